@@ -0,0 +1,30 @@
+"""
+Script de migration : table idempotency_keys
+(réponses mémorisées des mutations de tickets envoyées avec un en-tête Idempotency-Key).
+"""
+from sqlalchemy import inspect
+from app.database import engine
+from app import models
+
+
+def migrate_database():
+    """Crée la table des clés d'idempotence"""
+    try:
+        print("Début de la migration...")
+
+        table = models.IdempotencyKey.__table__
+        if table.name in inspect(engine).get_table_names():
+            print(f"OK - La table '{table.name}' existe déjà")
+        else:
+            # L'index sur expires_at (purge des clés expirées) est créé avec la table
+            table.create(bind=engine)
+            print(f"OK - Table '{table.name}' créée")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,40 @@
+"""
+Script de migration : crée la table notification_counters (compteur dénormalisé
+des notifications non lues) et l'initialise à partir de la table notifications
+"""
+from sqlalchemy import inspect, text
+from app.database import engine
+from app import models
+
+
+def migrate_database():
+    """Crée et initialise la table notification_counters"""
+    try:
+        print("Début de la migration...")
+
+        table = models.NotificationCounter.__table__
+        if table.name in inspect(engine).get_table_names():
+            print(f"OK - La table '{table.name}' existe déjà")
+        else:
+            table.create(bind=engine)
+            print(f"OK - Table '{table.name}' créée")
+
+        with engine.begin() as conn:
+            result = conn.execute(text("""
+                INSERT INTO notification_counters (user_id, unread_count, updated_at)
+                SELECT user_id, COUNT(*), NOW() AT TIME ZONE 'UTC'
+                FROM notifications
+                WHERE read = false
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO UPDATE SET unread_count = EXCLUDED.unread_count
+            """))
+            print(f"OK - {result.rowcount} compteur(s) initialisé(s)")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,56 @@
+"""
+Script de migration : crée les tables du mode récapitulatif des emails
+(notification_preferences, email_digest_items) et l'index unique partiel
+des préférences par défaut (une seule ligne notification_type NULL par utilisateur)
+"""
+from sqlalchemy import inspect, text
+from app.database import engine
+from app import models
+
+
+def migrate_database():
+    """Crée les tables notification_preferences et email_digest_items si elles n'existent pas"""
+    try:
+        print("Début de la migration...")
+
+        existing = set(inspect(engine).get_table_names())
+        tables = [
+            models.NotificationPreference.__table__,
+            models.EmailDigestItem.__table__,
+        ]
+        for table in tables:
+            if table.name in existing:
+                print(f"OK - La table '{table.name}' existe déjà")
+            else:
+                # checkfirst : le type ENUM notificationtype existe déjà
+                table.create(bind=engine, checkfirst=True)
+                print(f"OK - Table '{table.name}' créée")
+
+        # Tables créées avant l'index partiel : dédoublonner puis créer l'index
+        index_name = "uq_notification_preferences_user_default"
+        existing_indexes = {index["name"] for index in inspect(engine).get_indexes("notification_preferences")}
+        if index_name in existing_indexes:
+            print(f"OK - L'index '{index_name}' existe déjà")
+        else:
+            with engine.begin() as connection:
+                # Garder la préférence par défaut la plus récente de chaque utilisateur
+                removed = connection.execute(text("""
+                    DELETE FROM notification_preferences p
+                    USING notification_preferences newer
+                    WHERE p.notification_type IS NULL AND newer.notification_type IS NULL
+                      AND p.user_id = newer.user_id AND p.id < newer.id
+                """)).rowcount
+                if removed:
+                    print(f"OK - {removed} préférence(s) par défaut en double supprimée(s)")
+                index = next(i for i in models.NotificationPreference.__table__.indexes if i.name == index_name)
+                index.create(bind=connection)
+            print(f"OK - Index '{index_name}' créé")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
@@ -0,0 +1,38 @@
+"""
+Script de migration : rétention des notifications
+(table notifications_archive et index de la table notifications)
+"""
+from sqlalchemy import inspect
+from app.database import engine
+from app import models
+
+
+def migrate_database():
+    """Crée la table notifications_archive et les index manquants"""
+    try:
+        print("Début de la migration...")
+
+        archive = models.NotificationArchive.__table__
+        if archive.name in inspect(engine).get_table_names():
+            print(f"OK - La table '{archive.name}' existe déjà")
+        else:
+            # checkfirst : le type ENUM notificationtype existe déjà
+            archive.create(bind=engine, checkfirst=True)
+            print(f"OK - Table '{archive.name}' créée")
+
+        existing_indexes = {index["name"] for index in inspect(engine).get_indexes("notifications")}
+        for index in models.Notification.__table__.indexes:
+            if index.name in existing_indexes:
+                print(f"OK - L'index '{index.name}' existe déjà")
+            else:
+                index.create(bind=engine)
+                print(f"OK - Index '{index.name}' créé")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
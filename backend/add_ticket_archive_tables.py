@@ -0,0 +1,49 @@
+"""
+Script de migration : archivage des tickets clôturés
+(tables partitionnées tickets_archive, comments_archive, ticket_history_archive,
+index de parcours des tickets clôturés, clé étrangère notifications.ticket_id retirée).
+Nécessite PostgreSQL 11 ou plus récent (clé primaire sur une table partitionnée).
+"""
+from sqlalchemy import inspect, text
+from app.database import engine
+from app import models
+from app.ticket_archive import ARCHIVE_TABLES
+
+
+def migrate_database():
+    """Crée les tables d'archive et prépare les tables actives"""
+    try:
+        print("Début de la migration...")
+
+        existing_tables = inspect(engine).get_table_names()
+        for table in ARCHIVE_TABLES:
+            if table.name in existing_tables:
+                print(f"OK - La table '{table.name}' existe déjà")
+            else:
+                # checkfirst : les types ENUM existent déjà ; les index sont créés avec la table
+                table.create(bind=engine, checkfirst=True)
+                print(f"OK - Table partitionnée '{table.name}' créée (partitions annuelles créées à l'archivage)")
+
+        existing_indexes = {index["name"] for index in inspect(engine).get_indexes("tickets")}
+        for index in models.Ticket.__table__.indexes:
+            if index.name in existing_indexes:
+                print(f"OK - L'index '{index.name}' existe déjà")
+            else:
+                index.create(bind=engine)
+                print(f"OK - Index '{index.name}' créé")
+
+        # Une notification peut référencer un ticket archivé
+        with engine.begin() as connection:
+            for foreign_key in inspect(connection).get_foreign_keys("notifications"):
+                if foreign_key["referred_table"] == "tickets" and foreign_key["name"]:
+                    connection.execute(text(f'ALTER TABLE notifications DROP CONSTRAINT "{foreign_key["name"]}"'))
+                    print(f"OK - Clé étrangère '{foreign_key['name']}' retirée de notifications")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
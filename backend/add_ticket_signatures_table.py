@@ -0,0 +1,69 @@
+"""
+Script de migration : index de similarité des tickets (table ticket_signatures)
+Crée la table (et l'index sur updated_at, absent des tables créées avant lui)
+puis calcule la signature MinHash des tickets existants.
+"""
+from sqlalchemy import inspect
+from app.database import engine, SessionLocal
+from app import models
+from app.similarity_index import signature
+
+BATCH_SIZE = 1000
+
+
+def migrate_database():
+    """Crée la table ticket_signatures et calcule les signatures manquantes"""
+    db = SessionLocal()
+    try:
+        print("Début de la migration...")
+
+        signatures = models.TicketSignature.__table__
+        if signatures.name in inspect(engine).get_table_names():
+            print(f"OK - La table '{signatures.name}' existe déjà")
+        else:
+            signatures.create(bind=engine, checkfirst=True)
+            print(f"OK - Table '{signatures.name}' créée")
+
+        # Synchronisation de l'index entre processus : recherche par updated_at
+        existing_indexes = {index["name"] for index in inspect(engine).get_indexes(signatures.name)}
+        for index in signatures.indexes:
+            if index.name in existing_indexes:
+                print(f"OK - L'index '{index.name}' existe déjà")
+            else:
+                index.create(bind=engine)
+                print(f"OK - Index '{index.name}' créé")
+
+        indexed = 0
+        last_id = 0
+        while True:
+            tickets = (
+                db.query(models.Ticket.id, models.Ticket.title, models.Ticket.description)
+                .outerjoin(models.TicketSignature, models.TicketSignature.ticket_id == models.Ticket.id)
+                .filter(models.TicketSignature.ticket_id.is_(None), models.Ticket.id > last_id)
+                .order_by(models.Ticket.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not tickets:
+                break
+            db.bulk_insert_mappings(models.TicketSignature, [
+                {"ticket_id": ticket.id, "signature": signature(ticket.title, ticket.description)}
+                for ticket in tickets
+            ])
+            db.commit()
+            indexed += len(tickets)
+            last_id = tickets[-1].id
+            print(f"   {indexed} ticket(s) indexé(s)...")
+
+        print(f"OK - Signatures calculées pour {indexed} ticket(s)")
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        db.rollback()
+        print(f"ERREUR lors de la migration: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_database()
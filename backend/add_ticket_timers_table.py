@@ -0,0 +1,63 @@
+"""
+Script de migration : échéances des tickets (table ticket_timers)
+Crée la table puis arme les échéances des tickets ouverts ou résolus.
+"""
+from sqlalchemy import inspect
+from app.database import engine, SessionLocal
+from app import models
+from app.sla_timers import ACTIVE_STATUSES, sync_ticket_timers
+
+# Rappels déjà envoyés par l'ancien parcours horaire : ne pas les renvoyer
+SENT_REMINDERS = {
+    models.NotificationType.RAPPEL_VALIDATION_1: models.TimerKind.RAPPEL_VALIDATION_1,
+    models.NotificationType.RAPPEL_VALIDATION_2: models.TimerKind.RAPPEL_VALIDATION_2,
+    models.NotificationType.RAPPEL_VALIDATION_3: models.TimerKind.RAPPEL_VALIDATION_3,
+}
+
+
+def migrate_database():
+    """Crée la table ticket_timers et arme les échéances existantes"""
+    db = SessionLocal()
+    try:
+        print("Début de la migration...")
+
+        timers = models.TicketTimer.__table__
+        if timers.name in inspect(engine).get_table_names():
+            print(f"OK - La table '{timers.name}' existe déjà")
+        else:
+            timers.create(bind=engine, checkfirst=True)
+            print(f"OK - Table '{timers.name}' créée")
+
+        tickets = (
+            db.query(models.Ticket)
+            .filter(models.Ticket.status.in_(ACTIVE_STATUSES | {models.TicketStatus.RESOLU}))
+            .all()
+        )
+        for ticket in tickets:
+            sync_ticket_timers(db, ticket.id, ticket.status, ticket.priority, ticket.resolved_at)
+
+        sent = (
+            db.query(models.Notification.ticket_id, models.Notification.type)
+            .filter(models.Notification.type.in_(list(SENT_REMINDERS)))
+            .distinct()
+            .all()
+        )
+        for ticket_id, notification_type in sent:
+            db.query(models.TicketTimer).filter(
+                models.TicketTimer.ticket_id == ticket_id,
+                models.TicketTimer.kind == SENT_REMINDERS[notification_type],
+            ).update({models.TicketTimer.fired_at: models.TicketTimer.armed_at}, synchronize_session=False)
+
+        db.commit()
+        print(f"OK - Échéances armées pour {len(tickets)} ticket(s)")
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        db.rollback()
+        print(f"ERREUR lors de la migration: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate_database()
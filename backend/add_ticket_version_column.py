@@ -0,0 +1,39 @@
+"""
+Script de migration : ajoute la colonne version à la table tickets
+(verrouillage optimiste des transitions du workflow, voir app/ticket_workflow.py)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+
+def migrate_database():
+    """Ajoute la colonne version à la table tickets"""
+    try:
+        print("Début de la migration...")
+
+        with engine.begin() as conn:
+            # Vérifier si la colonne existe déjà
+            result = conn.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'tickets' AND column_name = 'version'
+            """))
+
+            if result.fetchone():
+                print("OK - La colonne 'version' existe déjà dans 'tickets'")
+            else:
+                print("Ajout de la colonne 'version' dans la table 'tickets'...")
+                conn.execute(text("""
+                    ALTER TABLE tickets
+                    ADD COLUMN version INTEGER NOT NULL DEFAULT 1
+                """))
+                print("OK - Colonne 'version' ajoutée dans 'tickets'")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
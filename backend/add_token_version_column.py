@@ -0,0 +1,39 @@
+"""
+Script de migration : ajoute la colonne token_version à la table users
+(révocation des jetons JWT : désactivation, réinitialisation du mot de passe, déconnexion)
+"""
+from sqlalchemy import text
+from app.database import engine
+
+
+def migrate_database():
+    """Ajoute la colonne token_version à la table users"""
+    try:
+        print("Début de la migration...")
+
+        with engine.begin() as conn:
+            # Vérifier si la colonne existe déjà
+            result = conn.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'users' AND column_name = 'token_version'
+            """))
+
+            if result.fetchone():
+                print("OK - La colonne 'token_version' existe déjà dans 'users'")
+            else:
+                print("Ajout de la colonne 'token_version' dans la table 'users'...")
+                conn.execute(text("""
+                    ALTER TABLE users
+                    ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0
+                """))
+                print("OK - Colonne 'token_version' ajoutée dans 'users'")
+
+        print("\nMigration terminée avec succès !")
+
+    except Exception as e:
+        print(f"ERREUR lors de la migration: {e}")
+
+
+if __name__ == "__main__":
+    migrate_database()
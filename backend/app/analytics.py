@@ -0,0 +1,308 @@
+"""
+Statistiques des tickets calculées par PostgreSQL.
+
+Les indicateurs (temps de résolution, temps de réponse, taux de réussite,
+satisfaction) étaient calculés en Python, ticket par ticket, sur des objets ORM
+chargés en entier (plus une requête d'historique par ticket pour le temps de
+réponse). Ici chaque rapport est une seule requête d'agrégation : seules les
+colonnes utiles sont lues, et moyennes, percentiles (percentile_cont),
+histogrammes et regroupements sont calculés par la base.
+
+Définitions (identiques aux statistiques des techniciens) :
+- temps de résolution : date de clôture (ou de résolution) - date de création ;
+- temps de réponse : première prise en charge (passage EN_COURS dans
+  l'historique, à défaut la résolution) - date d'assignation ;
+- taux de réussite : tickets clôturés / tickets du périmètre.
+
+Les tickets archivés (voir app.ticket_archive) sont inclus : les requêtes
+portent sur tickets UNION ALL tickets_archive (et l'historique sur les deux
+tables d'historique) dès que la période peut contenir des tickets archivés,
+c'est-à-dire sans date de début ou avec une date de début antérieure à
+TICKET_ARCHIVE_AFTER_DAYS jours. Les statistiques d'un technicien incluent
+toujours l'archive. Un rapport ne change donc pas quand le job d'archivage
+déplace des tickets.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+from .ticket_archive import TICKET_ARCHIVE_AFTER_DAYS
+
+S = models.TicketStatus
+
+# Colonnes lues par les rapports (communes à tickets et tickets_archive)
+TICKET_COLUMNS = (
+    "id", "status", "created_at", "assigned_at", "resolved_at", "closed_at",
+    "technician_id", "user_agency", "category", "type", "priority", "feedback_score",
+)
+HISTORY_COLUMNS = ("ticket_id", "new_status", "changed_at")
+
+PERCENTILES = (0.5, 0.9, 0.99)
+# Bornes (heures) de l'histogramme des temps de résolution
+RESOLUTION_HISTOGRAM_HOURS = (1, 4, 8, 24, 72, 168, 336)
+
+# Dimension de regroupement -> colonne des tickets
+BREAKDOWN_DIMENSIONS = {
+    "technician": "technician_id",
+    "agency": "user_agency",
+    "category": "category",
+    "type": "type",
+    "priority": "priority",
+}
+
+
+def _union(active, archive, columns: Tuple[str, ...], name: str):
+    return union_all(
+        select(*(active.c[column] for column in columns)),
+        select(*(archive.c[column] for column in columns)),
+    ).subquery(name)
+
+
+def _sources(with_archive: bool):
+    """Tickets et historique interrogés : tables actives, ou actives + archive"""
+    if not with_archive:
+        return models.Ticket.__table__, models.TicketHistory.__table__
+    return (
+        _union(models.Ticket.__table__, models.TicketArchive.__table__, TICKET_COLUMNS, "all_tickets"),
+        _union(models.TicketHistory.__table__, models.TicketHistoryArchive.__table__, HISTORY_COLUMNS, "all_history"),
+    )
+
+
+class ReportFilters(NamedTuple):
+    start: Optional[datetime] = None  # Tickets créés à partir de cette date
+    end: Optional[datetime] = None  # ... et avant cette date
+    technician_id: Optional[int] = None
+    agency: Optional[str] = None
+    category: Optional[str] = None
+
+    def reaches_archive(self, now: Optional[datetime] = None) -> bool:
+        """
+        La période peut contenir des tickets archivés : ceux-ci ont été créés avant
+        leur clôture, elle-même antérieure à TICKET_ARCHIVE_AFTER_DAYS jours
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(days=TICKET_ARCHIVE_AFTER_DAYS)
+        return self.start is None or self.start < cutoff
+
+    def conditions(self, T) -> list:
+        conditions = []
+        if self.start:
+            conditions.append(T.c.created_at >= self.start)
+        if self.end:
+            conditions.append(T.c.created_at < self.end)
+        if self.technician_id is not None:
+            conditions.append(T.c.technician_id == self.technician_id)
+        if self.agency:
+            conditions.append(T.c.user_agency == self.agency)
+        if self.category:
+            conditions.append(T.c.category == self.category)
+        return conditions
+
+
+def _epoch(column):
+    return func.extract("epoch", column)
+
+
+def _first_in_progress(T, H, conditions: list):
+    """Première prise en charge (passage EN_COURS) des tickets du périmètre"""
+    in_scope = select(T.c.id).where(*conditions).correlate(None)
+    return (
+        select(H.c.ticket_id, func.min(H.c.changed_at).label("started_at"))
+        .where(H.c.new_status == S.EN_COURS, H.c.ticket_id.in_(in_scope))
+        .group_by(H.c.ticket_id)
+        .subquery("first_in_progress")
+    )
+
+
+def _durations(T, H, conditions: list):
+    """Colonnes calculées : durée de résolution (heures) et de réponse (minutes), NULL si non applicable"""
+    started = _first_in_progress(T, H, conditions)
+    end = func.coalesce(T.c.closed_at, T.c.resolved_at)
+    resolution_hours = case(
+        (
+            and_(T.c.status.in_([S.RESOLU, S.CLOTURE]), end.isnot(None), end >= T.c.created_at),
+            (_epoch(end) - _epoch(T.c.created_at)) / 3600.0,
+        ),
+        else_=None,
+    )
+    first_action = func.coalesce(started.c.started_at, T.c.resolved_at)
+    response_minutes = case(
+        (
+            and_(
+                T.c.status.in_([S.RESOLU, S.CLOTURE]), T.c.assigned_at.isnot(None),
+                first_action.isnot(None), first_action >= T.c.assigned_at,
+            ),
+            (_epoch(first_action) - _epoch(T.c.assigned_at)) / 60.0,
+        ),
+        else_=None,
+    )
+    source = T.outerjoin(started, started.c.ticket_id == T.c.id)
+    return source, resolution_hours, response_minutes
+
+
+def _distribution(values, prefix: str) -> list:
+    columns = [func.avg(values).label(f"{prefix}_avg")]
+    for percentile in PERCENTILES:
+        columns.append(
+            func.percentile_cont(percentile).within_group(values).label(f"{prefix}_p{int(percentile * 100)}")
+        )
+    return columns
+
+
+def _rounded(value, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if value is not None else None
+
+
+def _distribution_dict(row, prefix: str) -> Dict[str, Optional[float]]:
+    return {
+        "avg": _rounded(row._mapping[f"{prefix}_avg"]),
+        **{f"p{int(p * 100)}": _rounded(row._mapping[f"{prefix}_p{int(p * 100)}"]) for p in PERCENTILES},
+    }
+
+
+def resolution_report(db: Session, filters: ReportFilters) -> Dict[str, Any]:
+    """Volumes, taux de réussite, distributions des temps de résolution / réponse et satisfaction"""
+    T, H = _sources(filters.reaches_archive())
+    conditions = filters.conditions(T)
+    source, resolution_hours, response_minutes = _durations(T, H, conditions)
+    row = db.execute(
+        select(
+            func.count().label("ticket_count"),
+            func.count().filter(T.c.status == S.RESOLU).label("resolved_count"),
+            func.count().filter(T.c.status == S.CLOTURE).label("closed_count"),
+            func.count(T.c.feedback_score).label("feedback_count"),
+            func.avg(T.c.feedback_score).label("feedback_avg"),
+            *_distribution(resolution_hours, "resolution"),
+            *_distribution(response_minutes, "response"),
+        )
+        .select_from(source)
+        .where(*conditions)
+    ).one()
+
+    feedback = dict(
+        db.execute(
+            select(T.c.feedback_score, func.count())
+            .where(T.c.feedback_score.isnot(None), *conditions)
+            .group_by(T.c.feedback_score)
+        ).all()
+    )
+
+    return {
+        "ticket_count": row.ticket_count,
+        "resolved_count": row.resolved_count,
+        "closed_count": row.closed_count,
+        "success_rate": round(row.closed_count / row.ticket_count * 100, 1) if row.ticket_count else 0,
+        "resolution_hours": _distribution_dict(row, "resolution"),
+        "response_minutes": _distribution_dict(row, "response"),
+        "feedback": {
+            "count": row.feedback_count,
+            "average": _rounded(row.feedback_avg),
+            "distribution": {int(score): count for score, count in sorted(feedback.items())},
+        },
+    }
+
+
+def resolution_histogram(db: Session, filters: ReportFilters) -> List[Dict[str, Any]]:
+    """Nombre de tickets résolus par tranche de temps de résolution"""
+    T, H = _sources(filters.reaches_archive())
+    conditions = filters.conditions(T)
+    source, resolution_hours, _ = _durations(T, H, conditions)
+    bucket = case(
+        *[(resolution_hours < upper, index) for index, upper in enumerate(RESOLUTION_HISTOGRAM_HOURS)],
+        else_=len(RESOLUTION_HISTOGRAM_HOURS),
+    ).label("bucket")
+    counts = dict(
+        db.execute(
+            select(bucket, func.count())
+            .select_from(source)
+            .where(resolution_hours.isnot(None), *conditions)
+            .group_by(bucket)
+        ).all()
+    )
+
+    bounds: List[Tuple[float, Optional[float]]] = []
+    lower = 0.0
+    for upper in RESOLUTION_HISTOGRAM_HOURS:
+        bounds.append((lower, float(upper)))
+        lower = float(upper)
+    bounds.append((lower, None))
+    return [
+        {"lower_hours": lower, "upper_hours": upper, "count": counts.get(index, 0)}
+        for index, (lower, upper) in enumerate(bounds)
+    ]
+
+
+def breakdown(db: Session, dimension: str, filters: ReportFilters) -> List[Dict[str, Any]]:
+    """Indicateurs regroupés par technicien, agence, catégorie, type ou priorité"""
+    T, H = _sources(filters.reaches_archive())
+    conditions = filters.conditions(T)
+    key = T.c[BREAKDOWN_DIMENSIONS[dimension]].label("key")
+    source, resolution_hours, response_minutes = _durations(T, H, conditions)
+    rows = db.execute(
+        select(
+            key,
+            func.count().label("ticket_count"),
+            func.count().filter(T.c.status == S.RESOLU).label("resolved_count"),
+            func.count().filter(T.c.status == S.CLOTURE).label("closed_count"),
+            func.avg(T.c.feedback_score).label("feedback_avg"),
+            *_distribution(resolution_hours, "resolution"),
+            func.avg(response_minutes).label("response_avg"),
+        )
+        .select_from(source)
+        .where(*conditions)
+        .group_by(key)
+        .order_by(func.count().desc())
+    ).all()
+
+    labels: Dict[Any, str] = {}
+    if dimension == "technician":
+        technician_ids = [row.key for row in rows if row.key is not None]
+        labels = dict(
+            db.query(models.User.id, models.User.full_name).filter(models.User.id.in_(technician_ids)).all()
+        ) if technician_ids else {}
+
+    result = []
+    for row in rows:
+        value = row.key.value if hasattr(row.key, "value") else row.key
+        result.append({
+            "key": None if value is None else str(value),
+            "label": labels.get(row.key, None if value is None else str(value)),
+            "ticket_count": row.ticket_count,
+            "resolved_count": row.resolved_count,
+            "closed_count": row.closed_count,
+            "success_rate": round(row.closed_count / row.ticket_count * 100, 1) if row.ticket_count else 0,
+            "resolution_hours": _distribution_dict(row, "resolution"),
+            "response_minutes_avg": _rounded(row.response_avg),
+            "feedback_average": _rounded(row.feedback_avg),
+        })
+    return result
+
+
+def technician_summary(db: Session, technician_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Compteurs et moyennes d'un technicien en une requête (statistiques du tableau de bord),
+    tickets archivés compris
+    """
+    now = now or datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+    T, H = _sources(with_archive=True)
+    source, resolution_hours, response_minutes = _durations(T, H, [T.c.technician_id == technician_id])
+    done = T.c.status.in_([S.RESOLU, S.CLOTURE])
+    row = db.execute(
+        select(
+            func.count().label("total_assigned"),
+            func.count().filter(T.c.status == S.RESOLU).label("resolved_count"),
+            func.count().filter(T.c.status == S.CLOTURE).label("closed_count"),
+            func.count().filter(T.c.status == S.EN_COURS).label("in_progress_count"),
+            func.count().filter(done, T.c.resolved_at >= month_start).label("resolved_this_month"),
+            func.count().filter(done, T.c.resolved_at >= today_start).label("resolved_today"),
+            func.avg(resolution_hours).label("resolution_hours_avg"),
+            func.avg(response_minutes).label("response_minutes_avg"),
+        )
+        .select_from(source)
+        .where(T.c.technician_id == technician_id)
+    ).one()
+    return dict(row._mapping)
@@ -0,0 +1,390 @@
+"""
+Backend d'envoi d'emails asyncio (EMAIL_BACKEND=async).
+
+Le backend synchrone (smtplib) occupe un thread du threadpool pendant toute la
+conversation SMTP de chaque tâche d'arrière-plan. Ici, les envois sont confiés à
+une boucle asyncio dédiée (thread démarré à la première utilisation) :
+
+- un sémaphore limite le nombre de conversations SMTP simultanées ;
+- un seau à jetons (token bucket) respecte le quota d'envoi du fournisseur ;
+- les connexions sont réutilisées : un pool de connexions ouvertes par domaine
+  destinataire, fermées après EMAIL_CONNECTION_IDLE_SECONDS d'inactivité. Une
+  connexion du pool fermée par le serveur pendant son inactivité n'est détectée
+  qu'à l'envoi suivant : celui-ci est alors retenté une fois sur une connexion neuve.
+
+Le client SMTP est écrit sur les streams asyncio de la bibliothèque standard
+(EHLO, STARTTLS, AUTH PLAIN, MAIL/RCPT/DATA, RSET, QUIT).
+"""
+import asyncio
+import base64
+import logging
+import os
+import socket
+import ssl
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .metrics import EMAIL_SEND_DURATION, EMAILS_SENT
+from .structured_logging import bind_log_context, current_log_context
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPError(Exception):
+    """Réponse inattendue du serveur SMTP"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+class SMTPSettings(NamedTuple):
+    """Paramètres de connexion lus sur l'EmailService au moment de l'envoi"""
+    server: str
+    port: int
+    username: str
+    password: str
+    use_tls: bool
+    verify_ssl: bool
+    plaintext: bool
+
+
+class TokenBucket:
+    """
+    Limiteur de débit : `rate` jetons par seconde, au plus `capacity` en réserve.
+    Un rate <= 0 désactive la limitation.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        # Le verrou sert les demandes dans l'ordre d'arrivée
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self._updated is not None:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncSMTPConnection:
+    """Connexion SMTP asyncio pouvant envoyer plusieurs messages"""
+
+    def __init__(self, settings: SMTPSettings, timeout: float = 30.0):
+        self.settings = settings
+        self.timeout = timeout
+        self.messages_sent = 0
+        self.last_used = 0.0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    def _ssl_context(self) -> ssl.SSLContext:
+        context = ssl.create_default_context()
+        if not self.settings.verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def _read_reply(self) -> Tuple[int, str]:
+        lines = []
+        while True:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("Connexion SMTP fermée par le serveur")
+            text = line.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(text[4:])
+            if len(text) < 4 or text[3] != "-":
+                return int(text[:3]), "\n".join(lines)
+
+    async def command(self, line: str, expected: Tuple[int, ...] = (250,)) -> str:
+        self._writer.write(line.encode("utf-8") + b"\r\n")
+        await self._writer.drain()
+        code, message = await self._read_reply()
+        if code not in expected:
+            raise SMTPError(code, message)
+        return message
+
+    async def connect(self) -> None:
+        s = self.settings
+        implicit_ssl = not s.use_tls and not s.plaintext
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                s.server,
+                s.port,
+                ssl=self._ssl_context() if implicit_ssl else None,
+                server_hostname=s.server if implicit_ssl else None,
+            ),
+            self.timeout,
+        )
+        code, message = await self._read_reply()
+        if code != 220:
+            raise SMTPError(code, message)
+
+        hostname = socket.getfqdn()
+        extensions = await self.command(f"EHLO {hostname}")
+        if s.use_tls and not s.plaintext:
+            await self.command("STARTTLS", (220,))
+            await asyncio.wait_for(
+                self._writer.start_tls(self._ssl_context(), server_hostname=s.server),
+                self.timeout,
+            )
+            extensions = await self.command(f"EHLO {hostname}")
+
+        if s.username and s.password:
+            if "AUTH" not in extensions.upper():
+                raise SMTPError(502, "Le serveur ne propose pas l'authentification")
+            token = base64.b64encode(f"\0{s.username}\0{s.password}".encode("utf-8")).decode("ascii")
+            await self.command(f"AUTH PLAIN {token}", (235,))
+
+    async def send(self, sender: str, recipients: List[str], data: bytes) -> None:
+        """Envoie un message déjà sérialisé (lignes terminées par CRLF)"""
+        try:
+            await self.command(f"MAIL FROM:<{sender}>")
+            for recipient in recipients:
+                await self.command(f"RCPT TO:<{recipient}>", (250, 251))
+            await self.command("DATA", (354,))
+            # Transparence SMTP : doubler les points en début de ligne
+            if data.startswith(b"."):
+                data = b"." + data
+            data = data.replace(b"\r\n.", b"\r\n..")
+            if not data.endswith(b"\r\n"):
+                data += b"\r\n"
+            self._writer.write(data + b".\r\n")
+            await self._writer.drain()
+            code, message = await self._read_reply()
+            if code != 250:
+                raise SMTPError(code, message)
+        except SMTPError:
+            # Transaction refusée : la connexion reste utilisable après RSET
+            await self.command("RSET")
+            raise
+        self.messages_sent += 1
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        try:
+            if not self._writer.is_closing():
+                await asyncio.wait_for(self.command("QUIT", (221,)), 5)
+        except Exception:
+            pass
+        finally:
+            self._writer.close()
+            self._writer = None
+
+
+class AsyncSMTPBackend:
+    """
+    Envoi asynchrone sur une boucle asyncio dédiée.
+    `settings_provider` est appelé à chaque envoi pour prendre en compte les
+    paramètres modifiés à chaud (PUT /settings/email).
+    """
+
+    def __init__(
+        self,
+        settings_provider: Callable[[], SMTPSettings],
+        concurrency: int = 10,
+        rate_per_second: float = 0.0,
+        burst: int = 1,
+        max_connections_per_domain: int = 2,
+        max_messages_per_connection: int = 100,
+        idle_seconds: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        self.settings_provider = settings_provider
+        self.concurrency = concurrency
+        self.max_connections_per_domain = max_connections_per_domain
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_seconds = idle_seconds
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(rate_per_second, burst)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._domain_slots: Dict[Tuple[SMTPSettings, str], asyncio.Semaphore] = {}
+        self._idle: Dict[Tuple[SMTPSettings, str], List[AsyncSMTPConnection]] = defaultdict(list)
+        self._pending: set = set()
+        self._reaper: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, settings_provider: Callable[[], SMTPSettings]) -> "AsyncSMTPBackend":
+        return cls(
+            settings_provider,
+            concurrency=int(os.getenv("EMAIL_ASYNC_CONCURRENCY", "10")),
+            rate_per_second=float(os.getenv("EMAIL_RATE_PER_SECOND", "0")),
+            burst=int(os.getenv("EMAIL_RATE_BURST", "10")),
+            max_connections_per_domain=int(os.getenv("EMAIL_MAX_CONNECTIONS_PER_DOMAIN", "2")),
+            max_messages_per_connection=int(os.getenv("EMAIL_MAX_MESSAGES_PER_CONNECTION", "100")),
+            idle_seconds=float(os.getenv("EMAIL_CONNECTION_IDLE_SECONDS", "30")),
+            timeout=float(os.getenv("EMAIL_SMTP_TIMEOUT", "30")),
+        )
+
+    # --- Boucle dédiée -------------------------------------------------
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.concurrency)
+                    self._reaper = loop.create_task(self._reap_idle())
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name="email-async-smtp", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, sender: str, recipients: List[str], data: bytes) -> Future:
+        """Planifie l'envoi depuis n'importe quel thread ; renvoie un Future (True/False)"""
+        loop = self._ensure_started()
+        # La boucle d'envoi tourne dans son propre thread : le request_id de l'appelant y est transmis
+        future = asyncio.run_coroutine_threadsafe(
+            bind_log_context(self.send(sender, recipients, data), current_log_context()), loop
+        )
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Attend la fin des envois en cours (tests, benchmarks, arrêt propre)"""
+        for future in list(self._pending):
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """Ferme les connexions ouvertes et arrête la boucle dédiée"""
+        if self._loop is None:
+            return
+        self.flush(self.timeout)
+        asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(self.timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(self.timeout)
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+
+    # --- Envoi ---------------------------------------------------------
+
+    async def send(self, sender: str, recipients: List[str], data: bytes) -> bool:
+        settings = self.settings_provider()
+        domain = recipients[0].rsplit("@", 1)[-1].lower()
+        key = (settings, domain)
+        slots = self._domain_slots.get(key)
+        if slots is None:
+            slots = self._domain_slots[key] = asyncio.Semaphore(self.max_connections_per_domain)
+
+        await self.rate_limiter.acquire()
+        async with self._semaphore, slots:
+            connection = None
+            start = time.perf_counter()
+            try:
+                connection = self._pooled(key)
+                if connection is not None:
+                    try:
+                        await connection.send(sender, recipients, data)
+                    except SMTPError:
+                        raise
+                    except Exception:
+                        # Fermée par le serveur pendant l'inactivité (is_open ne le voit pas
+                        # toujours en TCP simple) : nouvel essai sur une connexion neuve
+                        await connection.close()
+                        connection = None
+                if connection is None:
+                    connection = await self._connect(key)
+                    await connection.send(sender, recipients, data)
+            except Exception as e:
+                logger.error("Erreur lors de l'envoi de l'email (async): %s", e, extra={"recipients": recipients})
+                EMAIL_SEND_DURATION.labels("async").observe(time.perf_counter() - start)
+                EMAILS_SENT.labels("async", "failed").inc()
+                if connection is None:
+                    return False
+                if isinstance(e, SMTPError) and connection.is_open:
+                    self._checkin(key, connection)
+                else:
+                    await connection.close()
+                return False
+            self._checkin(key, connection)
+            EMAIL_SEND_DURATION.labels("async").observe(time.perf_counter() - start)
+            EMAILS_SENT.labels("async", "sent").inc()
+        logger.info("Email envoyé (async)", extra={"recipients": recipients, "sampled": True})
+        return True
+
+    def _pooled(self, key: Tuple[SMTPSettings, str]) -> Optional[AsyncSMTPConnection]:
+        """Connexion inactive du pool, None s'il n'y en a pas"""
+        idle = self._idle[key]
+        while idle:
+            connection = idle.pop()
+            if connection.is_open:
+                return connection
+        return None
+
+    async def _connect(self, key: Tuple[SMTPSettings, str]) -> AsyncSMTPConnection:
+        connection = AsyncSMTPConnection(key[0], self.timeout)
+        try:
+            await connection.connect()
+        except Exception:
+            await connection.close()
+            raise
+        return connection
+
+    def _checkin(self, key: Tuple[SMTPSettings, str], connection: AsyncSMTPConnection) -> None:
+        if connection.messages_sent >= self.max_messages_per_connection:
+            asyncio.ensure_future(connection.close())
+            return
+        connection.last_used = asyncio.get_running_loop().time()
+        self._idle[key].append(connection)
+
+    async def _reap_idle(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_seconds / 2))
+            deadline = loop.time() - self.idle_seconds
+            for key, connections in list(self._idle.items()):
+                expired = [c for c in connections if c.last_used <= deadline]
+                self._idle[key] = [c for c in connections if c.last_used > deadline]
+                for connection in expired:
+                    await connection.close()
+
+    async def _close_all(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for connections in self._idle.values():
+            for connection in connections:
+                await connection.close()
+        self._idle.clear()
@@ -0,0 +1,414 @@
+"""
+Stockage des pièces jointes (tickets et commentaires).
+
+Les fichiers sont stockés hors de la base, adressés par leur empreinte SHA-256
+(déduplication : un même fichier envoyé deux fois n'est stocké qu'une fois).
+Seules les métadonnées (nom, type, taille, empreinte) sont conservées dans les
+colonnes JSONB Ticket.attachments / Comment.attachments.
+
+Deux implémentations :
+- LocalAttachmentStore : système de fichiers local (par défaut) ;
+- S3AttachmentStore : stockage compatible S3 (AWS, MinIO en local...), via un
+  client boto3 (dépendance optionnelle).
+
+Un fichier n'est jamais supprimé par la requête qui retire la pièce jointe : la
+suppression est demandée dans attachment_deletions et exécutée par la tâche
+collect_deleted_attachments, après ATTACHMENT_GC_GRACE_MINUTES et une nouvelle
+vérification des références. Un upload du même contenu (dédupliqué, donc sans
+écriture) rafraîchit la date du fichier, qui n'est alors pas supprimé tant que
+la pièce jointe qui le référence n'est pas enregistrée.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from urllib.parse import quote
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse, Response
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import models
+
+# Taille des blocs lus/écrits : le fichier ne réside jamais entièrement en mémoire
+CHUNK_SIZE = 1024 * 1024
+
+ATTACHMENT_STORAGE = os.getenv("ATTACHMENT_STORAGE", "local")
+ATTACHMENT_DIR = os.getenv(
+    "ATTACHMENT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads"),
+)
+ATTACHMENT_MAX_SIZE_MB = int(os.getenv("ATTACHMENT_MAX_SIZE_MB", "25"))
+# Marge du corps multipart au-delà du fichier (délimiteurs, en-têtes des parties)
+ATTACHMENT_MULTIPART_OVERHEAD = 64 * 1024
+ATTACHMENT_GC_GRACE_MINUTES = int(os.getenv("ATTACHMENT_GC_GRACE_MINUTES", "60"))
+ATTACHMENT_GC_BATCH_SIZE = 500
+
+S3_BUCKET = os.getenv("S3_BUCKET", "tickets-attachments")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # ex: http://localhost:9000 pour MinIO
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_PRESIGNED_URL_EXPIRES = int(os.getenv("S3_PRESIGNED_URL_EXPIRES", "300"))
+
+
+class AttachmentStore:
+    """Interface commune des stockages de pièces jointes"""
+
+    def __init__(self, max_size: int = ATTACHMENT_MAX_SIZE_MB * 1024 * 1024):
+        self.max_size = max_size
+
+    def _staging_dir(self) -> Optional[str]:
+        return None
+
+    def save(self, fileobj: BinaryIO) -> Tuple[str, int]:
+        """
+        Copie le flux par blocs dans un fichier temporaire en calculant l'empreinte,
+        puis le publie sous sa clé SHA-256. Renvoie (sha256, taille).
+
+        La taille est vérifiée ici sur le fichier lui-même, une fois l'upload reçu ;
+        AttachmentUploadLimitMiddleware refuse plus tôt les corps trop volumineux,
+        avant leur réception complète.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._staging_dir(), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Attachment exceeds {self.max_size // (1024 * 1024)} MB",
+                        )
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            sha256 = digest.hexdigest()
+            self._publish(tmp_path, sha256)
+            return sha256, size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _publish(self, tmp_path: str, sha256: str) -> None:
+        raise NotImplementedError
+
+    def exists(self, sha256: str) -> bool:
+        raise NotImplementedError
+
+    def last_modified(self, sha256: str) -> Optional[datetime]:
+        """Date (UTC, naïve) du dernier dépôt du fichier, None s'il n'existe pas"""
+        raise NotImplementedError
+
+    def delete(self, sha256: str) -> None:
+        raise NotImplementedError
+
+    def delete_unless_modified(self, sha256: str, since: datetime) -> bool:
+        """Supprime le fichier s'il n'a pas été redéposé après `since`. Renvoie True s'il est supprimé"""
+        modified = self.last_modified(sha256)
+        if modified is None or modified > since:
+            return False
+        self.delete(sha256)
+        return True
+
+    def download_response(self, sha256: str, filename: str, content_type: str) -> Response:
+        raise NotImplementedError
+
+
+class LocalAttachmentStore(AttachmentStore):
+    """Stockage sur le système de fichiers local : <root>/ab/cd/abcd...."""
+
+    def __init__(self, root: str = ATTACHMENT_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _staging_dir(self) -> Optional[str]:
+        # Même système de fichiers que la destination : la publication est un simple renommage
+        return self.root
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def _publish(self, tmp_path: str, sha256: str) -> None:
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            # Déjà stocké (déduplication) : rafraîchir la date protège le fichier du ramasse-miettes
+            try:
+                os.utime(path)
+                return
+            except FileNotFoundError:
+                pass  # Supprimé entre-temps : le publier à nouveau
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def last_modified(self, sha256: str) -> Optional[datetime]:
+        try:
+            return datetime.utcfromtimestamp(os.path.getmtime(self.path_for(sha256)))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, sha256: str) -> None:
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def delete_unless_modified(self, sha256: str, since: datetime) -> bool:
+        # Renommage puis nouvelle lecture de la date : un upload qui rafraîchit le fichier
+        # avant le renommage le conserve, un upload après le renommage le republie
+        path = self.path_for(sha256)
+        tombstone = path + ".deleted"
+        try:
+            os.replace(path, tombstone)
+        except FileNotFoundError:
+            return False
+        if datetime.utcfromtimestamp(os.path.getmtime(tombstone)) > since:
+            os.replace(tombstone, path)
+            return False
+        os.remove(tombstone)
+        return True
+
+    def download_response(self, sha256: str, filename: str, content_type: str) -> Response:
+        path = self.path_for(sha256)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment file not found")
+        # FileResponse gère les en-têtes Range (206) et l'envoi direct du fichier (pathsend)
+        return FileResponse(path, media_type=content_type, filename=filename)
+
+
+class S3AttachmentStore(AttachmentStore):
+    """
+    Stockage compatible S3. Le client doit exposer l'API boto3 (head_object,
+    upload_file, put_object, copy_object, delete_object, generate_presigned_url) :
+    AWS S3, MinIO, ou un équivalent local pour les tests.
+
+    S3 n'a ni renommage atomique ni suppression conditionnelle sur tous les
+    fournisseurs : un upload dédupliqué dépose un bail (<sha256>.lease, objet vide)
+    puis vérifie que le fichier existe encore ; le ramasse-miettes copie le fichier
+    vers <sha256>.deleted avant de le supprimer, relit le bail et le restaure si
+    un upload l'a renouvelé entre-temps.
+    """
+
+    LEASE_SUFFIX = ".lease"
+    TOMBSTONE_SUFFIX = ".deleted"
+
+    def __init__(self, client, bucket: str = S3_BUCKET, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.bucket = bucket
+
+    def _modified(self, key: str) -> Optional[datetime]:
+        try:
+            modified = self.client.head_object(Bucket=self.bucket, Key=key)["LastModified"]
+        except Exception:
+            return None
+        return modified.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _copy(self, source: str, key: str) -> None:
+        self.client.copy_object(Bucket=self.bucket, Key=key, CopySource={"Bucket": self.bucket, "Key": source})
+
+    def exists(self, sha256: str) -> bool:
+        return self._modified(sha256) is not None
+
+    def last_modified(self, sha256: str) -> Optional[datetime]:
+        modified = self._modified(sha256)
+        if modified is None:
+            return None
+        lease = self._modified(sha256 + self.LEASE_SUFFIX)
+        return max(modified, lease) if lease is not None else modified
+
+    def _publish(self, tmp_path: str, sha256: str) -> None:
+        if self.exists(sha256):
+            # Déjà stocké (déduplication) : le bail protège l'objet du ramasse-miettes ;
+            # s'il a été supprimé avant le bail, il est publié à nouveau
+            self.client.put_object(Bucket=self.bucket, Key=sha256 + self.LEASE_SUFFIX, Body=b"")
+            if self.exists(sha256):
+                return
+        self.client.upload_file(tmp_path, self.bucket, sha256)
+
+    def delete(self, sha256: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=sha256)
+        self.client.delete_object(Bucket=self.bucket, Key=sha256 + self.LEASE_SUFFIX)
+
+    def delete_unless_modified(self, sha256: str, since: datetime) -> bool:
+        modified = self.last_modified(sha256)
+        if modified is None or modified > since:
+            return False
+        tombstone = sha256 + self.TOMBSTONE_SUFFIX
+        try:
+            self._copy(sha256, tombstone)
+        except Exception:
+            return False  # Supprimé entre-temps
+        self.client.delete_object(Bucket=self.bucket, Key=sha256)
+        lease = self._modified(sha256 + self.LEASE_SUFFIX)
+        restored = lease is not None and lease > since
+        if restored:
+            # Upload dédupliqué entre la vérification et la suppression : il référence ce fichier
+            self._copy(tombstone, sha256)
+        else:
+            self.client.delete_object(Bucket=self.bucket, Key=sha256 + self.LEASE_SUFFIX)
+        self.client.delete_object(Bucket=self.bucket, Key=tombstone)
+        return not restored
+
+    def download_response(self, sha256: str, filename: str, content_type: str) -> Response:
+        # Redirection vers une URL présignée : le fichier (et les requêtes Range)
+        # est servi directement par le stockage, sans transiter par le worker
+        url = self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": sha256,
+                "ResponseContentType": content_type,
+                "ResponseContentDisposition": content_disposition(filename),
+            },
+            ExpiresIn=S3_PRESIGNED_URL_EXPIRES,
+        )
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+
+def content_disposition(filename: str) -> str:
+    """
+    En-tête Content-Disposition d'un téléchargement : nom ASCII de repli (guillemets
+    et antislashs échappés) et nom exact encodé selon la RFC 5987
+    """
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("\\", "\\\\").replace('"', '\\"')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def is_referenced(db: Session, sha256: str) -> bool:
+    """
+    Vérifie si un fichier (dédupliqué) est encore référencé par un ticket ou un commentaire,
+    actif ou archivé
+    """
+    marker = [{"sha256": sha256}]
+    for model in (models.Ticket, models.Comment, models.TicketArchive, models.CommentArchive):
+        if db.query(model.id).filter(model.attachments.contains(marker)).first():
+            return True
+    return False
+
+
+def request_deletion(db: Session, sha256: str, now: Optional[datetime] = None) -> None:
+    """Demande la suppression du fichier (sans commit) : exécutée par collect_deleted_attachments"""
+    table = models.AttachmentDeletion.__table__
+    statement = insert(table).values(sha256=sha256, requested_at=now or datetime.utcnow())
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.sha256], set_={"requested_at": statement.excluded.requested_at},
+    )
+    db.execute(statement)
+
+
+def collect_deleted_attachments(db: Session, store: AttachmentStore, now: Optional[datetime] = None) -> int:
+    """
+    Supprime les fichiers dont la suppression a été demandée il y a plus de
+    ATTACHMENT_GC_GRACE_MINUTES, s'ils ne sont plus référencés ni redéposés depuis.
+    Renvoie le nombre de fichiers supprimés.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(minutes=ATTACHMENT_GC_GRACE_MINUTES)
+    deleted = 0
+    while True:
+        pending = (
+            db.query(models.AttachmentDeletion)
+            .filter(models.AttachmentDeletion.requested_at <= cutoff)
+            .order_by(models.AttachmentDeletion.requested_at)
+            .limit(ATTACHMENT_GC_BATCH_SIZE)
+            .all()
+        )
+        for request in pending:
+            if not is_referenced(db, request.sha256) and store.exists(request.sha256):
+                if not store.delete_unless_modified(request.sha256, cutoff):
+                    # Redéposé récemment : la pièce jointe n'est peut-être pas encore enregistrée
+                    request.requested_at = now
+                    continue
+                deleted += 1
+            db.delete(request)
+        db.commit()
+        if len(pending) < ATTACHMENT_GC_BATCH_SIZE:
+            return deleted
+
+
+def create_attachment_store() -> AttachmentStore:
+    """Instancie le stockage configuré par ATTACHMENT_STORAGE (local ou s3)"""
+    if ATTACHMENT_STORAGE == "s3":
+        import boto3  # Dépendance optionnelle, requise uniquement pour le stockage S3
+
+        client = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL,
+            aws_access_key_id=S3_ACCESS_KEY,
+            aws_secret_access_key=S3_SECRET_KEY,
+            region_name=S3_REGION,
+        )
+        return S3AttachmentStore(client)
+    return LocalAttachmentStore()
+
+
+_attachment_store: Optional[AttachmentStore] = None
+
+
+def get_attachment_store() -> AttachmentStore:
+    """Dépendance FastAPI : stockage partagé, créé au premier usage"""
+    global _attachment_store
+    if _attachment_store is None:
+        _attachment_store = create_attachment_store()
+    return _attachment_store
+
+
+_UPLOAD_PATH = re.compile(r"^/tickets/\d+(/comments/\d+)?/attachments$")
+
+
+class AttachmentUploadLimitMiddleware:
+    """
+    Refuse (413) les uploads de pièces jointes trop volumineux pendant leur réception :
+    dès l'en-tête Content-Length s'il est annoncé, sinon au premier bloc au-delà
+    de la limite, sans attendre la fin du corps.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = ATTACHMENT_MAX_SIZE_MB * 1024 * 1024) -> None:
+        self.app = app
+        self.max_size = max_size
+        self.max_body_size = max_size + ATTACHMENT_MULTIPART_OVERHEAD
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Attachment exceeds {self.max_size // (1024 * 1024)} MB",
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or not _UPLOAD_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_body_size:
+            error = self._too_large()
+            response = ORJSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Levée pendant la lecture du formulaire : FastAPI la renvoie telle quelle
+                    raise self._too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
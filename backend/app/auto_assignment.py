@@ -0,0 +1,352 @@
+"""
+Assignation automatique des tickets aux techniciens.
+
+Le moteur garde en mémoire, par spécialisation, un tas (heapq) des techniciens
+actifs ordonné par taux de charge (tickets ASSIGNE_TECHNICIEN / EN_COURS rapportés
+à max_tickets_capacity). Choisir un technicien pour un nouveau ticket revient à
+lire le sommet du tas de la spécialisation correspondant au type du ticket
+(puis, à défaut, celui des techniciens sans spécialisation) : O(log n), sans
+requête de comptage sur la table tickets.
+
+La charge est tenue à jour de façon incrémentale :
+- les changements de technicien / statut des tickets faits via la session ORM
+  sont relevés au flush (écouteur after_flush) et appliqués au commit ;
+- les UPDATE en masse (opérations groupées) déclarent leurs deltas via
+  record_load_deltas ;
+- les modifications d'un technicien (spécialisation, capacité, activation) le
+  font relire depuis la base à la demande suivante ;
+- pick() réserve provisoirement le technicien choisi (+1 immédiat) : deux
+  créations simultanées ne choisissent pas le même technicien. La réservation
+  est soldée à la fin de la transaction (remplacée par la charge réelle au
+  commit, annulée au rollback).
+Chaque processus ayant son propre moteur, le job resync_assignment_engine
+reconstruit périodiquement l'état depuis la base.
+
+AUTO_ASSIGNMENT_MODE :
+- "suggest" (défaut) : le moteur propose des techniciens (GET /tickets/{id}/assignment-suggestions) ;
+- "auto" : les nouveaux tickets sont assignés dès leur création.
+"""
+import heapq
+import itertools
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from . import models
+
+load_dotenv()
+
+AUTO_ASSIGNMENT_MODE = os.getenv("AUTO_ASSIGNMENT_MODE", "suggest").lower()
+# Capacité utilisée pour les techniciens sans max_tickets_capacity
+AUTO_ASSIGNMENT_DEFAULT_CAPACITY = int(os.getenv("AUTO_ASSIGNMENT_DEFAULT_CAPACITY", "10"))
+
+LOAD_STATUSES = frozenset({models.TicketStatus.ASSIGNE_TECHNICIEN, models.TicketStatus.EN_COURS})
+TECHNICIAN_ROLE = "Technicien"
+# Attributs d'un utilisateur qui modifient sa place dans le moteur
+TECHNICIAN_ATTRIBUTES = ("specialization", "max_tickets_capacity", "actif", "role_id")
+
+_PENDING_DELTAS = "auto_assignment_load_deltas"
+_PENDING_STALE = "auto_assignment_stale_users"
+_PENDING_RESERVATIONS = "auto_assignment_reservations"
+
+
+class AssignmentCandidate(NamedTuple):
+    technician_id: int
+    full_name: str
+    specialization: Optional[str]
+    load: int
+    capacity: int
+
+
+class _Technician:
+    __slots__ = ("id", "full_name", "specialization", "capacity", "load", "seq")
+
+    def __init__(self, id: int, full_name: str, specialization: Optional[str], capacity: Optional[int], load: int = 0):
+        self.id = id
+        self.full_name = full_name
+        self.specialization = _normalize(specialization)
+        self.capacity = capacity if capacity and capacity > 0 else AUTO_ASSIGNMENT_DEFAULT_CAPACITY
+        self.load = load
+        self.seq = -1
+
+    def candidate(self) -> AssignmentCandidate:
+        return AssignmentCandidate(self.id, self.full_name, self.specialization, self.load, self.capacity)
+
+
+def _normalize(specialization: Optional[str]) -> Optional[str]:
+    if not specialization:
+        return None
+    return specialization.strip().lower() or None
+
+
+class AssignmentEngine:
+    """
+    Tas de techniciens par spécialisation (clé None : sans spécialisation).
+    Les entrées périmées (charge modifiée depuis) sont ignorées à la lecture :
+    chaque mise à jour empile une nouvelle entrée au lieu de réorganiser le tas.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._technicians: Dict[int, _Technician] = {}
+        self._heaps: Dict[Optional[str], list] = defaultdict(list)
+        self._loaded = False
+        self._stale_users: Set[int] = set()
+        # Réservations de pick() en cours, comptées dans la charge jusqu'à la fin de leur transaction
+        self._reserved: Dict[int, int] = defaultdict(int)
+        # Numéro unique de chaque entrée empilée : une entrée est vivante si c'est la dernière du technicien
+        self._seq = itertools.count()
+
+    # ----- Chargement depuis la base -----
+
+    def _technician_rows(self, db: Session, user_ids: Optional[Set[int]] = None):
+        query = (
+            db.query(
+                models.User.id, models.User.full_name, models.User.specialization,
+                models.User.max_tickets_capacity,
+            )
+            .join(models.Role, models.User.role_id == models.Role.id)
+            .filter(models.Role.name == TECHNICIAN_ROLE, models.User.actif == True)
+        )
+        if user_ids is not None:
+            query = query.filter(models.User.id.in_(user_ids))
+        return query.all()
+
+    def _loads(self, db: Session, user_ids: Optional[Set[int]] = None) -> Dict[int, int]:
+        query = (
+            db.query(models.Ticket.technician_id, func.count(models.Ticket.id))
+            .filter(models.Ticket.technician_id.isnot(None), models.Ticket.status.in_(LOAD_STATUSES))
+        )
+        if user_ids is not None:
+            query = query.filter(models.Ticket.technician_id.in_(user_ids))
+        return dict(query.group_by(models.Ticket.technician_id).all())
+
+    def load(self, db: Session) -> int:
+        """Reconstruit l'état complet (deux requêtes). Renvoie le nombre de techniciens"""
+        rows = self._technician_rows(db)
+        loads = self._loads(db)
+        with self._lock:
+            self._technicians = {
+                row.id: _Technician(
+                    row.id, row.full_name, row.specialization, row.max_tickets_capacity,
+                    loads.get(row.id, 0) + self._reserved.get(row.id, 0),
+                )
+                for row in rows
+            }
+            self._heaps = defaultdict(list)
+            for technician in self._technicians.values():
+                self._push(technician)
+            self._loaded = True
+            self._stale_users.clear()
+            return len(self._technicians)
+
+    def _reload_users(self, db: Session, user_ids: Set[int]) -> None:
+        rows = {row.id: row for row in self._technician_rows(db, user_ids)}
+        loads = self._loads(db, user_ids)
+        with self._lock:
+            for user_id in user_ids:
+                self._technicians.pop(user_id, None)  # Les entrées restées dans les tas sont ignorées
+                row = rows.get(user_id)
+                if row:
+                    technician = _Technician(
+                        row.id, row.full_name, row.specialization, row.max_tickets_capacity,
+                        loads.get(row.id, 0) + self._reserved.get(row.id, 0),
+                    )
+                    self._technicians[user_id] = technician
+                    self._push(technician)
+
+    def _sync(self, db: Session) -> None:
+        with self._lock:
+            loaded = self._loaded
+            stale, self._stale_users = self._stale_users, set()
+        if not loaded:
+            self.load(db)
+        elif stale:
+            self._reload_users(db, stale)
+
+    # ----- Tas -----
+
+    def _push(self, technician: _Technician) -> None:
+        technician.seq = next(self._seq)
+        heap = self._heaps[technician.specialization]
+        heapq.heappush(heap, (technician.load / technician.capacity, technician.load, technician.id, technician.seq))
+        # Compactage quand les entrées périmées dominent
+        if len(heap) > 4 * len(self._technicians) + 16:
+            live = [
+                entry for entry in heap
+                if (t := self._technicians.get(entry[2])) and t.seq == entry[3]
+            ]
+            heapq.heapify(live)
+            self._heaps[technician.specialization] = live
+
+    def _pop_live(self, heap: list) -> Optional[_Technician]:
+        while heap:
+            _, _, technician_id, seq = heapq.heappop(heap)
+            technician = self._technicians.get(technician_id)
+            if technician and technician.seq == seq:
+                return technician
+        return None
+
+    def candidates(
+        self,
+        db: Session,
+        ticket_type: models.TicketType,
+        limit: int = 3,
+        exclude: Optional[int] = None,
+    ) -> List[AssignmentCandidate]:
+        """
+        Techniciens ayant encore de la capacité, les moins chargés d'abord :
+        spécialistes du type de ticket, puis techniciens sans spécialisation.
+        """
+        self._sync(db)
+        return self._top(ticket_type, limit, exclude)
+
+    def _top(self, ticket_type: models.TicketType, limit: int, exclude: Optional[int] = None) -> List[AssignmentCandidate]:
+        result: List[AssignmentCandidate] = []
+        with self._lock:
+            for key in (ticket_type.value, None):
+                heap = self._heaps.get(key)
+                taken = []
+                while heap and len(result) < limit:
+                    technician = self._pop_live(heap)
+                    if technician is None:
+                        break
+                    taken.append(technician)
+                    if technician.load >= technician.capacity:
+                        break  # Tas ordonné par taux de charge : les suivants sont pleins aussi
+                    if technician.id != exclude:
+                        result.append(technician.candidate())
+                for technician in taken:
+                    self._push(technician)
+        return result
+
+    def pick(self, db: Session, ticket_type: models.TicketType) -> Optional[AssignmentCandidate]:
+        """
+        Technicien le moins chargé pour ce type de ticket (None si tous sont pleins).
+        Sa charge est augmentée d'une unité dès maintenant, jusqu'à la fin de la
+        transaction de `db` : le ticket doit lui être assigné dans cette transaction.
+        """
+        self._sync(db)
+        if not db.in_transaction():
+            db.begin()  # Réservation soldée par after_transaction_end, même sans requête
+        with self._lock:
+            candidates = self._top(ticket_type, limit=1)
+            if not candidates:
+                return None
+            technician = self._technicians[candidates[0].technician_id]
+            technician.load += 1
+            self._push(technician)
+            self._reserved[technician.id] += 1
+        reservations = db.info.setdefault(_PENDING_RESERVATIONS, defaultdict(int))
+        reservations[technician.id] += 1
+        return candidates[0]
+
+    # ----- Mises à jour incrémentales -----
+
+    def apply_load_deltas(self, deltas: Dict[int, int], reservations: Optional[Dict[int, int]] = None) -> None:
+        """
+        Applique des variations de charge. `reservations` (réservations de pick()
+        soldées) est retiré de la charge : au commit, le ticket assigné est compté
+        par `deltas` à la place de sa réservation.
+        """
+        with self._lock:
+            deltas = defaultdict(int, deltas)
+            for technician_id, count in (reservations or {}).items():
+                deltas[technician_id] -= count
+                remaining = self._reserved.get(technician_id, 0) - count
+                if remaining > 0:
+                    self._reserved[technician_id] = remaining
+                else:
+                    self._reserved.pop(technician_id, None)
+            if not self._loaded:
+                return
+            for technician_id, delta in deltas.items():
+                technician = self._technicians.get(technician_id)
+                if technician and delta:
+                    technician.load = max(technician.load + delta, 0)
+                    self._push(technician)
+
+    def mark_stale(self, user_ids: Set[int]) -> None:
+        with self._lock:
+            self._stale_users |= user_ids
+
+
+assignment_engine = AssignmentEngine()
+
+
+def record_load_deltas(session: Session, deltas: Dict[int, int]) -> None:
+    """Déclare des variations de charge (UPDATE en masse), appliquées au commit de la session"""
+    pending = session.info.setdefault(_PENDING_DELTAS, defaultdict(int))
+    for technician_id, delta in deltas.items():
+        if technician_id is not None:
+            pending[technician_id] += delta
+
+
+def _attribute_change(obj, name: str):
+    """(ancienne valeur, nouvelle valeur) d'un attribut pendant le flush"""
+    history = inspect(obj).attrs[name].history
+    current = getattr(obj, name)
+    return (history.deleted[0] if history.deleted else current), current
+
+
+@event.listens_for(Session, "after_flush")
+def _track_ticket_load(session: Session, flush_context) -> None:
+    """Relève les changements de charge des techniciens et les techniciens modifiés"""
+    deltas: Dict[int, int] = defaultdict(int)
+    stale: Set[int] = set()
+
+    for obj in session.new:
+        if isinstance(obj, models.Ticket) and obj.technician_id and obj.status in LOAD_STATUSES:
+            deltas[obj.technician_id] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, models.Ticket) and obj.technician_id and obj.status in LOAD_STATUSES:
+            deltas[obj.technician_id] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, models.Ticket):
+            old_technician, new_technician = _attribute_change(obj, "technician_id")
+            old_status, new_status = _attribute_change(obj, "status")
+            if (old_technician, old_status in LOAD_STATUSES) == (new_technician, new_status in LOAD_STATUSES):
+                continue
+            if old_technician and old_status in LOAD_STATUSES:
+                deltas[old_technician] -= 1
+            if new_technician and new_status in LOAD_STATUSES:
+                deltas[new_technician] += 1
+        elif isinstance(obj, models.User):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in TECHNICIAN_ATTRIBUTES):
+                stale.add(obj.id)
+
+    stale |= {obj.id for obj in session.new if isinstance(obj, models.User)}
+    if stale:
+        session.info.setdefault(_PENDING_STALE, set()).update(stale)
+    if any(deltas.values()):
+        record_load_deltas(session, deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_changes(session: Session) -> None:
+    deltas = session.info.pop(_PENDING_DELTAS, None)
+    reservations = session.info.pop(_PENDING_RESERVATIONS, None)
+    if deltas or reservations:
+        assignment_engine.apply_load_deltas(deltas or {}, reservations)
+    stale = session.info.pop(_PENDING_STALE, None)
+    if stale:
+        assignment_engine.mark_stale(stale)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending_changes(session: Session, transaction) -> None:
+    # Transaction annulée (ou session fermée sans commit) : rien à appliquer, réservations libérées
+    if transaction.parent is None:
+        session.info.pop(_PENDING_DELTAS, None)
+        session.info.pop(_PENDING_STALE, None)
+        reservations = session.info.pop(_PENDING_RESERVATIONS, None)
+        if reservations:
+            assignment_engine.apply_load_deltas({}, reservations)
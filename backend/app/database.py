@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.exc import OperationalError, DisconnectionError
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi import HTTPException, status
+from fastapi.exceptions import RequestValidationError
 import os
 
 from dotenv import load_dotenv
@@ -42,6 +44,16 @@ def get_db():
         # Tester la connexion avant de continuer
         db.execute(text("SELECT 1"))
         yield db
+    except (HTTPException, RequestValidationError):
+        # Erreurs métier levées par les endpoints (404, 403, 409...) et corps de requête
+        # invalides (422) : les laisser passer telles quelles
+        raise
+    except StaleDataError:
+        # Verrouillage optimiste : la ligne a été modifiée par une autre requête entre lecture et écriture
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The resource was modified by another request. Reload it and try again."
+        )
     except (OperationalError, DisconnectionError) as e:
         db.close()
         raise HTTPException(
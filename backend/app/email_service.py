@@ -1,16 +1,24 @@
 """
 Service d'envoi d'emails pour les notifications de tickets
 """
+import logging
 import smtplib
 import os
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urlencode
 from dotenv import load_dotenv
 
+from .async_smtp import AsyncSMTPBackend, SMTPSettings
+from .email_templates import RenderedEmail, template_engine
+from .metrics import EMAIL_SEND_DURATION, EMAILS_SENT
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class EmailService:
     """Service pour envoyer des emails via SMTP"""
@@ -28,6 +36,25 @@ class EmailService:
         self.verify_ssl = os.getenv("VERIFY_SSL", "true").lower() == "true"
         self.app_base_url = os.getenv("APP_BASE_URL", "http://localhost:5173")
         self.email_enabled = os.getenv("EMAIL_ENABLED", "true").lower() == "true"
+        # Langue des templates d'emails (fr, en)
+        self.locale = os.getenv("EMAIL_LOCALE", "fr")
+        # Connexion SMTP non chiffrée (uniquement pour un serveur local, ex. app.smtp_sink)
+        self.smtp_plaintext = os.getenv("SMTP_PLAINTEXT", "false").lower() == "true"
+        # Backend d'envoi : "sync" (smtplib, bloquant) ou "async" (voir app.async_smtp)
+        self.backend = os.getenv("EMAIL_BACKEND", "sync").lower()
+        self.async_backend = AsyncSMTPBackend.from_env(self._smtp_settings)
+    
+    def _smtp_settings(self) -> SMTPSettings:
+        """Paramètres SMTP courants (modifiables à chaud depuis les paramètres)"""
+        return SMTPSettings(
+            server=self.smtp_server,
+            port=self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            use_tls=self.use_tls,
+            verify_ssl=self.verify_ssl,
+            plaintext=self.smtp_plaintext,
+        )
     
     def _format_ticket_number(self, ticket_number: int) -> str:
         """Formate le numéro de ticket en TKT-XXX"""
@@ -48,7 +75,8 @@ class EmailService:
         to_emails: List[str],
         subject: str,
         body: str,
-        html_body: Optional[str] = None
+        html_body: Optional[str] = None,
+        wait: bool = False
     ) -> bool:
         """
         Envoie un email à une ou plusieurs adresses
@@ -58,42 +86,49 @@ class EmailService:
             subject: Sujet de l'email
             body: Corps de l'email en texte brut
             html_body: Corps de l'email en HTML (optionnel)
+            wait: Backend async : attendre le résultat de l'envoi au lieu de rendre la main
+                dès sa mise en file (appelants qui exploitent la valeur de retour)
         
         Returns:
-            True si l'email a été envoyé avec succès, False sinon
+            True si l'email a été envoyé avec succès, False sinon. Backend async sans
+            `wait` : True dès que l'email est accepté pour envoi, avant tout échange SMTP ;
+            un échec ultérieur est seulement journalisé (et compté dans emails_sent_total)
         """
         if not self.email_enabled:
-            print(f"[EMAIL] Envoi désactivé - Email non envoyé à {to_emails}")
+            logger.info("Envoi désactivé - Email non envoyé", extra={"recipients": to_emails, "subject": subject})
             return False
         
         if not to_emails:
-            print("[EMAIL] Aucun destinataire spécifié")
+            logger.warning("Aucun destinataire spécifié", extra={"subject": subject})
             return False
         
         # Filtrer les emails vides
         to_emails = [email for email in to_emails if email and email.strip()]
         if not to_emails:
-            print("[EMAIL] Aucun email valide dans la liste")
+            logger.warning("Aucun email valide dans la liste", extra={"subject": subject})
             return False
         
+        msg = self._build_message(to_emails, subject, body, html_body)
+        
+        if self.backend == "async":
+            # L'envoi est confié à la boucle asyncio dédiée : le thread appelant est libéré
+            # immédiatement, le résultat de l'envoi est journalisé par le backend
+            future = self.async_backend.submit(
+                self.sender_email, to_emails, msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+            )
+            if wait:
+                try:
+                    return future.result(self.async_backend.timeout * 2)
+                except Exception:
+                    return False
+            return True
+        
+        start = time.perf_counter()
         try:
-            # Créer le message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.sender_name} <{self.sender_email}>"
-            msg['To'] = ", ".join(to_emails)
-            msg['Subject'] = subject
-            
-            # Ajouter le corps en texte brut
-            text_part = MIMEText(body, 'plain', 'utf-8')
-            msg.attach(text_part)
-            
-            # Ajouter le corps HTML si fourni
-            if html_body:
-                html_part = MIMEText(html_body, 'html', 'utf-8')
-                msg.attach(html_part)
-            
             # Connexion au serveur SMTP
-            if self.use_tls:
+            if self.smtp_plaintext:
+                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            elif self.use_tls:
                 server = smtplib.SMTP(self.smtp_server, self.smtp_port)
                 server.starttls()
             else:
@@ -107,13 +142,72 @@ class EmailService:
             server.send_message(msg)
             server.quit()
             
-            print(f"[EMAIL] Email envoyé avec succès à {to_emails}")
+            EMAIL_SEND_DURATION.labels("sync").observe(time.perf_counter() - start)
+            EMAILS_SENT.labels("sync", "sent").inc()
+            logger.info("Email envoyé", extra={"recipients": to_emails, "subject": subject, "sampled": True})
             return True
             
         except Exception as e:
-            print(f"[EMAIL] Erreur lors de l'envoi de l'email: {str(e)}")
+            EMAIL_SEND_DURATION.labels("sync").observe(time.perf_counter() - start)
+            EMAILS_SENT.labels("sync", "failed").inc()
+            logger.error("Erreur lors de l'envoi de l'email: %s", e, extra={"recipients": to_emails, "subject": subject})
             return False
     
+    def _build_message(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body: str,
+        html_body: Optional[str] = None
+    ) -> MIMEMultipart:
+        """Construit le message MIME (texte brut + HTML optionnel)"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.sender_name} <{self.sender_email}>"
+        msg['To'] = ", ".join(to_emails)
+        msg['Subject'] = subject
+        
+        # Ajouter le corps en texte brut
+        text_part = MIMEText(body, 'plain', 'utf-8')
+        msg.attach(text_part)
+        
+        # Ajouter le corps HTML si fourni
+        if html_body:
+            html_part = MIMEText(html_body, 'html', 'utf-8')
+            msg.attach(html_part)
+        
+        return msg
+    
+    
+    def _template_globals(self) -> Dict[str, str]:
+        """Valeurs communes à tous les emails (modifiables à chaud depuis les paramètres)"""
+        return {"sender_name": self.sender_name, "app_base_url": self.app_base_url}
+    
+    def _login_link(self, redirect: str, ticket_id: Optional[str] = None, action: Optional[str] = None) -> str:
+        """Lien vers /login avec redirection pour forcer l'authentification"""
+        params = {"redirect": redirect}
+        if ticket_id is not None:
+            params["ticket"] = ticket_id
+        if action:
+            params["action"] = action
+        return f"{self.app_base_url}/login?{urlencode(params)}"
+    
+    def render_email(self, template: str, context: Dict[str, Any], locale: Optional[str] = None) -> RenderedEmail:
+        """Rend un email (sujet, texte brut, HTML) à partir d'un template compilé"""
+        return template_engine.render(template, context, locale or self.locale, self._template_globals())
+    
+    def render_many(
+        self,
+        template: str,
+        contexts: Iterable[Dict[str, Any]],
+        locale: Optional[str] = None
+    ) -> List[RenderedEmail]:
+        """Rend en une passe un email personnalisé par contexte (envois groupés)"""
+        return template_engine.render_many(template, contexts, locale or self.locale, self._template_globals())
+    
+    def _send_template(self, template: str, to_email: str, context: Dict[str, Any]) -> bool:
+        rendered = self.render_email(template, context)
+        return self.send_email([to_email], rendered.subject, rendered.body, rendered.html_body)
+    
     def send_ticket_created_notification(
         self,
         ticket_number: int,
@@ -133,129 +227,85 @@ class EmailService:
         Returns:
             True si l'email a été envoyé avec succès
         """
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Nouveau ticket {formatted_number} créé: {ticket_title}"
-        
-        body = f"""
-Bonjour,
-
-Un nouveau ticket a été créé dans le système de gestion des tickets.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Créateur : {creator_name}
-
-Veuillez vous connecter à l'application pour analyser et assigner ce ticket.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        html_body = f"""
-<html>
-<body>
-    <h2>Nouveau ticket créé</h2>
-    <p>Bonjour,</p>
-    <p>Un nouveau ticket a été créé dans le système de gestion des tickets.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Créateur :</strong> {creator_name}</li>
-        </ul>
-    </div>
-    <p>Veuillez vous connecter à l'application pour analyser et assigner ce ticket.</p>
-    <div style="margin: 20px 0;">
-        <a href="{self.app_base_url}/login?redirect=/dashboard" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Ouvrir l'application</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email(recipient_emails, subject, body, html_body)
-
-    def send_ticket_created_notification_with_actions(
+        rendered = self.render_email("ticket_created", {
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "creator_name": creator_name,
+            "action_link": self._login_link("/dashboard"),
+        })
+        return self.send_email(recipient_emails, rendered.subject, rendered.body, rendered.html_body)
+    
+    def _ticket_created_with_actions_context(
         self,
         ticket_id: str,
-        ticket_number: int,
+        formatted_number: str,
         ticket_title: str,
         creator_name: str,
-        recipient_email: str,
         recipient_role: str
-    ) -> bool:
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Nouveau ticket {formatted_number} créé: {ticket_title}"
-        body = f"""
-Bonjour,
-
-Un nouveau ticket a été créé dans le système de gestion des tickets.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Créateur : {creator_name}
-
-Veuillez vous connecter à l'application pour analyser et assigner ce ticket.
-
-Cordialement,
-{self.sender_name}
-"""
-        # Les liens pointent vers /login avec redirection pour forcer l'authentification
+    ) -> Dict[str, Any]:
+        # Pour le DSI : seulement une phrase avec lien vers l'application.
+        # Secrétaire DSI, Adjoint DSI et Admin : bouton "Assigner à un technicien"
         if recipient_role == "DSI":
-            # Pour le DSI : plus de boutons d'action, seulement une phrase avec lien vers l'application
-            login_params = urlencode({
-                "redirect": "/dashboard/dsi"
-            })
-            login_link = f"{self.app_base_url}/login?{login_params}"
-            actions_html = f"""
-            <p>Veuillez vous connecter à l'application en cliquant sur ce lien afin d'analyser et d'assigner ce ticket :
-                <a href="{login_link}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.
-            </p>
-            """
+            action_link = self._login_link("/dashboard/dsi")
         else:
-            # Secrétaire DSI, Adjoint DSI et Admin : seulement le bouton "Assigner à un technicien"
             if recipient_role == "Admin":
                 role_path = "/dashboard/dsi"
             elif recipient_role == "Adjoint DSI":
                 role_path = "/dashboard/adjoint"
             else:
                 role_path = "/dashboard/secretary"
-            
-            assign_params = urlencode({
-                "redirect": role_path,
-                "ticket": ticket_id,
-                "action": "assign"
-            })
-            assign_link = f"{self.app_base_url}/login?{assign_params}"
-            
-            actions_html = f"""
-            <div style="margin: 20px 0;">
-                <a href="{assign_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Assigner à un technicien</a>
-            </div>
-            """
-        html_body = f"""
-<html>
-<body>
-    <h2>Nouveau ticket créé</h2>
-    <p>Bonjour,</p>
-    <p>Un nouveau ticket a été créé dans le système de gestion des tickets.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Créateur :</strong> {creator_name}</li>
-        </ul>
-    </div>
-    {actions_html}
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        return self.send_email([recipient_email], subject, body, html_body)
+            action_link = self._login_link(role_path, ticket_id, "assign")
+        return {
+            "number": formatted_number,
+            "title": ticket_title,
+            "creator_name": creator_name,
+            "link_only": recipient_role == "DSI",
+            "action_link": action_link,
+        }
+    
+    def send_ticket_created_notification_with_actions(
+        self,
+        ticket_id: str,
+        ticket_number: int,
+        ticket_title: str,
+        creator_name: str,
+        recipient_email: str,
+        recipient_role: str
+    ) -> bool:
+        context = self._ticket_created_with_actions_context(
+            ticket_id, self._format_ticket_number(ticket_number), ticket_title, creator_name, recipient_role
+        )
+        return self._send_template("ticket_created_with_actions", recipient_email, context)
+    
+    def send_ticket_created_notifications_with_actions(
+        self,
+        ticket_id: str,
+        ticket_number: int,
+        ticket_title: str,
+        creator_name: str,
+        recipients: List[Tuple[str, str]]
+    ) -> int:
+        """
+        Envoie la notification de nouveau ticket à plusieurs destinataires
+        (Secrétaires/Adjoints DSI, DSI, Admin) : tous les emails sont rendus en une passe.
+        
+        Args:
+            recipients: Liste de tuples (email, nom du rôle)
+        
+        Returns:
+            Nombre d'emails envoyés avec succès
+        """
+        formatted_number = self._format_ticket_number(ticket_number)
+        contexts = [
+            self._ticket_created_with_actions_context(ticket_id, formatted_number, ticket_title, creator_name, role)
+            for _, role in recipients
+        ]
+        rendered_emails = self.render_many("ticket_created_with_actions", contexts)
+        sent = 0
+        for (email, _), rendered in zip(recipients, rendered_emails):
+            if self.send_email([email], rendered.subject, rendered.body, rendered.html_body):
+                sent += 1
+        return sent
     
     def send_ticket_assigned_notification(
         self,
@@ -281,78 +331,14 @@ Cordialement,
         Returns:
             True si l'email a été envoyé avec succès
         """
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Ticket {formatted_number} vous a été assigné: {ticket_title}"
-        
-        body = f"""
-Bonjour {technician_name},
-
-Un nouveau ticket vous a été assigné.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-"""
-        
-        if priority:
-            formatted_priority = self._format_priority(priority)
-            body += f"• Priorité : {formatted_priority}\n"
-        
-        if notes:
-            body += f"\nInstructions :\n{notes}\n"
-        
-        body += f"""
-Veuillez vous connecter à l'application pour prendre en charge ce ticket.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        # Lien vers login avec redirection pour forcer l'authentification
-        redirect_params = urlencode({
-            "redirect": "/dashboard/techniciens",
-            "ticket": ticket_id
+        return self._send_template("ticket_assigned", technician_email, {
+            "name": technician_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "priority": self._format_priority(priority) if priority else None,
+            "notes": notes,
+            "action_link": self._login_link("/dashboard/techniciens", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        
-        # Construire le HTML progressivement
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket assigné</h2>
-    <p>Bonjour {technician_name},</p>
-    <p>Un nouveau ticket vous a été assigné.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-"""
-        
-        if priority:
-            formatted_priority = self._format_priority(priority)
-            html_body += f"            <li><strong>Priorité :</strong> {formatted_priority}</li>\n"
-        
-        html_body += "        </ul>"
-        
-        if notes:
-            html_body += f"""
-        <p><strong>Instructions :</strong></p>
-        <p style="background-color: #fff; padding: 10px; border-left: 3px solid #007bff;">{notes}</p>
-"""
-        
-        html_body += f"""
-    </div>
-    <p>
-        Veuillez vous connecter à l'application en cliquant sur ce lien afin de prendre en charge et de résoudre ce ticket :
-        <a href="{action_link}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.
-    </p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([technician_email], subject, body, html_body)
     
     def send_ticket_assigned_to_creator_notification(
         self,
@@ -377,56 +363,13 @@ Cordialement,
         Returns:
             True si l'email a été envoyé avec succès
         """
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été assigné à un technicien"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été assigné à un technicien et sera traité prochainement.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Technicien assigné : {technician_name}
-
-Vous serez notifié lorsque le ticket sera résolu.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        # Lien vers login avec redirection pour forcer l'authentification
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_assigned_to_creator", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "technician_name": technician_name,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket assigné</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Votre ticket a été assigné à un technicien et sera traité prochainement.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Technicien assigné :</strong> {technician_name}</li>
-        </ul>
-    </div>
-    <p>Vous serez notifié lorsque le ticket sera résolu.</p>
-    <p>
-        Pour suivre l'avancement de votre demande, veuillez vous connecter à l'application en cliquant sur ce lien :
-        <a href="{action_link}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.
-    </p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_created_to_creator_notification(
         self,
@@ -449,54 +392,12 @@ Cordialement,
         Returns:
             True si l'email a été envoyé avec succès
         """
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été créé avec succès"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été créé avec succès et sera traité prochainement.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-
-Vous serez notifié lorsque le ticket sera assigné à un technicien.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        # Lien vers login avec redirection pour forcer l'authentification
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_created_to_creator", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket créé</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Votre ticket a été créé avec succès et sera traité prochainement.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    <p>Vous serez notifié lorsque le ticket sera assigné à un technicien.</p>
-    <p>
-        Pour consulter le détail de votre demande et suivre son traitement, veuillez vous connecter à l'application en cliquant sur ce lien :
-        <a href="{action_link}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.
-    </p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_rejected_notification(
         self,
@@ -506,48 +407,12 @@ Cordialement,
         technician_name: str,
         rejection_reason: Optional[str] = None
     ) -> bool:
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Ticket {formatted_number} rejeté par l'utilisateur: {ticket_title}"
-        body = f"""
-Bonjour {technician_name},
-
-L'utilisateur a rejeté la résolution du ticket.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-"""
-        if rejection_reason:
-            body += f"• Motif du rejet : {rejection_reason}\n"
-
-        body += f"""
-Veuillez vous connecter à l'application et reprendre le ticket si nécessaire.
-
-Cordialement,
-{self.sender_name}
-"""
-
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket rejeté</h2>
-    <p>Bonjour {technician_name},</p>
-    <p>L'utilisateur a rejeté la résolution du ticket.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    {('<p><strong>Motif du rejet :</strong> ' + rejection_reason + '</p>') if rejection_reason else ''}
-    <p>Veuillez vous connecter à l'application et reprendre le ticket si nécessaire.</p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-    </body>
-</html>
-"""
-
-        return self.send_email([technician_email], subject, body, html_body)
+        return self._send_template("ticket_rejected", technician_email, {
+            "name": technician_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "rejection_reason": rejection_reason,
+        })
     
     def send_ticket_delegated_to_adjoint_notification(
         self,
@@ -574,71 +439,14 @@ Cordialement,
         Returns:
             True si l'email a été envoyé avec succès
         """
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Ticket {formatted_number} délégué par le DSI: {ticket_title}"
-        
-        body = f"""
-Bonjour {adjoint_name},
-
-Le DSI {dsi_name} vous a délégué un ticket à assigner à un technicien.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-"""
-        
-        if notes:
-            body += f"\nNotes du DSI :\n{notes}\n"
-        
-        body += f"""
-Veuillez vous connecter à l'application pour assigner ce ticket à un technicien.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        # Lien vers le dashboard avec le ticket et l'action assign
-        redirect_params = urlencode({
-            "redirect": "/dashboard/adjoint",
-            "ticket": ticket_id,
-            "action": "assign"
+        return self._send_template("ticket_delegated_to_adjoint", adjoint_email, {
+            "name": adjoint_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "dsi_name": dsi_name,
+            "notes": notes,
+            "action_link": self._login_link("/dashboard/adjoint", ticket_id, "assign"),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket délégué par le DSI</h2>
-    <p>Bonjour {adjoint_name},</p>
-    <p>Le DSI <strong>{dsi_name}</strong> vous a délégué un ticket à assigner à un technicien.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-"""
-        
-        if notes:
-            html_body += f"""
-    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 3px solid #ffc107;">
-        <p><strong>Notes du DSI :</strong></p>
-        <p>{notes}</p>
-    </div>
-"""
-        
-        html_body += f"""
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#0ea5e9;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;font-weight:bold">Assigner ce ticket</a>
-    </div>
-    <p>Veuillez vous connecter à l'application pour assigner ce ticket à un technicien.</p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([adjoint_email], subject, body, html_body)
     
     def send_ticket_in_progress_notification(
         self,
@@ -650,55 +458,13 @@ Cordialement,
         technician_name: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le ticket est en cours de traitement"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} est en cours de traitement"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket est maintenant en cours de traitement par le technicien.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Technicien : {technician_name}
-
-Vous serez notifié lorsque le ticket sera résolu.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_in_progress", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "technician_name": technician_name,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket en cours de traitement</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Votre ticket est maintenant en cours de traitement par le technicien.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Technicien :</strong> {technician_name}</li>
-        </ul>
-    </div>
-    <p>Vous serez notifié lorsque le ticket sera résolu.</p>
-    <p>
-        Pour suivre l'avancement de votre demande, veuillez vous connecter à l'application en cliquant sur ce lien :
-        <a href="{action_link}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.
-    </p>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_resolved_notification(
         self,
@@ -710,67 +476,13 @@ Cordialement,
         resolution_summary: Optional[str] = None
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le ticket est résolu"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été résolu - Validation requise"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été résolu. Veuillez valider la résolution.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-"""
-        if resolution_summary:
-            body += f"• Résumé de la résolution : {resolution_summary}\n"
-        
-        body += f"""
-Merci de valider la résolution dans les 14 jours. Si vous ne validez pas, le ticket sera clôturé automatiquement.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_resolved", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "resolution_summary": resolution_summary,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket résolu - Validation requise</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Votre ticket a été résolu. Veuillez valider la résolution.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-"""
-        if resolution_summary:
-            html_body += f"""
-    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Résumé de la résolution :</strong></p>
-        <p>{resolution_summary}</p>
-    </div>
-"""
-        html_body += f"""
-    <p style="color: #856404; background-color: #fff3cd; padding: 10px; border-radius: 5px;">
-        <strong>⚠️ Important :</strong> Merci de valider la résolution dans les 14 jours. Si vous ne validez pas, le ticket sera clôturé automatiquement.
-    </p>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#28a745;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;font-weight:bold">Valider la résolution</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_validation_reminder(
         self,
@@ -783,68 +495,16 @@ Cordialement,
         days_since_resolution: int
     ) -> bool:
         """Envoie un rappel de validation à l'utilisateur"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subjects = {
-            1: f"Rappel : Veuillez valider votre ticket {formatted_number}",
-            2: f"Second rappel : Validation requise pour votre ticket {formatted_number}",
-            3: f"Dernier rappel : Veuillez valider votre ticket {formatted_number}"
-        }
-        subject = subjects.get(reminder_number, f"Rappel : Validation requise pour votre ticket {formatted_number}")
-        
-        messages = {
-            1: f"Votre ticket a été résolu il y a {days_since_resolution} jours. Veuillez valider la résolution.",
-            2: f"Votre ticket a été résolu il y a {days_since_resolution} jours. Validation requise.",
-            3: f"⚠️ Dernier rappel : Votre ticket a été résolu il y a {days_since_resolution} jours. Si vous ne validez pas dans les prochains jours, le ticket sera clôturé automatiquement."
-        }
-        message = messages.get(reminder_number, f"Votre ticket a été résolu il y a {days_since_resolution} jours.")
-        
-        body = f"""
-Bonjour {creator_name},
-
-{message}
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-
-Merci de valider la résolution dès que possible.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("validation_reminder", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "days": days_since_resolution,
+            "is_first": reminder_number == 1,
+            "is_second": reminder_number == 2,
+            "is_last": reminder_number == 3,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        
-        urgency_style = "background-color: #f8d7da; border-left: 4px solid #dc3545;" if reminder_number == 3 else "background-color: #fff3cd; border-left: 4px solid #ffc107;"
-        
-        html_body = f"""
-<html>
-<body>
-    <h2>Rappel de validation</h2>
-    <p>Bonjour {creator_name},</p>
-    <div style="{urgency_style} padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>{message}</strong></p>
-    </div>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#28a745;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;font-weight:bold">Valider la résolution</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_auto_closed_notification(
         self,
@@ -855,56 +515,12 @@ Cordialement,
         creator_name: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le ticket est clôturé automatiquement"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été clôturé automatiquement"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été clôturé automatiquement après 14 jours sans validation.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-
-Vous pouvez réouvrir ce ticket dans les 7 prochains jours si le problème persiste. Après cette période, vous devrez créer un nouveau ticket.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_auto_closed", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket clôturé automatiquement</h2>
-    <p>Bonjour {creator_name},</p>
-    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
-        <p><strong>Votre ticket a été clôturé automatiquement après 14 jours sans validation.</strong></p>
-    </div>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>⚠️ Important :</strong> Vous pouvez réouvrir ce ticket dans les <strong>7 prochains jours</strong> si le problème persiste. Après cette période, vous devrez créer un nouveau ticket.</p>
-    </div>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_rejected_notification_to_user(
         self,
@@ -916,67 +532,13 @@ Cordialement,
         rejection_reason: Optional[str] = None
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque son ticket est rejeté"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été rejeté"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été rejeté.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-"""
-        if rejection_reason:
-            body += f"• Raison du rejet : {rejection_reason}\n"
-        
-        body += f"""
-Si vous avez des questions, n'hésitez pas à contacter le support.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_rejected_to_user", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "rejection_reason": rejection_reason,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket rejeté</h2>
-    <p>Bonjour {creator_name},</p>
-    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
-        <p><strong>Votre ticket a été rejeté.</strong></p>
-    </div>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-"""
-        if rejection_reason:
-            html_body += f"""
-    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Raison du rejet :</strong></p>
-        <p>{rejection_reason}</p>
-    </div>
-"""
-        html_body += f"""
-    <p>Si vous avez des questions, n'hésitez pas à contacter le support.</p>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_comment_notification_to_user(
         self,
@@ -989,58 +551,14 @@ Cordialement,
         comment_content: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsqu'un commentaire est ajouté"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Nouveau commentaire sur votre ticket {formatted_number}"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Un nouveau commentaire a été ajouté sur votre ticket.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Commentaire de : {commenter_name}
-
-Commentaire :
-{comment_content}
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("comment_to_user", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "commenter_name": commenter_name,
+            "comment_content": comment_content,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Nouveau commentaire</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Un nouveau commentaire a été ajouté sur votre ticket.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Commentaire de :</strong> {commenter_name}</li>
-        </ul>
-    </div>
-    <div style="background-color: #e7f3ff; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #007bff;">
-        <p><strong>Commentaire :</strong></p>
-        <p>{comment_content}</p>
-    </div>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_priority_changed_notification(
         self,
@@ -1053,55 +571,14 @@ Cordialement,
         new_priority: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque la priorité change"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        formatted_old_priority = self._format_priority(old_priority)
-        formatted_new_priority = self._format_priority(new_priority)
-        subject = f"Priorité modifiée pour votre ticket {formatted_number}"
-        
-        body = f"""
-Bonjour {creator_name},
-
-La priorité de votre ticket a été modifiée.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-• Ancienne priorité : {formatted_old_priority}
-• Nouvelle priorité : {formatted_new_priority}
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("priority_changed", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "old_priority": self._format_priority(old_priority),
+            "new_priority": self._format_priority(new_priority),
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Priorité modifiée</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>La priorité de votre ticket a été modifiée.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-            <li><strong>Ancienne priorité :</strong> {formatted_old_priority}</li>
-            <li><strong>Nouvelle priorité :</strong> <strong style="color: #dc3545;">{formatted_new_priority}</strong></li>
-        </ul>
-    </div>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_technician_changed_notification(
         self,
@@ -1114,58 +591,14 @@ Cordialement,
         new_technician_name: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le technicien change"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Technicien modifié pour votre ticket {formatted_number}"
-        
-        technician_info = f"• Nouveau technicien : {new_technician_name}"
-        if old_technician_name:
-            technician_info = f"• Ancien technicien : {old_technician_name}\n{technician_info}"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été réassigné à un autre technicien.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-{technician_info}
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("technician_changed", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "old_technician_name": old_technician_name,
+            "new_technician_name": new_technician_name,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Technicien modifié</h2>
-    <p>Bonjour {creator_name},</p>
-    <p>Votre ticket a été réassigné à un autre technicien.</p>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-"""
-        if old_technician_name:
-            html_body += f"            <li><strong>Ancien technicien :</strong> {old_technician_name}</li>\n"
-        html_body += f"""            <li><strong>Nouveau technicien :</strong> {new_technician_name}</li>
-        </ul>
-    </div>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_reopened_notification(
         self,
@@ -1176,54 +609,12 @@ Cordialement,
         creator_name: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le ticket est réouvert"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été réouvert"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été réouvert pour traitement supplémentaire.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-
-Le ticket sera traité à nouveau par un technicien.
-
-Cordialement,
-{self.sender_name}
-"""
-        
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        return self._send_template("ticket_reopened", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket réouvert</h2>
-    <p>Bonjour {creator_name},</p>
-    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #0dcaf0;">
-        <p><strong>Votre ticket a été réouvert pour traitement supplémentaire.</strong></p>
-    </div>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    <p>Le ticket sera traité à nouveau par un technicien.</p>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
-        
-        return self.send_email([creator_email], subject, body, html_body)
     
     def send_ticket_closed_notification_to_user(
         self,
@@ -1234,56 +625,86 @@ Cordialement,
         creator_name: str
     ) -> bool:
         """Envoie une notification à l'utilisateur lorsque le ticket est clôturé (après validation)"""
-        formatted_number = self._format_ticket_number(ticket_number)
-        subject = f"Votre ticket {formatted_number} a été clôturé"
-        
-        body = f"""
-Bonjour {creator_name},
-
-Votre ticket a été clôturé avec succès.
-
-Détails du ticket :
-• Numéro : {formatted_number}
-• Titre : {ticket_title}
-
-Merci d'avoir utilisé notre service de support.
+        return self._send_template("ticket_closed_to_user", creator_email, {
+            "name": creator_name,
+            "number": self._format_ticket_number(ticket_number),
+            "title": ticket_title,
+            "action_link": self._login_link("/dashboard/user", ticket_id),
+        })
 
-Cordialement,
-{self.sender_name}
-"""
+    
+    def send_notification_digest(
+        self,
+        recipient_email: str,
+        recipient_name: str,
+        entries: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Envoie le récapitulatif des notifications mises en attente (mode digest)
+        
+        Args:
+            recipient_email: Email du destinataire
+            recipient_name: Nom du destinataire
+            entries: Éléments du récapitulatif (created_at, message, ticket_id)
         
-        redirect_params = urlencode({
-            "redirect": "/dashboard/user",
-            "ticket": ticket_id
+        Returns:
+            True si l'email a été envoyé avec succès
+        """
+        lines = self.render_many("notification_digest_item", [
+            {
+                "time": entry["created_at"].strftime("%d/%m %H:%M"),
+                "message": entry["message"],
+                "action_link": self._login_link("/dashboard", str(entry["ticket_id"])) if entry.get("ticket_id") else None,
+            }
+            for entry in entries
+        ])
+        return self._send_template("notification_digest", recipient_email, {
+            "name": recipient_name,
+            "count": len(entries),
+            "items_text": "\n".join(line.body for line in lines),
+            "items_html": "\n".join(line.html_body for line in lines),
+            "action_link": self._login_link("/dashboard"),
         })
-        action_link = f"{self.app_base_url}/login?{redirect_params}"
-        html_body = f"""
-<html>
-<body>
-    <h2>Ticket clôturé</h2>
-    <p>Bonjour {creator_name},</p>
-    <div style="background-color: #d4edda; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #28a745;">
-        <p><strong>Votre ticket a été clôturé avec succès.</strong></p>
-    </div>
-    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
-        <p><strong>Détails du ticket :</strong></p>
-        <ul>
-            <li><strong>Numéro :</strong> {formatted_number}</li>
-            <li><strong>Titre :</strong> {ticket_title}</li>
-        </ul>
-    </div>
-    <p>Merci d'avoir utilisé notre service de support.</p>
-    <div style="margin: 20px 0;">
-        <a href="{action_link}" style="background:#007bff;color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block">Voir le ticket</a>
-    </div>
-    <p>Cordialement,<br>{self.sender_name}</p>
-</body>
-</html>
-"""
+
+    
+    def send_tickets_bulk_summary(
+        self,
+        template: str,
+        recipient_email: str,
+        recipient_name: str,
+        tickets: List[Dict[str, Any]],
+        notes: Optional[str] = None
+    ) -> bool:
+        """
+        Envoie un seul email récapitulant une opération groupée sur plusieurs tickets
+        
+        Args:
+            template: tickets_bulk_assigned, tickets_bulk_assigned_to_creator,
+                tickets_bulk_closed ou tickets_bulk_reprioritized
+            tickets: Tickets concernés (id, number, title, priority optionnelle)
+            notes: Instructions communes (assignation)
         
-        return self.send_email([creator_email], subject, body, html_body)
+        Returns:
+            True si l'email a été envoyé avec succès
+        """
+        lines = self.render_many("tickets_bulk_item", [
+            {
+                "number": self._format_ticket_number(ticket["number"]),
+                "title": ticket["title"],
+                "priority": self._format_priority(ticket["priority"]) if ticket.get("priority") else None,
+                "action_link": self._login_link("/dashboard", str(ticket["id"])),
+            }
+            for ticket in tickets
+        ])
+        return self._send_template(template, recipient_email, {
+            "name": recipient_name,
+            "count": len(tickets),
+            "items_text": "\n".join(line.body for line in lines),
+            "items_html": "\n".join(line.html_body for line in lines),
+            "notes": notes,
+            "action_link": self._login_link("/dashboard"),
+        })
 
 
 # Instance globale du service email
 email_service = EmailService()
-
@@ -0,0 +1,296 @@
+"""
+Moteur de templates des emails de notification.
+
+Les templates (sujet, texte brut, HTML) sont définis par langue dans
+email_templates/<langue>.py. Ils partagent une mise en page commune
+(LAYOUT_TEXT / LAYOUT_HTML) et des fragments réutilisables.
+
+Chaque template est compilé une seule fois en une suite de segments (texte
+littéral, variable, condition). Les valeurs statiques (en-tête, bouton, nom de
+l'expéditeur, URL de l'application) sont ensuite injectées une fois pour toutes
+et le résultat est mis en cache : un rendu ne fait plus que concaténer les
+quelques segments propres au destinataire.
+
+Syntaxe :
+    {{ nom }}                   variable (échappée dans les templates HTML)
+    {{ nom|raw }}               variable non échappée
+    {% if nom %}...{% else %}...{% endif %}
+    {% include fragment %}      fragment partagé de la langue (inséré à la compilation)
+    {% content %}               emplacement du corps dans la mise en page
+"""
+import html
+import importlib
+import os
+import re
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_LOCALE = os.getenv("EMAIL_LOCALE", "fr")
+
+# Clés d'un template qui ne sont pas des valeurs statiques
+# ("layout": False pour un fragment rendu sans la mise en page, ex. une ligne de récapitulatif)
+TEMPLATE_PARTS = ("subject", "text", "html", "layout")
+
+
+class TemplateSyntaxError(ValueError):
+    """Erreur de syntaxe dans un template d'email"""
+
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    body: str
+    html_body: str
+
+
+class _Var(NamedTuple):
+    name: str
+    escape: bool
+
+
+class _If(NamedTuple):
+    name: str
+    then: tuple
+    otherwise: tuple
+
+
+_Node = Union[str, _Var, _If]
+
+_TAG_RE = re.compile(r"\{\{\s*(\w+)(\|raw)?\s*\}\}|\{%\s*(if|else|endif)\s*(\w*)\s*%\}")
+_INCLUDE_RE = re.compile(r"\{%\s*include\s+(\w+)\s*%\}")
+_CONTENT_MARKER = "{% content %}"
+# Une balise de bloc seule sur sa ligne ne doit pas laisser de ligne vide
+_STANDALONE_RE = re.compile(r"^[ \t]*(\{%\s*(?:if\s+\w+|else|endif)\s*%\})[ \t]*\n", re.M)
+
+
+def _render_nodes(nodes: tuple, context: Mapping[str, Any], out: List[str]) -> None:
+    for node in nodes:
+        if node.__class__ is str:
+            out.append(node)
+        elif node.__class__ is _Var:
+            value = context.get(node.name)
+            if value is None:
+                continue
+            value = str(value)
+            out.append(html.escape(value) if node.escape else value)
+        else:
+            _render_nodes(node.then if context.get(node.name) else node.otherwise, context, out)
+
+
+def _bind_nodes(nodes: tuple, values: Mapping[str, Any]) -> tuple:
+    """Remplace les variables et conditions connues par du texte et fusionne les littéraux"""
+    bound: List[_Node] = []
+
+    def append(node: _Node) -> None:
+        if node.__class__ is str and bound and bound[-1].__class__ is str:
+            bound[-1] += node
+        elif node != "":
+            bound.append(node)
+
+    for node in nodes:
+        if node.__class__ is _Var and node.name in values:
+            parts: List[str] = []
+            _render_nodes((node,), values, parts)
+            append("".join(parts))
+        elif node.__class__ is _If:
+            if node.name in values:
+                branch = node.then if values[node.name] else node.otherwise
+                for child in _bind_nodes(branch, values):
+                    append(child)
+            else:
+                append(_If(node.name, _bind_nodes(node.then, values), _bind_nodes(node.otherwise, values)))
+        else:
+            append(node)
+    return tuple(bound)
+
+
+class CompiledTemplate:
+    """Template compilé : suite immuable de segments"""
+
+    __slots__ = ("nodes",)
+
+    def __init__(self, nodes: tuple):
+        self.nodes = nodes
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        out: List[str] = []
+        _render_nodes(self.nodes, context, out)
+        return "".join(out)
+
+    def bind(self, values: Mapping[str, Any]) -> "CompiledTemplate":
+        """Évalue à l'avance les parties qui ne dépendent que de `values`"""
+        return CompiledTemplate(_bind_nodes(self.nodes, values))
+
+
+def compile_template(
+    source: str,
+    autoescape: bool = False,
+    fragments: Optional[Mapping[str, str]] = None,
+) -> CompiledTemplate:
+    """Compile un template source en segments"""
+    if fragments:
+        # Les fragments peuvent eux-mêmes inclure d'autres fragments
+        for _ in range(10):
+            expanded = _INCLUDE_RE.sub(lambda m: fragments[m.group(1)], source)
+            if expanded == source:
+                break
+            source = expanded
+    if _INCLUDE_RE.search(source):
+        raise TemplateSyntaxError("Fragment inclus inconnu ou inclusion trop profonde")
+    source = _STANDALONE_RE.sub(r"\1", source)
+
+    root: List[_Node] = []
+    current = root
+    # Pile des conditions ouvertes : (nom, liste parente, branche "then", branche "else")
+    stack: List[Tuple[str, list, list, Optional[list]]] = []
+    pos = 0
+    for match in _TAG_RE.finditer(source):
+        if match.start() > pos:
+            current.append(source[pos:match.start()])
+        pos = match.end()
+        var, raw, keyword, arg = match.groups()
+        if var:
+            current.append(_Var(var, autoescape and not raw))
+        elif keyword == "if":
+            if not arg:
+                raise TemplateSyntaxError("{% if %} sans condition")
+            then: List[_Node] = []
+            stack.append((arg, current, then, None))
+            current = then
+        elif keyword == "else":
+            if not stack or stack[-1][3] is not None:
+                raise TemplateSyntaxError("{% else %} inattendu")
+            name, parent, then, _ = stack.pop()
+            otherwise: List[_Node] = []
+            stack.append((name, parent, then, otherwise))
+            current = otherwise
+        else:
+            if not stack:
+                raise TemplateSyntaxError("{% endif %} inattendu")
+            name, parent, then, otherwise = stack.pop()
+            parent.append(_If(name, tuple(then), tuple(otherwise or ())))
+            current = parent
+    if stack:
+        raise TemplateSyntaxError(f"{{% if {stack[-1][0]} %}} non fermé")
+    if pos < len(source):
+        current.append(source[pos:])
+    return CompiledTemplate(_bind_nodes(tuple(root), {}))
+
+
+class _EmailTemplate(NamedTuple):
+    subject: CompiledTemplate
+    text: CompiledTemplate
+    html: CompiledTemplate
+
+
+class EmailTemplateEngine:
+    """
+    Charge, compile et met en cache les templates d'emails.
+
+    - _compiled : (langue, nom) → template compilé avec la mise en page de la langue ;
+    - _bound : (langue, nom, valeurs globales) → template dont toutes les parties
+      statiques sont déjà rendues. Les valeurs globales (nom de l'expéditeur, URL
+      de l'application) font partie de la clé car elles sont modifiables à chaud
+      depuis les paramètres.
+    """
+
+    def __init__(self, default_locale: str = DEFAULT_LOCALE):
+        self.default_locale = default_locale
+        self._locales: Dict[str, Optional[ModuleType]] = {}
+        self._compiled: Dict[Tuple[str, str], _EmailTemplate] = {}
+        self._bound: Dict[Tuple[str, str, tuple], _EmailTemplate] = {}
+
+    def _locale_module(self, locale: str) -> Optional[ModuleType]:
+        if locale not in self._locales:
+            try:
+                self._locales[locale] = importlib.import_module(f"{__name__}.{locale}")
+            except ImportError:
+                self._locales[locale] = None
+        return self._locales[locale]
+
+    def _resolve(self, name: str, locale: Optional[str]) -> Tuple[str, ModuleType]:
+        """Langue demandée si elle définit le template, sinon langue par défaut"""
+        for candidate in (locale, self.default_locale):
+            if not candidate:
+                continue
+            module = self._locale_module(candidate)
+            if module is not None and name in module.TEMPLATES:
+                return candidate, module
+        raise KeyError(f"Template d'email inconnu : {name}")
+
+    def _compile(self, locale: str, module: ModuleType, name: str) -> _EmailTemplate:
+        key = (locale, name)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            spec = module.TEMPLATES[name]
+            fragments = module.FRAGMENTS
+            static = {k: v for k, v in spec.items() if k not in TEMPLATE_PARTS}
+            if spec.get("layout", True):
+                text_source = module.LAYOUT_TEXT.replace(_CONTENT_MARKER, spec["text"])
+                html_source = module.LAYOUT_HTML.replace(_CONTENT_MARKER, spec["html"])
+            else:
+                text_source, html_source = spec["text"], spec["html"]
+            compiled = _EmailTemplate(
+                subject=compile_template(spec.get("subject", ""), fragments=fragments).bind(static),
+                text=compile_template(text_source, fragments=fragments).bind(static),
+                html=compile_template(html_source, autoescape=True, fragments=fragments).bind(static),
+            )
+            self._compiled[key] = compiled
+        return compiled
+
+    def get(
+        self,
+        name: str,
+        locale: Optional[str] = None,
+        globals: Optional[Mapping[str, Any]] = None,
+    ) -> _EmailTemplate:
+        """Template prêt à rendre, avec les valeurs globales déjà injectées"""
+        resolved, module = self._resolve(name, locale)
+        frozen = tuple(sorted((globals or {}).items()))
+        key = (resolved, name, frozen)
+        bound = self._bound.get(key)
+        if bound is None:
+            compiled = self._compile(resolved, module, name)
+            values = dict(frozen)
+            bound = _EmailTemplate(*(part.bind(values) for part in compiled))
+            self._bound[key] = bound
+        return bound
+
+    def render(
+        self,
+        name: str,
+        context: Mapping[str, Any],
+        locale: Optional[str] = None,
+        globals: Optional[Mapping[str, Any]] = None,
+    ) -> RenderedEmail:
+        template = self.get(name, locale, globals)
+        return RenderedEmail(
+            template.subject.render(context),
+            template.text.render(context),
+            template.html.render(context),
+        )
+
+    def render_many(
+        self,
+        name: str,
+        contexts: Iterable[Mapping[str, Any]],
+        locale: Optional[str] = None,
+        globals: Optional[Mapping[str, Any]] = None,
+    ) -> List[RenderedEmail]:
+        """Rend N messages personnalisés à partir d'un seul template résolu"""
+        subject, text, html_template = self.get(name, locale, globals)
+        return [
+            RenderedEmail(subject.render(context), text.render(context), html_template.render(context))
+            for context in contexts
+        ]
+
+    def template_names(self, locale: Optional[str] = None) -> List[str]:
+        module = self._locale_module(locale or self.default_locale)
+        return sorted(module.TEMPLATES) if module is not None else []
+
+    def clear_cache(self) -> None:
+        self._compiled.clear()
+        self._bound.clear()
+
+
+# Instance globale du moteur de templates
+template_engine = EmailTemplateEngine()
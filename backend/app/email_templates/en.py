@@ -0,0 +1,510 @@
+"""
+Templates des emails de notification - anglais (EMAIL_LOCALE=en)
+"""
+
+LAYOUT_TEXT = """
+{% if name %}Hello {{ name }},{% else %}Hello,{% endif %}
+
+{% content %}
+
+Best regards,
+{{ sender_name }}
+"""
+
+LAYOUT_HTML = """
+<html>
+<body>
+    <h2>{{ heading }}</h2>
+    <p>{% if name %}Hello {{ name }},{% else %}Hello,{% endif %}</p>
+{% content %}
+    <p>Best regards,<br>{{ sender_name }}</p>
+</body>
+</html>
+"""
+
+FRAGMENTS = {
+    "text_details": """Ticket details:
+• Number: {{ number }}
+• Title: {{ title }}""",
+    "html_details_open": """    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Ticket details:</strong></p>
+        <ul>
+            <li><strong>Number:</strong> {{ number }}</li>
+            <li><strong>Title:</strong> {{ title }}</li>""",
+    "html_details_close": """        </ul>
+    </div>""",
+    "html_button": """    <div style="margin: 20px 0;">
+        <a href="{{ action_link }}" style="background:{{ button_color }};color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;font-weight:bold">{{ button_label }}</a>
+    </div>""",
+    "html_app_link": """<a href="{{ action_link }}" style="color:#007bff;text-decoration:underline;">Open the application</a>.""",
+    "reminder_message": (
+        "{% if is_last %}⚠️ Final reminder: your ticket was resolved {{ days }} days ago. "
+        "If you do not validate it in the coming days, the ticket will be closed automatically."
+        "{% else %}{% if is_second %}Your ticket was resolved {{ days }} days ago. Validation required."
+        "{% else %}{% if is_first %}Your ticket was resolved {{ days }} days ago. Please validate the resolution."
+        "{% else %}Your ticket was resolved {{ days }} days ago.{% endif %}{% endif %}{% endif %}"
+    ),
+    "bulk_items_text": """{{ items_text|raw }}
+{% if notes %}
+
+Instructions:
+{{ notes }}
+{% endif %}
+
+Please log in to the application to see the details.""",
+    "bulk_items_html": """    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <ul>
+{{ items_html|raw }}
+        </ul>
+{% if notes %}
+        <p><strong>Instructions:</strong></p>
+        <p style="background-color: #fff; padding: 10px; border-left: 3px solid #007bff;">{{ notes }}</p>
+{% endif %}
+    </div>
+{% include html_button %}""",
+}
+
+TEMPLATES = {
+    "ticket_created": {
+        "subject": "New ticket {{ number }} created: {{ title }}",
+        "heading": "New ticket created",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """A new ticket has been created in the ticket management system.
+
+{% include text_details %}
+• Created by: {{ creator_name }}
+
+Please log in to the application to review and assign this ticket.""",
+        "html": """    <p>A new ticket has been created in the ticket management system.</p>
+{% include html_details_open %}
+            <li><strong>Created by:</strong> {{ creator_name }}</li>
+{% include html_details_close %}
+    <p>Please log in to the application to review and assign this ticket.</p>
+{% include html_button %}""",
+    },
+    "ticket_created_with_actions": {
+        "subject": "New ticket {{ number }} created: {{ title }}",
+        "heading": "New ticket created",
+        "button_color": "#007bff",
+        "button_label": "Assign to a technician",
+        "text": """A new ticket has been created in the ticket management system.
+
+{% include text_details %}
+• Created by: {{ creator_name }}
+
+Please log in to the application to review and assign this ticket.""",
+        "html": """    <p>A new ticket has been created in the ticket management system.</p>
+{% include html_details_open %}
+            <li><strong>Created by:</strong> {{ creator_name }}</li>
+{% include html_details_close %}
+{% if link_only %}
+    <p>Please log in to the application using this link to review and assign this ticket:
+        {% include html_app_link %}
+    </p>
+{% else %}
+{% include html_button %}
+{% endif %}""",
+    },
+    "ticket_assigned": {
+        "subject": "Ticket {{ number }} has been assigned to you: {{ title }}",
+        "heading": "Ticket assigned",
+        "text": """A new ticket has been assigned to you.
+
+{% include text_details %}
+{% if priority %}
+• Priority: {{ priority }}
+{% endif %}
+{% if notes %}
+
+Instructions:
+{{ notes }}
+{% endif %}
+
+Please log in to the application to take charge of this ticket.""",
+        "html": """    <p>A new ticket has been assigned to you.</p>
+{% include html_details_open %}
+{% if priority %}
+            <li><strong>Priority:</strong> {{ priority }}</li>
+{% endif %}
+        </ul>
+{% if notes %}
+        <p><strong>Instructions:</strong></p>
+        <p style="background-color: #fff; padding: 10px; border-left: 3px solid #007bff;">{{ notes }}</p>
+{% endif %}
+    </div>
+    <p>
+        Please log in to the application using this link to take charge of and resolve this ticket:
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_assigned_to_creator": {
+        "subject": "Your ticket {{ number }} has been assigned to a technician",
+        "heading": "Ticket assigned",
+        "text": """Your ticket has been assigned to a technician and will be handled shortly.
+
+{% include text_details %}
+• Assigned technician: {{ technician_name }}
+
+You will be notified when the ticket is resolved.""",
+        "html": """    <p>Your ticket has been assigned to a technician and will be handled shortly.</p>
+{% include html_details_open %}
+            <li><strong>Assigned technician:</strong> {{ technician_name }}</li>
+{% include html_details_close %}
+    <p>You will be notified when the ticket is resolved.</p>
+    <p>
+        To follow the progress of your request, please log in to the application using this link:
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_created_to_creator": {
+        "subject": "Your ticket {{ number }} has been created successfully",
+        "heading": "Ticket created",
+        "text": """Your ticket has been created successfully and will be handled shortly.
+
+{% include text_details %}
+
+You will be notified when the ticket is assigned to a technician.""",
+        "html": """    <p>Your ticket has been created successfully and will be handled shortly.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>You will be notified when the ticket is assigned to a technician.</p>
+    <p>
+        To view your request and follow its progress, please log in to the application using this link:
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_rejected": {
+        "subject": "Ticket {{ number }} rejected by the user: {{ title }}",
+        "heading": "Ticket rejected",
+        "text": """The user has rejected the resolution of the ticket.
+
+{% include text_details %}
+{% if rejection_reason %}
+• Rejection reason: {{ rejection_reason }}
+{% endif %}
+
+Please log in to the application and resume the ticket if necessary.""",
+        "html": """    <p>The user has rejected the resolution of the ticket.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if rejection_reason %}
+    <p><strong>Rejection reason:</strong> {{ rejection_reason }}</p>
+{% endif %}
+    <p>Please log in to the application and resume the ticket if necessary.</p>""",
+    },
+    "ticket_delegated_to_adjoint": {
+        "subject": "Ticket {{ number }} delegated by the CIO: {{ title }}",
+        "heading": "Ticket delegated by the CIO",
+        "button_color": "#0ea5e9",
+        "button_label": "Assign this ticket",
+        "text": """{{ dsi_name }} (CIO) has delegated a ticket to you to assign to a technician.
+
+{% include text_details %}
+{% if notes %}
+
+Notes from the CIO:
+{{ notes }}
+{% endif %}
+
+Please log in to the application to assign this ticket to a technician.""",
+        "html": """    <p><strong>{{ dsi_name }}</strong> (CIO) has delegated a ticket to you to assign to a technician.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if notes %}
+    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 3px solid #ffc107;">
+        <p><strong>Notes from the CIO:</strong></p>
+        <p>{{ notes }}</p>
+    </div>
+{% endif %}
+{% include html_button %}
+    <p>Please log in to the application to assign this ticket to a technician.</p>""",
+    },
+    "ticket_in_progress": {
+        "subject": "Your ticket {{ number }} is being processed",
+        "heading": "Ticket in progress",
+        "text": """Your ticket is now being processed by the technician.
+
+{% include text_details %}
+• Technician: {{ technician_name }}
+
+You will be notified when the ticket is resolved.""",
+        "html": """    <p>Your ticket is now being processed by the technician.</p>
+{% include html_details_open %}
+            <li><strong>Technician:</strong> {{ technician_name }}</li>
+{% include html_details_close %}
+    <p>You will be notified when the ticket is resolved.</p>
+    <p>
+        To follow the progress of your request, please log in to the application using this link:
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_resolved": {
+        "subject": "Your ticket {{ number }} has been resolved - Validation required",
+        "heading": "Ticket resolved - Validation required",
+        "button_color": "#28a745",
+        "button_label": "Validate the resolution",
+        "text": """Your ticket has been resolved. Please validate the resolution.
+
+{% include text_details %}
+{% if resolution_summary %}
+• Resolution summary: {{ resolution_summary }}
+{% endif %}
+
+Please validate the resolution within 14 days. Otherwise, the ticket will be closed automatically.""",
+        "html": """    <p>Your ticket has been resolved. Please validate the resolution.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if resolution_summary %}
+    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Resolution summary:</strong></p>
+        <p>{{ resolution_summary }}</p>
+    </div>
+{% endif %}
+    <p style="color: #856404; background-color: #fff3cd; padding: 10px; border-radius: 5px;">
+        <strong>⚠️ Important:</strong> Please validate the resolution within 14 days. Otherwise, the ticket will be closed automatically.
+    </p>
+{% include html_button %}""",
+    },
+    "validation_reminder": {
+        "subject": (
+            "{% if is_last %}Final reminder: please validate your ticket {{ number }}"
+            "{% else %}{% if is_second %}Second reminder: validation required for your ticket {{ number }}"
+            "{% else %}{% if is_first %}Reminder: please validate your ticket {{ number }}"
+            "{% else %}Reminder: validation required for your ticket {{ number }}{% endif %}{% endif %}{% endif %}"
+        ),
+        "heading": "Validation reminder",
+        "button_color": "#28a745",
+        "button_label": "Validate the resolution",
+        "text": """{% include reminder_message %}
+
+{% include text_details %}
+
+Please validate the resolution as soon as possible.""",
+        "html": """{% if is_last %}
+    <div style="background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; border-radius: 5px; margin: 15px 0;">
+{% else %}
+    <div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; border-radius: 5px; margin: 15px 0;">
+{% endif %}
+        <p><strong>{% include reminder_message %}</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "ticket_auto_closed": {
+        "subject": "Your ticket {{ number }} has been closed automatically",
+        "heading": "Ticket closed automatically",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """Your ticket has been closed automatically after 14 days without validation.
+
+{% include text_details %}
+
+You can reopen this ticket within the next 7 days if the problem persists. After this period, you will need to create a new ticket.""",
+        "html": """    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
+        <p><strong>Your ticket has been closed automatically after 14 days without validation.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>⚠️ Important:</strong> You can reopen this ticket within the <strong>next 7 days</strong> if the problem persists. After this period, you will need to create a new ticket.</p>
+    </div>
+{% include html_button %}""",
+    },
+    "ticket_rejected_to_user": {
+        "subject": "Your ticket {{ number }} has been rejected",
+        "heading": "Ticket rejected",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """Your ticket has been rejected.
+
+{% include text_details %}
+{% if rejection_reason %}
+• Rejection reason: {{ rejection_reason }}
+{% endif %}
+
+If you have any questions, please contact support.""",
+        "html": """    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
+        <p><strong>Your ticket has been rejected.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if rejection_reason %}
+    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Rejection reason:</strong></p>
+        <p>{{ rejection_reason }}</p>
+    </div>
+{% endif %}
+    <p>If you have any questions, please contact support.</p>
+{% include html_button %}""",
+    },
+    "comment_to_user": {
+        "subject": "New comment on your ticket {{ number }}",
+        "heading": "New comment",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """A new comment has been added to your ticket.
+
+{% include text_details %}
+• Comment by: {{ commenter_name }}
+
+Comment:
+{{ comment_content }}""",
+        "html": """    <p>A new comment has been added to your ticket.</p>
+{% include html_details_open %}
+            <li><strong>Comment by:</strong> {{ commenter_name }}</li>
+{% include html_details_close %}
+    <div style="background-color: #e7f3ff; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #007bff;">
+        <p><strong>Comment:</strong></p>
+        <p>{{ comment_content }}</p>
+    </div>
+{% include html_button %}""",
+    },
+    "priority_changed": {
+        "subject": "Priority changed for your ticket {{ number }}",
+        "heading": "Priority changed",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """The priority of your ticket has been changed.
+
+{% include text_details %}
+• Previous priority: {{ old_priority }}
+• New priority: {{ new_priority }}""",
+        "html": """    <p>The priority of your ticket has been changed.</p>
+{% include html_details_open %}
+            <li><strong>Previous priority:</strong> {{ old_priority }}</li>
+            <li><strong>New priority:</strong> <strong style="color: #dc3545;">{{ new_priority }}</strong></li>
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "technician_changed": {
+        "subject": "Technician changed for your ticket {{ number }}",
+        "heading": "Technician changed",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """Your ticket has been reassigned to another technician.
+
+{% include text_details %}
+{% if old_technician_name %}
+• Previous technician: {{ old_technician_name }}
+{% endif %}
+• New technician: {{ new_technician_name }}""",
+        "html": """    <p>Your ticket has been reassigned to another technician.</p>
+{% include html_details_open %}
+{% if old_technician_name %}
+            <li><strong>Previous technician:</strong> {{ old_technician_name }}</li>
+{% endif %}
+            <li><strong>New technician:</strong> {{ new_technician_name }}</li>
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "ticket_reopened": {
+        "subject": "Your ticket {{ number }} has been reopened",
+        "heading": "Ticket reopened",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """Your ticket has been reopened for further processing.
+
+{% include text_details %}
+
+The ticket will be handled again by a technician.""",
+        "html": """    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #0dcaf0;">
+        <p><strong>Your ticket has been reopened for further processing.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>The ticket will be handled again by a technician.</p>
+{% include html_button %}""",
+    },
+    "ticket_closed_to_user": {
+        "subject": "Your ticket {{ number }} has been closed",
+        "heading": "Ticket closed",
+        "button_color": "#007bff",
+        "button_label": "View the ticket",
+        "text": """Your ticket has been closed successfully.
+
+{% include text_details %}
+
+Thank you for using our support service.""",
+        "html": """    <div style="background-color: #d4edda; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #28a745;">
+        <p><strong>Your ticket has been closed successfully.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>Thank you for using our support service.</p>
+{% include html_button %}""",
+    },
+    "notification_digest": {
+        "subject": "Summary: {{ count }} pending notification(s)",
+        "heading": "Your notification summary",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """Here is a summary of your notifications since the last email:
+
+{{ items_text|raw }}
+
+Please log in to the application to see the details.""",
+        "html": """    <p>Here is a summary of your notifications since the last email:</p>
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <ul>
+{{ items_html|raw }}
+        </ul>
+    </div>
+{% include html_button %}""",
+    },
+    "notification_digest_item": {
+        "layout": False,
+        "text": "• {{ time }} - {{ message }}",
+        "html": """            <li>{{ time }} - {% if action_link %}<a href="{{ action_link }}" style="color:#007bff;">{{ message }}</a>{% else %}{{ message }}{% endif %}</li>""",
+    },
+    "tickets_bulk_assigned": {
+        "subject": "{{ count }} ticket(s) have been assigned to you",
+        "heading": "Tickets assigned",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """The following tickets have been assigned to you:
+
+{% include bulk_items_text %}""",
+        "html": """    <p>The following tickets have been assigned to you:</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_assigned_to_creator": {
+        "subject": "{{ count }} of your tickets have been assigned",
+        "heading": "Tickets assigned",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """The following tickets have been assigned to a technician:
+
+{% include bulk_items_text %}""",
+        "html": """    <p>The following tickets have been assigned to a technician:</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_closed": {
+        "subject": "{{ count }} of your tickets have been closed",
+        "heading": "Tickets closed",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """The following tickets have been closed:
+
+{% include bulk_items_text %}""",
+        "html": """    <p>The following tickets have been closed:</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_reprioritized": {
+        "subject": "Priority changed for {{ count }} ticket(s)",
+        "heading": "Priority changed",
+        "button_color": "#007bff",
+        "button_label": "Open the application",
+        "text": """The priority of the following tickets has been changed:
+
+{% include bulk_items_text %}""",
+        "html": """    <p>The priority of the following tickets has been changed:</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_item": {
+        "layout": False,
+        "text": "• {{ number }} - {{ title }}{% if priority %} (priority: {{ priority }}){% endif %}",
+        "html": """            <li><a href="{{ action_link }}" style="color:#007bff;">{{ number }}</a> - {{ title }}{% if priority %} (priority: {{ priority }}){% endif %}</li>""",
+    },
+}
@@ -0,0 +1,510 @@
+"""
+Templates des emails de notification - français (langue par défaut)
+"""
+
+LAYOUT_TEXT = """
+{% if name %}Bonjour {{ name }},{% else %}Bonjour,{% endif %}
+
+{% content %}
+
+Cordialement,
+{{ sender_name }}
+"""
+
+LAYOUT_HTML = """
+<html>
+<body>
+    <h2>{{ heading }}</h2>
+    <p>{% if name %}Bonjour {{ name }},{% else %}Bonjour,{% endif %}</p>
+{% content %}
+    <p>Cordialement,<br>{{ sender_name }}</p>
+</body>
+</html>
+"""
+
+FRAGMENTS = {
+    "text_details": """Détails du ticket :
+• Numéro : {{ number }}
+• Titre : {{ title }}""",
+    "html_details_open": """    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Détails du ticket :</strong></p>
+        <ul>
+            <li><strong>Numéro :</strong> {{ number }}</li>
+            <li><strong>Titre :</strong> {{ title }}</li>""",
+    "html_details_close": """        </ul>
+    </div>""",
+    "html_button": """    <div style="margin: 20px 0;">
+        <a href="{{ action_link }}" style="background:{{ button_color }};color:#fff;text-decoration:none;padding:10px 16px;border-radius:6px;display:inline-block;font-weight:bold">{{ button_label }}</a>
+    </div>""",
+    "html_app_link": """<a href="{{ action_link }}" style="color:#007bff;text-decoration:underline;">Accéder à l'application</a>.""",
+    "reminder_message": (
+        "{% if is_last %}⚠️ Dernier rappel : Votre ticket a été résolu il y a {{ days }} jours. "
+        "Si vous ne validez pas dans les prochains jours, le ticket sera clôturé automatiquement."
+        "{% else %}{% if is_second %}Votre ticket a été résolu il y a {{ days }} jours. Validation requise."
+        "{% else %}{% if is_first %}Votre ticket a été résolu il y a {{ days }} jours. Veuillez valider la résolution."
+        "{% else %}Votre ticket a été résolu il y a {{ days }} jours.{% endif %}{% endif %}{% endif %}"
+    ),
+    "bulk_items_text": """{{ items_text|raw }}
+{% if notes %}
+
+Instructions :
+{{ notes }}
+{% endif %}
+
+Veuillez vous connecter à l'application pour consulter le détail.""",
+    "bulk_items_html": """    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <ul>
+{{ items_html|raw }}
+        </ul>
+{% if notes %}
+        <p><strong>Instructions :</strong></p>
+        <p style="background-color: #fff; padding: 10px; border-left: 3px solid #007bff;">{{ notes }}</p>
+{% endif %}
+    </div>
+{% include html_button %}""",
+}
+
+TEMPLATES = {
+    "ticket_created": {
+        "subject": "Nouveau ticket {{ number }} créé: {{ title }}",
+        "heading": "Nouveau ticket créé",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """Un nouveau ticket a été créé dans le système de gestion des tickets.
+
+{% include text_details %}
+• Créateur : {{ creator_name }}
+
+Veuillez vous connecter à l'application pour analyser et assigner ce ticket.""",
+        "html": """    <p>Un nouveau ticket a été créé dans le système de gestion des tickets.</p>
+{% include html_details_open %}
+            <li><strong>Créateur :</strong> {{ creator_name }}</li>
+{% include html_details_close %}
+    <p>Veuillez vous connecter à l'application pour analyser et assigner ce ticket.</p>
+{% include html_button %}""",
+    },
+    "ticket_created_with_actions": {
+        "subject": "Nouveau ticket {{ number }} créé: {{ title }}",
+        "heading": "Nouveau ticket créé",
+        "button_color": "#007bff",
+        "button_label": "Assigner à un technicien",
+        "text": """Un nouveau ticket a été créé dans le système de gestion des tickets.
+
+{% include text_details %}
+• Créateur : {{ creator_name }}
+
+Veuillez vous connecter à l'application pour analyser et assigner ce ticket.""",
+        "html": """    <p>Un nouveau ticket a été créé dans le système de gestion des tickets.</p>
+{% include html_details_open %}
+            <li><strong>Créateur :</strong> {{ creator_name }}</li>
+{% include html_details_close %}
+{% if link_only %}
+    <p>Veuillez vous connecter à l'application en cliquant sur ce lien afin d'analyser et d'assigner ce ticket :
+        {% include html_app_link %}
+    </p>
+{% else %}
+{% include html_button %}
+{% endif %}""",
+    },
+    "ticket_assigned": {
+        "subject": "Ticket {{ number }} vous a été assigné: {{ title }}",
+        "heading": "Ticket assigné",
+        "text": """Un nouveau ticket vous a été assigné.
+
+{% include text_details %}
+{% if priority %}
+• Priorité : {{ priority }}
+{% endif %}
+{% if notes %}
+
+Instructions :
+{{ notes }}
+{% endif %}
+
+Veuillez vous connecter à l'application pour prendre en charge ce ticket.""",
+        "html": """    <p>Un nouveau ticket vous a été assigné.</p>
+{% include html_details_open %}
+{% if priority %}
+            <li><strong>Priorité :</strong> {{ priority }}</li>
+{% endif %}
+        </ul>
+{% if notes %}
+        <p><strong>Instructions :</strong></p>
+        <p style="background-color: #fff; padding: 10px; border-left: 3px solid #007bff;">{{ notes }}</p>
+{% endif %}
+    </div>
+    <p>
+        Veuillez vous connecter à l'application en cliquant sur ce lien afin de prendre en charge et de résoudre ce ticket :
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_assigned_to_creator": {
+        "subject": "Votre ticket {{ number }} a été assigné à un technicien",
+        "heading": "Ticket assigné",
+        "text": """Votre ticket a été assigné à un technicien et sera traité prochainement.
+
+{% include text_details %}
+• Technicien assigné : {{ technician_name }}
+
+Vous serez notifié lorsque le ticket sera résolu.""",
+        "html": """    <p>Votre ticket a été assigné à un technicien et sera traité prochainement.</p>
+{% include html_details_open %}
+            <li><strong>Technicien assigné :</strong> {{ technician_name }}</li>
+{% include html_details_close %}
+    <p>Vous serez notifié lorsque le ticket sera résolu.</p>
+    <p>
+        Pour suivre l'avancement de votre demande, veuillez vous connecter à l'application en cliquant sur ce lien :
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_created_to_creator": {
+        "subject": "Votre ticket {{ number }} a été créé avec succès",
+        "heading": "Ticket créé",
+        "text": """Votre ticket a été créé avec succès et sera traité prochainement.
+
+{% include text_details %}
+
+Vous serez notifié lorsque le ticket sera assigné à un technicien.""",
+        "html": """    <p>Votre ticket a été créé avec succès et sera traité prochainement.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>Vous serez notifié lorsque le ticket sera assigné à un technicien.</p>
+    <p>
+        Pour consulter le détail de votre demande et suivre son traitement, veuillez vous connecter à l'application en cliquant sur ce lien :
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_rejected": {
+        "subject": "Ticket {{ number }} rejeté par l'utilisateur: {{ title }}",
+        "heading": "Ticket rejeté",
+        "text": """L'utilisateur a rejeté la résolution du ticket.
+
+{% include text_details %}
+{% if rejection_reason %}
+• Motif du rejet : {{ rejection_reason }}
+{% endif %}
+
+Veuillez vous connecter à l'application et reprendre le ticket si nécessaire.""",
+        "html": """    <p>L'utilisateur a rejeté la résolution du ticket.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if rejection_reason %}
+    <p><strong>Motif du rejet :</strong> {{ rejection_reason }}</p>
+{% endif %}
+    <p>Veuillez vous connecter à l'application et reprendre le ticket si nécessaire.</p>""",
+    },
+    "ticket_delegated_to_adjoint": {
+        "subject": "Ticket {{ number }} délégué par le DSI: {{ title }}",
+        "heading": "Ticket délégué par le DSI",
+        "button_color": "#0ea5e9",
+        "button_label": "Assigner ce ticket",
+        "text": """Le DSI {{ dsi_name }} vous a délégué un ticket à assigner à un technicien.
+
+{% include text_details %}
+{% if notes %}
+
+Notes du DSI :
+{{ notes }}
+{% endif %}
+
+Veuillez vous connecter à l'application pour assigner ce ticket à un technicien.""",
+        "html": """    <p>Le DSI <strong>{{ dsi_name }}</strong> vous a délégué un ticket à assigner à un technicien.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if notes %}
+    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 3px solid #ffc107;">
+        <p><strong>Notes du DSI :</strong></p>
+        <p>{{ notes }}</p>
+    </div>
+{% endif %}
+{% include html_button %}
+    <p>Veuillez vous connecter à l'application pour assigner ce ticket à un technicien.</p>""",
+    },
+    "ticket_in_progress": {
+        "subject": "Votre ticket {{ number }} est en cours de traitement",
+        "heading": "Ticket en cours de traitement",
+        "text": """Votre ticket est maintenant en cours de traitement par le technicien.
+
+{% include text_details %}
+• Technicien : {{ technician_name }}
+
+Vous serez notifié lorsque le ticket sera résolu.""",
+        "html": """    <p>Votre ticket est maintenant en cours de traitement par le technicien.</p>
+{% include html_details_open %}
+            <li><strong>Technicien :</strong> {{ technician_name }}</li>
+{% include html_details_close %}
+    <p>Vous serez notifié lorsque le ticket sera résolu.</p>
+    <p>
+        Pour suivre l'avancement de votre demande, veuillez vous connecter à l'application en cliquant sur ce lien :
+        {% include html_app_link %}
+    </p>""",
+    },
+    "ticket_resolved": {
+        "subject": "Votre ticket {{ number }} a été résolu - Validation requise",
+        "heading": "Ticket résolu - Validation requise",
+        "button_color": "#28a745",
+        "button_label": "Valider la résolution",
+        "text": """Votre ticket a été résolu. Veuillez valider la résolution.
+
+{% include text_details %}
+{% if resolution_summary %}
+• Résumé de la résolution : {{ resolution_summary }}
+{% endif %}
+
+Merci de valider la résolution dans les 14 jours. Si vous ne validez pas, le ticket sera clôturé automatiquement.""",
+        "html": """    <p>Votre ticket a été résolu. Veuillez valider la résolution.</p>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if resolution_summary %}
+    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Résumé de la résolution :</strong></p>
+        <p>{{ resolution_summary }}</p>
+    </div>
+{% endif %}
+    <p style="color: #856404; background-color: #fff3cd; padding: 10px; border-radius: 5px;">
+        <strong>⚠️ Important :</strong> Merci de valider la résolution dans les 14 jours. Si vous ne validez pas, le ticket sera clôturé automatiquement.
+    </p>
+{% include html_button %}""",
+    },
+    "validation_reminder": {
+        "subject": (
+            "{% if is_last %}Dernier rappel : Veuillez valider votre ticket {{ number }}"
+            "{% else %}{% if is_second %}Second rappel : Validation requise pour votre ticket {{ number }}"
+            "{% else %}{% if is_first %}Rappel : Veuillez valider votre ticket {{ number }}"
+            "{% else %}Rappel : Validation requise pour votre ticket {{ number }}{% endif %}{% endif %}{% endif %}"
+        ),
+        "heading": "Rappel de validation",
+        "button_color": "#28a745",
+        "button_label": "Valider la résolution",
+        "text": """{% include reminder_message %}
+
+{% include text_details %}
+
+Merci de valider la résolution dès que possible.""",
+        "html": """{% if is_last %}
+    <div style="background-color: #f8d7da; border-left: 4px solid #dc3545; padding: 15px; border-radius: 5px; margin: 15px 0;">
+{% else %}
+    <div style="background-color: #fff3cd; border-left: 4px solid #ffc107; padding: 15px; border-radius: 5px; margin: 15px 0;">
+{% endif %}
+        <p><strong>{% include reminder_message %}</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "ticket_auto_closed": {
+        "subject": "Votre ticket {{ number }} a été clôturé automatiquement",
+        "heading": "Ticket clôturé automatiquement",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Votre ticket a été clôturé automatiquement après 14 jours sans validation.
+
+{% include text_details %}
+
+Vous pouvez réouvrir ce ticket dans les 7 prochains jours si le problème persiste. Après cette période, vous devrez créer un nouveau ticket.""",
+        "html": """    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
+        <p><strong>Votre ticket a été clôturé automatiquement après 14 jours sans validation.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>⚠️ Important :</strong> Vous pouvez réouvrir ce ticket dans les <strong>7 prochains jours</strong> si le problème persiste. Après cette période, vous devrez créer un nouveau ticket.</p>
+    </div>
+{% include html_button %}""",
+    },
+    "ticket_rejected_to_user": {
+        "subject": "Votre ticket {{ number }} a été rejeté",
+        "heading": "Ticket rejeté",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Votre ticket a été rejeté.
+
+{% include text_details %}
+{% if rejection_reason %}
+• Raison du rejet : {{ rejection_reason }}
+{% endif %}
+
+Si vous avez des questions, n'hésitez pas à contacter le support.""",
+        "html": """    <div style="background-color: #f8d7da; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #dc3545;">
+        <p><strong>Votre ticket a été rejeté.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+{% if rejection_reason %}
+    <div style="background-color: #fff3cd; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <p><strong>Raison du rejet :</strong></p>
+        <p>{{ rejection_reason }}</p>
+    </div>
+{% endif %}
+    <p>Si vous avez des questions, n'hésitez pas à contacter le support.</p>
+{% include html_button %}""",
+    },
+    "comment_to_user": {
+        "subject": "Nouveau commentaire sur votre ticket {{ number }}",
+        "heading": "Nouveau commentaire",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Un nouveau commentaire a été ajouté sur votre ticket.
+
+{% include text_details %}
+• Commentaire de : {{ commenter_name }}
+
+Commentaire :
+{{ comment_content }}""",
+        "html": """    <p>Un nouveau commentaire a été ajouté sur votre ticket.</p>
+{% include html_details_open %}
+            <li><strong>Commentaire de :</strong> {{ commenter_name }}</li>
+{% include html_details_close %}
+    <div style="background-color: #e7f3ff; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #007bff;">
+        <p><strong>Commentaire :</strong></p>
+        <p>{{ comment_content }}</p>
+    </div>
+{% include html_button %}""",
+    },
+    "priority_changed": {
+        "subject": "Priorité modifiée pour votre ticket {{ number }}",
+        "heading": "Priorité modifiée",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """La priorité de votre ticket a été modifiée.
+
+{% include text_details %}
+• Ancienne priorité : {{ old_priority }}
+• Nouvelle priorité : {{ new_priority }}""",
+        "html": """    <p>La priorité de votre ticket a été modifiée.</p>
+{% include html_details_open %}
+            <li><strong>Ancienne priorité :</strong> {{ old_priority }}</li>
+            <li><strong>Nouvelle priorité :</strong> <strong style="color: #dc3545;">{{ new_priority }}</strong></li>
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "technician_changed": {
+        "subject": "Technicien modifié pour votre ticket {{ number }}",
+        "heading": "Technicien modifié",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Votre ticket a été réassigné à un autre technicien.
+
+{% include text_details %}
+{% if old_technician_name %}
+• Ancien technicien : {{ old_technician_name }}
+{% endif %}
+• Nouveau technicien : {{ new_technician_name }}""",
+        "html": """    <p>Votre ticket a été réassigné à un autre technicien.</p>
+{% include html_details_open %}
+{% if old_technician_name %}
+            <li><strong>Ancien technicien :</strong> {{ old_technician_name }}</li>
+{% endif %}
+            <li><strong>Nouveau technicien :</strong> {{ new_technician_name }}</li>
+{% include html_details_close %}
+{% include html_button %}""",
+    },
+    "ticket_reopened": {
+        "subject": "Votre ticket {{ number }} a été réouvert",
+        "heading": "Ticket réouvert",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Votre ticket a été réouvert pour traitement supplémentaire.
+
+{% include text_details %}
+
+Le ticket sera traité à nouveau par un technicien.""",
+        "html": """    <div style="background-color: #d1ecf1; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #0dcaf0;">
+        <p><strong>Votre ticket a été réouvert pour traitement supplémentaire.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>Le ticket sera traité à nouveau par un technicien.</p>
+{% include html_button %}""",
+    },
+    "ticket_closed_to_user": {
+        "subject": "Votre ticket {{ number }} a été clôturé",
+        "heading": "Ticket clôturé",
+        "button_color": "#007bff",
+        "button_label": "Voir le ticket",
+        "text": """Votre ticket a été clôturé avec succès.
+
+{% include text_details %}
+
+Merci d'avoir utilisé notre service de support.""",
+        "html": """    <div style="background-color: #d4edda; padding: 15px; border-radius: 5px; margin: 15px 0; border-left: 4px solid #28a745;">
+        <p><strong>Votre ticket a été clôturé avec succès.</strong></p>
+    </div>
+{% include html_details_open %}
+{% include html_details_close %}
+    <p>Merci d'avoir utilisé notre service de support.</p>
+{% include html_button %}""",
+    },
+    "notification_digest": {
+        "subject": "Récapitulatif : {{ count }} notification(s) en attente",
+        "heading": "Récapitulatif de vos notifications",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """Voici le récapitulatif de vos notifications depuis le dernier envoi :
+
+{{ items_text|raw }}
+
+Veuillez vous connecter à l'application pour consulter le détail.""",
+        "html": """    <p>Voici le récapitulatif de vos notifications depuis le dernier envoi :</p>
+    <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 15px 0;">
+        <ul>
+{{ items_html|raw }}
+        </ul>
+    </div>
+{% include html_button %}""",
+    },
+    "notification_digest_item": {
+        "layout": False,
+        "text": "• {{ time }} - {{ message }}",
+        "html": """            <li>{{ time }} - {% if action_link %}<a href="{{ action_link }}" style="color:#007bff;">{{ message }}</a>{% else %}{{ message }}{% endif %}</li>""",
+    },
+    "tickets_bulk_assigned": {
+        "subject": "{{ count }} ticket(s) vous ont été assignés",
+        "heading": "Tickets assignés",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """Les tickets suivants vous ont été assignés :
+
+{% include bulk_items_text %}""",
+        "html": """    <p>Les tickets suivants vous ont été assignés :</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_assigned_to_creator": {
+        "subject": "{{ count }} de vos tickets ont été assignés",
+        "heading": "Tickets assignés",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """Les tickets suivants ont été assignés à un technicien :
+
+{% include bulk_items_text %}""",
+        "html": """    <p>Les tickets suivants ont été assignés à un technicien :</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_closed": {
+        "subject": "{{ count }} de vos tickets ont été clôturés",
+        "heading": "Tickets clôturés",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """Les tickets suivants ont été clôturés :
+
+{% include bulk_items_text %}""",
+        "html": """    <p>Les tickets suivants ont été clôturés :</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_reprioritized": {
+        "subject": "Priorité modifiée pour {{ count }} ticket(s)",
+        "heading": "Priorité modifiée",
+        "button_color": "#007bff",
+        "button_label": "Ouvrir l'application",
+        "text": """La priorité des tickets suivants a été modifiée :
+
+{% include bulk_items_text %}""",
+        "html": """    <p>La priorité des tickets suivants a été modifiée :</p>
+{% include bulk_items_html %}""",
+    },
+    "tickets_bulk_item": {
+        "layout": False,
+        "text": "• {{ number }} - {{ title }}{% if priority %} (priorité : {{ priority }}){% endif %}",
+        "html": """            <li><a href="{{ action_link }}" style="color:#007bff;">{{ number }}</a> - {{ title }}{% if priority %} (priorité : {{ priority }}){% endif %}</li>""",
+    },
+}
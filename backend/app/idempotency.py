@@ -0,0 +1,303 @@
+"""
+Clés d'idempotence des mutations de tickets (en-tête Idempotency-Key).
+
+Un client qui renvoie une requête après une coupure réseau ou un délai
+dépassé ne sait pas si la première a abouti : sans protection, un POST /tickets/
+crée un second ticket et un PUT de workflow rejoue l'historique, les
+notifications et les emails. Les POST et PUT sous /tickets envoyés avec un
+en-tête Idempotency-Key sont donc traités une seule fois par utilisateur et
+par clé :
+
+- la première requête réserve la clé (ligne idempotency_keys sans réponse),
+  s'exécute normalement puis sa réponse (statut, type et corps) est mémorisée ;
+- une répétition reçoit la réponse mémorisée, avec l'en-tête
+  Idempotent-Replayed: true, sans exécuter l'endpoint : ni requêtes sur les
+  tickets, ni historique, ni notifications ;
+- une répétition arrivant pendant le traitement de la première reçoit 409,
+  la même clé avec un autre corps ou un autre chemin reçoit 422.
+
+Les réponses 5xx et les exceptions libèrent la clé : la requête pourra être
+réessayée. Une réservation restée sans réponse plus de
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS secondes (processus arrêté en cours de
+traitement) est reprise par la requête suivante. Les clés expirent après
+IDEMPOTENCY_KEY_TTL_HOURS heures et sont supprimées par lots par le scheduler.
+
+Les envois de fichiers (multipart) ne sont pas concernés : leur corps n'est
+pas mis en mémoire.
+"""
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import models
+from .database import SessionLocal
+from .security import decode_token
+
+load_dotenv()
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "5000"))
+# Nombre maximal de lots par exécution du job (le reste est traité à l'exécution suivante)
+IDEMPOTENCY_PURGE_MAX_BATCHES = int(os.getenv("IDEMPOTENCY_PURGE_MAX_BATCHES", "100"))
+
+IDEMPOTENT_METHODS = ("POST", "PUT")
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# UUID, ULID ou toute chaîne ASCII imprimable sans espace
+_KEY_RE = re.compile(r"^[\x21-\x7e]{1,255}$")
+
+
+def request_fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query_string, body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _user_id(authorization: Optional[str]) -> Optional[int]:
+    """Utilisateur du jeton Bearer, None si absent ou invalide (l'endpoint répondra 401)"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token)["sub"]
+    except HTTPException:
+        return None
+
+
+def reserve_key(db: Session, user_id: int, key: str, request_hash: str, now: datetime):
+    """
+    Réserve la clé pour cette requête. Renvoie None si la requête doit être
+    exécutée, sinon la ligne existante (request_hash, status_code,
+    content_type, response_body) : réponse à rejouer ou requête en cours.
+    """
+    table = models.IdempotencyKey.__table__
+    values = {
+        "request_hash": request_hash,
+        "status_code": None,
+        "content_type": None,
+        "response_body": None,
+        "created_at": now,
+        "expires_at": now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS),
+    }
+    reserved = db.execute(
+        insert(table)
+        .values(user_id=user_id, key=key, **values)
+        .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        .returning(table.c.key)
+    ).first()
+    if reserved is not None:
+        db.commit()
+        return None
+
+    existing = db.execute(
+        select(table.c.request_hash, table.c.status_code, table.c.content_type,
+               table.c.response_body, table.c.created_at, table.c.expires_at)
+        .where(table.c.user_id == user_id, table.c.key == key)
+        .with_for_update()
+    ).first()
+    stale_before = now - timedelta(seconds=IDEMPOTENCY_PENDING_TIMEOUT_SECONDS)
+    if (
+        existing is None
+        or existing.expires_at <= now
+        or (existing.status_code is None and existing.created_at < stale_before)
+    ):
+        # Clé expirée (pas encore purgée), réservation abandonnée ou purgée entre-temps
+        if existing is None:
+            db.execute(insert(table).values(user_id=user_id, key=key, **values).on_conflict_do_nothing())
+        else:
+            db.execute(update(table).where(table.c.user_id == user_id, table.c.key == key).values(**values))
+        db.commit()
+        return None
+
+    db.commit()
+    return existing
+
+
+def store_response(db: Session, user_id: int, key: str, status_code: int,
+                   content_type: Optional[str], body: bytes) -> None:
+    table = models.IdempotencyKey.__table__
+    db.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.key == key)
+        .values(status_code=status_code, content_type=content_type, response_body=body)
+    )
+    db.commit()
+
+
+def release_key(db: Session, user_id: int, key: str) -> None:
+    """Supprime une réservation sans réponse (erreur serveur) : la requête pourra être réessayée"""
+    table = models.IdempotencyKey.__table__
+    db.execute(
+        delete(table).where(table.c.user_id == user_id, table.c.key == key, table.c.status_code.is_(None))
+    )
+    db.commit()
+
+
+def _run(function, *args):
+    db = SessionLocal()
+    try:
+        return function(db, *args)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class IdempotencyMiddleware:
+    """
+    Applique l'en-tête Idempotency-Key aux POST et PUT sous `path_prefix`.
+    Placé sous CORSMiddleware (les réponses rejouées gardent leurs en-têtes CORS)
+    et sous CompressionMiddleware (les corps mémorisés ne sont pas compressés).
+    """
+
+    def __init__(self, app: ASGIApp, path_prefix: str = "/tickets") -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+
+    def _applies(self, scope: Scope, headers: Headers) -> bool:
+        if scope["method"] not in IDEMPOTENT_METHODS:
+            return False
+        path = scope["path"]
+        if path != self.path_prefix and not path.startswith(self.path_prefix + "/"):
+            return False
+        if "idempotency-key" not in headers:
+            return False
+        return not headers.get("content-type", "").startswith("multipart/")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # lifespan et websocket : pas d'en-têtes HTTP
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not self._applies(scope, headers):
+            await self.app(scope, receive, send)
+            return
+
+        key = headers["idempotency-key"]
+        if not _KEY_RE.match(key):
+            response = ORJSONResponse(
+                {"detail": "Invalid Idempotency-Key header"}, status_code=status.HTTP_400_BAD_REQUEST
+            )
+            await response(scope, receive, send)
+            return
+
+        # decode_token peut resynchroniser la liste de révocation (requête SQL) : hors de la boucle
+        user_id = await run_in_threadpool(_user_id, headers.get("authorization"))
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        request_hash = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        existing = await run_in_threadpool(_run, reserve_key, user_id, key, request_hash, datetime.utcnow())
+        if existing is not None:
+            await self._existing_response(existing, request_hash)(scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response_start: Optional[Message] = None
+        chunks = []
+        stored = False
+
+        async def capture_send(message: Message) -> None:
+            nonlocal response_start, stored
+            if message["type"] == "http.response.start":
+                response_start = message
+            elif message["type"] == "http.response.body" and response_start is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and response_start["status"] < 500:
+                    content_type = Headers(raw=response_start["headers"]).get("content-type")
+                    await run_in_threadpool(
+                        _run, store_response, user_id, key, response_start["status"], content_type, b"".join(chunks)
+                    )
+                    stored = True
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if not stored:
+                await run_in_threadpool(_run, release_key, user_id, key)
+
+    @staticmethod
+    def _existing_response(existing, request_hash: str) -> Response:
+        if existing.request_hash != request_hash:
+            return ORJSONResponse(
+                {"detail": "Idempotency-Key already used with a different request"},
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            )
+        if existing.status_code is None:
+            return ORJSONResponse(
+                {"detail": "A request with this Idempotency-Key is still being processed"},
+                status_code=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": "1"},
+            )
+        return Response(
+            content=existing.response_body,
+            status_code=existing.status_code,
+            headers={REPLAYED_HEADER: "true"},
+            media_type=existing.content_type,
+        )
+
+
+# ----- Purge des clés expirées -----
+
+def purge_batch(db: Session, now: datetime, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE) -> int:
+    """Supprime un lot de clés expirées"""
+    table = models.IdempotencyKey.__table__
+    batch = (
+        select(table.c.user_id, table.c.key)
+        .where(table.c.expires_at < now)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = db.execute(delete(table).where(tuple_(table.c.user_id, table.c.key).in_(batch)))
+    db.commit()
+    return result.rowcount
+
+
+def purge_expired_keys(db: Session, now: Optional[datetime] = None) -> int:
+    """Supprime par lots les clés d'idempotence expirées"""
+    now = now or datetime.utcnow()
+    total = 0
+    for _ in range(IDEMPOTENCY_PURGE_MAX_BATCHES):
+        count = purge_batch(db, now)
+        total += count
+        if count < IDEMPOTENCY_PURGE_BATCH_SIZE:
+            break
+    return total
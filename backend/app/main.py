@@ -1,14 +1,61 @@
+"""
+Application FastAPI.
+
+L'import du module n'a pas d'effet de bord (ni thread, ni connexion) : le
+scheduler, le thread d'écoute des journaux et l'arrêt du backend d'emails sont
+gérés par le lifespan, c'est-à-dire au démarrage et à l'arrêt du serveur. Un
+test, un script ou un worker peut donc importer app.main sans rien démarrer.
+Les connexions à la base sont ouvertes par le pool à la première requête.
+"""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from fastapi.responses import ORJSONResponse
+
+from .routers import auth, tickets, users, notifications, settings, ticket_config, attachments, reports, diagnostics, metrics
+from .scheduler import SCHEDULER_ENABLED, create_scheduler, shutdown_scheduler
+from .database import engine
+from .attachment_storage import AttachmentUploadLimitMiddleware
+from .metrics import MetricsMiddleware, instrument_engine_pool
+from .profiler import ProfilerMiddleware
+from .query_metrics import QueryMetricsMiddleware
+from .responses import CompressionMiddleware
+from .email_service import email_service
+from .idempotency import IdempotencyMiddleware
+from .structured_logging import RequestIdMiddleware, setup_logging
+
 
-from .routers import auth, tickets, users, notifications, settings, ticket_config
-from .scheduler import run_scheduled_tasks
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Journaux JSON écrits par un thread d'écoute (voir app.structured_logging)
+    setup_logging()
+
+    # Tâches planifiées : seulement dans le processus désigné (voir app.scheduler)
+    scheduler = None
+    if SCHEDULER_ENABLED:
+        scheduler = create_scheduler()
+        scheduler.start()
+    try:
+        yield
+    finally:
+        if scheduler is not None:
+            shutdown_scheduler(scheduler)
+        # Backend d'envoi async : vider la file et fermer les connexions SMTP à l'arrêt
+        email_service.async_backend.close()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Système de gestion des tickets")
+    # orjson comme sérialiseur JSON par défaut (plus rapide que json de la stdlib)
+    app = FastAPI(
+        title="Système de gestion des tickets",
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
+
+    # Idempotency-Key des POST/PUT sous /tickets : middleware le plus interne (réponses non compressées,
+    # réponses rejouées avec leurs en-têtes CORS)
+    app.add_middleware(IdempotencyMiddleware, path_prefix="/tickets")
 
     # Configuration CORS pour permettre les requêtes depuis le frontend
     app.add_middleware(
@@ -25,25 +72,36 @@ def create_app() -> FastAPI:
         expose_headers=["*"],
     )
 
+    # Taille des uploads de pièces jointes : 413 avant la réception complète du corps
+    app.add_middleware(AttachmentUploadLimitMiddleware)
+
+    # Profileur à la demande (/diagnostics/profiler) : sous QueryMetricsMiddleware pour lire le temps SQL
+    app.add_middleware(ProfilerMiddleware)
+
+    # Requêtes SQL par requête HTTP : en-tête Server-Timing, détection des N+1
+    app.add_middleware(QueryMetricsMiddleware)
+
+    # Métriques Prometheus (/metrics) : latence HTTP par route, pool de connexions
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine_pool(engine)
+
+    # Compression brotli/gzip des réponses au-delà de COMPRESSION_MINIMUM_SIZE octets
+    app.add_middleware(CompressionMiddleware)
+
+    # Identifiant de corrélation (X-Request-ID) des journaux : middleware le plus externe
+    app.add_middleware(RequestIdMiddleware)
+
     # Routers principaux
     app.include_router(auth.router, prefix="/auth", tags=["auth"])
     app.include_router(tickets.router, prefix="/tickets", tags=["tickets"])
+    app.include_router(attachments.router, prefix="/tickets", tags=["attachments"])
     app.include_router(users.router, prefix="/users", tags=["users"])
     app.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
     app.include_router(settings.router, tags=["settings"])
     app.include_router(ticket_config.router)
-
-    # Configurer le scheduler pour exécuter les tâches planifiées
-    scheduler = BackgroundScheduler()
-    # Exécuter toutes les heures
-    scheduler.add_job(
-        run_scheduled_tasks,
-        trigger=CronTrigger(minute=0),  # Toutes les heures à la minute 0
-        id='run_scheduled_tasks',
-        name='Exécuter les tâches planifiées (rappels et clôtures)',
-        replace_existing=True
-    )
-    scheduler.start()
+    app.include_router(reports.router)
+    app.include_router(diagnostics.router)
+    app.include_router(metrics.router)
 
     return app
 
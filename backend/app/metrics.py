@@ -0,0 +1,326 @@
+"""
+Métriques d'exploitation au format texte Prometheus (servies sur /metrics).
+
+- HTTP : latence des requêtes par route (histogramme) ;
+- base de données : connexions du pool du moteur (utilisées, en débordement, taille) ;
+- tâches planifiées : durée, lignes traitées et échecs par tâche ;
+- emails : latence d'envoi et nombre d'envois par issue (envoyé, échec).
+
+Registre minimal sans dépendance (compteurs, jauges, histogrammes avec labels).
+Les valeurs sont propres au processus : avec plusieurs workers, chacun expose
+les siennes (Prometheus les distingue par instance).
+"""
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .structured_logging import log_context, new_request_id
+
+# Bornes (secondes) par défaut des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} attend les labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        """Copie des séries sous le verrou : une requête peut en créer une pendant l'export"""
+        with self._lock:
+            return list(self._children.items())
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        """[(suffixe du nom, labels formatés, valeur)]"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self):
+        return [("_total", _format_labels(self.labelnames, key), child.value) for key, child in self._items()]
+
+
+class Gauge(_Metric):
+    """Jauge : valeur posée par set(), ou lue à chaque export (callback de set_function)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                return [("", "", float(self._function()))]
+            except Exception:
+                return []
+        return [("", _format_labels(self.labelnames, key), child.value) for key, child in self._items()]
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case : au-delà de la plus grande borne
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self):
+        samples = []
+        for key, child in self._items():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(upper),))
+                samples.append(("_bucket", labels, cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Export au format texte Prometheus (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ----- HTTP -----
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP par route",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge("http_requests_in_progress", "Requêtes HTTP en cours de traitement")
+
+# ----- Base de données -----
+
+DB_POOL_SIZE = registry.gauge("db_pool_size", "Taille du pool de connexions")
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Connexions du pool en cours d'utilisation")
+DB_POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Connexions ouvertes au-delà de la taille du pool")
+
+# ----- Tâches planifiées -----
+
+SCHEDULER_JOB_DURATION = registry.histogram(
+    "scheduler_job_duration_seconds",
+    "Durée d'exécution des tâches planifiées",
+    ("job",),
+    buckets=(0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+SCHEDULER_JOB_ROWS = registry.counter("scheduler_job_rows", "Lignes traitées par les tâches planifiées", ("job",))
+SCHEDULER_JOB_FAILURES = registry.counter("scheduler_job_failures", "Exécutions en échec des tâches planifiées", ("job",))
+
+# ----- Emails -----
+
+EMAIL_SEND_DURATION = registry.histogram(
+    "email_send_duration_seconds",
+    "Durée d'envoi d'un email (connexion SMTP comprise)",
+    ("backend",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+EMAILS_SENT = registry.counter("emails_sent", "Emails par issue de l'envoi (sent, failed)", ("backend", "outcome"))
+
+
+def instrument_engine_pool(engine) -> None:
+    """Jauges du pool de connexions du moteur (lues à chaque export)"""
+    pool = engine.pool
+    if not all(hasattr(pool, attribute) for attribute in ("size", "checkedout", "overflow")):
+        return  # Pool sans file d'attente (ex. StaticPool, NullPool)
+    DB_POOL_SIZE.set_function(pool.size)
+    DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+    DB_POOL_OVERFLOW.set_function(lambda: max(pool.overflow(), 0))
+
+
+def observe_job(name: str):
+    """
+    Décorateur des tâches planifiées : mesure leur durée, et ajoute aux lignes traitées
+    le nombre renvoyé par la tâche (les échecs sont comptés par scheduler._scheduled_job).
+    Chaque exécution a son propre request_id dans les journaux (champ job = nom de la tâche)
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with log_context(request_id=new_request_id(), job=name):
+                    rows = function(*args, **kwargs)
+            finally:
+                SCHEDULER_JOB_DURATION.labels(name).observe(time.perf_counter() - start)
+            if rows:
+                SCHEDULER_JOB_ROWS.labels(name).inc(rows)
+            return rows
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """Latence des requêtes HTTP par route, jusqu'à l'envoi du dernier octet de la réponse"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        recorded = False
+
+        def record() -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            # Gabarit de la route ("/tickets/{ticket_id}") : nombre de séries borné
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, status_code).observe(time.perf_counter() - start)
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        HTTP_REQUESTS_IN_PROGRESS.labels().inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.labels().inc(-1)
+            record()
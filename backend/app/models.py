@@ -6,9 +6,12 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -43,6 +46,8 @@ class User(Base):
     notes = Column(Text, nullable=True)  # Notes optionnelles
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login_at = Column(DateTime, nullable=True)
+    # Incrémenté à chaque révocation des jetons (désactivation, reset du mot de passe, déconnexion)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     username = Column(String(100), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
@@ -110,12 +115,21 @@ class Ticket(Base):
     feedback_score = Column(Integer, nullable=True)
     feedback_comment = Column(Text, nullable=True)
 
+    # Verrouillage optimiste : chaque UPDATE vérifie et incrémente la version (voir app.ticket_workflow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     creator = relationship("User", foreign_keys=[creator_id], back_populates="created_tickets")
     technician = relationship("User", foreign_keys=[technician_id], back_populates="assigned_tickets")
 
     comments = relationship("Comment", back_populates="ticket", cascade="all, delete-orphan")
     history = relationship("TicketHistory", back_populates="ticket", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Parcours de l'archivage (tickets clôturés les plus anciens)
+        Index("ix_tickets_cloture_closed_at", "closed_at", postgresql_where=(status == TicketStatus.CLOTURE)),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 
 class CommentType(str, PyEnum):
     TECHNIQUE = "technique"
@@ -154,6 +168,96 @@ class TicketHistory(Base):
     user = relationship("User")
 
 
+# Tables d'archive partitionnées par année de clôture du ticket (voir app.ticket_archive)
+_ARCHIVE_PARTITIONING = {"postgresql_partition_by": "RANGE (ticket_closed_at)"}
+
+
+class TicketArchive(Base):
+    """
+    Ticket clôturé archivé (mêmes colonnes que tickets, sans clés étrangères).
+    Clé primaire (id, ticket_closed_at) : la clé de partition doit en faire partie.
+    """
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Identifiant d'origine
+    ticket_closed_at = Column(DateTime, primary_key=True)  # Copie de closed_at : clé de partition
+    number = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=False)
+    type = Column(Enum(TicketType), nullable=False)
+    priority = Column(Enum(TicketPriority), nullable=False)
+    status = Column(Enum(TicketStatus), nullable=False)
+    category = Column(String(100), nullable=True)
+    creator_id = Column(Integer, nullable=False)
+    technician_id = Column(Integer, nullable=True)
+    secretary_id = Column(Integer, nullable=True)
+    user_agency = Column(String(100), nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    assigned_at = Column(DateTime, nullable=True)
+    resolved_at = Column(DateTime, nullable=True)
+    closed_at = Column(DateTime, nullable=True)
+    auto_closed_at = Column(DateTime, nullable=True)
+    attachments = Column(JSONB, nullable=True)
+    feedback_score = Column(Integer, nullable=True)
+    feedback_comment = Column(Text, nullable=True)
+    version = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+    creator = relationship("User", primaryjoin="foreign(TicketArchive.creator_id) == User.id", viewonly=True)
+    technician = relationship("User", primaryjoin="foreign(TicketArchive.technician_id) == User.id", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_tickets_archive_id", "id"),
+        Index("ix_tickets_archive_number", "number"),
+        Index("ix_tickets_archive_creator", "creator_id"),
+        Index("ix_tickets_archive_technician", "technician_id"),
+        _ARCHIVE_PARTITIONING,
+    )
+
+
+class CommentArchive(Base):
+    """Commentaire d'un ticket archivé"""
+    __tablename__ = "comments_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_closed_at = Column(DateTime, primary_key=True)
+    ticket_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    type = Column(Enum(CommentType), nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    attachments = Column(JSONB, nullable=True)
+
+    user = relationship("User", primaryjoin="foreign(CommentArchive.user_id) == User.id", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_comments_archive_ticket", "ticket_id", "created_at"),
+        _ARCHIVE_PARTITIONING,
+    )
+
+
+class TicketHistoryArchive(Base):
+    """Historique d'un ticket archivé"""
+    __tablename__ = "ticket_history_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_closed_at = Column(DateTime, primary_key=True)
+    ticket_id = Column(Integer, nullable=False)
+    old_status = Column(Enum(TicketStatus), nullable=True)
+    new_status = Column(Enum(TicketStatus), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    reason = Column(Text, nullable=True)
+    changed_at = Column(DateTime, nullable=True)
+
+    user = relationship("User", primaryjoin="foreign(TicketHistoryArchive.user_id) == User.id", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_ticket_history_archive_ticket", "ticket_id", "changed_at"),
+        _ARCHIVE_PARTITIONING,
+    )
+
+
 class TicketTypeModel(Base):
     """
     Table de configuration pour les types de tickets.
@@ -234,12 +338,174 @@ class Notification(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     type = Column(Enum(NotificationType), nullable=False)
-    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=True)
+    # Sans clé étrangère : le ticket peut avoir été archivé (voir app.ticket_archive)
+    ticket_id = Column(Integer, nullable=True)
     message = Column(Text, nullable=False)
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     read_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # Liste des notifications d'un utilisateur (ORDER BY created_at DESC)
+        Index("ix_notifications_user_created", "user_id", "created_at"),
+        # Parcours de la rétention (notifications lues les plus anciennes)
+        Index("ix_notifications_read_created", "created_at", postgresql_where=(read == True)),
+    )
+
+
+class NotificationArchive(Base):
+    """
+    Notifications lues archivées par la rétention (voir app.notification_retention).
+    Table compacte sans clés étrangères : elle peut être purgée indépendamment.
+    """
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Identifiant d'origine
+    user_id = Column(Integer, nullable=False)
+    type = Column(Enum(NotificationType), nullable=False)
+    ticket_id = Column(Integer, nullable=True)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    read_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notifications_archive_user_created", "user_id", "created_at"),
+        Index("ix_notifications_archive_created", "created_at"),
+    )
+
+
+class NotificationCounter(Base):
+    """Compteur dénormalisé des notifications non lues (voir app.notification_counters)"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TimerKind(str, PyEnum):
+    SLA_ASSIGNATION = "sla_assignation"  # Délai d'assignation dépassé (selon la priorité)
+    SLA_RESOLUTION = "sla_resolution"  # Délai de résolution dépassé (selon la priorité)
+    RAPPEL_VALIDATION_1 = "rappel_validation_1"
+    RAPPEL_VALIDATION_2 = "rappel_validation_2"
+    RAPPEL_VALIDATION_3 = "rappel_validation_3"
+    CLOTURE_AUTOMATIQUE = "clôture_automatique"
+
+
+class TicketTimer(Base):
+    """
+    Échéance à venir d'un ticket (voir app.sla_timers). Une ligne par ticket et par
+    type d'échéance, armée ou annulée à chaque changement de statut ou de priorité.
+    """
+    __tablename__ = "ticket_timers"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(Enum(TimerKind), nullable=False)
+    armed_at = Column(DateTime, nullable=False)  # Point de départ du délai
+    due_at = Column(DateTime, nullable=False)
+    fired_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ticket_id", "kind"),
+        # Échéances en attente, les plus proches d'abord
+        Index("ix_ticket_timers_pending_due", "due_at", postgresql_where=(fired_at.is_(None))),
+    )
+
+
+class TicketSignature(Base):
+    """Signature MinHash du texte d'un ticket (voir app.similarity_index)"""
+    __tablename__ = "ticket_signatures"
+
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(JSONB, nullable=False)  # Liste de SIMILARITY_NUM_PERM entiers
+    # Index : les autres processus récupèrent les signatures modifiées depuis leur dernière synchronisation
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+
+class EmailDeliveryMode(str, PyEnum):
+    IMMEDIAT = "immediat"  # Un email par notification
+    DIGEST = "digest"  # Emails regroupés en un récapitulatif périodique
+
+
+class NotificationPreference(Base):
+    """
+    Mode d'envoi des emails d'un utilisateur. notification_type NULL : préférence
+    par défaut de l'utilisateur pour tous les types ; une ligne par type la surcharge.
+    """
+    __tablename__ = "notification_preferences"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    notification_type = Column(Enum(NotificationType), nullable=True)
+    email_mode = Column(Enum(EmailDeliveryMode), nullable=False, default=EmailDeliveryMode.IMMEDIAT)
+    digest_window_minutes = Column(Integer, nullable=False, default=60)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "notification_type"),
+        # PostgreSQL considère les NULL comme distincts : une seule préférence par défaut
+        # (notification_type NULL) par utilisateur est garantie par un index partiel
+        Index(
+            "uq_notification_preferences_user_default", "user_id",
+            unique=True, postgresql_where=(notification_type.is_(None)),
+        ),
+    )
+
+
+class EmailDigestItem(Base):
+    """Email en attente d'envoi dans le prochain récapitulatif de l'utilisateur"""
+    __tablename__ = "email_digest_items"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    notification_type = Column(Enum(NotificationType), nullable=False)
+    ticket_id = Column(Integer, ForeignKey("tickets.id"), nullable=True)
+    message = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    due_at = Column(DateTime, nullable=False, index=True)  # Fin de la fenêtre de regroupement
+
+
+class UsedRefreshToken(Base):
+    """
+    Jeton de rafraîchissement déjà échangé (jti), conservé jusqu'à son expiration :
+    un jeton de rafraîchissement n'est utilisable qu'une fois (voir app.security)
+    """
+    __tablename__ = "used_refresh_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class IdempotencyKey(Base):
+    """
+    Réponse mémorisée d'une mutation envoyée avec un en-tête Idempotency-Key
+    (voir app.idempotency). status_code NULL : requête en cours de traitement.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 de la méthode, du chemin et du corps
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class AttachmentDeletion(Base):
+    """
+    Fichier de pièce jointe à supprimer du stockage, s'il n'est plus référencé
+    (voir app.attachment_storage.collect_deleted_attachments)
+    """
+    __tablename__ = "attachment_deletions"
+
+    sha256 = Column(String(64), primary_key=True)
+    requested_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 
 class Report(Base):
     __tablename__ = "reports"
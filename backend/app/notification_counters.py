@@ -0,0 +1,141 @@
+"""
+Compteur dénormalisé des notifications non lues (table notification_counters).
+
+Le badge du tableau de bord interroge /notifications/unread/count toutes les
+30 secondes : le compteur évite un COUNT(*) sur la table notifications, qui ne
+fait que grandir, au profit d'une lecture par clé primaire.
+
+Le compteur est tenu à jour dans la même transaction que la modification :
+- automatiquement pour les notifications ajoutées, supprimées ou marquées lues
+  via la session ORM (écouteur after_flush ci-dessous) ;
+- explicitement via apply_unread_deltas pour les UPDATE/DELETE en masse
+  (query.update(), query.delete()), qui ne passent pas par le flush. On applique
+  toujours un delta plutôt qu'une valeur absolue, pour ne pas écraser les
+  incréments des transactions concurrentes.
+
+reconcile_unread_counters (job du scheduler) corrige les écarts éventuels.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    """Nombre de notifications non lues de l'utilisateur (lecture par clé primaire)"""
+    counter = db.get(models.NotificationCounter, user_id)
+    return counter.unread_count if counter else 0
+
+
+def apply_unread_deltas(db: Union[Session, Connection], deltas: Dict[int, int]) -> None:
+    """Ajoute deltas[user_id] au compteur de chaque utilisateur (dans la transaction en cours)"""
+    table = models.NotificationCounter.__table__
+    for user_id, delta in deltas.items():
+        if not delta:
+            continue
+        statement = insert(table).values(user_id=user_id, unread_count=max(delta, 0))
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                "unread_count": func.greatest(table.c.unread_count + delta, 0),
+                "updated_at": datetime.utcnow(),
+            },
+        )
+        db.execute(statement)
+
+
+def unread_counts_for_ticket(db: Session, ticket_id: int) -> Dict[int, int]:
+    """Non lues par utilisateur pour un ticket (à soustraire avant un DELETE en masse)"""
+    rows = (
+        db.query(models.Notification.user_id, func.count(models.Notification.id))
+        .filter(
+            models.Notification.ticket_id == ticket_id,
+            models.Notification.read == False,
+        )
+        .group_by(models.Notification.user_id)
+        .all()
+    )
+    return {user_id: count for user_id, count in rows}
+
+
+def _is_unread(read: Optional[bool]) -> bool:
+    # read vaut None avant l'INSERT quand la valeur par défaut (False) n'a pas été fixée
+    return not read
+
+
+@event.listens_for(Session, "after_flush")
+def _track_unread_changes(session: Session, flush_context) -> None:
+    """Reporte sur les compteurs les notifications ajoutées, supprimées ou (dé)marquées lues"""
+    deltas: Dict[int, int] = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, models.Notification) and _is_unread(obj.read):
+            deltas[obj.user_id] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, models.Notification) and _is_unread(obj.read):
+            deltas[obj.user_id] -= 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, models.Notification):
+            continue
+        history = inspect(obj).attrs.read.history
+        if not history.has_changes():
+            continue
+        was_unread = _is_unread(history.deleted[0]) if history.deleted else True
+        is_unread = _is_unread(obj.read)
+        if was_unread != is_unread:
+            deltas[obj.user_id] += 1 if is_unread else -1
+
+    if any(deltas.values()):
+        # Pendant le flush, passer par la connexion de la session (même transaction)
+        apply_unread_deltas(session.connection(), deltas)
+
+
+def reconcile_unread_counters(db: Session) -> int:
+    """
+    Recalcule les compteurs qui divergent du nombre réel de notifications non lues.
+    Renvoie le nombre de compteurs corrigés.
+    """
+    actual = dict(
+        db.query(models.Notification.user_id, func.count(models.Notification.id))
+        .filter(models.Notification.read == False)
+        .group_by(models.Notification.user_id)
+        .all()
+    )
+    stored = dict(
+        db.query(models.NotificationCounter.user_id, models.NotificationCounter.unread_count).all()
+    )
+
+    drifted = [
+        user_id
+        for user_id in set(actual) | set(stored)
+        if actual.get(user_id, 0) != stored.get(user_id, 0)
+    ]
+    if not drifted:
+        return 0
+
+    table = models.NotificationCounter.__table__
+    notifications = models.Notification.__table__
+    for user_id in drifted:
+        # Recalcul dans l'instruction elle-même : pas d'écrasement d'une insertion concurrente
+        recount = (
+            select(func.count())
+            .select_from(notifications)
+            .where(notifications.c.user_id == user_id, notifications.c.read == False)
+            .scalar_subquery()
+        )
+        statement = insert(table).values(user_id=user_id, unread_count=recount)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"unread_count": statement.excluded.unread_count, "updated_at": datetime.utcnow()},
+        )
+        db.execute(statement)
+    db.commit()
+    return len(drifted)
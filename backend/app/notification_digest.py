@@ -0,0 +1,231 @@
+"""
+Mode récapitulatif (digest) des emails de notification.
+
+Un utilisateur peut choisir, globalement ou par type de notification, de ne plus
+recevoir un email par événement : les emails sont alors mis en attente dans
+email_digest_items et regroupés en un seul récapitulatif à la fin de la fenêtre
+configurée (voir send_due_digests, exécuté chaque minute par le scheduler).
+
+Les tickets de priorité CRITIQUE ne passent jamais par le récapitulatif.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDelivery(NamedTuple):
+    """Destinataire et contexte d'un email de notification"""
+    user_id: int
+    notification_type: models.NotificationType
+    ticket_id: Optional[int]
+    message: str
+    priority: Optional[models.TicketPriority] = None
+
+    @classmethod
+    def for_notification(
+        cls,
+        notification: models.Notification,
+        priority: Optional[models.TicketPriority] = None,
+    ) -> "EmailDelivery":
+        """À appeler avant le commit (les attributs de la notification sont encore chargés)"""
+        return cls(notification.user_id, notification.type, notification.ticket_id, notification.message, priority)
+
+
+def get_digest_windows(
+    db: Session,
+    user_ids: Iterable[int],
+    notification_type: models.NotificationType,
+) -> Dict[int, int]:
+    """
+    Renvoie {user_id: fenêtre en minutes} pour les utilisateurs en mode récapitulatif
+    pour ce type. La préférence du type prime sur la préférence par défaut (type NULL).
+    """
+    ids = set(user_ids)
+    if not ids:
+        return {}
+
+    preferences = (
+        db.query(models.NotificationPreference)
+        .filter(
+            models.NotificationPreference.user_id.in_(ids),
+            (models.NotificationPreference.notification_type == notification_type)
+            | (models.NotificationPreference.notification_type.is_(None)),
+        )
+        .all()
+    )
+
+    resolved: Dict[int, models.NotificationPreference] = {}
+    for preference in preferences:
+        current = resolved.get(preference.user_id)
+        if current is None or current.notification_type is None:
+            resolved[preference.user_id] = preference
+
+    return {
+        user_id: preference.digest_window_minutes
+        for user_id, preference in resolved.items()
+        if preference.email_mode == models.EmailDeliveryMode.DIGEST
+    }
+
+
+def _sent_immediately(delivery: EmailDelivery) -> bool:
+    return delivery.priority == models.TicketPriority.CRITIQUE
+
+
+def queue_for_digest(db: Session, deliveries: List[EmailDelivery]) -> set:
+    """
+    Met en attente les emails des destinataires en mode récapitulatif.
+    Renvoie les identifiants des utilisateurs dont l'email a été mis en attente.
+    """
+    by_type: Dict[models.NotificationType, List[EmailDelivery]] = defaultdict(list)
+    for delivery in deliveries:
+        if _sent_immediately(delivery):
+            continue  # Envoi immédiat
+        by_type[delivery.notification_type].append(delivery)
+
+    now = datetime.utcnow()
+    queued = set()
+    for notification_type, items in by_type.items():
+        windows = get_digest_windows(db, (d.user_id for d in items), notification_type)
+        for delivery in items:
+            window = windows.get(delivery.user_id)
+            if window is None:
+                continue
+            db.add(models.EmailDigestItem(
+                user_id=delivery.user_id,
+                notification_type=notification_type,
+                ticket_id=delivery.ticket_id,
+                message=delivery.message,
+                created_at=now,
+                due_at=now + timedelta(minutes=window),
+            ))
+            queued.add(delivery.user_id)
+
+    if queued:
+        db.commit()
+    return queued
+
+
+def _queue(deliveries: List[EmailDelivery]) -> set:
+    db: Session = SessionLocal()
+    try:
+        return queue_for_digest(db, deliveries)
+    except Exception:
+        # En cas d'erreur, l'email est envoyé immédiatement plutôt que perdu
+        logger.exception("Erreur lors de la mise en attente du récapitulatif")
+        db.rollback()
+        return set()
+    finally:
+        db.close()
+
+
+def deliver_email(delivery: EmailDelivery, send: Callable[..., bool], **kwargs: Any) -> bool:
+    """
+    Tâche d'arrière-plan : envoie l'email immédiatement (send(**kwargs)) ou le met
+    en attente du récapitulatif selon les préférences du destinataire.
+    """
+    if _queue([delivery]):
+        return True
+    return send(**kwargs)
+
+
+def deliver_many(
+    deliveries: List[EmailDelivery],
+    recipients: List[Any],
+    send_many: Callable[..., Any],
+    **kwargs: Any,
+) -> Any:
+    """
+    Variante groupée de deliver_email : deliveries[i] décrit recipients[i].
+    Les destinataires qui ne sont pas en mode récapitulatif reçoivent l'email
+    via un seul appel send_many(recipients=..., **kwargs).
+    """
+    queued = _queue(deliveries)
+    remaining = [r for d, r in zip(deliveries, recipients) if d.user_id not in queued]
+    if not remaining:
+        return 0
+    return send_many(recipients=remaining, **kwargs)
+
+
+def deliver_ticket_summary(
+    deliveries: List[EmailDelivery],
+    tickets: List[Any],
+    send_summary: Callable[..., Any],
+    **kwargs: Any,
+) -> Any:
+    """
+    Variante de deliver_email pour un email récapitulant plusieurs tickets adressé à
+    un seul destinataire : deliveries[i] décrit tickets[i]. Les tickets mis en attente
+    du récapitulatif sont retirés de l'email ; les autres (dont les CRITIQUE) sont
+    envoyés via un seul appel send_summary(tickets=..., **kwargs).
+    """
+    queued = _queue(deliveries)
+    remaining = [t for d, t in zip(deliveries, tickets) if d.user_id not in queued or _sent_immediately(d)]
+    if not remaining:
+        return True
+    return send_summary(tickets=remaining, **kwargs)
+
+
+def send_due_digests(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Envoie un récapitulatif à chaque utilisateur dont au moins un email en attente
+    a atteint la fin de sa fenêtre. Tous ses emails en attente y sont regroupés.
+    Renvoie le nombre de récapitulatifs envoyés.
+    """
+    now = now or datetime.utcnow()
+    due_user_ids = [
+        row[0]
+        for row in (
+            db.query(models.EmailDigestItem.user_id)
+            .filter(models.EmailDigestItem.due_at <= now)
+            .distinct()
+            .all()
+        )
+    ]
+    if not due_user_ids:
+        return 0
+
+    items = (
+        db.query(models.EmailDigestItem)
+        .filter(models.EmailDigestItem.user_id.in_(due_user_ids))
+        .order_by(models.EmailDigestItem.user_id, models.EmailDigestItem.created_at)
+        .all()
+    )
+    users = {
+        user.id: user
+        for user in db.query(models.User).filter(models.User.id.in_(due_user_ids)).all()
+    }
+
+    grouped: Dict[int, List[models.EmailDigestItem]] = defaultdict(list)
+    for item in items:
+        grouped[item.user_id].append(item)
+
+    sent = 0
+    for user_id, user_items in grouped.items():
+        user = users.get(user_id)
+        if user and user.actif and user.email and user.email.strip():
+            entries = [
+                {
+                    "created_at": item.created_at,
+                    "message": item.message,
+                    "ticket_id": item.ticket_id,
+                }
+                for item in user_items
+            ]
+            if email_service.send_notification_digest(user.email, user.full_name, entries):
+                sent += 1
+
+    # Les éléments sont supprimés même si l'envoi échoue (pas de relance, comme les envois immédiats)
+    db.query(models.EmailDigestItem).filter(
+        models.EmailDigestItem.id.in_([item.id for item in items])
+    ).delete(synchronize_session=False)
+    db.commit()
+    return sent
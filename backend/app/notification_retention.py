@@ -0,0 +1,97 @@
+"""
+Rétention des notifications.
+
+La table notifications reçoit plusieurs lignes par événement de ticket et n'était
+jamais purgée. Les notifications lues depuis plus de NOTIFICATION_RETENTION_DAYS
+jours sont déplacées vers notifications_archive (table compacte, sans clés
+étrangères), puis supprimées de l'archive après NOTIFICATION_ARCHIVE_RETENTION_DAYS
+jours. La table active ne contient ainsi que les notifications non lues et
+récentes : la liste par utilisateur reste rapide quel que soit l'historique.
+
+Les deux opérations travaillent par lots (une transaction par lot, lignes
+verrouillées avec SKIP LOCKED) pour ne pas bloquer les écritures concurrentes.
+Les notifications archivées étant toutes lues, le compteur de non lues n'est
+pas modifié.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+load_dotenv()
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = int(os.getenv("NOTIFICATION_ARCHIVE_RETENTION_DAYS", "730"))
+NOTIFICATION_RETENTION_BATCH_SIZE = int(os.getenv("NOTIFICATION_RETENTION_BATCH_SIZE", "5000"))
+# Nombre maximal de lots par exécution du job (le reste est traité à l'exécution suivante)
+NOTIFICATION_RETENTION_MAX_BATCHES = int(os.getenv("NOTIFICATION_RETENTION_MAX_BATCHES", "200"))
+
+ARCHIVED_COLUMNS = ("id", "user_id", "type", "ticket_id", "message", "created_at", "read_at")
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = NOTIFICATION_RETENTION_BATCH_SIZE) -> int:
+    """
+    Déplace un lot de notifications lues antérieures à `cutoff` vers l'archive
+    en une seule instruction (DELETE ... RETURNING dans un INSERT ... SELECT).
+    Renvoie le nombre de notifications archivées.
+    """
+    notifications = models.Notification.__table__
+    archive = models.NotificationArchive.__table__
+
+    batch_ids = (
+        select(notifications.c.id)
+        .where(notifications.c.read == True, notifications.c.created_at < cutoff)
+        .order_by(notifications.c.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(notifications)
+        .where(notifications.c.id.in_(batch_ids.scalar_subquery()))
+        .returning(*(notifications.c[name] for name in ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    result = db.execute(
+        insert(archive).from_select(ARCHIVED_COLUMNS, select(*(moved.c[name] for name in ARCHIVED_COLUMNS)))
+    )
+    db.commit()
+    return result.rowcount
+
+
+def purge_archive_batch(db: Session, cutoff: datetime, batch_size: int = NOTIFICATION_RETENTION_BATCH_SIZE) -> int:
+    """Supprime un lot de notifications archivées antérieures à `cutoff`"""
+    archive = models.NotificationArchive.__table__
+    batch_ids = (
+        select(archive.c.id)
+        .where(archive.c.created_at < cutoff)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = db.execute(delete(archive).where(archive.c.id.in_(batch_ids.scalar_subquery())))
+    db.commit()
+    return result.rowcount
+
+
+def apply_notification_retention(db: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Archive les notifications lues anciennes puis purge l'archive, par lots.
+    Renvoie {"archived": n, "purged": m}.
+    """
+    now = now or datetime.utcnow()
+    totals = {"archived": 0, "purged": 0}
+    steps = (
+        ("archived", archive_batch, now - timedelta(days=NOTIFICATION_RETENTION_DAYS)),
+        ("purged", purge_archive_batch, now - timedelta(days=NOTIFICATION_ARCHIVE_RETENTION_DAYS)),
+    )
+    for key, run_batch, cutoff in steps:
+        for _ in range(NOTIFICATION_RETENTION_MAX_BATCHES):
+            count = run_batch(db, cutoff)
+            totals[key] += count
+            if count < NOTIFICATION_RETENTION_BATCH_SIZE:
+                break
+    return totals
@@ -0,0 +1,62 @@
+"""
+Pagination par curseur (keyset) pour les commentaires, l'historique et la timeline.
+
+Le curseur est opaque pour le client : il encode la position du dernier élément
+renvoyé (horodatage, rang de la source, identifiant). La page suivante est lue
+avec une condition "(date, rang, id) > curseur", servie par l'index, au lieu
+d'un OFFSET qui relit toutes les lignes précédentes.
+"""
+import base64
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Cursor(NamedTuple):
+    timestamp: datetime
+    rank: int
+    id: int
+
+
+def encode_cursor(timestamp: datetime, rank: int, item_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{rank}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Décode un curseur reçu du client. Lève une 400 s'il est invalide."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, rank, item_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return Cursor(datetime.fromisoformat(timestamp), int(rank), int(item_id))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_filter(timestamp_col, id_col, rank: int, cursor: Cursor, descending: bool = False):
+    """
+    Condition SQL "après le curseur" pour une source de rang `rank`.
+    Le rang départage deux sources (commentaires / historique) de même horodatage.
+    """
+    if descending:
+        after_ts = timestamp_col < cursor.timestamp
+        at_or_after_ts = timestamp_col <= cursor.timestamp
+        after_id = id_col < cursor.id
+        rank_after = rank < cursor.rank
+    else:
+        after_ts = timestamp_col > cursor.timestamp
+        at_or_after_ts = timestamp_col >= cursor.timestamp
+        after_id = id_col > cursor.id
+        rank_after = rank > cursor.rank
+
+    if rank == cursor.rank:
+        return or_(after_ts, and_(timestamp_col == cursor.timestamp, after_id))
+    # Source différente : à horodatage égal, seul le rang départage
+    return at_or_after_ts if rank_after else after_ts
@@ -0,0 +1,248 @@
+"""
+Profileur échantillonneur à la demande (administrateurs, /diagnostics/profiler).
+
+Une session cible une route ("GET /tickets/") pour ses N prochaines requêtes
+ou pour une fenêtre de temps. Pendant la session, un thread relève toutes les
+PROFILER_INTERVAL_MS la pile de chaque thread (sys._current_frames) et ne garde
+que les piles en train d'exécuter l'endpoint de la route (présence de son code
+dans la pile). Les piles sont agrégées au format « folded » (une ligne
+"f1;f2;f3 nombre" par pile), lu par flamegraph.pl, speedscope ou inferno.
+
+Pour chaque requête profilée, la répartition du temps SQL (instructions les plus
+coûteuses) est relevée via app.query_metrics.
+
+Une session dure au plus PROFILER_MAX_SECONDS secondes, même lancée pour N
+requêtes seulement : sans trafic sur la route, le thread d'échantillonnage
+s'arrête de lui-même.
+
+La session est propre au processus : avec plusieurs workers uvicorn, seul le
+worker qui a reçu le POST /diagnostics/profiler profile ses requêtes, et les
+GET /diagnostics/profiler suivants peuvent tomber sur un autre worker. Profiler
+avec un seul worker (ou sur une instance dédiée) pour des résultats complets.
+
+Sans session active, ni thread ni hook : le middleware se limite à un test.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_metrics import current_query_stats
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+# Bornes d'une session (y compris une session lancée pour N requêtes seulement)
+PROFILER_MAX_SECONDS = 600
+PROFILER_MAX_REQUESTS = 1000
+_MAX_STACK_DEPTH = 200
+
+_SITE_PACKAGES = ("site-packages" + os.sep, "dist-packages" + os.sep)
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+class ProfilerBusy(Exception):
+    """Une session de profilage est déjà en cours"""
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_APP_ROOT):
+        return filename[len(_APP_ROOT):]
+    for marker in _SITE_PACKAGES:
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def endpoint_codes(routes, path: str, method: Optional[str] = None) -> Set:
+    """Objets code des endpoints de la route `path` (pour une méthode, ou toutes)"""
+    codes = set()
+    for route in routes:
+        if not isinstance(route, Route) or route.path != path:
+            continue
+        if method and method not in (route.methods or ()):
+            continue
+        code = getattr(route.endpoint, "__code__", None)
+        if code is not None:
+            codes.add(code)
+    return codes
+
+
+class ProfileSession:
+    def __init__(self, path: str, method: Optional[str], codes: Set, max_requests: Optional[int],
+                 seconds: Optional[float], interval: float):
+        self.path = path
+        self.method = method
+        self.codes = codes
+        self.max_requests = min(max_requests, PROFILER_MAX_REQUESTS) if max_requests else None
+        self.deadline = time.monotonic() + min(seconds or PROFILER_MAX_SECONDS, PROFILER_MAX_SECONDS)
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self.ended_at: Optional[datetime] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stacks_lock = threading.Lock()  # stacks : écrit par le thread échantillonneur, lu par les requêtes
+        self.requests: List[dict] = []
+        self._labels: Dict = {}
+
+    def matches(self, scope: Scope) -> bool:
+        route = scope.get("route")
+        return (
+            getattr(route, "path", None) == self.path
+            and (self.method is None or scope.get("method") == self.method)
+        )
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def sample(self, frames: Dict[int, object], own_thread: int) -> None:
+        for thread_id, frame in frames.items():
+            if thread_id == own_thread:
+                continue
+            stack = []
+            hit = False
+            depth = 0
+            while frame is not None and depth < _MAX_STACK_DEPTH:
+                stack.append(frame.f_code)
+                if frame.f_code in self.codes:
+                    hit = True
+                    break
+                frame = frame.f_back
+                depth += 1
+            if hit:
+                # Pile de l'endpoint (racine) jusqu'à la fonction en cours
+                key = ";".join(self._label(code) for code in reversed(stack))
+                with self._stacks_lock:
+                    self.stacks[key] += 1
+                    self.samples += 1
+
+    def folded(self) -> str:
+        with self._stacks_lock:
+            stacks = self.stacks.copy()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def summary(self) -> dict:
+        return {
+            "route": self.path,
+            "method": self.method,
+            "active": self.ended_at is None,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "interval_ms": self.interval * 1000,
+            "max_requests": self.max_requests,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "requests": self.requests,
+        }
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active: Optional[ProfileSession] = None
+        self.last: Optional[ProfileSession] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(
+        self,
+        routes,
+        path: str,
+        method: Optional[str] = None,
+        max_requests: Optional[int] = None,
+        seconds: Optional[float] = None,
+        interval_ms: float = PROFILER_INTERVAL_MS,
+    ) -> ProfileSession:
+        """Démarre une session ; ValueError si la route n'existe pas, ProfilerBusy si une session tourne"""
+        codes = endpoint_codes(routes, path, method)
+        if not codes:
+            raise ValueError(path)
+        with self._lock:
+            if self.active is not None:
+                raise ProfilerBusy()
+            session = ProfileSession(path, method, codes, max_requests, seconds, interval_ms / 1000)
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(session, self._stop), name="profiler", daemon=True)
+            self.active = self.last = session
+            self._thread.start()
+            return session
+
+    def stop(self) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self.active
+            if session is None:
+                return self.last
+            self.active = None
+            session.ended_at = datetime.utcnow()
+            self._stop.set()
+        return session
+
+    def _run(self, session: ProfileSession, stop: threading.Event) -> None:
+        own_thread = threading.get_ident()
+        while not stop.wait(session.interval):
+            if time.monotonic() >= session.deadline:
+                self.stop()
+                return
+            session.sample(sys._current_frames(), own_thread)
+
+    def record_request(self, session: ProfileSession, scope: Scope, status_code: int, duration: float) -> None:
+        """Requête profilée terminée : durée et répartition SQL ; arrête la session après N requêtes"""
+        stats = current_query_stats()
+        entry = {
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 2),
+        }
+        if stats is not None:
+            entry.update({
+                "sql_queries": stats.count,
+                "sql_time_ms": round(stats.duration * 1000, 2),
+                "sql_statements": stats.breakdown(),
+            })
+        with self._lock:
+            if self.active is not session:
+                return
+            session.requests.append(entry)
+            done = session.max_requests is not None and len(session.requests) >= session.max_requests
+        if done:
+            self.stop()
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilerMiddleware:
+    """Relève durée et temps SQL des requêtes de la route profilée (placé sous QueryMetricsMiddleware)"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        session = profiler.active
+        if session is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if session.matches(scope):
+                profiler.record_request(session, scope, status_code, time.perf_counter() - start)
@@ -0,0 +1,126 @@
+"""
+Projections compactes pour les listes de tickets.
+
+Au lieu d'embarquer les objets UserRead complets du créateur et du technicien
+dans chaque ticket, la vue compacte renvoie uniquement les identifiants et un
+dictionnaire "users" chargé une seule fois (side-loading). Les colonnes des
+tickets sont limitées avec load_only aux champs demandés via `fields=`.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy.orm import Query, Session, load_only
+
+from . import models
+from .responses import conditional_json_response, dump_json
+
+# Champs exposés par la vue compacte (toutes les colonnes de TicketRead sans les objets imbriqués)
+TICKET_LIST_FIELDS = (
+    "id",
+    "number",
+    "title",
+    "description",
+    "type",
+    "priority",
+    "status",
+    "category",
+    "created_at",
+    "creator_id",
+    "technician_id",
+    "secretary_id",
+    "user_agency",
+    "assigned_at",
+    "resolved_at",
+    "closed_at",
+)
+
+# Champs qui référencent un utilisateur à charger dans le dictionnaire "users"
+USER_REFERENCE_FIELDS = ("creator_id", "technician_id")
+
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """
+    Convertit le paramètre `fields=title,status,...` en liste de champs valides.
+    L'identifiant est toujours inclus. Lève une 400 si un champ est inconnu.
+    """
+    if not fields:
+        return TICKET_LIST_FIELDS
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in TICKET_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(TICKET_LIST_FIELDS)}",
+        )
+
+    selected = ["id"] + [f for f in TICKET_LIST_FIELDS if f in requested and f != "id"]
+    return tuple(selected)
+
+
+def apply_ticket_projection(query: Query, fields: Sequence[str], model=models.Ticket) -> Query:
+    """Restreint le chargement des tickets (actifs ou archivés) aux colonnes demandées (load_only)"""
+    columns = [getattr(model, f) for f in fields]
+    return query.options(load_only(*columns))
+
+
+def load_user_summaries(db: Session, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Charge en une seule requête les informations résumées des utilisateurs référencés"""
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return {}
+
+    rows = (
+        db.query(
+            models.User.id,
+            models.User.full_name,
+            models.User.email,
+            models.User.agency,
+            models.User.phone,
+            models.User.specialization,
+            models.User.actif,
+            models.Role.name.label("role"),
+        )
+        .outerjoin(models.Role, models.User.role_id == models.Role.id)  # Utilisateurs sans rôle : role None
+        .filter(models.User.id.in_(ids))
+        .all()
+    )
+    return {row.id: dict(row._mapping) for row in rows}
+
+
+def build_compact_ticket_list(
+    db: Session,
+    tickets: List[models.Ticket],
+    fields: Sequence[str],
+) -> Dict[str, Any]:
+    """Construit la réponse compacte {"tickets": [...], "users": {id: {...}}}"""
+    items = [{f: getattr(ticket, f) for f in fields} for ticket in tickets]
+
+    user_ids = set()
+    for ref in USER_REFERENCE_FIELDS:
+        if ref in fields:
+            user_ids.update(item[ref] for item in items)
+
+    return {
+        "tickets": items,
+        "users": load_user_summaries(db, user_ids),
+    }
+
+
+def compact_ticket_response(
+    db: Session,
+    request: Request,
+    query: Query,
+    fields: Sequence[str],
+    archived_query: Optional[Query] = None,
+) -> Response:
+    """
+    Exécute la requête en mode compact et renvoie directement la réponse JSON
+    (orjson + ETag), sans passer par la validation Pydantic de TicketRead.
+    archived_query : tickets archivés ajoutés après les tickets actifs
+    """
+    tickets = apply_ticket_projection(query, fields).all()
+    if archived_query is not None:
+        tickets += apply_ticket_projection(archived_query, fields, models.TicketArchive).all()
+    payload = build_compact_ticket_list(db, tickets, fields)
+    return conditional_json_response(request, dump_json(payload))
@@ -0,0 +1,223 @@
+"""
+Instrumentation des requêtes SQL par requête HTTP.
+
+Les événements du moteur SQLAlchemy (before/after_cursor_execute) comptent les
+requêtes et le temps passé en base pour la requête HTTP en cours (ContextVar,
+propagée aux endpoints synchrones exécutés dans le pool de threads).
+
+QueryMetricsMiddleware :
+- ajoute l'en-tête Server-Timing (db;dur=<ms>, dbq;desc=<nombre de requêtes>),
+  visible dans l'onglet réseau des outils de développement du navigateur ;
+- signale les N+1 présumés : une même instruction SQL exécutée au moins
+  QUERY_N_PLUS_ONE_THRESHOLD fois pendant une requête HTTP ;
+- agrège les chiffres par route (GET /diagnostics/queries).
+
+query_budget est l'aide de test : elle vérifie qu'un bloc de code (ou un appel
+d'endpoint via TestClient) ne dépasse pas un nombre de requêtes donné.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+QUERY_METRICS_ENABLED = os.getenv("QUERY_METRICS_ENABLED", "true").lower() == "true"
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "5"))
+
+
+class QueryStats:
+    """Requêtes SQL exécutées pendant une requête HTTP (ou un bloc query_budget)"""
+
+    __slots__ = ("count", "duration", "statements", "statement_durations")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # Secondes
+        self.statements: Counter = Counter()
+        self.statement_durations: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        self.statement_durations[statement] += duration
+
+    def breakdown(self, limit: int = 10) -> List[dict]:
+        """Instructions les plus coûteuses : nombre d'exécutions et temps cumulé"""
+        return [
+            {"statement": statement, "count": self.statements[statement], "time_ms": round(duration * 1000, 2)}
+            for statement, duration in self.statement_durations.most_common(limit)
+        ]
+
+    def suspected_n_plus_one(self, threshold: int = QUERY_N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Instructions répétées au moins `threshold` fois : [(instruction, nombre)]"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# Blocs query_budget actifs : globaux et non liés au contexte, car TestClient exécute
+# l'application dans un autre thread que le test
+_budgets: List[QueryStats] = []
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Requêtes SQL de la requête HTTP en cours (None hors QueryMetricsMiddleware)"""
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or _budgets:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    for budget in list(_budgets):
+        budget.record(statement, duration)
+
+
+class EndpointQueryStats:
+    __slots__ = ("requests", "queries", "max_queries", "db_time", "n_plus_one_requests", "last_suspects")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.n_plus_one_requests = 0
+        self.last_suspects: List[Tuple[str, int]] = []
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries_total": self.queries,
+            "queries_avg": round(self.queries / self.requests, 2) if self.requests else 0,
+            "queries_max": self.max_queries,
+            "db_time_ms_avg": round(self.db_time * 1000 / self.requests, 2) if self.requests else 0,
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "last_suspects": [{"statement": statement, "count": count} for statement, count in self.last_suspects],
+        }
+
+
+class QueryMetricsRegistry:
+    """Chiffres agrégés par route ("GET /tickets/{ticket_id}"), propres au processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointQueryStats] = {}
+
+    def record(self, endpoint: str, stats: QueryStats, suspects: List[Tuple[str, int]]) -> None:
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, EndpointQueryStats())
+            entry.requests += 1
+            entry.queries += stats.count
+            entry.max_queries = max(entry.max_queries, stats.count)
+            entry.db_time += stats.duration
+            if suspects:
+                entry.n_plus_one_requests += 1
+                entry.last_suspects = suspects
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: entry.as_dict()
+                for endpoint, entry in sorted(self._endpoints.items(), key=lambda item: -item[1].queries)
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_metrics = QueryMetricsRegistry()
+
+
+def _endpoint_name(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}"
+
+
+class QueryMetricsMiddleware:
+    """Compte les requêtes SQL de chaque requête HTTP (Server-Timing, détection N+1, agrégats par route)"""
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = QUERY_N_PLUS_ONE_THRESHOLD) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not QUERY_METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Réponse prête : les requêtes de l'endpoint sont terminées (hors tâches d'arrière-plan)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={stats.duration * 1000:.1f}, dbq;desc="{stats.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            endpoint = _endpoint_name(scope)
+            suspects = stats.suspected_n_plus_one(self.n_plus_one_threshold)
+            if suspects:
+                statement, count = suspects[0]
+                logger.warning(
+                    "N+1 présumé",
+                    extra={"endpoint": endpoint, "queries": stats.count, "repeated": count, "statement": statement[:200]},
+                )
+            query_metrics.record(endpoint, stats, suspects)
+
+
+@contextmanager
+def query_budget(max_queries: int, n_plus_one_threshold: Optional[int] = None):
+    """
+    Aide de test : échoue (AssertionError) si le bloc exécute plus de `max_queries`
+    requêtes SQL, ou une même instruction au moins `n_plus_one_threshold` fois.
+
+        with query_budget(5):
+            client.get("/tickets/", headers=headers)
+    """
+    stats = QueryStats()
+    _budgets.append(stats)
+    try:
+        yield stats
+    finally:
+        _budgets.remove(stats)
+
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"{stats.count} requêtes SQL pour un budget de {max_queries}")
+    if n_plus_one_threshold is not None:
+        for statement, count in stats.suspected_n_plus_one(n_plus_one_threshold):
+            problems.append(f"N+1 présumé ({count} fois) : {statement[:200]}")
+    if problems:
+        details = "\n".join(f"  {count} x {statement[:200]}" for statement, count in stats.statements.most_common(10))
+        raise AssertionError("; ".join(problems) + "\nInstructions les plus fréquentes :\n" + details)
@@ -0,0 +1,223 @@
+"""
+Pipeline de réponses HTTP : sérialisation orjson, compression gzip/brotli
+et réponses conditionnelles (ETag / If-None-Match → 304).
+"""
+import hashlib
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request, Response, status
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotli est optionnel : repli sur gzip
+    brotli = None
+
+# Taille minimale (en octets) à partir de laquelle une réponse est compressée
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESSLEVEL = int(os.getenv("GZIP_COMPRESSLEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Types compressés : JSON de l'API et texte. Les pièces jointes (PDF, images,
+# archives) sont déjà compressées ou servies par plages d'octets.
+COMPRESSIBLE_CONTENT_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dump_json(content: Any) -> bytes:
+    """Sérialise un contenu JSON-compatible (dict, list, datetime, enum...) avec orjson"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def is_compressible(headers: Headers) -> bool:
+    """
+    Réponse à compresser : type texte ou JSON, hors flux d'événements, et pas de
+    réponse par plages (Content-Range / Accept-Ranges des FileResponse) dont les
+    positions d'octets ne correspondraient plus au corps compressé.
+    """
+    if "content-range" in headers or "accept-ranges" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES) and not content_type.startswith("text/event-stream")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Encodage à appliquer selon Accept-Encoding (valeurs q comprises, q=0 : refusé) :
+    br ou gzip, le mieux pondéré, brotli à égalité. None : réponse non compressée.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in (("br", "gzip") if brotli is not None else ("gzip",)):
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class GzipCompressor:
+    def __init__(self, level: int = GZIP_COMPRESSLEVEL) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, *, final: bool) -> bytes:
+        # Z_SYNC_FLUSH : chaque bloc d'une réponse en flux est décodable dès sa réception
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int = BROTLI_QUALITY) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, *, final: bool) -> bytes:
+        data = self._compressor.process(data)
+        return data + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionResponder:
+    """
+    Compresse le corps d'une réponse. L'en-tête http.response.start est retenu
+    jusqu'au premier bloc du corps : une réponse complète plus petite que
+    minimum_size, ou non compressible (voir is_compressible), part telle quelle.
+    """
+
+    def __init__(self, app: ASGIApp, encoding: str, compressor, minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressing: Optional[bool] = None  # None : décision au premier bloc du corps
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or not is_compressible(headers):
+                self.compressing = False
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.compressing is False:
+            # Réponse transmise telle quelle (ou extension ASGI comme pathsend)
+            await self._flush_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressing is None:
+            self.compressing = more_body or len(body) >= self.minimum_size
+            if not self.compressing:
+                await self._flush_start()
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            if not more_body:
+                body = self.compressor.compress(body, final=True)
+                headers["Content-Length"] = str(len(body))
+                await self._flush_start()
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self._flush_start()
+
+        await self.send({
+            "type": "http.response.body",
+            "body": self.compressor.compress(body, final=not more_body),
+            "more_body": more_body,
+        })
+
+    async def _flush_start(self) -> None:
+        if self.start_message is not None:
+            message, self.start_message = self.start_message, None
+            await self.send(message)
+
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses selon l'en-tête Accept-Encoding du client (voir
+    negotiate_encoding) : brotli si disponible et accepté, sinon gzip. Les petites
+    réponses (< minimum_size) et les réponses non compressibles (voir is_compressible :
+    téléchargements de pièces jointes, plages d'octets) sont envoyées telles quelles.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = GZIP_COMPRESSLEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding == "br":
+            compressor = BrotliCompressor(self.brotli_quality)
+        elif encoding == "gzip":
+            compressor = GzipCompressor(self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressionResponder(self.app, encoding, compressor, self.minimum_size)(scope, receive, send)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparaison faible : W/"x" et "x" désignent la même représentation
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional_json_response(request: Request, body: bytes) -> Response:
+    """
+    Renvoie un corps JSON déjà sérialisé avec un ETag.
+    Si le client présente le même ETag (If-None-Match), renvoie 304 sans corps :
+    les dashboards qui interrogent les listes en boucle ne retéléchargent rien
+    tant que les données n'ont pas changé.
+    """
+    etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
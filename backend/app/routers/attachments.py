@@ -0,0 +1,167 @@
+"""
+Router des pièces jointes des tickets et des commentaires.
+Les fichiers sont envoyés en multipart et stockés via attachment_storage ;
+seules les métadonnées sont enregistrées dans les colonnes JSONB.
+"""
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..attachment_storage import AttachmentStore, get_attachment_store, request_deletion
+from ..database import get_db
+from ..security import AGENT_ROLES, get_accessible_ticket, get_current_user
+from ..ticket_archive import comment_model
+
+router = APIRouter()
+
+
+def _get_comment(db: Session, ticket, comment_id: int) -> models.Comment:
+    model = comment_model(ticket)
+    comment = (
+        db.query(model)
+        .filter(model.id == comment_id, model.ticket_id == ticket.id)
+        .first()
+    )
+    if not comment:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    return comment
+
+
+def _find_attachment(attachments: Optional[list], attachment_id: str) -> dict:
+    for attachment in attachments or []:
+        if isinstance(attachment, dict) and attachment.get("id") == attachment_id:
+            return attachment
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attachment not found")
+
+
+def _store_upload(
+    upload: UploadFile,
+    store: AttachmentStore,
+    current_user: models.User,
+) -> dict:
+    """Enregistre le fichier dans le stockage et renvoie ses métadonnées"""
+    sha256, size = store.save(upload.file)
+    filename = os.path.basename(upload.filename or "") or "fichier"
+    return {
+        "id": uuid.uuid4().hex,
+        "filename": filename,
+        "content_type": upload.content_type or "application/octet-stream",
+        "size": size,
+        "sha256": sha256,
+        "uploaded_by": current_user.id,
+        "uploaded_at": datetime.utcnow().isoformat(),
+    }
+
+
+@router.post("/{ticket_id}/attachments", response_model=schemas.AttachmentRead)
+def upload_ticket_attachment(
+    ticket_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Ajouter une pièce jointe à un ticket (upload multipart en streaming)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user)
+    attachment = _store_upload(file, store, current_user)
+
+    # Réaffecter la liste pour que SQLAlchemy détecte la modification du JSONB
+    ticket.attachments = list(ticket.attachments or []) + [attachment]
+    db.commit()
+    return attachment
+
+
+@router.get("/{ticket_id}/attachments", response_model=List[schemas.AttachmentRead])
+def list_ticket_attachments(
+    ticket_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Lister les pièces jointes d'un ticket (actif ou archivé)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+    return [a for a in ticket.attachments or [] if isinstance(a, dict) and a.get("sha256")]
+
+
+@router.get("/{ticket_id}/attachments/{attachment_id}")
+def download_ticket_attachment(
+    ticket_id: int,
+    attachment_id: str,
+    db: Session = Depends(get_db),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Télécharger une pièce jointe (supporte l'en-tête Range)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+    attachment = _find_attachment(ticket.attachments, attachment_id)
+    return store.download_response(
+        attachment["sha256"], attachment["filename"], attachment["content_type"]
+    )
+
+
+@router.delete("/{ticket_id}/attachments/{attachment_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_ticket_attachment(
+    ticket_id: int,
+    attachment_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Supprimer une pièce jointe (auteur de l'upload ou agent/DSI)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user)
+    attachment = _find_attachment(ticket.attachments, attachment_id)
+
+    is_agent = current_user.role and current_user.role.name in AGENT_ROLES
+    if attachment.get("uploaded_by") != current_user.id and not is_agent:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    ticket.attachments = [a for a in ticket.attachments if a is not attachment]
+    # Fichier supprimé plus tard par la tâche planifiée, s'il n'est alors plus référencé
+    # ailleurs (déduplication) : un upload concurrent du même contenu peut encore s'y rattacher
+    request_deletion(db, attachment["sha256"])
+    db.commit()
+
+
+@router.post(
+    "/{ticket_id}/comments/{comment_id}/attachments",
+    response_model=schemas.AttachmentRead,
+)
+def upload_comment_attachment(
+    ticket_id: int,
+    comment_id: int,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Ajouter une pièce jointe à un commentaire (auteur du commentaire uniquement)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user)
+    comment = _get_comment(db, ticket, comment_id)
+    if comment.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    attachment = _store_upload(file, store, current_user)
+    comment.attachments = list(comment.attachments or []) + [attachment]
+    db.commit()
+    return attachment
+
+
+@router.get("/{ticket_id}/comments/{comment_id}/attachments/{attachment_id}")
+def download_comment_attachment(
+    ticket_id: int,
+    comment_id: int,
+    attachment_id: str,
+    db: Session = Depends(get_db),
+    store: AttachmentStore = Depends(get_attachment_store),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Télécharger une pièce jointe de commentaire (supporte l'en-tête Range)"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+    comment = _get_comment(db, ticket, comment_id)
+    attachment = _find_attachment(comment.attachments, attachment_id)
+    return store.download_response(
+        attachment["sha256"], attachment["filename"], attachment["content_type"]
+    )
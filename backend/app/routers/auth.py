@@ -1,4 +1,3 @@
-from datetime import timedelta
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -8,11 +7,14 @@ from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..database import get_db
 from ..security import (
-    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_TYPE,
     authenticate_user,
-    create_access_token,
+    consume_refresh_token,
+    create_token_pair,
+    decode_token,
     get_password_hash,
     get_current_user,
+    revoke_user_tokens,
 )
 
 router = APIRouter()
@@ -78,11 +80,46 @@ def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-    return schemas.Token(access_token=access_token)
+    return create_token_pair(user)
+
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_access_token(
+    refresh_in: schemas.TokenRefresh, db: Session = Depends(get_db)
+):
+    """
+    Échange un jeton de rafraîchissement valide contre un nouveau couple de jetons.
+    Rotation : le jeton présenté est consommé et ne peut plus être réutilisé
+    """
+    payload = decode_token(refresh_in.refresh_token, expected_type=REFRESH_TOKEN_TYPE)
+
+    # Chemin lent (une fois par durée de vie du jeton d'accès) : on relit l'utilisateur
+    user = db.get(models.User, payload["sub"])
+    if user is None or not user.actif or payload["ver"] != (user.token_version or 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token is invalid or has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not consume_refresh_token(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has already been used",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    db.commit()
+    return create_token_pair(user)
+
+
+@router.post("/logout")
+def logout(
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Révoque tous les jetons (accès et rafraîchissement) de l'utilisateur connecté"""
+    revoke_user_tokens(current_user)
+    db.commit()
+    return {"message": "Logged out"}
 
 
 @router.get("/me", response_model=schemas.UserRead)
@@ -0,0 +1,100 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from .. import models, schemas
+from ..profiler import ProfilerBusy, profiler
+from ..query_metrics import QUERY_N_PLUS_ONE_THRESHOLD, query_metrics
+from ..security import require_role
+
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/queries")
+def get_query_metrics(
+    current_user: models.User = Depends(require_role("DSI", "Admin")),
+) -> Dict:
+    """
+    Requêtes SQL par route depuis le démarrage du processus (ou la dernière remise à zéro) :
+    nombre moyen / maximal, temps base moyen et N+1 présumés
+    """
+    return {
+        "n_plus_one_threshold": QUERY_N_PLUS_ONE_THRESHOLD,
+        "endpoints": query_metrics.snapshot(),
+    }
+
+
+@router.delete("/queries")
+def reset_query_metrics(
+    current_user: models.User = Depends(require_role("DSI", "Admin")),
+):
+    """Remet à zéro les compteurs de requêtes SQL"""
+    query_metrics.reset()
+    return {"message": "Query metrics reset"}
+
+
+@router.post("/profiler", status_code=status.HTTP_201_CREATED)
+def start_profiler(
+    session: schemas.ProfilerStart,
+    request: Request,
+    current_user: models.User = Depends(require_role("Admin")),
+) -> Dict:
+    """
+    Démarre le profileur échantillonneur sur une route, pour ses N prochaines requêtes
+    et/ou une fenêtre de temps (600 s au plus dans tous les cas). Une seule session à
+    la fois, propre au worker qui reçoit cette requête (voir app.profiler)
+    """
+    if session.requests is None and session.seconds is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide requests and/or seconds",
+        )
+    try:
+        started = profiler.start(
+            request.app.routes,
+            session.route,
+            method=session.method,
+            max_requests=session.requests,
+            seconds=session.seconds,
+            interval_ms=session.interval_ms,
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Route not found")
+    except ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profiling session is already running")
+    return started.summary()
+
+
+@router.get("/profiler")
+def get_profiler_session(
+    current_user: models.User = Depends(require_role("Admin")),
+) -> Dict:
+    """Session en cours (ou dernière session) : échantillons et requêtes profilées avec leur temps SQL"""
+    session = profiler.active or profiler.last
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profiling session")
+    return session.summary()
+
+
+@router.get("/profiler/flamegraph", response_class=PlainTextResponse)
+def get_profiler_flamegraph(
+    current_user: models.User = Depends(require_role("Admin")),
+):
+    """Piles agrégées au format folded (flamegraph.pl, speedscope, inferno)"""
+    session = profiler.active or profiler.last
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profiling session")
+    return PlainTextResponse(session.folded())
+
+
+@router.delete("/profiler")
+def stop_profiler(
+    current_user: models.User = Depends(require_role("Admin")),
+) -> Dict:
+    """Arrête la session en cours ; ses résultats restent consultables"""
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No profiling session")
+    return session.summary()
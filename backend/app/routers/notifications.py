@@ -1,72 +1,171 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import Integer, any_, bindparam, delete, desc, literal, select, union_all, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
-from .. import models, schemas
+from .. import models, notification_counters, schemas
 from ..database import get_db
-from ..security import get_current_user
+from ..security import get_current_user_id
+from ..responses import conditional_json_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.NotificationRead])
 def get_my_notifications(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unread_only: bool = Query(False),
+    include_archived: bool = Query(False),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    """Récupérer les notifications de l'utilisateur connecté"""
-    query = db.query(models.Notification).filter(
-        models.Notification.user_id == current_user.id
-    )
-    
-    if unread_only:
-        query = query.filter(models.Notification.read == False)
+    """
+    Récupérer les notifications de l'utilisateur connecté.
+    Par défaut, seule la table active est lue (notifications non lues et récentes) ;
+    include_archived ajoute les notifications archivées par la rétention.
+    """
+    if include_archived and not unread_only:
+        notifications = _list_with_archive(db, current_user_id, skip, limit)
+    else:
+        query = db.query(models.Notification).filter(
+            models.Notification.user_id == current_user_id
+        )
+
+        if unread_only:
+            query = query.filter(models.Notification.read == False)
+
+        notifications = (
+            query.order_by(desc(models.Notification.created_at))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
     
-    notifications = (
-        query.order_by(desc(models.Notification.created_at))
-        .offset(skip)
-        .limit(limit)
-        .all()
+    # Réponse conditionnelle : 304 si la liste n'a pas changé depuis le dernier appel
+    body = schemas.NotificationReadList.dump_json(
+        schemas.NotificationReadList.validate_python(notifications, from_attributes=True)
     )
-    
-    return notifications
+    return conditional_json_response(request, body)
+
+
+def _list_with_archive(db: Session, user_id: int, skip: int, limit: int) -> list:
+    """Notifications actives et archivées (toutes lues) fusionnées par date décroissante"""
+    notifications = models.Notification.__table__
+    archive = models.NotificationArchive.__table__
+    # Chaque branche est bornée à skip + limit lignes grâce à l'index (user_id, created_at)
+    window = skip + limit
+    active = (
+        select(
+            notifications.c.id, notifications.c.user_id, notifications.c.type, notifications.c.ticket_id,
+            notifications.c.message, notifications.c.read, notifications.c.created_at, notifications.c.read_at,
+        )
+        .where(notifications.c.user_id == user_id)
+        .order_by(notifications.c.created_at.desc())
+        .limit(window)
+    )
+    archived = (
+        select(
+            archive.c.id, archive.c.user_id, archive.c.type, archive.c.ticket_id,
+            archive.c.message, literal(True).label("read"), archive.c.created_at, archive.c.read_at,
+        )
+        .where(archive.c.user_id == user_id)
+        .order_by(archive.c.created_at.desc())
+        .limit(window)
+    )
+    merged = union_all(select(active.subquery()), select(archived.subquery())).subquery()
+    return db.execute(
+        select(merged).order_by(merged.c.created_at.desc()).offset(skip).limit(limit)
+    ).all()
 
 
 @router.get("/unread/count", response_model=dict)
 def get_unread_count(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    """Récupérer le nombre de notifications non lues"""
-    count = (
-        db.query(models.Notification)
-        .filter(
-            models.Notification.user_id == current_user.id,
-            models.Notification.read == False
-        )
-        .count()
+    """Récupérer le nombre de notifications non lues (compteur dénormalisé)"""
+    return {"unread_count": notification_counters.get_unread_count(db, current_user_id)}
+
+
+@router.get("/preferences", response_model=List[schemas.NotificationPreferenceRead])
+def get_my_notification_preferences(
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """Récupérer les préférences d'envoi des emails (immédiat ou récapitulatif)"""
+    return (
+        db.query(models.NotificationPreference)
+        .filter(models.NotificationPreference.user_id == current_user_id)
+        .all()
     )
-    return {"unread_count": count}
+
+
+@router.put("/preferences", response_model=schemas.NotificationPreferenceRead)
+def update_my_notification_preference(
+    preference_in: schemas.NotificationPreferenceUpdate,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Définir le mode d'envoi des emails pour un type de notification
+    (notification_type absent : préférence par défaut pour tous les types)
+    """
+    table = models.NotificationPreference.__table__
+    values = {
+        "email_mode": preference_in.email_mode,
+        "digest_window_minutes": preference_in.digest_window_minutes,
+        "updated_at": datetime.utcnow(),
+    }
+    # Upsert en une instruction : deux requêtes simultanées ne créent pas de doublon
+    if preference_in.notification_type is None:
+        conflict = {"index_elements": ["user_id"], "index_where": table.c.notification_type.is_(None)}
+    else:
+        conflict = {"index_elements": ["user_id", "notification_type"]}
+    preference_id = db.execute(
+        insert(table)
+        .values(user_id=current_user_id, notification_type=preference_in.notification_type, **values)
+        .on_conflict_do_update(set_=values, **conflict)
+        .returning(table.c.id)
+    ).scalar_one()
+    db.commit()
+    return db.get(models.NotificationPreference, preference_id)
+
+
+@router.delete("/preferences", status_code=status.HTTP_204_NO_CONTENT)
+def delete_my_notification_preference(
+    notification_type: Optional[models.NotificationType] = Query(None),
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """Supprimer une préférence (retour à l'envoi immédiat ou à la préférence par défaut)"""
+    type_filter = (
+        models.NotificationPreference.notification_type.is_(None)
+        if notification_type is None
+        else models.NotificationPreference.notification_type == notification_type
+    )
+    db.query(models.NotificationPreference).filter(
+        models.NotificationPreference.user_id == current_user_id, type_filter
+    ).delete(synchronize_session=False)
+    db.commit()
 
 
 @router.put("/{notification_id}/read", response_model=schemas.NotificationRead)
 def mark_notification_as_read(
     notification_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """Marquer une notification comme lue"""
     notification = (
         db.query(models.Notification)
         .filter(
             models.Notification.id == notification_id,
-            models.Notification.user_id == current_user.id
+            models.Notification.user_id == current_user_id
         )
         .first()
     )
@@ -88,18 +187,75 @@ def mark_notification_as_read(
 @router.put("/read-all", response_model=dict)
 def mark_all_as_read(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
     """Marquer toutes les notifications comme lues"""
     updated = (
         db.query(models.Notification)
         .filter(
-            models.Notification.user_id == current_user.id,
+            models.Notification.user_id == current_user_id,
             models.Notification.read == False
         )
-        .update({"read": True, "read_at": datetime.utcnow()})
+        .update({"read": True, "read_at": datetime.utcnow()}, synchronize_session=False)
     )
+    # UPDATE en masse : le compteur n'est pas mis à jour par le flush
+    notification_counters.apply_unread_deltas(db, {current_user_id: -updated})
     db.commit()
     
     return {"updated_count": updated}
 
+
+
+@router.post("/batch", response_model=schemas.NotificationBatchResult)
+def batch_update_notifications(
+    batch: schemas.NotificationBatchRequest,
+    db: Session = Depends(get_db),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    """
+    Marquer comme lues / non lues ou supprimer plusieurs notifications en une requête
+    (UPDATE/DELETE unique) et renvoyer le nouveau nombre de non lues
+    """
+    if batch.ids is None and batch.ticket_id is None and batch.type is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide ids, ticket_id or type"
+        )
+
+    notifications = models.Notification.__table__
+    conditions = [notifications.c.user_id == current_user_id]
+    if batch.ids is not None:
+        # Un seul paramètre tableau (= ANY) quel que soit le nombre d'identifiants
+        conditions.append(notifications.c.id == any_(bindparam("ids", batch.ids, type_=ARRAY(Integer))))
+    if batch.ticket_id is not None:
+        conditions.append(notifications.c.ticket_id == batch.ticket_id)
+    if batch.type is not None:
+        conditions.append(notifications.c.type == batch.type)
+
+    if batch.action == "read":
+        affected = db.execute(
+            update(notifications)
+            .where(*conditions, notifications.c.read == False)
+            .values(read=True, read_at=datetime.utcnow())
+        ).rowcount
+        unread_delta = -affected
+    elif batch.action == "unread":
+        affected = db.execute(
+            update(notifications)
+            .where(*conditions, notifications.c.read == True)
+            .values(read=False, read_at=None)
+        ).rowcount
+        unread_delta = affected
+    else:
+        deleted_read_flags = db.execute(
+            delete(notifications).where(*conditions).returning(notifications.c.read)
+        ).scalars().all()
+        affected = len(deleted_read_flags)
+        unread_delta = -sum(1 for read in deleted_read_flags if not read)
+
+    # UPDATE/DELETE hors ORM : le compteur est mis à jour explicitement
+    notification_counters.apply_unread_deltas(db, {current_user_id: unread_delta})
+    unread_count = notification_counters.get_unread_count(db, current_user_id)
+    db.commit()
+
+    return {"action": batch.action, "affected_count": affected, "unread_count": unread_count}
@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from .. import analytics, models, schemas
+from ..database import get_db
+from ..security import require_role
+
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+
+def report_filters(
+    start: Optional[datetime] = Query(None, description="Tickets créés à partir de cette date"),
+    end: Optional[datetime] = Query(None, description="Tickets créés avant cette date"),
+    technician_id: Optional[int] = None,
+    agency: Optional[str] = None,
+    category: Optional[str] = None,
+) -> analytics.ReportFilters:
+    return analytics.ReportFilters(start, end, technician_id, agency, category)
+
+
+@router.get("/resolution", response_model=schemas.ResolutionReport)
+def get_resolution_report(
+    filters: analytics.ReportFilters = Depends(report_filters),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """
+    Rapport de période : volumes, taux de réussite, temps de résolution (heures) et
+    de réponse (minutes) en moyenne et percentiles p50/p90/p99, satisfaction
+    """
+    return analytics.resolution_report(db, filters)
+
+
+@router.get("/resolution/histogram", response_model=List[schemas.HistogramBucket])
+def get_resolution_histogram(
+    filters: analytics.ReportFilters = Depends(report_filters),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """Répartition des tickets résolus par tranche de temps de résolution"""
+    return analytics.resolution_histogram(db, filters)
+
+
+@router.get("/breakdown", response_model=List[schemas.BreakdownRow])
+def get_breakdown(
+    by: Literal["technician", "agency", "category", "type", "priority"] = "technician",
+    filters: analytics.ReportFilters = Depends(report_filters),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """Indicateurs regroupés par technicien, agence, catégorie, type ou priorité"""
+    return analytics.breakdown(db, by, filters)
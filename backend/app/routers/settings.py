@@ -125,10 +125,12 @@ Cordialement,
 {email_service.sender_name}
 """
     
+    # wait : avec le backend async, le résultat de l'envoi et non sa seule mise en file
     success = email_service.send_email(
         to_emails=[test_email],
         subject=subject,
-        body=body
+        body=body,
+        wait=True
     )
     
     if success:
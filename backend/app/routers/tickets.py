@@ -1,17 +1,119 @@
-from typing import List, Optional
+import logging
+from typing import List, Optional, Union
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Request
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy import func, or_, cast, String
 
 from .. import models, schemas
+from ..auto_assignment import AUTO_ASSIGNMENT_MODE, assignment_engine
 from ..database import get_db
-from ..security import get_current_user, require_role
+from ..security import get_accessible_ticket, get_current_user, require_role
 from ..email_service import email_service
+from ..notification_digest import EmailDelivery, deliver_email, deliver_many, deliver_ticket_summary
+from ..notification_counters import apply_unread_deltas, unread_counts_for_ticket
+from ..projections import compact_ticket_response, parse_fields
+from ..responses import conditional_json_response
+from ..similarity_index import similarity_index
+from ..ticket_archive import comment_model, get_archived_ticket, history_model
+from ..ticket_bulk import apply_bulk_operation
+from ..ticket_workflow import action_for_status, ensure_transition
+from ..pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+)
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+VIEW_DESCRIPTION = (
+    "full : tickets avec creator/technician complets ; compact : ids des tickets "
+    "et dictionnaire \"users\" chargé une seule fois"
+)
+FIELDS_DESCRIPTION = "Liste de champs séparés par des virgules (active la vue compacte)"
+INCLUDE_ARCHIVED_DESCRIPTION = "Inclure les tickets archivés dans la recherche (après les tickets actifs)"
+# Vue complète ou compacte (view=compact / fields=) : réponses construites par _list_tickets
+TICKET_LIST_RESPONSE = Union[List[schemas.TicketRead], schemas.TicketCompactList]
+
+
+def _apply_search(query, search: Optional[str], model=models.Ticket):
+    """Applique le filtre de recherche (numéro exact, ou ID/Numéro/Titre/Description partiels)"""
+    if not search:
+        return query
+
+    # Essayer de convertir la recherche en nombre pour une recherche exacte
+    search_number = None
+    try:
+        search_number = int(search.strip())
+    except (ValueError, AttributeError):
+        pass
+
+    # Construire le filtre de recherche
+    if search_number is not None:
+        # Si la recherche est un nombre pur, faire UNIQUEMENT une recherche exacte par numéro de ticket
+        # (le numéro visible par l'utilisateur, pas l'ID interne)
+        # Cela évite les faux positifs si l'ID diffère du numéro
+        search_conditions = [
+            model.number == search_number  # Recherche exacte par numéro uniquement
+        ]
+    else:
+        # Si ce n'est pas un nombre, faire une recherche partielle sur tous les champs
+        search_conditions = [
+            cast(model.id, String).ilike(f"%{search}%"),
+            model.title.ilike(f"%{search}%"),
+            model.description.ilike(f"%{search}%"),
+            cast(model.number, String).ilike(f"%{search}%")
+        ]
+
+    return query.filter(or_(*search_conditions))
+
+
+def _archived_search(db: Session, search: Optional[str], include_archived: bool):
+    """Requête des tickets archivés correspondant à la recherche (None sans include_archived)"""
+    if not include_archived:
+        return None
+    if not search:
+        # Sans filtre, l'archive entière serait renvoyée
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="include_archived requires a search term",
+        )
+    return _apply_search(db.query(models.TicketArchive), search, models.TicketArchive)
+
+
+def _list_tickets(db: Session, request: Request, query, view: str, fields: Optional[str], archived_query=None):
+    """
+    Exécute une requête de liste en vue complète ou compacte (réponse JSON avec ETag).
+    archived_query : tickets archivés à ajouter après les tickets actifs
+    """
+    query = query.order_by(models.Ticket.created_at.desc())
+    if archived_query is not None:
+        archived_query = archived_query.order_by(models.TicketArchive.created_at.desc())
+    if view == "compact" or fields:
+        return compact_ticket_response(db, request, query, parse_fields(fields), archived_query)
+
+    tickets = (
+        query.options(
+            joinedload(models.Ticket.creator),
+            joinedload(models.Ticket.technician)
+        )
+        .all()
+    )
+    if archived_query is not None:
+        tickets += archived_query.options(
+            joinedload(models.TicketArchive.creator),
+            joinedload(models.TicketArchive.technician),
+        ).all()
+    body = schemas.TicketReadList.dump_json(
+        schemas.TicketReadList.validate_python(tickets, from_attributes=True)
+    )
+    return conditional_json_response(request, body)
+
 
 @router.post("/", response_model=schemas.TicketRead)
 def create_ticket(
@@ -22,11 +124,10 @@ def create_ticket(
 ):
     """Créer un nouveau ticket"""
     # Générer le numéro de ticket automatiquement
-    # Récupérer le dernier numéro de ticket
-    last_ticket = db.query(models.Ticket).order_by(models.Ticket.number.desc()).first()
-    next_number = 1
-    if last_ticket and last_ticket.number:
-        next_number = last_ticket.number + 1
+    # Dernier numéro attribué : tickets actifs et archivés (les plus récents peuvent tous être archivés)
+    last_active = db.query(func.max(models.Ticket.number)).scalar() or 0
+    last_archived = db.query(func.max(models.TicketArchive.number)).scalar() or 0
+    next_number = max(last_active, last_archived) + 1
     
     ticket = models.Ticket(
         number=next_number,  # Assigner le numéro généré
@@ -42,6 +143,8 @@ def create_ticket(
     db.add(ticket)
     db.commit()
     db.refresh(ticket)
+    # Signature MinHash pour la détection des doublons et problèmes récurrents
+    similarity_index.index_ticket(db, ticket)
     
     # Créer une notification pour les Secrétaires/Adjoints DSI, DSI et Admin
     # Récupérer tous les utilisateurs concernés (Secrétaire DSI, Adjoint DSI, DSI, Admin)
@@ -52,6 +155,7 @@ def create_ticket(
     
     # Préparer l'envoi d'emails en arrière-plan (asynchrone)
     notified_users = []
+    deliveries = []
     if target_roles:
         for role in target_roles:
             users = (
@@ -77,19 +181,22 @@ def create_ticket(
                 # Ajouter l'utilisateur à la liste pour l'envoi d'emails (éviter doublons par email)
                 if user.email and user.email.strip() and user.email not in [u.email for u in notified_users if u.email]:
                     notified_users.append(user)
+                    deliveries.append(EmailDelivery.for_notification(notification, ticket.priority))
         
         db.commit()
         
-        # Ajouter les tâches d'envoi d'emails en arrière-plan
-        for user in notified_users:
+        # Une seule tâche d'envoi en arrière-plan : les emails sont rendus en une passe
+        # (les destinataires en mode récapitulatif sont mis en attente)
+        if notified_users:
             background_tasks.add_task(
-                email_service.send_ticket_created_notification_with_actions,
+                deliver_many,
+                deliveries,
+                [(user.email, user.role.name if user.role else "") for user in notified_users],
+                email_service.send_ticket_created_notifications_with_actions,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
                 ticket_title=ticket.title,
-                creator_name=current_user.full_name,
-                recipient_email=user.email,
-                recipient_role=user.role.name if user.role else ""
+                creator_name=current_user.full_name
             )
     
     # Créer une notification pour le créateur du ticket
@@ -101,11 +208,14 @@ def create_ticket(
         read=False
     )
     db.add(creator_notification)
+    creator_delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
     db.commit()
     
     # Envoyer un email de confirmation au créateur en arrière-plan (asynchrone)
     if current_user.email and current_user.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            creator_delivery,
             email_service.send_ticket_created_to_creator_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -114,6 +224,18 @@ def create_ticket(
             creator_name=current_user.full_name
         )
     
+    # Mode automatique : assigner directement le technicien le moins chargé de la spécialisation
+    if AUTO_ASSIGNMENT_MODE == "auto":
+        candidate = assignment_engine.pick(db, ticket.type)
+        technician = db.get(models.User, candidate.technician_id) if candidate else None
+        if technician:
+            _assign_to_technician(
+                db, ticket, technician, background_tasks,
+                secretary_id=None,
+                actor_id=current_user.id,
+                reason="Assignation automatique",
+            )
+    
     # Charger les relations pour la réponse
     ticket = (
         db.query(models.Ticket)
@@ -128,122 +250,54 @@ def create_ticket(
     return ticket
 
 
-@router.get("/me", response_model=List[schemas.TicketRead])
+@router.get("/me", response_model=TICKET_LIST_RESPONSE)
 def list_my_tickets(
+    request: Request,
+    view: str = Query("full", pattern="^(full|compact)$", description=VIEW_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """Liste des tickets créés par l'utilisateur connecté"""
-    tickets = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.creator),
-            joinedload(models.Ticket.technician)
-        )
-        .filter(models.Ticket.creator_id == current_user.id)
-        .order_by(models.Ticket.created_at.desc())
-        .all()
-    )
-    return tickets
+    query = db.query(models.Ticket).filter(models.Ticket.creator_id == current_user.id)
+    return _list_tickets(db, request, query, view, fields)
 
 
-@router.get("/", response_model=List[schemas.TicketRead])
+@router.get("/", response_model=TICKET_LIST_RESPONSE)
 def list_all_tickets(
+    request: Request,
     search: Optional[str] = Query(None, description="Rechercher par ID, Numéro, Titre ou Description"),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
+    view: str = Query("full", pattern="^(full|compact)$", description=VIEW_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(
         require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
     ),
 ):
     """Liste de tous les tickets (pour secrétaire/adjoint/DSI/admin)"""
-    query = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.creator),
-            joinedload(models.Ticket.technician)
-        )
-    )
-    
-    # Ajouter le filtre de recherche si fourni
-    if search:
-        # Essayer de convertir la recherche en nombre pour une recherche exacte
-        search_number = None
-        try:
-            search_number = int(search.strip())
-        except (ValueError, AttributeError):
-            pass
-        
-        # Construire le filtre de recherche
-        if search_number is not None:
-            # Si la recherche est un nombre pur, faire UNIQUEMENT une recherche exacte par numéro de ticket
-            # (le numéro visible par l'utilisateur, pas l'ID interne)
-            # Cela évite les faux positifs si l'ID diffère du numéro
-            search_conditions = [
-                models.Ticket.number == search_number  # Recherche exacte par numéro uniquement
-            ]
-        else:
-            # Si ce n'est pas un nombre, faire une recherche partielle sur tous les champs
-            search_conditions = [
-                cast(models.Ticket.id, String).ilike(f"%{search}%"),
-                models.Ticket.title.ilike(f"%{search}%"),
-                models.Ticket.description.ilike(f"%{search}%"),
-                cast(models.Ticket.number, String).ilike(f"%{search}%")
-            ]
-        
-        search_filter = or_(*search_conditions)
-        query = query.filter(search_filter)
-    
-    tickets = query.order_by(models.Ticket.created_at.desc()).all()
-    return tickets
+    query = _apply_search(db.query(models.Ticket), search)
+    archived_query = _archived_search(db, search, include_archived)
+    return _list_tickets(db, request, query, view, fields, archived_query)
 
 
-@router.get("/assigned", response_model=List[schemas.TicketRead])
+@router.get("/assigned", response_model=TICKET_LIST_RESPONSE)
 def list_assigned_tickets(
+    request: Request,
     search: Optional[str] = Query(None, description="Rechercher par ID, Numéro, Titre ou Description"),
+    include_archived: bool = Query(False, description=INCLUDE_ARCHIVED_DESCRIPTION),
+    view: str = Query("full", pattern="^(full|compact)$", description=VIEW_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     """Liste des tickets assignés au technicien connecté"""
-    query = (
-        db.query(models.Ticket)
-        .options(
-            joinedload(models.Ticket.creator),
-            joinedload(models.Ticket.technician)
-        )
-        .filter(models.Ticket.technician_id == current_user.id)
-    )
-    
-    # Ajouter le filtre de recherche si fourni
-    if search:
-        # Essayer de convertir la recherche en nombre pour une recherche exacte
-        search_number = None
-        try:
-            search_number = int(search.strip())
-        except (ValueError, AttributeError):
-            pass
-        
-        # Construire le filtre de recherche
-        if search_number is not None:
-            # Si la recherche est un nombre pur, faire UNIQUEMENT une recherche exacte par numéro de ticket
-            # (le numéro visible par l'utilisateur, pas l'ID interne)
-            # Cela évite les faux positifs si l'ID diffère du numéro
-            search_conditions = [
-                models.Ticket.number == search_number  # Recherche exacte par numéro uniquement
-            ]
-        else:
-            # Si ce n'est pas un nombre, faire une recherche partielle sur tous les champs
-            search_conditions = [
-                cast(models.Ticket.id, String).ilike(f"%{search}%"),
-                models.Ticket.title.ilike(f"%{search}%"),
-                models.Ticket.description.ilike(f"%{search}%"),
-                cast(models.Ticket.number, String).ilike(f"%{search}%")
-            ]
-        
-        search_filter = or_(*search_conditions)
-        query = query.filter(search_filter)
-
-    tickets = query.order_by(models.Ticket.created_at.desc()).all()
-    return tickets
+    query = db.query(models.Ticket).filter(models.Ticket.technician_id == current_user.id)
+    query = _apply_search(query, search)
+    archived_query = _archived_search(db, search, include_archived)
+    if archived_query is not None:
+        archived_query = archived_query.filter(models.TicketArchive.technician_id == current_user.id)
+    return _list_tickets(db, request, query, view, fields, archived_query)
 
 
 @router.get("/{ticket_id}", response_model=schemas.TicketRead)
@@ -252,7 +306,7 @@ def get_ticket(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Récupérer un ticket par son ID"""
+    """Récupérer un ticket par son ID (ticket actif ou archivé)"""
     ticket = (
         db.query(models.Ticket)
         .options(
@@ -261,7 +315,7 @@ def get_ticket(
         )
         .filter(models.Ticket.id == ticket_id)
         .first()
-    )
+    ) or get_archived_ticket(db, ticket_id)
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
@@ -305,6 +359,10 @@ def edit_ticket(
     if ticket.technician_id is not None or ticket.status in blocked_statuses:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Le ticket est déjà en cours de traitement")
 
+    text_changed = (
+        (ticket_in.title is not None and ticket_in.title != ticket.title)
+        or (ticket_in.description is not None and ticket_in.description != ticket.description)
+    )
     if ticket_in.title is not None:
         ticket.title = ticket_in.title
     if ticket_in.description is not None:
@@ -327,6 +385,8 @@ def edit_ticket(
 
     db.commit()
     db.refresh(ticket)
+    if text_changed:
+        similarity_index.index_ticket(db, ticket)
 
     ticket = (
         db.query(models.Ticket)
@@ -366,69 +426,118 @@ def delete_ticket(
 
     # Supprimer les notifications liées au ticket avant de supprimer le ticket
     try:
+        # DELETE en masse : retirer d'abord les non lues des compteurs des destinataires
+        unread_deltas = {user_id: -count for user_id, count in unread_counts_for_ticket(db, ticket.id).items()}
         db.query(models.Notification).filter(models.Notification.ticket_id == ticket.id).delete()
+        apply_unread_deltas(db, unread_deltas)
+        # Emails en attente d'un récapitulatif (mode digest) : ils référencent le ticket
+        db.query(models.EmailDigestItem).filter(models.EmailDigestItem.ticket_id == ticket.id).delete()
         # Les comments et history sont supprimés automatiquement grâce au cascade
         db.delete(ticket)
         db.commit()
+        similarity_index.remove(ticket_id)
     except Exception as e:
         db.rollback()
-        print(f"[DELETE] Erreur lors de la suppression du ticket: {e}")
+        logger.exception("Erreur lors de la suppression du ticket", extra={"ticket_id": ticket_id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la suppression du ticket: {str(e)}"
         )
 
 
-@router.put("/{ticket_id}/assign", response_model=schemas.TicketRead)
-def assign_ticket(
-    ticket_id: int,
-    assign_data: schemas.TicketAssign,
+@router.post("/bulk", response_model=schemas.TicketBulkResult)
+def bulk_ticket_operation(
+    operation: schemas.TicketBulkOperation,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(
         require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
     ),
 ):
-    """Assigner un ticket à un technicien"""
-    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
-    if not ticket:
+    """
+    Assigner, clôturer ou changer la priorité de plusieurs tickets en une requête.
+    Résultat par ticket : 200 (appliqué), 404 (introuvable) ou 409 (statut incompatible
+    ou ticket modifié entre-temps). Un seul email récapitulatif par destinataire.
+    """
+    if operation.action == "assign":
+        if operation.technician_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="technician_id is required for assign"
+            )
+        technician = db.query(models.User).filter(models.User.id == operation.technician_id).first()
+        if not technician:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Technician not found"
+            )
+    elif operation.action == "reprioritize" and operation.priority is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
+            status_code=status.HTTP_400_BAD_REQUEST, detail="priority is required for reprioritize"
         )
-    
-    # Vérifier que le technicien existe
-    technician = db.query(models.User).filter(models.User.id == assign_data.technician_id).first()
-    if not technician:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Technician not found"
+
+    results, emails = apply_bulk_operation(db, operation, current_user)
+    db.commit()
+
+    # Envoyer les emails récapitulatifs en arrière-plan (asynchrone), hors tickets
+    # mis en attente du récapitulatif périodique (destinataires en mode digest)
+    for email in emails:
+        background_tasks.add_task(
+            deliver_ticket_summary,
+            email.deliveries,
+            email.tickets,
+            email_service.send_tickets_bulk_summary,
+            template=email.template,
+            recipient_email=email.recipient_email,
+            recipient_name=email.recipient_name,
+            notes=email.notes,
         )
-    
+
+    succeeded = sum(1 for result in results if result.status_code == status.HTTP_200_OK)
+    return schemas.TicketBulkResult(
+        action=operation.action,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+    )
+
+
+def _assign_to_technician(
+    db: Session,
+    ticket: models.Ticket,
+    technician: models.User,
+    background_tasks: BackgroundTasks,
+    secretary_id: Optional[int],
+    actor_id: int,
+    reason: Optional[str] = None,
+    notes: Optional[str] = None,
+) -> None:
+    """Assigne le ticket (historique, notifications, commit) et programme les emails"""
     # Enregistrer l'ancien statut pour l'historique
     old_status = ticket.status
+    new_status = ensure_transition(ticket, "assign")
     
     # Assigner le ticket
-    ticket.technician_id = assign_data.technician_id
-    ticket.secretary_id = current_user.id
-    ticket.status = models.TicketStatus.ASSIGNE_TECHNICIEN
+    ticket.technician_id = technician.id
+    ticket.secretary_id = secretary_id
+    ticket.status = new_status
     ticket.assigned_at = datetime.utcnow()
     
     # Créer une entrée d'historique avec notes/instructions
-    history_reason = assign_data.reason or ""
-    if assign_data.notes:
-        history_reason += f" | Instructions: {assign_data.notes}"
+    history_reason = reason or ""
+    if notes:
+        history_reason += f" | Instructions: {notes}"
     
     history = models.TicketHistory(
         ticket_id=ticket.id,
         old_status=old_status,
         new_status=ticket.status,
-        user_id=current_user.id,
+        user_id=actor_id,
         reason=history_reason,
     )
     db.add(history)
     
     # Créer une notification pour le technicien
     notification = models.Notification(
-        user_id=assign_data.technician_id,
+        user_id=technician.id,
         type=models.NotificationType.ASSIGNATION,
         ticket_id=ticket.id,
         message=f"Un nouveau ticket #{ticket.number} vous a été assigné: {ticket.title}",
@@ -445,6 +554,8 @@ def assign_ticket(
         read=False
     )
     db.add(creator_notification)
+    technician_delivery = EmailDelivery.for_notification(notification, ticket.priority)
+    creator_delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
     
     db.commit()
     db.refresh(ticket)
@@ -455,6 +566,8 @@ def assign_ticket(
     # Envoyer les emails en arrière-plan (asynchrone)
     if technician.email and technician.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            technician_delivery,
             email_service.send_ticket_assigned_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -462,11 +575,13 @@ def assign_ticket(
             technician_email=technician.email,
             technician_name=technician.full_name,
             priority=ticket.priority,
-            notes=assign_data.notes
+            notes=notes
         )
     
     if creator and creator.email and creator.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            creator_delivery,
             email_service.send_ticket_assigned_to_creator_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -475,6 +590,94 @@ def assign_ticket(
             creator_name=creator.full_name,
             technician_name=technician.full_name
         )
+
+
+@router.get("/{ticket_id}/similar", response_model=List[schemas.SimilarTicket])
+def get_similar_tickets(
+    ticket_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Technicien", "Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """Tickets au texte proche (doublons, problèmes récurrents), les plus similaires d'abord"""
+    ticket = db.query(models.Ticket.id).filter(models.Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
+        )
+    scored = similarity_index.similar(db, ticket_id, limit=limit)
+    if not scored:
+        return []
+    tickets = {
+        t.id: t
+        for t in db.query(models.Ticket).filter(models.Ticket.id.in_([similar_id for similar_id, _ in scored])).all()
+    }
+    return [
+        schemas.SimilarTicket(
+            id=t.id, number=t.number, title=t.title, status=t.status,
+            created_at=t.created_at, similarity=round(similarity, 3),
+        )
+        for similar_id, similarity in scored
+        if (t := tickets.get(similar_id))
+    ]
+
+
+@router.get("/{ticket_id}/assignment-suggestions", response_model=schemas.AssignmentSuggestions)
+def get_assignment_suggestions(
+    ticket_id: int,
+    limit: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """Techniciens proposés pour un ticket : spécialisation du type de ticket, les moins chargés d'abord"""
+    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
+        )
+    candidates = assignment_engine.candidates(db, ticket.type, limit=limit, exclude=ticket.technician_id)
+    return schemas.AssignmentSuggestions(
+        ticket_id=ticket.id,
+        candidates=[schemas.AssignmentCandidate(**candidate._asdict()) for candidate in candidates],
+    )
+
+
+@router.put("/{ticket_id}/assign", response_model=schemas.TicketRead)
+def assign_ticket(
+    ticket_id: int,
+    assign_data: schemas.TicketAssign,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(
+        require_role("Secrétaire DSI", "Adjoint DSI", "DSI", "Admin")
+    ),
+):
+    """Assigner un ticket à un technicien"""
+    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
+        )
+    ensure_transition(ticket, "assign")
+    
+    # Vérifier que le technicien existe
+    technician = db.query(models.User).filter(models.User.id == assign_data.technician_id).first()
+    if not technician:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Technician not found"
+        )
+    
+    _assign_to_technician(
+        db, ticket, technician, background_tasks,
+        secretary_id=current_user.id,
+        actor_id=current_user.id,
+        reason=assign_data.reason,
+        notes=assign_data.notes,
+    )
     
     # Charger les relations pour la réponse
     ticket = (
@@ -513,6 +716,7 @@ def reassign_ticket(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ticket is not assigned yet. Use /assign instead."
         )
+    ensure_transition(ticket, "reassign")
     
     # Vérifier que le technicien existe
     technician = db.query(models.User).filter(models.User.id == assign_data.technician_id).first()
@@ -580,6 +784,8 @@ def reassign_ticket(
         read=False
     )
     db.add(creator_notification)
+    technician_delivery = EmailDelivery.for_notification(notification, ticket.priority)
+    creator_delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
     
     # Récupérer le créateur pour l'email
     creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
@@ -591,6 +797,8 @@ def reassign_ticket(
     # Envoyer un email de notification au nouveau technicien en arrière-plan (asynchrone)
     if technician.email and technician.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            technician_delivery,
             email_service.send_ticket_assigned_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -604,6 +812,8 @@ def reassign_ticket(
     # Envoyer un email au créateur pour le changement de technicien
     if creator and creator.email and creator.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            creator_delivery,
             email_service.send_technician_changed_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -642,6 +852,7 @@ def escalate_ticket(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
         )
+    ensure_transition(ticket, "escalate")
     
     old_priority = ticket.priority
     old_status = ticket.status
@@ -745,6 +956,7 @@ def update_ticket_status(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
         )
+    ensure_transition(ticket, action_for_status(status_update.status))
     
     # Récupérer le créateur pour les emails
     creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
@@ -773,6 +985,8 @@ def update_ticket_status(
         # Envoyer un email au créateur
         if creator and creator.email and creator.email.strip():
             background_tasks.add_task(
+                deliver_email,
+                EmailDelivery.for_notification(notification, ticket.priority),
                 email_service.send_ticket_resolved_notification,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
@@ -803,6 +1017,8 @@ def update_ticket_status(
         # Envoyer un email au créateur
         if creator and creator.email and creator.email.strip():
             background_tasks.add_task(
+                deliver_email,
+                EmailDelivery.for_notification(creator_notification, ticket.priority),
                 email_service.send_ticket_closed_notification_to_user,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
@@ -842,6 +1058,8 @@ def update_ticket_status(
         # Envoyer un email au créateur
         if creator and creator.email and creator.email.strip() and technician:
             background_tasks.add_task(
+                deliver_email,
+                EmailDelivery.for_notification(creator_notification, ticket.priority),
                 email_service.send_ticket_in_progress_notification,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
@@ -864,6 +1082,8 @@ def update_ticket_status(
         # Envoyer un email au créateur
         if creator and creator.email and creator.email.strip():
             background_tasks.add_task(
+                deliver_email,
+                EmailDelivery.for_notification(creator_notification, ticket.priority),
                 email_service.send_ticket_rejected_notification_to_user,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
@@ -944,11 +1164,14 @@ def add_comment(
                 read=False
             )
             db.add(notification)
+            delivery = EmailDelivery.for_notification(notification, ticket.priority)
             db.commit()
             
             # Envoyer un email au créateur
             if creator.email and creator.email.strip():
                 background_tasks.add_task(
+                    deliver_email,
+                    delivery,
                     email_service.send_comment_notification_to_user,
                     ticket_id=str(ticket.id),
                     ticket_number=ticket.number,
@@ -968,17 +1191,18 @@ def get_ticket_comments(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Récupérer tous les commentaires d'un ticket"""
-    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
+    """Récupérer tous les commentaires d'un ticket (ticket actif ou archivé)"""
+    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first() or get_archived_ticket(db, ticket_id)
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
         )
     
+    model = comment_model(ticket)
     comments = (
-        db.query(models.Comment)
-        .filter(models.Comment.ticket_id == ticket_id)
-        .order_by(models.Comment.created_at.asc())
+        db.query(model)
+        .filter(model.ticket_id == ticket_id)
+        .order_by(model.created_at.asc())
         .all()
     )
     return comments
@@ -1007,11 +1231,7 @@ def validate_ticket_resolution(
         )
     
     # Vérifier que le ticket est en statut "résolu"
-    if ticket.status != models.TicketStatus.RESOLU:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ticket must be resolved before validation"
-        )
+    ensure_transition(ticket, "validate" if validation.validated else "reject_resolution")
     
     old_status = ticket.status
     
@@ -1037,6 +1257,8 @@ def validate_ticket_resolution(
         # Envoyer un email au créateur
         if creator and creator.email and creator.email.strip():
             background_tasks.add_task(
+                deliver_email,
+                EmailDelivery.for_notification(creator_notification, ticket.priority),
                 email_service.send_ticket_closed_notification_to_user,
                 ticket_id=str(ticket.id),
                 ticket_number=ticket.number,
@@ -1083,7 +1305,10 @@ def validate_ticket_resolution(
             db.add(notification)
             technician = db.query(models.User).filter(models.User.id == ticket.technician_id).first()
             if technician and technician.email and technician.email.strip():
-                email_service.send_ticket_rejected_notification(
+                background_tasks.add_task(
+                    deliver_email,
+                    EmailDelivery.for_notification(notification, ticket.priority),
+                    email_service.send_ticket_rejected_notification,
                     ticket_number=ticket.number,
                     ticket_title=ticket.title,
                     technician_email=technician.email,
@@ -1151,6 +1376,7 @@ def delegate_to_adjoint(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
         )
+    ensure_transition(ticket, "delegate_adjoint")
     adjoint = db.query(models.User).filter(models.User.id == delegate_data.adjoint_id).first()
     if not adjoint or not adjoint.role or adjoint.role.name != "Adjoint DSI":
         raise HTTPException(
@@ -1180,11 +1406,14 @@ def delegate_to_adjoint(
         read=False
     )
     db.add(notification)
+    delivery = EmailDelivery.for_notification(notification, ticket.priority)
     db.commit()
     
     # Envoyer un email à l'adjoint DSI en arrière-plan
     if adjoint.email and adjoint.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            delivery,
             email_service.send_ticket_delegated_to_adjoint_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -1228,11 +1457,7 @@ def accept_assignment(
             detail="This ticket is not assigned to you"
         )
     
-    if ticket.status != models.TicketStatus.ASSIGNE_TECHNICIEN:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ticket is not in assigned status"
-        )
+    ensure_transition(ticket, "accept_assignment")
     
     # Le technicien accepte, le statut reste "assigné" (il peut ensuite "prendre en charge")
     # On crée une entrée d'historique pour tracer l'acceptation
@@ -1280,16 +1505,12 @@ def reject_assignment(
             detail="This ticket is not assigned to you"
         )
     
-    if ticket.status != models.TicketStatus.ASSIGNE_TECHNICIEN:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ticket is not in assigned status"
-        )
+    new_status = ensure_transition(ticket, "reject_assignment")
     
     # Remettre le ticket en attente d'analyse pour réassignation
     old_status = ticket.status
     ticket.technician_id = None
-    ticket.status = models.TicketStatus.EN_ATTENTE_ANALYSE
+    ticket.status = new_status
     
     # Créer une entrée d'historique
     history = models.TicketHistory(
@@ -1349,11 +1570,7 @@ def submit_ticket_feedback(
         )
     
     # Vérifier que le ticket est clôturé
-    if ticket.status != models.TicketStatus.CLOTURE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Feedback can only be submitted for closed tickets"
-        )
+    ensure_transition(ticket, "feedback")
     
     # Vérifier le score (1-5)
     if feedback.score < 1 or feedback.score > 5:
@@ -1411,11 +1628,7 @@ def reopen_ticket_by_user(
         )
     
     # Vérifier que le ticket est clôturé
-    if ticket.status != models.TicketStatus.CLOTURE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Ticket is not closed"
-        )
+    new_status = ensure_transition(ticket, "reopen_by_user")
     
     # Vérifier que moins de 7 jours se sont écoulés depuis la clôture automatique
     now = datetime.utcnow()
@@ -1429,7 +1642,7 @@ def reopen_ticket_by_user(
     old_status = ticket.status
     
     # Réouvrir le ticket : remettre en attente d'analyse
-    ticket.status = models.TicketStatus.EN_ATTENTE_ANALYSE
+    ticket.status = new_status
     ticket.auto_closed_at = None  # Réinitialiser le flag de clôture automatique
     ticket.closed_at = None  # Réinitialiser la date de clôture
     ticket.resolved_at = None  # Réinitialiser la date de résolution
@@ -1454,6 +1667,7 @@ def reopen_ticket_by_user(
         read=False
     )
     db.add(creator_notification)
+    creator_delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
     
     # Notifier les secrétaires/adjoints/DSI
     target_roles = db.query(models.Role).filter(
@@ -1487,6 +1701,8 @@ def reopen_ticket_by_user(
     creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
     if creator and creator.email and creator.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            creator_delivery,
             email_service.send_ticket_reopened_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -1527,11 +1743,7 @@ def reopen_ticket(
         )
     
     # Vérifier que le ticket est rejeté
-    if ticket.status != models.TicketStatus.REJETE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only rejected tickets can be reopened"
-        )
+    new_status = ensure_transition(ticket, "reopen")
     
     # Vérifier que le technicien existe
     technician = db.query(models.User).filter(models.User.id == assign_data.technician_id).first()
@@ -1545,7 +1757,7 @@ def reopen_ticket(
     # Réassigner et remettre en statut "assigné"
     ticket.technician_id = assign_data.technician_id
     ticket.secretary_id = current_user.id
-    ticket.status = models.TicketStatus.ASSIGNE_TECHNICIEN
+    ticket.status = new_status
     ticket.assigned_at = datetime.utcnow()
     
     # Créer une entrée d'historique
@@ -1569,6 +1781,7 @@ def reopen_ticket(
             read=False
         )
         db.add(creator_notification)
+        creator_delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
     
     db.commit()
     db.refresh(ticket)
@@ -1576,6 +1789,8 @@ def reopen_ticket(
     # Envoyer un email au créateur
     if creator and creator.email and creator.email.strip():
         background_tasks.add_task(
+            deliver_email,
+            creator_delivery,
             email_service.send_ticket_reopened_notification,
             ticket_id=str(ticket.id),
             ticket_number=ticket.number,
@@ -1603,8 +1818,8 @@ def get_ticket_history(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    """Récupérer l'historique d'un ticket"""
-    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
+    """Récupérer l'historique d'un ticket (ticket actif ou archivé)"""
+    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first() or get_archived_ticket(db, ticket_id)
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found"
@@ -1620,12 +1835,140 @@ def get_ticket_history(
             status_code=status.HTTP_403_FORBIDDEN, detail="Access denied"
         )
     
+    model = history_model(ticket)
     history = (
-        db.query(models.TicketHistory)
-        .options(joinedload(models.TicketHistory.user))
-        .filter(models.TicketHistory.ticket_id == ticket_id)
-        .order_by(models.TicketHistory.changed_at.desc())
+        db.query(model)
+        .options(joinedload(model.user).joinedload(models.User.role))
+        .filter(model.ticket_id == ticket_id)
+        .order_by(model.changed_at.desc())
         .all()
     )
     
     return history
+
+
+# Rang de chaque source dans la timeline (départage les éléments de même horodatage)
+COMMENT_RANK = 0
+HISTORY_RANK = 1
+
+
+def _fetch_comments(db: Session, ticket, cursor, limit: int, descending: bool):
+    """Lit une page de commentaires avec leurs auteurs (selectinload : une requête par relation)"""
+    model = comment_model(ticket)
+    query = (
+        db.query(model)
+        .options(selectinload(model.user).selectinload(models.User.role))
+        .filter(model.ticket_id == ticket.id)
+    )
+    if cursor:
+        query = query.filter(
+            keyset_filter(model.created_at, model.id, COMMENT_RANK, cursor, descending)
+        )
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    return query.limit(limit).all()
+
+
+def _fetch_history(db: Session, ticket, cursor, limit: int, descending: bool):
+    """Lit une page d'historique avec les utilisateurs concernés"""
+    model = history_model(ticket)
+    query = (
+        db.query(model)
+        .options(selectinload(model.user).selectinload(models.User.role))
+        .filter(model.ticket_id == ticket.id)
+    )
+    if cursor:
+        query = query.filter(
+            keyset_filter(model.changed_at, model.id, HISTORY_RANK, cursor, descending)
+        )
+    if descending:
+        query = query.order_by(model.changed_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.changed_at.asc(), model.id.asc())
+    return query.limit(limit).all()
+
+
+@router.get("/{ticket_id}/comments/page", response_model=schemas.CommentPage)
+def get_ticket_comments_page(
+    ticket_id: int,
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Récupérer les commentaires d'un ticket, paginés par curseur"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+
+    comments = _fetch_comments(db, ticket, decode_cursor(cursor), limit + 1, order == "desc")
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        last = comments[-1]
+        next_cursor = encode_cursor(last.created_at, COMMENT_RANK, last.id)
+    return {"items": comments, "next_cursor": next_cursor}
+
+
+@router.get("/{ticket_id}/history/page", response_model=schemas.TicketHistoryPage)
+def get_ticket_history_page(
+    ticket_id: int,
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Récupérer l'historique d'un ticket, paginé par curseur"""
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+
+    history = _fetch_history(db, ticket, decode_cursor(cursor), limit + 1, order == "desc")
+    next_cursor = None
+    if len(history) > limit:
+        history = history[:limit]
+        last = history[-1]
+        next_cursor = encode_cursor(last.changed_at, HISTORY_RANK, last.id)
+    return {"items": history, "next_cursor": next_cursor}
+
+
+@router.get("/{ticket_id}/timeline", response_model=schemas.TimelinePage)
+def get_ticket_timeline(
+    ticket_id: int,
+    cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """
+    Timeline d'un ticket : commentaires et historique fusionnés côté serveur
+    en un seul flux ordonné, paginé par curseur.
+    """
+    ticket = get_accessible_ticket(db, ticket_id, current_user, include_archived=True)
+    descending = order == "desc"
+    position = decode_cursor(cursor)
+
+    # Chaque source fournit au plus limit + 1 éléments après le curseur ;
+    # la fusion garde les limit premiers de l'ensemble
+    entries = [
+        (comment.created_at, COMMENT_RANK, comment.id, "comment", comment)
+        for comment in _fetch_comments(db, ticket, position, limit + 1, descending)
+    ] + [
+        (history.changed_at, HISTORY_RANK, history.id, "history", history)
+        for history in _fetch_history(db, ticket, position, limit + 1, descending)
+    ]
+    entries.sort(key=lambda e: (e[0], e[1], e[2]), reverse=descending)
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        next_cursor = encode_cursor(last[0], last[1], last[2])
+
+    items = [
+        {"kind": kind, "timestamp": timestamp, kind: item}
+        for timestamp, _rank, _id, kind, item in entries
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
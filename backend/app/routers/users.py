@@ -1,15 +1,14 @@
 from typing import List
 import secrets
 import string
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from .. import models, schemas
+from .. import analytics, models, schemas
 from ..database import get_db
-from ..security import get_current_user, require_role, get_password_hash
+from ..security import get_current_user, require_role, get_password_hash, revoke_user_tokens
 
 router = APIRouter()
 
@@ -44,28 +43,31 @@ def list_technicians(
         .all()
     )
     
-    # Ajouter la charge de travail pour chaque technicien
-    result = []
-    for tech in technicians:
-        assigned_count = (
-            db.query(models.Ticket)
-            .filter(
-                models.Ticket.technician_id == tech.id,
+    # Charge de travail de tous les techniciens en une requête groupée (au lieu de deux par technicien)
+    workload = {
+        row.technician_id: row
+        for row in db.query(
+            models.Ticket.technician_id,
+            func.count().filter(
                 models.Ticket.status.in_([
                     models.TicketStatus.ASSIGNE_TECHNICIEN,
                     models.TicketStatus.EN_COURS
                 ])
-            )
-            .count()
-        )
-        in_progress_count = (
-            db.query(models.Ticket)
-            .filter(
-                models.Ticket.technician_id == tech.id,
+            ).label("assigned_count"),
+            func.count().filter(
                 models.Ticket.status == models.TicketStatus.EN_COURS
-            )
-            .count()
+            ).label("in_progress_count"),
         )
+        .filter(models.Ticket.technician_id.in_([tech.id for tech in technicians]))
+        .group_by(models.Ticket.technician_id)
+    } if technicians else {}
+
+    # Ajouter la charge de travail pour chaque technicien
+    result = []
+    for tech in technicians:
+        counts = workload.get(tech.id)
+        assigned_count = counts.assigned_count if counts else 0
+        in_progress_count = counts.in_progress_count if counts else 0
         
         tech_dict = {
             "id": tech.id,
@@ -108,132 +110,32 @@ def get_technician_stats(
             detail="Technicien not found"
         )
     
-    # Tickets résolus
-    resolved_tickets = (
-        db.query(models.Ticket)
-        .filter(
-            models.Ticket.technician_id == technician_id,
-            models.Ticket.status == models.TicketStatus.RESOLU
-        )
-        .all()
-    )
-    
-    # Tickets clôturés
-    closed_tickets = (
-        db.query(models.Ticket)
-        .filter(
-            models.Ticket.technician_id == technician_id,
-            models.Ticket.status == models.TicketStatus.CLOTURE
-        )
-        .all()
-    )
+    # Compteurs et moyennes calculés par la base en une requête (voir app.analytics)
+    summary = analytics.technician_summary(db, technician_id)
+    total_assigned = summary["total_assigned"]
+    in_progress_count = summary["in_progress_count"]
+    resolved_this_month = summary["resolved_this_month"]
+    resolved_today = summary["resolved_today"]
     
-    # Calculer le temps moyen de résolution (en jours)
-    # Formule : Temps moyen = (Somme des temps de résolution) / (Nombre de tickets résolus/clôturés)
-    # Temps de résolution = Date de clôture (ou résolution) - Date de création
-    total_resolution_time = 0
-    resolved_count = 0
-    for ticket in resolved_tickets + closed_tickets:
-        if ticket.created_at:
-            # Utiliser closed_at si disponible (ticket clôturé), sinon resolved_at (ticket résolu mais pas encore clôturé)
-            end_date = ticket.closed_at if ticket.closed_at else ticket.resolved_at
-            if end_date:
-                time_diff = (end_date - ticket.created_at).total_seconds() / 86400  # Convertir en jours
-                # Ne compter que si le résultat est valide (différence positive)
-                if time_diff >= 0:
-                    total_resolution_time += time_diff
-                    resolved_count += 1
-    
-    avg_resolution_time = round(total_resolution_time / resolved_count, 1) if resolved_count > 0 else 0
+    # Temps moyen de résolution (en jours) : date de clôture (ou résolution) - date de création
+    resolution_hours_avg = summary["resolution_hours_avg"]
+    avg_resolution_time = round(float(resolution_hours_avg) / 24, 1) if resolution_hours_avg is not None else 0
     
     # Taux de réussite (tickets clôturés / tickets assignés)
-    total_assigned = (
-        db.query(models.Ticket)
-        .filter(models.Ticket.technician_id == technician_id)
-        .count()
-    )
-    
-    success_rate = round((len(closed_tickets) / total_assigned * 100), 1) if total_assigned > 0 else 0
-    
-    # Tickets résolus ce mois
-    first_day_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    resolved_this_month = (
-        db.query(models.Ticket)
-        .filter(
-            models.Ticket.technician_id == technician_id,
-            models.Ticket.status.in_([models.TicketStatus.RESOLU, models.TicketStatus.CLOTURE]),
-            models.Ticket.resolved_at.isnot(None),
-            models.Ticket.resolved_at >= first_day_of_month
-        )
-        .count()
-    )
-    
-    # Compter les tickets en cours pour les statistiques
-    in_progress_count = (
-        db.query(models.Ticket)
-        .filter(
-            models.Ticket.technician_id == technician_id,
-            models.Ticket.status == models.TicketStatus.EN_COURS
-        )
-        .count()
-    )
+    success_rate = round((summary["closed_count"] / total_assigned * 100), 1) if total_assigned > 0 else 0
     
     # Disponibilité basée uniquement sur actif (True/False)
     is_available = technician.actif
     
-    # Calculer le temps de réponse moyen (temps entre assignation et première action du technicien)
-    # Le temps de réponse = temps entre assigned_at et le moment où le ticket passe à "en_cours"
-    total_response_time = 0
-    response_count = 0
-    
-    for ticket in resolved_tickets + closed_tickets:
-        if ticket.assigned_at:
-            # Chercher dans l'historique le moment où le ticket est passé à "en_cours"
-            first_en_cours_history = (
-                db.query(models.TicketHistory)
-                .filter(
-                    models.TicketHistory.ticket_id == ticket.id,
-                    models.TicketHistory.new_status == models.TicketStatus.EN_COURS
-                )
-                .order_by(models.TicketHistory.changed_at.asc())
-                .first()
-            )
-            
-            if first_en_cours_history:
-                # Temps de réponse = temps entre assignation et première prise en charge
-                time_diff = (first_en_cours_history.changed_at - ticket.assigned_at).total_seconds() / 60  # Convertir en minutes
-                if time_diff >= 0:  # S'assurer que le temps est positif
-                    total_response_time += time_diff
-                    response_count += 1
-            # Si pas d'historique "en_cours" mais que le ticket est résolu/clôturé,
-            # on peut utiliser resolved_at comme approximation (mais moins précis)
-            elif ticket.resolved_at and ticket.assigned_at:
-                # Utiliser le temps jusqu'à la résolution comme approximation
-                time_diff = (ticket.resolved_at - ticket.assigned_at).total_seconds() / 60
-                if time_diff >= 0:
-                    total_response_time += time_diff
-                    response_count += 1
-    
-    avg_response_time_minutes = round(total_response_time / response_count, 0) if response_count > 0 else 0
+    # Temps de réponse moyen : assignation -> première prise en charge ("en_cours", à défaut la résolution)
+    response_minutes_avg = summary["response_minutes_avg"]
+    avg_response_time_minutes = round(float(response_minutes_avg), 0) if response_minutes_avg is not None else 0
     
     # Calculer la charge de travail (basée sur les tickets en cours, max 5)
     max_workload = 5
     current_workload = min(in_progress_count, max_workload)
     workload_ratio = f"{current_workload}/{max_workload}"
     
-    # Tickets résolus aujourd'hui
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    resolved_today = (
-        db.query(models.Ticket)
-        .filter(
-            models.Ticket.technician_id == technician_id,
-            models.Ticket.status.in_([models.TicketStatus.RESOLU, models.TicketStatus.CLOTURE]),
-            models.Ticket.resolved_at.isnot(None),
-            models.Ticket.resolved_at >= today_start
-        )
-        .count()
-    )
-    
     return {
         "id": str(technician.id),
         "full_name": technician.full_name,
@@ -245,8 +147,8 @@ def get_technician_stats(
         "last_login_at": technician.last_login_at.isoformat() if technician.last_login_at else None,
         "assigned_tickets_count": total_assigned,
         "in_progress_tickets_count": in_progress_count,
-        "resolved_tickets_count": len(resolved_tickets),
-        "closed_tickets_count": len(closed_tickets),
+        "resolved_tickets_count": summary["resolved_count"],
+        "closed_tickets_count": summary["closed_count"],
         "resolved_this_month": resolved_this_month,
         "resolved_today": resolved_today,
         "avg_resolution_time_days": avg_resolution_time,
@@ -317,7 +219,8 @@ def list_all_users(
     current_user: models.User = Depends(require_role("DSI", "Admin")),
 ):
     """Liste tous les utilisateurs (Admin uniquement)"""
-    users = db.query(models.User).all()
+    # Rôles chargés avec les utilisateurs (une seule requête)
+    users = db.query(models.User).options(joinedload(models.User.role)).all()
     
     result = []
     for user in users:
@@ -393,7 +296,11 @@ def update_user(
     if user_update.phone is not None:
         user.phone = user_update.phone
     if user_update.actif is not None:
+        was_active = user.actif
         user.actif = user_update.actif
+        # Une désactivation invalide immédiatement les sessions en cours
+        if was_active is not False and user_update.actif is False:
+            revoke_user_tokens(user)
     if user_update.specialization is not None:
         user.specialization = user_update.specialization
     if user_update.max_tickets_capacity is not None:
@@ -447,6 +354,7 @@ def delete_user(
     if created_tickets > 0 or assigned_tickets > 0:
         # Au lieu de supprimer, désactiver l'utilisateur
         user.actif = False
+        revoke_user_tokens(user)
         db.commit()
         return {"message": "User deactivated (has associated tickets)", "user_id": user_id}
     
@@ -481,6 +389,8 @@ def reset_user_password(
     
     # Hasher et sauvegarder le nouveau mot de passe
     user.password_hash = get_password_hash(new_password)
+    # Les sessions ouvertes avec l'ancien mot de passe ne sont plus valides
+    revoke_user_tokens(user)
     db.commit()
     
     return {
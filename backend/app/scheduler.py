@@ -1,227 +1,155 @@
 """
 Système de tâches planifiées pour les notifications et clôtures automatiques
+
+Le scheduler tourne dans un seul processus désigné :
+- dans le serveur web (démarré et arrêté par le lifespan de app.main) si
+  SCHEDULER_ENABLED=true, valeur par défaut pour un seul worker ;
+- ou dans un processus dédié, `python -m app.scheduler`, les workers web
+  ayant alors SCHEDULER_ENABLED=false.
 """
-from datetime import datetime, timedelta
+import functools
+import logging
+import os
+import signal
+import sys
+
 from sqlalchemy.orm import Session
-from typing import List
 
+from .attachment_storage import collect_deleted_attachments, get_attachment_store
 from .database import SessionLocal
-from . import models
-from .email_service import email_service
+from .metrics import SCHEDULER_JOB_FAILURES, observe_job
+from .notification_digest import send_due_digests
+from .notification_counters import reconcile_unread_counters
+from .notification_retention import apply_notification_retention
+from .auto_assignment import assignment_engine
+from .sla_timers import process_due_timers, timer_wakeup
+from .similarity_index import detect_recurring_problems
+from .ticket_archive import archive_closed_tickets as archive_tickets
+from .idempotency import purge_expired_keys
+from .security import purge_used_refresh_tokens as purge_refresh_tokens
+from .structured_logging import setup_logging
+
+logger = logging.getLogger(__name__)
 
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
 
-def check_validation_reminders():
+
+def _scheduled_job(name: str, error_message: str):
     """
-    Vérifie les tickets résolus non validés et envoie des rappels
-    Rappels à 3, 7 et 10 jours après résolution
+    Décorateur des tâches planifiées : la tâche reçoit une session ouverte pour
+    l'exécution et n'a plus qu'à faire son travail. Une exception est journalisée
+    (error_message), comptée dans scheduler_job_failures et la transaction annulée ;
+    la tâche renvoie alors None. Durée et lignes traitées : voir observe_job.
     """
-    db: Session = SessionLocal()
-    try:
-        # Récupérer tous les tickets résolus non clôturés
-        resolved_tickets = (
-            db.query(models.Ticket)
-            .filter(
-                models.Ticket.status == models.TicketStatus.RESOLU,
-                models.Ticket.resolved_at.isnot(None)
-            )
-            .all()
-        )
-        
-        now = datetime.utcnow()
-        
-        for ticket in resolved_tickets:
-            if not ticket.resolved_at:
-                continue
-                
-            days_since_resolution = (now - ticket.resolved_at).days
-            
-            # Vérifier si des rappels ont déjà été envoyés
-            existing_reminders = (
-                db.query(models.Notification)
-                .filter(
-                    models.Notification.ticket_id == ticket.id,
-                    models.Notification.user_id == ticket.creator_id,
-                    models.Notification.type.in_([
-                        models.NotificationType.RAPPEL_VALIDATION_1,
-                        models.NotificationType.RAPPEL_VALIDATION_2,
-                        models.NotificationType.RAPPEL_VALIDATION_3
-                    ])
-                )
-                .all()
-            )
-            
-            reminder_numbers_sent = set()
-            for reminder in existing_reminders:
-                if reminder.type == models.NotificationType.RAPPEL_VALIDATION_1:
-                    reminder_numbers_sent.add(1)
-                elif reminder.type == models.NotificationType.RAPPEL_VALIDATION_2:
-                    reminder_numbers_sent.add(2)
-                elif reminder.type == models.NotificationType.RAPPEL_VALIDATION_3:
-                    reminder_numbers_sent.add(3)
-            
-            # Envoyer le premier rappel après 3 jours
-            if days_since_resolution >= 3 and 1 not in reminder_numbers_sent:
-                creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
-                if creator and creator.email and creator.email.strip():
-                    # Créer la notification
-                    notification = models.Notification(
-                        user_id=ticket.creator_id,
-                        type=models.NotificationType.RAPPEL_VALIDATION_1,
-                        ticket_id=ticket.id,
-                        message=f"Rappel : Veuillez valider la résolution de votre ticket #{ticket.number}",
-                        read=False
-                    )
-                    db.add(notification)
-                    db.commit()
-                    
-                    # Envoyer l'email
-                    email_service.send_validation_reminder(
-                        ticket_id=str(ticket.id),
-                        ticket_number=ticket.number,
-                        ticket_title=ticket.title,
-                        creator_email=creator.email,
-                        creator_name=creator.full_name,
-                        reminder_number=1,
-                        days_since_resolution=days_since_resolution
-                    )
-            
-            # Envoyer le second rappel après 7 jours
-            elif days_since_resolution >= 7 and 2 not in reminder_numbers_sent:
-                creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
-                if creator and creator.email and creator.email.strip():
-                    # Créer la notification
-                    notification = models.Notification(
-                        user_id=ticket.creator_id,
-                        type=models.NotificationType.RAPPEL_VALIDATION_2,
-                        ticket_id=ticket.id,
-                        message=f"Second rappel : Validation requise pour votre ticket #{ticket.number}",
-                        read=False
-                    )
-                    db.add(notification)
-                    db.commit()
-                    
-                    # Envoyer l'email
-                    email_service.send_validation_reminder(
-                        ticket_id=str(ticket.id),
-                        ticket_number=ticket.number,
-                        ticket_title=ticket.title,
-                        creator_email=creator.email,
-                        creator_name=creator.full_name,
-                        reminder_number=2,
-                        days_since_resolution=days_since_resolution
-                    )
-            
-            # Envoyer le troisième rappel après 10 jours
-            elif days_since_resolution >= 10 and 3 not in reminder_numbers_sent:
-                creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
-                if creator and creator.email and creator.email.strip():
-                    # Créer la notification
-                    notification = models.Notification(
-                        user_id=ticket.creator_id,
-                        type=models.NotificationType.RAPPEL_VALIDATION_3,
-                        ticket_id=ticket.id,
-                        message=f"Dernier rappel : Veuillez valider votre ticket #{ticket.number}",
-                        read=False
-                    )
-                    db.add(notification)
-                    db.commit()
-                    
-                    # Envoyer l'email
-                    email_service.send_validation_reminder(
-                        ticket_id=str(ticket.id),
-                        ticket_number=ticket.number,
-                        ticket_title=ticket.title,
-                        creator_email=creator.email,
-                        creator_name=creator.full_name,
-                        reminder_number=3,
-                        days_since_resolution=days_since_resolution
-                    )
-    
-    except Exception as e:
-        print(f"Erreur lors de la vérification des rappels de validation: {str(e)}")
-        db.rollback()
-    finally:
-        db.close()
+    def decorator(function):
+        @observe_job(name)
+        @functools.wraps(function)
+        def wrapper():
+            db: Session = SessionLocal()
+            try:
+                return function(db)
+            except Exception:
+                logger.exception(error_message)
+                SCHEDULER_JOB_FAILURES.labels(name).inc()
+                db.rollback()
+            finally:
+                db.close()
+        return wrapper
+    return decorator
 
 
-def auto_close_unvalidated_tickets():
+@_scheduled_job("process_sla_timers", "Erreur lors du traitement des échéances des tickets")
+def process_sla_timers(db: Session):
     """
-    Clôture automatiquement les tickets résolus non validés après 14 jours
+    Déclenche les échéances dépassées des tickets (SLA, rappels de validation,
+    clôture automatique) puis programme le réveil à la prochaine échéance
     """
-    db: Session = SessionLocal()
-    try:
-        # Récupérer tous les tickets résolus non clôturés depuis plus de 14 jours
-        now = datetime.utcnow()
-        cutoff_date = now - timedelta(days=14)
-        
-        unvalidated_tickets = (
-            db.query(models.Ticket)
-            .filter(
-                models.Ticket.status == models.TicketStatus.RESOLU,
-                models.Ticket.resolved_at.isnot(None),
-                models.Ticket.resolved_at <= cutoff_date,
-                models.Ticket.closed_at.is_(None)  # Pas encore clôturé
-            )
-            .all()
-        )
-        
-        for ticket in unvalidated_tickets:
-            # Clôturer le ticket automatiquement
-            ticket.status = models.TicketStatus.CLOTURE
-            ticket.closed_at = now
-            ticket.auto_closed_at = now  # Marquer comme clôture automatique
-            
-            # Créer une entrée d'historique
-            history = models.TicketHistory(
-                ticket_id=ticket.id,
-                old_status=models.TicketStatus.RESOLU,
-                new_status=models.TicketStatus.CLOTURE,
-                user_id=ticket.creator_id,  # Utiliser le créateur comme user_id pour l'historique
-                reason="Clôture automatique après 14 jours sans validation"
-            )
-            db.add(history)
-            
-            # Créer une notification pour le créateur
-            notification = models.Notification(
-                user_id=ticket.creator_id,
-                type=models.NotificationType.CLOTURE_AUTOMATIQUE,
-                ticket_id=ticket.id,
-                message=f"Votre ticket #{ticket.number} a été clôturé automatiquement après 14 jours sans validation. Vous pouvez le réouvrir dans les 7 prochains jours si nécessaire.",
-                read=False
-            )
-            db.add(notification)
-            
-            # Récupérer le créateur pour l'email
-            creator = db.query(models.User).filter(models.User.id == ticket.creator_id).first()
-            if creator and creator.email and creator.email.strip():
-                # Envoyer l'email
-                email_service.send_ticket_auto_closed_notification(
-                    ticket_id=str(ticket.id),
-                    ticket_number=ticket.number,
-                    ticket_title=ticket.title,
-                    creator_email=creator.email,
-                    creator_name=creator.full_name
-                )
-            
-            # Notifier le technicien si assigné
-            if ticket.technician_id:
-                tech_notification = models.Notification(
-                    user_id=ticket.technician_id,
-                    type=models.NotificationType.TICKET_CLOTURE,
-                    ticket_id=ticket.id,
-                    message=f"Le ticket #{ticket.number} a été clôturé automatiquement après 14 jours sans validation: {ticket.title}",
-                    read=False
-                )
-                db.add(tech_notification)
-        
-        db.commit()
-        print(f"Clôture automatique: {len(unvalidated_tickets)} tickets clôturés")
-    
-    except Exception as e:
-        print(f"Erreur lors de la clôture automatique: {str(e)}")
-        db.rollback()
-    finally:
-        db.close()
+    fired, next_due = process_due_timers(db)
+    if fired:
+        logger.info("Échéances des tickets: %d déclenchées", fired)
+    timer_wakeup.rearm(next_due)
+    return fired
+
+
+@_scheduled_job("send_email_digests", "Erreur lors de l'envoi des récapitulatifs d'emails")
+def send_email_digests(db: Session):
+    """
+    Envoie les récapitulatifs d'emails dont la fenêtre de regroupement est écoulée
+    (utilisateurs en mode digest). Exécuté chaque minute.
+    """
+    sent = send_due_digests(db)
+    if sent:
+        logger.info("Récapitulatifs d'emails: %d envoyés", sent)
+    return sent
+
+
+@_scheduled_job("reconcile_notification_counters", "Erreur lors de la réconciliation des compteurs de notifications")
+def reconcile_notification_counters(db: Session):
+    """Corrige les compteurs de notifications non lues qui auraient divergé"""
+    corrected = reconcile_unread_counters(db)
+    if corrected:
+        logger.info("Compteurs de notifications non lues: %d corrigés", corrected)
+    return corrected
+
+
+@_scheduled_job("archive_old_notifications", "Erreur lors de la rétention des notifications")
+def archive_old_notifications(db: Session):
+    """Archive les notifications lues anciennes et purge l'archive (par lots)"""
+    totals = apply_notification_retention(db)
+    if totals["archived"] or totals["purged"]:
+        logger.info("Rétention des notifications: %d archivées, %d purgées", totals["archived"], totals["purged"])
+    return totals["archived"] + totals["purged"]
+
+
+@_scheduled_job("archive_closed_tickets", "Erreur lors de l'archivage des tickets clôturés")
+def archive_closed_tickets(db: Session):
+    """Déplace les tickets clôturés anciens (commentaires et historique compris) vers l'archive"""
+    archived = archive_tickets(db)
+    if archived:
+        logger.info("Archivage des tickets clôturés: %d archivés", archived)
+    return archived
+
+
+@_scheduled_job("purge_idempotency_keys", "Erreur lors de la purge des clés d'idempotence")
+def purge_idempotency_keys(db: Session):
+    """Supprime les clés d'idempotence expirées (réponses mémorisées des mutations)"""
+    purged = purge_expired_keys(db)
+    if purged:
+        logger.info("Clés d'idempotence expirées: %d supprimées", purged)
+    return purged
+
+
+@_scheduled_job("purge_used_refresh_tokens", "Erreur lors de la purge des jetons de rafraîchissement utilisés")
+def purge_used_refresh_tokens(db: Session):
+    """Supprime les identifiants des jetons de rafraîchissement utilisés et expirés"""
+    purged = purge_refresh_tokens(db)
+    if purged:
+        logger.info("Jetons de rafraîchissement utilisés expirés: %d supprimés", purged)
+    return purged
+
+
+@_scheduled_job("resync_assignment_engine", "Erreur lors de la resynchronisation de l'assignation automatique")
+def resync_assignment_engine(db: Session):
+    """Reconstruit depuis la base la charge des techniciens gardée en mémoire (assignation automatique)"""
+    return assignment_engine.load(db)
+
+
+@_scheduled_job("report_recurring_problems", "Erreur lors de la détection des problèmes récurrents")
+def report_recurring_problems(db: Session):
+    """Signale au DSI les groupes de tickets similaires récents (problèmes récurrents)"""
+    reported = detect_recurring_problems(db)
+    if reported:
+        logger.info("Problèmes récurrents: %d signalés", reported)
+    return reported
+
+
+@_scheduled_job("collect_attachment_files", "Erreur lors de la suppression des fichiers de pièces jointes")
+def collect_attachment_files(db: Session):
+    """Supprime du stockage les fichiers des pièces jointes retirées et plus référencées"""
+    deleted = collect_deleted_attachments(db, get_attachment_store())
+    if deleted:
+        logger.info("Fichiers de pièces jointes: %d supprimés", deleted)
+    return deleted
 
 
 def run_scheduled_tasks():
@@ -229,11 +157,134 @@ def run_scheduled_tasks():
     Fonction principale pour exécuter toutes les tâches planifiées
     À appeler périodiquement (ex: toutes les heures via cron ou APScheduler)
     """
-    print(f"[{datetime.utcnow()}] Exécution des tâches planifiées...")
-    check_validation_reminders()
-    auto_close_unvalidated_tickets()
-    print(f"[{datetime.utcnow()}] Tâches planifiées terminées")
+    setup_logging()
+    logger.info("Exécution des tâches planifiées...")
+    process_sla_timers()
+    logger.info("Tâches planifiées terminées")
+
 
+def create_scheduler(scheduler_class=None):
+    """Scheduler (BackgroundScheduler par défaut) avec les tâches planifiées, non démarré"""
+    # Import différé : APScheduler n'est chargé que par le processus qui planifie
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler = (scheduler_class or BackgroundScheduler)()
+    # Échéances des tickets (SLA, rappels, clôtures) : réveil à la prochaine échéance,
+    # plus un passage toutes les 5 minutes (échéances armées par un autre processus)
+    scheduler.add_job(
+        process_sla_timers,
+        trigger=CronTrigger(minute="*/5"),
+        id='process_sla_timers',
+        name='Traiter les échéances des tickets (SLA, rappels et clôtures)',
+        replace_existing=True
+    )
+    timer_wakeup.attach(scheduler, process_sla_timers)
+    # Récapitulatifs d'emails (mode digest) : vérification chaque minute
+    scheduler.add_job(
+        send_email_digests,
+        trigger=CronTrigger(minute="*"),
+        id='send_email_digests',
+        name='Envoyer les récapitulatifs d\'emails',
+        replace_existing=True
+    )
+    # Réconciliation des compteurs de notifications non lues : chaque nuit à 3h30
+    scheduler.add_job(
+        reconcile_notification_counters,
+        trigger=CronTrigger(hour=3, minute=30),
+        id='reconcile_notification_counters',
+        name='Réconcilier les compteurs de notifications non lues',
+        replace_existing=True
+    )
+    # Rétention des notifications (archivage puis purge par lots) : chaque nuit à 3h
+    scheduler.add_job(
+        archive_old_notifications,
+        trigger=CronTrigger(hour=3, minute=0),
+        id='archive_old_notifications',
+        name='Archiver les anciennes notifications',
+        replace_existing=True
+    )
+    # Archivage des tickets clôturés (avec commentaires et historique) : chaque nuit à 3h15
+    scheduler.add_job(
+        archive_closed_tickets,
+        trigger=CronTrigger(hour=3, minute=15),
+        id='archive_closed_tickets',
+        name='Archiver les tickets clôturés',
+        replace_existing=True
+    )
+    # Clés d'idempotence expirées : purge par lots toutes les heures
+    scheduler.add_job(
+        purge_idempotency_keys,
+        trigger=CronTrigger(minute=45),
+        id='purge_idempotency_keys',
+        name='Purger les clés d\'idempotence expirées',
+        replace_existing=True
+    )
+    # Jetons de rafraîchissement utilisés expirés : chaque nuit à 3h45
+    scheduler.add_job(
+        purge_used_refresh_tokens,
+        trigger=CronTrigger(hour=3, minute=45),
+        id='purge_used_refresh_tokens',
+        name='Purger les jetons de rafraîchissement utilisés',
+        replace_existing=True
+    )
+    # Charge des techniciens (assignation automatique) : resynchronisation toutes les 10 minutes
+    scheduler.add_job(
+        resync_assignment_engine,
+        trigger=CronTrigger(minute="*/10"),
+        id='resync_assignment_engine',
+        name='Resynchroniser la charge des techniciens',
+        replace_existing=True
+    )
+    # Détection des problèmes récurrents (tickets similaires) : chaque jour à 7h
+    scheduler.add_job(
+        report_recurring_problems,
+        trigger=CronTrigger(hour=7, minute=0),
+        id='report_recurring_problems',
+        name='Détecter les problèmes récurrents',
+        replace_existing=True
+    )
+    # Fichiers des pièces jointes supprimées (après le délai de grâce) : toutes les heures
+    scheduler.add_job(
+        collect_attachment_files,
+        trigger=CronTrigger(minute=30),
+        id='collect_attachment_files',
+        name='Supprimer les fichiers des pièces jointes retirées',
+        replace_existing=True
+    )
+    return scheduler
+
+
+def shutdown_scheduler(scheduler) -> None:
+    """Arrêt propre : attend la fin des tâches en cours puis détache le réveil des échéances"""
+    if scheduler.running:
+        scheduler.shutdown(wait=True)
+    timer_wakeup.detach()
+
+
+def main():
+    """Processus dédié au scheduler (les workers web tournent avec SCHEDULER_ENABLED=false)"""
+    from apscheduler.schedulers.blocking import BlockingScheduler
+
+    from .email_service import email_service
+
+    setup_logging()
+    # SIGTERM (docker stop, systemd) : même arrêt propre que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    scheduler = create_scheduler(BlockingScheduler)
+    logger.info("Scheduler démarré (processus dédié)")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        shutdown_scheduler(scheduler)
+        email_service.async_backend.close()
+        logger.info("Scheduler arrêté")
 
 
+if __name__ == "__main__":
+    # Passer par le module importé : journaux sous le logger "app.scheduler", pas "__main__"
+    from app.scheduler import main as run_scheduler
 
+    run_scheduler()
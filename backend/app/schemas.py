@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
-from .models import TicketPriority, TicketStatus, TicketType, CommentType, NotificationType, TicketTypeModel, TicketCategory
+from .models import TicketPriority, TicketStatus, TicketType, CommentType, NotificationType, TicketTypeModel, TicketCategory, EmailDeliveryMode
 
 
 class RoleBase(BaseModel):
@@ -91,6 +91,43 @@ class TicketAssign(BaseModel):
     reason: Optional[str] = None
     notes: Optional[str] = None  # Notes/instructions pour le technicien
 
+class TicketBulkOperation(BaseModel):
+    """Même opération appliquée à plusieurs tickets en une transaction"""
+    action: Literal["assign", "close", "reprioritize"]
+    ticket_ids: List[int] = Field(..., min_length=1, max_length=500)
+    technician_id: Optional[int] = None  # assign
+    priority: Optional[TicketPriority] = None  # reprioritize
+    reason: Optional[str] = None
+    notes: Optional[str] = None  # Instructions pour le technicien (assign)
+
+
+class TicketBulkItemResult(BaseModel):
+    ticket_id: int
+    status_code: int  # 200 : appliqué, 404 / 409 : ignoré
+    detail: Optional[str] = None
+    version: Optional[int] = None
+
+
+class TicketBulkResult(BaseModel):
+    action: str
+    succeeded: int
+    failed: int
+    results: List[TicketBulkItemResult]
+
+
+class AssignmentCandidate(BaseModel):
+    technician_id: int
+    full_name: str
+    specialization: Optional[str] = None
+    load: int  # Tickets assignés ou en cours
+    capacity: int
+
+
+class AssignmentSuggestions(BaseModel):
+    ticket_id: int
+    candidates: List[AssignmentCandidate]
+
+
 class TicketDelegate(BaseModel):
     adjoint_id: int
     reason: Optional[str] = None
@@ -111,12 +148,59 @@ class TicketRead(TicketBase):
     assigned_at: Optional[datetime] = None
     resolved_at: Optional[datetime] = None
     closed_at: Optional[datetime] = None
+    version: int = 1
     # category est hérité de TicketBase
 
     class Config:
         from_attributes = True
 
 
+class TicketCompact(BaseModel):
+    """Ticket de la vue compacte : seuls les champs demandés (fields=) sont présents"""
+    id: int
+    number: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    type: Optional[TicketType] = None
+    priority: Optional[TicketPriority] = None
+    status: Optional[TicketStatus] = None
+    category: Optional[str] = None
+    created_at: Optional[datetime] = None
+    creator_id: Optional[int] = None
+    technician_id: Optional[int] = None
+    secretary_id: Optional[int] = None
+    user_agency: Optional[str] = None
+    assigned_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+
+
+class UserSummary(BaseModel):
+    id: int
+    full_name: str
+    email: Optional[str] = None
+    agency: Optional[str] = None
+    phone: Optional[str] = None
+    specialization: Optional[str] = None
+    actif: bool
+    role: Optional[str] = None  # Nom du rôle
+
+
+class TicketCompactList(BaseModel):
+    """Vue compacte des listes de tickets : utilisateurs référencés chargés une seule fois"""
+    tickets: List[TicketCompact]
+    users: Dict[int, UserSummary]
+
+
+class SimilarTicket(BaseModel):
+    id: int
+    number: int
+    title: str
+    status: TicketStatus
+    created_at: datetime
+    similarity: float  # Estimation de la similarité de Jaccard (0 à 1)
+
+
 class TicketTypeConfig(BaseModel):
     id: int
     code: str
@@ -156,9 +240,26 @@ class CommentRead(BaseModel):
         from_attributes = True
 
 
+class AttachmentRead(BaseModel):
+    """Métadonnées d'une pièce jointe (le fichier est dans le stockage de pièces jointes)"""
+    id: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    uploaded_by: Optional[int] = None
+    uploaded_at: Optional[datetime] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # Durée de validité du jeton d'accès (en secondes)
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -200,6 +301,38 @@ class NotificationRead(BaseModel):
         from_attributes = True
 
 
+class NotificationBatchRequest(BaseModel):
+    """
+    Action groupée sur les notifications de l'utilisateur connecté :
+    liste d'identifiants et/ou filtre par ticket et type (au moins un critère)
+    """
+    action: Literal["read", "unread", "delete"]
+    ids: Optional[List[int]] = Field(None, max_length=1000)
+    ticket_id: Optional[int] = None
+    type: Optional[NotificationType] = None
+
+
+class NotificationBatchResult(BaseModel):
+    action: str
+    affected_count: int
+    unread_count: int
+
+
+class NotificationPreferenceUpdate(BaseModel):
+    """Mode d'envoi des emails pour un type de notification (None : tous les types)"""
+    notification_type: Optional[NotificationType] = None
+    email_mode: EmailDeliveryMode
+    digest_window_minutes: int = Field(60, ge=1, le=1440)
+
+
+class NotificationPreferenceRead(NotificationPreferenceUpdate):
+    id: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 class TicketHistoryRead(BaseModel):
     """Schéma pour lire l'historique d'un ticket"""
     id: int
@@ -213,3 +346,89 @@ class TicketHistoryRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+
+class CommentWithAuthorRead(CommentRead):
+    """Commentaire avec son auteur (chargé en une requête pour toute la page)"""
+    user: Optional[UserRead] = None
+
+
+class CommentPage(BaseModel):
+    items: List[CommentWithAuthorRead]
+    next_cursor: Optional[str] = None  # None : dernière page
+
+
+class TicketHistoryPage(BaseModel):
+    items: List[TicketHistoryRead]
+    next_cursor: Optional[str] = None
+
+
+class TimelineEntry(BaseModel):
+    """Élément de la timeline d'un ticket : un commentaire ou un changement d'historique"""
+    kind: str  # "comment" ou "history"
+    timestamp: datetime
+    comment: Optional[CommentWithAuthorRead] = None
+    history: Optional[TicketHistoryRead] = None
+
+
+class TimelinePage(BaseModel):
+    items: List[TimelineEntry]
+    next_cursor: Optional[str] = None
+
+# Adaptateurs de listes : sérialisation directe en JSON (pydantic-core) pour les
+# endpoints de liste qui renvoient une réponse conditionnelle (ETag)
+TicketReadList = TypeAdapter(List[TicketRead])
+NotificationReadList = TypeAdapter(List[NotificationRead])
+
+
+# ----- Rapports statistiques (voir app.analytics) -----
+
+class DurationDistribution(BaseModel):
+    avg: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+
+
+class FeedbackSummary(BaseModel):
+    count: int
+    average: Optional[float] = None
+    distribution: Dict[int, int]  # Note -> nombre de tickets
+
+
+class ResolutionReport(BaseModel):
+    ticket_count: int
+    resolved_count: int
+    closed_count: int
+    success_rate: float
+    resolution_hours: DurationDistribution
+    response_minutes: DurationDistribution
+    feedback: FeedbackSummary
+
+
+class HistogramBucket(BaseModel):
+    lower_hours: float
+    upper_hours: Optional[float] = None  # None : tranche ouverte
+    count: int
+
+
+class BreakdownRow(BaseModel):
+    key: Optional[str] = None
+    label: Optional[str] = None
+    ticket_count: int
+    resolved_count: int
+    closed_count: int
+    success_rate: float
+    resolution_hours: DurationDistribution
+    response_minutes_avg: Optional[float] = None
+    feedback_average: Optional[float] = None
+
+
+class ProfilerStart(BaseModel):
+    """Session de profilage : N prochaines requêtes de la route et/ou fenêtre de temps"""
+    route: str  # Gabarit de la route, ex. "/tickets/" ou "/users/technicians/{technician_id}/stats"
+    method: Optional[Literal["GET", "POST", "PUT", "PATCH", "DELETE"]] = None
+    requests: Optional[int] = Field(None, ge=1, le=1000)
+    seconds: Optional[float] = Field(None, gt=0, le=600)
+    interval_ms: float = Field(5, ge=1, le=1000)
@@ -1,22 +1,39 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Dict, Optional, Set
+import logging
 import os
+import threading
+import time
+import uuid
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 import bcrypt
+from sqlalchemy import delete, or_, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from . import models, schemas
-from .database import get_db
+from .database import get_db, SessionLocal
+from .ticket_archive import get_archived_ticket
 
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_SECRET_KEY_VERY_IMPORTANT_TO_CHANGE")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+# Jetons d'accès courts : la révocation (désactivation, déconnexion) est effective
+# au plus tard à leur expiration, et en quelques secondes via la liste de révocation
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Intervalle de resynchronisation de la liste de révocation avec la base (en secondes)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+logger = logging.getLogger(__name__)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifie un mot de passe avec bcrypt"""
@@ -31,8 +48,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
-        # Logger l'erreur pour le débogage (en production, utiliser un vrai logger)
-        print(f"Erreur lors de la vérification du mot de passe: {e}")
+        logger.error("Erreur lors de la vérification du mot de passe: %s", e)
         return False
 
 
@@ -48,11 +64,153 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+    to_encode.setdefault("typ", ACCESS_TOKEN_TYPE)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Crée un jeton de rafraîchissement (longue durée, utilisable uniquement sur /auth/refresh).
+    Son identifiant unique (jti) permet de ne l'accepter qu'une fois (consume_refresh_token)
+    """
+    to_encode = data.copy()
+    to_encode["typ"] = REFRESH_TOKEN_TYPE
+    to_encode["jti"] = uuid.uuid4().hex
+    return create_access_token(
+        to_encode, expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+
+def create_token_pair(user: models.User) -> schemas.Token:
+    """Émet un couple jeton d'accès / jeton de rafraîchissement pour un utilisateur"""
+    claims = {"sub": str(user.id), "ver": user.token_version or 0}
+    return schemas.Token(
+        access_token=create_access_token(claims),
+        refresh_token=create_refresh_token(claims),
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    )
+
+
+class TokenRevocationList:
+    """
+    Liste de révocation en mémoire, partagée par toutes les requêtes d'un worker.
+
+    Elle ne contient que les utilisateurs dont les jetons ont déjà été révoqués
+    (token_version > 0) ou qui sont désactivés : elle reste donc très compacte.
+    La base de données fait foi : chaque worker la relit au plus toutes les
+    REVOCATION_SYNC_SECONDS secondes, ce qui synchronise les workers entre eux
+    sans requête sur la table users à chaque appel.
+    """
+
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self._versions: Dict[int, int] = {}
+        self._inactive: Set[int] = set()
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        self._sync_if_stale()
+        if user_id in self._inactive:
+            return True
+        return token_version < self._versions.get(user_id, 0)
+
+    def register(self, user_id: int, token_version: int, actif: bool = True) -> None:
+        """Applique immédiatement une révocation locale (avant la prochaine synchronisation)"""
+        with self._lock:
+            if token_version:
+                self._versions[user_id] = token_version
+            if actif:
+                self._inactive.discard(user_id)
+            else:
+                self._inactive.add(user_id)
+
+    def invalidate(self) -> None:
+        """Force une relecture depuis la base lors du prochain contrôle"""
+        self._last_sync = 0.0
+
+    def _sync_if_stale(self) -> None:
+        if time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_sync < self.sync_interval:
+                return
+            db = SessionLocal()
+            try:
+                rows = (
+                    db.query(models.User.id, models.User.token_version, models.User.actif)
+                    .filter(
+                        or_(
+                            models.User.token_version > 0,
+                            models.User.actif == False,
+                        )
+                    )
+                    .all()
+                )
+                self._versions = {row.id: row.token_version for row in rows if row.token_version}
+                self._inactive = {row.id for row in rows if row.actif is False}
+            except Exception as e:
+                # Conserver la dernière liste connue si la base est indisponible
+                logger.warning("Erreur lors de la synchronisation de la liste de révocation: %s", e)
+            finally:
+                self._last_sync = time.monotonic()
+                db.close()
+
+
+revocation_list = TokenRevocationList()
+
+
+def revoke_user_tokens(user: models.User) -> None:
+    """
+    Invalide tous les jetons émis pour un utilisateur (désactivation, réinitialisation
+    du mot de passe, déconnexion). À appeler avant le commit de la session.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    revocation_list.register(user.id, user.token_version, actif=user.actif is not False)
+
+
+def consume_refresh_token(db: Session, payload: dict) -> bool:
+    """
+    Marque le jeton de rafraîchissement comme utilisé (rotation : chaque échange émet un
+    nouveau jeton et invalide l'ancien). Renvoie False s'il a déjà été échangé ou s'il
+    n'a pas d'identifiant (jeton émis avant la rotation). À committer par l'appelant.
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return False
+    table = models.UsedRefreshToken.__table__
+    consumed = db.execute(
+        insert(table)
+        .values(
+            jti=jti,
+            user_id=payload["sub"],
+            used_at=datetime.utcnow(),
+            expires_at=datetime.utcfromtimestamp(payload["exp"]),
+        )
+        .on_conflict_do_nothing(index_elements=["jti"])
+        .returning(table.c.jti)
+    ).first()
+    return consumed is not None
+
+
+def purge_used_refresh_tokens(db: Session, now: Optional[datetime] = None,
+                              batch_size: int = 5000, max_batches: int = 100) -> int:
+    """Supprime par lots les jetons de rafraîchissement utilisés et expirés"""
+    table = models.UsedRefreshToken.__table__
+    now = now or datetime.utcnow()
+    total = 0
+    for _ in range(max_batches):
+        batch = select(table.c.jti).where(table.c.expires_at < now).limit(batch_size).with_for_update(skip_locked=True)
+        count = db.execute(delete(table).where(table.c.jti.in_(batch.scalar_subquery()))).rowcount
+        db.commit()
+        total += count
+        if count < batch_size:
+            break
+    return total
+
+
 def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.username == username).first()
 
@@ -73,9 +231,11 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[mod
     return user
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+def decode_token(token: str, expected_type: str = ACCESS_TOKEN_TYPE) -> dict:
+    """
+    Décode et vérifie un jeton (signature, expiration, type et liste de révocation).
+    Lève une 401 si le jeton n'est pas valide. Aucun accès à la base de données.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -86,12 +246,45 @@ async def get_current_user(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
+        # Les anciens jetons (sans "typ") sont traités comme des jetons d'accès
+        if payload.get("typ", ACCESS_TOKEN_TYPE) != expected_type:
+            raise credentials_exception
         token_data = schemas.TokenData(user_id=int(user_id))
+        token_version = int(payload.get("ver", 0))
     except (JWTError, ValueError):
         raise credentials_exception
 
-    user = db.get(models.User, token_data.user_id)
-    if user is None:
+    if revocation_list.is_revoked(token_data.user_id, token_version):
+        raise credentials_exception
+
+    payload["sub"] = token_data.user_id
+    payload["ver"] = token_version
+    return payload
+
+
+def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """
+    Chemin rapide : identifie l'utilisateur à partir du seul jeton, sans charger
+    la ligne users. À utiliser pour les endpoints qui n'ont besoin que de l'id
+    (notifications, compteurs interrogés en boucle par les dashboards).
+    """
+    return decode_token(token)["sub"]
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> models.User:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = decode_token(token)
+
+    user = db.get(models.User, payload["sub"])
+    if user is None or user.actif is False:
+        raise credentials_exception
+    if payload["ver"] < (user.token_version or 0):
         raise credentials_exception
     return user
 
@@ -108,3 +301,29 @@ def require_role(*allowed_roles: str):
     return dependency
 
 
+# Rôles ayant accès à tous les tickets
+AGENT_ROLES = ["Secrétaire DSI", "Adjoint DSI", "DSI", "Admin"]
+
+
+def get_accessible_ticket(
+    db: Session,
+    ticket_id: int,
+    current_user: models.User,
+    include_archived: bool = False,
+):
+    """
+    Charge un ticket et vérifie l'accès : créateur, technicien assigné, ou agent/DSI.
+    include_archived : cherche aussi dans l'archive (lecture seule, renvoie un TicketArchive)
+    """
+    ticket = db.query(models.Ticket).filter(models.Ticket.id == ticket_id).first()
+    if not ticket and include_archived:
+        ticket = get_archived_ticket(db, ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+
+    is_creator = ticket.creator_id == current_user.id
+    is_assigned_tech = ticket.technician_id == current_user.id
+    is_agent = current_user.role and current_user.role.name in AGENT_ROLES
+    if not (is_creator or is_assigned_tech or is_agent):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    return ticket
@@ -0,0 +1,322 @@
+"""
+Index de similarité des tickets (doublons et problèmes récurrents).
+
+Le texte d'un ticket (titre + début de la description) est normalisé (minuscules,
+accents et mots vides français retirés) puis découpé en shingles de
+SIMILARITY_SHINGLE_SIZE caractères. Sa signature MinHash (SIMILARITY_NUM_PERM
+minima de fonctions de hachage) permet d'estimer la similarité de Jaccard entre
+deux tickets sans comparer leurs textes.
+
+La signature est découpée en SIMILARITY_BANDS bandes (LSH) : deux tickets qui
+partagent au moins une bande tombent dans le même seau. Une recherche ne compare
+donc le ticket qu'aux candidats de ses seaux, au lieu de tous les tickets.
+
+Les signatures sont calculées à la création / modification d'un ticket et
+stockées dans ticket_signatures : chaque processus charge l'index en mémoire à
+la première recherche puis, à chaque recherche, relit les signatures dont
+updated_at est postérieur à sa dernière synchronisation (moins une marge, pour
+les transactions validées après d'autres plus récentes). Les tickets supprimés
+par un autre processus sont retirés au plus tard SIMILARITY_RECONCILE_SECONDS
+après, en comparant les identifiants indexés à ceux de la table.
+"""
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from . import models
+
+load_dotenv()
+
+SIMILARITY_NUM_PERM = 64
+SIMILARITY_BANDS = 16  # 16 bandes de 4 lignes : seuil de détection vers 0.5
+SIMILARITY_SHINGLE_SIZE = 4
+SIMILARITY_MAX_TEXT_LENGTH = 600  # Seul le début de la description est indexé
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.5"))
+SIMILARITY_SYNC_OVERLAP = timedelta(seconds=int(os.getenv("SIMILARITY_SYNC_OVERLAP_SECONDS", "60")))
+SIMILARITY_RECONCILE_SECONDS = int(os.getenv("SIMILARITY_RECONCILE_SECONDS", "60"))
+
+RECURRING_PROBLEM_WINDOW_DAYS = int(os.getenv("RECURRING_PROBLEM_WINDOW_DAYS", "30"))
+RECURRING_PROBLEM_MIN_TICKETS = int(os.getenv("RECURRING_PROBLEM_MIN_TICKETS", "3"))
+
+_ROWS = SIMILARITY_NUM_PERM // SIMILARITY_BANDS
+_PRIME = 4294967311  # Premier > 2^32
+# Paramètres fixes des fonctions de hachage : les signatures stockées restent comparables
+_rng = random.Random(20240521)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(SIMILARITY_NUM_PERM)]
+
+FRENCH_STOPWORDS = frozenset("""
+    a au aux avec ce ces cet cette d dans de des du elle en est et il ils j je l la le les leur
+    lui m ma mais me mes mon n ne nous on ou par pas plus pour qu que qui s sa se ses son sont
+    sur t ta te tes ton tu un une vos votre vous y ete etre avoir fait bonjour merci svp
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Minuscules, sans accents ni mots vides"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(word for word in _WORD.findall(text) if word not in FRENCH_STOPWORDS)
+
+
+def shingles(title: str, description: Optional[str]) -> Set[str]:
+    text = normalize(f"{title} {(description or '')[:SIMILARITY_MAX_TEXT_LENGTH]}")
+    if len(text) <= SIMILARITY_SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SIMILARITY_SHINGLE_SIZE] for i in range(len(text) - SIMILARITY_SHINGLE_SIZE + 1)}
+
+
+def signature(title: str, description: Optional[str]) -> List[int]:
+    """Signature MinHash du ticket"""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(title, description)]
+    if not hashes:
+        return [_PRIME] * SIMILARITY_NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(first, second) if x == y) / SIMILARITY_NUM_PERM
+
+
+def _band_keys(sig: Tuple[int, ...]) -> Iterable[Tuple[int, int]]:
+    for band in range(SIMILARITY_BANDS):
+        yield band, hash(sig[band * _ROWS:(band + 1) * _ROWS])
+
+
+class SimilarityIndex:
+    """Signatures en mémoire et seaux LSH (bande, hachage de la bande) -> tickets"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._signatures: Dict[int, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._loaded = False
+        self._synced_at: Optional[datetime] = None  # Plus grand updated_at lu
+        self._reconciled_at = 0.0  # time.monotonic() de la dernière recherche des suppressions
+
+    # ----- Contenu de l'index -----
+
+    def _add(self, ticket_id: int, sig: Tuple[int, ...]) -> None:
+        self._remove(ticket_id)
+        self._signatures[ticket_id] = sig
+        for key in _band_keys(sig):
+            self._buckets[key].add(ticket_id)
+
+    def _remove(self, ticket_id: int) -> None:
+        sig = self._signatures.pop(ticket_id, None)
+        if sig is None:
+            return
+        for key in _band_keys(sig):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(ticket_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _load_signatures(self, db: Session, since: Optional[datetime] = None) -> None:
+        signatures = models.TicketSignature.__table__
+        query = select(signatures.c.ticket_id, signatures.c.signature, signatures.c.updated_at)
+        if since is not None:
+            query = query.where(signatures.c.updated_at >= since)
+        rows = db.execute(query.execution_options(yield_per=5000))
+        with self._lock:
+            for ticket_id, sig, updated_at in rows:
+                self._add(ticket_id, tuple(sig))
+                if updated_at is not None and (self._synced_at is None or updated_at > self._synced_at):
+                    self._synced_at = updated_at
+
+    def _reconcile(self, db: Session) -> None:
+        """Retire les tickets dont la signature a été supprimée (par un autre processus)"""
+        with self._lock:
+            indexed = set(self._signatures)
+        signatures = models.TicketSignature.__table__
+        stored = set(db.execute(select(signatures.c.ticket_id)).scalars())
+        with self._lock:
+            # Seuls les tickets déjà indexés avant la lecture : un ticket ajouté entre-temps
+            # par index_ticket est validé mais peut manquer à la lecture
+            for ticket_id in indexed - stored:
+                self._remove(ticket_id)
+            self._reconciled_at = time.monotonic()
+
+    def load(self, db: Session) -> int:
+        """Recharge toutes les signatures stockées. Renvoie la taille de l'index"""
+        with self._lock:
+            self._signatures.clear()
+            self._buckets.clear()
+            self._synced_at = None
+            self._load_signatures(db)
+            self._reconciled_at = time.monotonic()
+            self._loaded = True
+            return len(self._signatures)
+
+    def _sync(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+            return
+        # Tickets créés ou modifiés par un autre processus depuis la dernière recherche
+        since = self._synced_at - SIMILARITY_SYNC_OVERLAP if self._synced_at is not None else None
+        self._load_signatures(db, since=since)
+        if time.monotonic() - self._reconciled_at >= SIMILARITY_RECONCILE_SECONDS:
+            self._reconcile(db)
+
+    def index_ticket(self, db: Session, ticket: models.Ticket) -> None:
+        """Calcule et enregistre la signature du ticket (création / modification), puis commit"""
+        sig = signature(ticket.title, ticket.description)
+        table = models.TicketSignature.__table__
+        statement = insert(table).values(ticket_id=ticket.id, signature=sig, updated_at=datetime.utcnow())
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.ticket_id],
+            set_={"signature": statement.excluded.signature, "updated_at": statement.excluded.updated_at},
+        )
+        db.execute(statement)
+        db.commit()
+        with self._lock:
+            if self._loaded:
+                self._add(ticket.id, tuple(sig))
+
+    def remove(self, ticket_id: int) -> None:
+        with self._lock:
+            self._remove(ticket_id)
+
+    # ----- Recherche -----
+
+    def _candidates(self, sig: Tuple[int, ...]) -> Set[int]:
+        candidates: Set[int] = set()
+        for key in _band_keys(sig):
+            candidates |= self._buckets.get(key, set())
+        return candidates
+
+    def similar(
+        self,
+        db: Session,
+        ticket_id: int,
+        limit: int = 10,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ) -> List[Tuple[int, float]]:
+        """Tickets les plus proches : [(ticket_id, similarité estimée)], par similarité décroissante"""
+        self._sync(db)
+        with self._lock:
+            sig = self._signatures.get(ticket_id)
+            if sig is None:
+                return []
+            scored = []
+            for candidate in self._candidates(sig):
+                if candidate == ticket_id:
+                    continue
+                similarity = estimate_similarity(sig, self._signatures[candidate])
+                if similarity >= threshold:
+                    scored.append((candidate, similarity))
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return scored[:limit]
+
+    def clusters(
+        self,
+        db: Session,
+        ticket_ids: Iterable[int],
+        min_size: int = RECURRING_PROBLEM_MIN_TICKETS,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ) -> List[List[int]]:
+        """
+        Groupes de tickets similaires parmi ticket_ids (composantes connexes du graphe
+        des paires au-dessus du seuil), du plus grand au plus petit
+        """
+        self._sync(db)
+        parent: Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        with self._lock:
+            members = {ticket_id for ticket_id in ticket_ids if ticket_id in self._signatures}
+            for ticket_id in members:
+                parent[ticket_id] = ticket_id
+            for ticket_id in members:
+                sig = self._signatures[ticket_id]
+                for candidate in self._candidates(sig) & members:
+                    if candidate > ticket_id and estimate_similarity(sig, self._signatures[candidate]) >= threshold:
+                        parent[find(candidate)] = find(ticket_id)
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for ticket_id in members:
+            groups[find(ticket_id)].append(ticket_id)
+        return sorted(
+            (sorted(group) for group in groups.values() if len(group) >= min_size),
+            key=len, reverse=True,
+        )
+
+
+similarity_index = SimilarityIndex()
+
+
+def detect_recurring_problems(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Notifie le DSI (PROBLEME_RECURRENT) pour chaque groupe d'au moins
+    RECURRING_PROBLEM_MIN_TICKETS tickets similaires créés sur la fenêtre.
+    Un groupe déjà signalé sur la fenêtre n'est pas re-signalé.
+    Renvoie le nombre de groupes signalés.
+    """
+    now = now or datetime.utcnow()
+    since = now - timedelta(days=RECURRING_PROBLEM_WINDOW_DAYS)
+    similarity_index.load(db)
+
+    recent = dict(
+        db.query(models.Ticket.id, models.Ticket.number)
+        .filter(models.Ticket.created_at >= since)
+        .all()
+    )
+    clusters = similarity_index.clusters(db, recent)
+    if not clusters:
+        return 0
+
+    already_reported = {
+        ticket_id
+        for (ticket_id,) in db.query(models.Notification.ticket_id).filter(
+            models.Notification.type == models.NotificationType.PROBLEME_RECURRENT,
+            models.Notification.created_at >= since,
+        ).distinct()
+    }
+    recipients = (
+        db.query(models.User.id)
+        .join(models.Role, models.User.role_id == models.Role.id)
+        .filter(models.Role.name == "DSI", models.User.actif == True)
+        .all()
+    )
+
+    reported = 0
+    for cluster in clusters:
+        if already_reported.intersection(cluster):
+            continue
+        latest = max(cluster)
+        latest_ticket = db.get(models.Ticket, latest)
+        numbers = ", ".join(f"#{recent[ticket_id]}" for ticket_id in cluster[:10])
+        message = (
+            f"Problème récurrent : {len(cluster)} tickets similaires en {RECURRING_PROBLEM_WINDOW_DAYS} jours "
+            f"({numbers}{', ...' if len(cluster) > 10 else ''}) : {latest_ticket.title}"
+        )
+        for (user_id,) in recipients:
+            db.add(models.Notification(
+                user_id=user_id,
+                type=models.NotificationType.PROBLEME_RECURRENT,
+                ticket_id=latest,
+                message=message,
+                read=False,
+            ))
+        reported += 1
+    db.commit()
+    return reported
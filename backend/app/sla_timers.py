@@ -0,0 +1,399 @@
+"""
+Échéances des tickets (SLA, rappels de validation, clôture automatique).
+
+Au lieu de parcourir toute la table tickets chaque heure, les échéances sont
+stockées dans ticket_timers (une ligne par ticket et par type, indexée sur
+due_at) :
+- à chaque changement de statut ou de priorité, sync_ticket_timers arme les
+  échéances correspondant au nouveau statut et annule les autres (écouteur
+  after_flush pour les modifications ORM, appel explicite pour les UPDATE en masse) ;
+- process_due_timers ne traite que les échéances dépassées ;
+- timer_wakeup programme un réveil du scheduler à la prochaine échéance
+  (précision à la minute), un job périodique servant de filet de sécurité.
+
+Échéances par statut :
+- EN_ATTENTE_ANALYSE : délai d'assignation (SLA_ASSIGNMENT_MINUTES_<PRIORITÉ>) ;
+- EN_ATTENTE_ANALYSE, ASSIGNE_TECHNICIEN, EN_COURS : délai de résolution
+  (SLA_RESOLUTION_MINUTES_<PRIORITÉ>), compté depuis l'ouverture ou la réouverture ;
+- RESOLU : rappels de validation à 3, 7 et 10 jours, clôture automatique à 14 jours.
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .email_service import email_service
+from .notification_digest import EmailDelivery, deliver_email
+
+load_dotenv()
+
+P = models.TicketPriority
+K = models.TimerKind
+
+
+def _minutes_by_priority(prefix: str, defaults: Dict[models.TicketPriority, int]) -> Dict[models.TicketPriority, timedelta]:
+    return {
+        priority: timedelta(minutes=int(os.getenv(f"{prefix}_{priority.name}", str(minutes))))
+        for priority, minutes in defaults.items()
+    }
+
+
+# Délais SLA par priorité (surchargeables, ex. SLA_ASSIGNMENT_MINUTES_CRITIQUE=30)
+SLA_ASSIGNMENT = _minutes_by_priority("SLA_ASSIGNMENT_MINUTES", {
+    P.CRITIQUE: 60, P.HAUTE: 4 * 60, P.MOYENNE: 8 * 60, P.FAIBLE: 24 * 60,
+})
+SLA_RESOLUTION = _minutes_by_priority("SLA_RESOLUTION_MINUTES", {
+    P.CRITIQUE: 4 * 60, P.HAUTE: 24 * 60, P.MOYENNE: 3 * 24 * 60, P.FAIBLE: 7 * 24 * 60,
+})
+
+VALIDATION_REMINDERS = {
+    K.RAPPEL_VALIDATION_1: (1, timedelta(days=3)),
+    K.RAPPEL_VALIDATION_2: (2, timedelta(days=7)),
+    K.RAPPEL_VALIDATION_3: (3, timedelta(days=10)),
+}
+AUTO_CLOSE_DAYS = 14
+
+SLA_TIMER_BATCH_SIZE = int(os.getenv("SLA_TIMER_BATCH_SIZE", "500"))
+
+ACTIVE_STATUSES = frozenset({
+    models.TicketStatus.EN_ATTENTE_ANALYSE,
+    models.TicketStatus.ASSIGNE_TECHNICIEN,
+    models.TicketStatus.EN_COURS,
+})
+# Attributs du ticket qui déterminent ses échéances
+TIMER_ATTRIBUTES = ("status", "priority", "resolved_at")
+
+_NEXT_DUE = "sla_timers_next_due"
+
+
+def _desired_timers(
+    status: models.TicketStatus,
+    priority: models.TicketPriority,
+    resolved_at: Optional[datetime],
+) -> Dict[models.TimerKind, Tuple[Optional[datetime], timedelta]]:
+    """Échéances attendues pour ce statut : {type: (point de départ fixe ou None, délai)}"""
+    desired = {}
+    if status == models.TicketStatus.EN_ATTENTE_ANALYSE:
+        desired[K.SLA_ASSIGNATION] = (None, SLA_ASSIGNMENT[priority])
+    if status in ACTIVE_STATUSES:
+        desired[K.SLA_RESOLUTION] = (None, SLA_RESOLUTION[priority])
+    if status == models.TicketStatus.RESOLU:
+        for kind, (_, delay) in VALIDATION_REMINDERS.items():
+            desired[kind] = (resolved_at, delay)
+        desired[K.CLOTURE_AUTOMATIQUE] = (resolved_at, timedelta(days=AUTO_CLOSE_DAYS))
+    return desired
+
+
+def sync_ticket_timers(
+    session: Session,
+    ticket_id: int,
+    status: models.TicketStatus,
+    priority: models.TicketPriority,
+    resolved_at: Optional[datetime] = None,
+    now: Optional[datetime] = None,
+) -> None:
+    """
+    Arme les échéances du statut courant et annule les autres (dans la transaction
+    en cours). Une échéance déjà armée garde son point de départ : un changement de
+    priorité recalcule seulement due_at. Une échéance déjà déclenchée n'est pas réarmée.
+    """
+    now = now or datetime.utcnow()
+    timers = models.TicketTimer.__table__
+    connection = session.connection()
+    desired = _desired_timers(status, priority, resolved_at)
+
+    existing = {
+        row.kind: row
+        for row in connection.execute(
+            select(timers.c.id, timers.c.kind, timers.c.armed_at, timers.c.due_at, timers.c.fired_at)
+            .where(timers.c.ticket_id == ticket_id)
+        )
+    }
+
+    cancelled = [row.id for kind, row in existing.items() if kind not in desired]
+    if cancelled:
+        connection.execute(delete(timers).where(timers.c.id.in_(cancelled)))
+
+    armed = []
+    next_due = None
+    for kind, (start, delay) in desired.items():
+        row = existing.get(kind)
+        if row is None:
+            armed_at = start or now
+            armed.append({"ticket_id": ticket_id, "kind": kind, "armed_at": armed_at, "due_at": armed_at + delay})
+            due_at = armed_at + delay
+        elif row.fired_at is None:
+            due_at = (start or row.armed_at) + delay
+            if due_at != row.due_at:
+                connection.execute(update(timers).where(timers.c.id == row.id).values(due_at=due_at))
+        else:
+            continue
+        next_due = due_at if next_due is None else min(next_due, due_at)
+
+    if armed:
+        connection.execute(insert(timers), armed)
+    if next_due is not None:
+        _note_next_due(session, next_due)
+
+
+def _note_next_due(session: Session, due_at: datetime) -> None:
+    current = session.info.get(_NEXT_DUE)
+    if current is None or due_at < current:
+        session.info[_NEXT_DUE] = due_at
+
+
+@event.listens_for(Session, "after_flush")
+def _track_ticket_timers(session: Session, flush_context) -> None:
+    """Arme / annule les échéances des tickets créés ou dont le statut ou la priorité a changé"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, models.Ticket):
+            continue
+        if obj not in session.new:
+            state = inspect(obj)
+            if not any(state.attrs[name].history.has_changes() for name in TIMER_ATTRIBUTES):
+                continue
+        sync_ticket_timers(session, obj.id, obj.status, obj.priority, obj.resolved_at)
+
+
+@event.listens_for(Session, "after_commit")
+def _request_wakeup(session: Session) -> None:
+    due_at = session.info.pop(_NEXT_DUE, None)
+    if due_at is not None:
+        timer_wakeup.request(due_at)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_next_due(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_NEXT_DUE, None)
+
+
+class TimerWakeup:
+    """
+    Réveil ponctuel du scheduler à la prochaine échéance connue (job DateTrigger
+    remplacé quand une échéance plus proche est armée).
+    """
+
+    JOB_ID = "sla_timer_wakeup"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scheduler = None
+        self._job: Optional[Callable] = None
+        self._next: Optional[datetime] = None
+
+    def attach(self, scheduler, job: Callable) -> None:
+        self._scheduler = scheduler
+        self._job = job
+
+    def detach(self) -> None:
+        """Scheduler arrêté : plus de réveil à programmer"""
+        with self._lock:
+            self._scheduler = None
+            self._job = None
+            self._next = None
+
+    def request(self, due_at: datetime) -> None:
+        """Programme un réveil à due_at (UTC naïf) s'il précède le réveil déjà prévu"""
+        if self._scheduler is None:
+            return
+        # Import différé : APScheduler n'est chargé que si un scheduler est attaché
+        from apscheduler.triggers.date import DateTrigger
+
+        with self._lock:
+            if self._scheduler is None or (self._next is not None and self._next <= due_at):
+                return
+            self._next = due_at
+            # Échéance déjà passée : réveil immédiat (une date passée serait ignorée comme ratée)
+            run_date = max(due_at, datetime.utcnow()).replace(tzinfo=timezone.utc)
+            self._scheduler.add_job(
+                self._job,
+                trigger=DateTrigger(run_date=run_date),
+                id=self.JOB_ID,
+                name="Traiter les échéances des tickets",
+                replace_existing=True,
+            )
+
+    def rearm(self, due_at: Optional[datetime]) -> None:
+        """Après un traitement : oublie le réveil passé et programme le suivant"""
+        with self._lock:
+            self._next = None
+        if due_at is not None:
+            self.request(due_at)
+
+
+timer_wakeup = TimerWakeup()
+
+
+# ----- Traitement des échéances dépassées -----
+
+def _users_with_roles(db: Session, role_names: List[str]) -> List[models.User]:
+    return (
+        db.query(models.User)
+        .join(models.Role, models.User.role_id == models.Role.id)
+        .filter(models.Role.name.in_(role_names), models.User.actif == True)
+        .all()
+    )
+
+
+def _notify(
+    db: Session, user_id: int, notification_type: models.NotificationType, ticket: models.Ticket, message: str,
+) -> models.Notification:
+    notification = models.Notification(
+        user_id=user_id, type=notification_type, ticket_id=ticket.id, message=message, read=False,
+    )
+    db.add(notification)
+    return notification
+
+
+def _fire_sla_assignment(db: Session, ticket: models.Ticket, now: datetime, emails: list) -> None:
+    for user in _users_with_roles(db, ["Secrétaire DSI", "Adjoint DSI"]):
+        _notify(db, user.id, models.NotificationType.TICKET_EN_ATTENTE, ticket,
+                f"Délai d'assignation dépassé ({ticket.priority.value}) pour le ticket #{ticket.number}: {ticket.title}")
+
+
+def _fire_sla_resolution(db: Session, ticket: models.Ticket, now: datetime, emails: list) -> None:
+    for user in _users_with_roles(db, ["Adjoint DSI", "DSI"]):
+        _notify(db, user.id, models.NotificationType.ESCALADE, ticket,
+                f"Délai de résolution dépassé ({ticket.priority.value}) pour le ticket #{ticket.number}: {ticket.title}")
+    if ticket.technician_id:
+        _notify(db, ticket.technician_id, models.NotificationType.RAPPEL, ticket,
+                f"Délai de résolution dépassé pour le ticket #{ticket.number}: {ticket.title}")
+
+
+REMINDER_MESSAGES = {
+    1: "Rappel : Veuillez valider la résolution de votre ticket #{number}",
+    2: "Second rappel : Validation requise pour votre ticket #{number}",
+    3: "Dernier rappel : Veuillez valider votre ticket #{number}",
+}
+
+
+def _fire_validation_reminder(kind: models.TimerKind):
+    reminder_number, _ = VALIDATION_REMINDERS[kind]
+    # Délai du rappel suivant (ou de la clôture) : au-delà, ce rappel est dépassé
+    superseded_after = min(
+        [delay for number, delay in VALIDATION_REMINDERS.values() if number > reminder_number]
+        + [timedelta(days=AUTO_CLOSE_DAYS)]
+    )
+
+    def fire(db: Session, ticket: models.Ticket, now: datetime, emails: list) -> None:
+        if ticket.status != models.TicketStatus.RESOLU:
+            return
+        # Rattrapage (scheduler arrêté) : seul le dernier rappel échu est envoyé
+        if ticket.resolved_at and now >= ticket.resolved_at + superseded_after:
+            return
+        creator = db.get(models.User, ticket.creator_id)
+        if not (creator and creator.email and creator.email.strip()):
+            return
+        notification = _notify(db, ticket.creator_id, models.NotificationType[kind.name], ticket,
+                               REMINDER_MESSAGES[reminder_number].format(number=ticket.number))
+        delivery = EmailDelivery.for_notification(notification, ticket.priority)
+        emails.append((delivery, email_service.send_validation_reminder, dict(
+            ticket_id=str(ticket.id),
+            ticket_number=ticket.number,
+            ticket_title=ticket.title,
+            creator_email=creator.email,
+            creator_name=creator.full_name,
+            reminder_number=reminder_number,
+            days_since_resolution=(now - (ticket.resolved_at or now)).days,
+        )))
+
+    return fire
+
+
+def _fire_auto_close(db: Session, ticket: models.Ticket, now: datetime, emails: list) -> None:
+    if ticket.status != models.TicketStatus.RESOLU:
+        return
+    # Le changement de statut annule les autres échéances du ticket (écouteur after_flush)
+    ticket.status = models.TicketStatus.CLOTURE
+    ticket.closed_at = now
+    ticket.auto_closed_at = now  # Marquer comme clôture automatique
+
+    db.add(models.TicketHistory(
+        ticket_id=ticket.id,
+        old_status=models.TicketStatus.RESOLU,
+        new_status=models.TicketStatus.CLOTURE,
+        user_id=ticket.creator_id,  # Utiliser le créateur comme user_id pour l'historique
+        reason=f"Clôture automatique après {AUTO_CLOSE_DAYS} jours sans validation",
+    ))
+    creator_notification = _notify(
+        db, ticket.creator_id, models.NotificationType.CLOTURE_AUTOMATIQUE, ticket,
+        f"Votre ticket #{ticket.number} a été clôturé automatiquement après {AUTO_CLOSE_DAYS} jours sans validation. "
+        "Vous pouvez le réouvrir dans les 7 prochains jours si nécessaire.",
+    )
+    if ticket.technician_id:
+        _notify(db, ticket.technician_id, models.NotificationType.TICKET_CLOTURE, ticket,
+                f"Le ticket #{ticket.number} a été clôturé automatiquement après {AUTO_CLOSE_DAYS} jours sans validation: {ticket.title}")
+
+    creator = db.get(models.User, ticket.creator_id)
+    if creator and creator.email and creator.email.strip():
+        delivery = EmailDelivery.for_notification(creator_notification, ticket.priority)
+        emails.append((delivery, email_service.send_ticket_auto_closed_notification, dict(
+            ticket_id=str(ticket.id),
+            ticket_number=ticket.number,
+            ticket_title=ticket.title,
+            creator_email=creator.email,
+            creator_name=creator.full_name,
+        )))
+
+
+HANDLERS = {
+    K.SLA_ASSIGNATION: _fire_sla_assignment,
+    K.SLA_RESOLUTION: _fire_sla_resolution,
+    K.CLOTURE_AUTOMATIQUE: _fire_auto_close,
+    **{kind: _fire_validation_reminder(kind) for kind in VALIDATION_REMINDERS},
+}
+
+
+def process_due_timers(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: int = SLA_TIMER_BATCH_SIZE,
+) -> Tuple[int, Optional[datetime]]:
+    """
+    Déclenche les échéances dépassées, par lots (une transaction par lot, lignes
+    verrouillées avec SKIP LOCKED : plusieurs processus peuvent s'exécuter en parallèle).
+    Les emails sont envoyés (ou mis en attente du récapitulatif) après le commit de chaque lot.
+    Renvoie (nombre d'échéances déclenchées, prochaine échéance en attente).
+    """
+    now = now or datetime.utcnow()
+    timers = models.TicketTimer.__table__
+    fired = 0
+
+    while True:
+        due = db.execute(
+            select(timers.c.id, timers.c.ticket_id, timers.c.kind)
+            .where(timers.c.fired_at.is_(None), timers.c.due_at <= now)
+            .order_by(timers.c.due_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not due:
+            break
+
+        db.execute(update(timers).where(timers.c.id.in_([row.id for row in due])).values(fired_at=now))
+        tickets = {
+            ticket.id: ticket
+            for ticket in db.query(models.Ticket).filter(models.Ticket.id.in_({row.ticket_id for row in due})).all()
+        }
+        emails = []
+        for row in due:
+            ticket = tickets.get(row.ticket_id)
+            if ticket:
+                HANDLERS[row.kind](db, ticket, now, emails)
+        db.commit()
+        fired += len(due)
+
+        # Destinataires en mode récapitulatif : emails mis en attente (voir app.notification_digest)
+        for delivery, send, kwargs in emails:
+            deliver_email(delivery, send, **kwargs)
+        if len(due) < batch_size:
+            break
+
+    next_due = db.execute(select(func.min(timers.c.due_at)).where(timers.c.fired_at.is_(None))).scalar()
+    return fired, next_due
@@ -0,0 +1,195 @@
+"""
+Serveur SMTP local qui accepte et conserve les messages sans les délivrer.
+
+Sert aux tests et aux mesures de débit hors ligne des backends d'envoi
+(EMAIL_BACKEND=sync|async). Pointer l'application dessus avec :
+
+    SMTP_SERVER=127.0.0.1
+    SMTP_PORT=1025
+    SMTP_PLAINTEXT=true
+
+Lancement : python -m app.smtp_sink --port 1025 [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+
+class SinkMessage(NamedTuple):
+    mail_from: str
+    rcpt_tos: List[str]
+    data: bytes
+    received_at: float
+
+
+class SMTPSink:
+    """
+    Serveur SMTP minimal (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT).
+    `latency` (secondes) simule le temps de réponse d'un fournisseur sur chaque commande.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, latency: float = 0.0, verbose: bool = False):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.verbose = verbose
+        self.messages: List[SinkMessage] = []
+        self.connections = 0
+        self.active = 0  # Connexions ouvertes
+        self.max_active = 0
+        self._writers = set()
+        self._received = threading.Condition()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(line.encode("ascii") + b"\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self._writers.add(writer)
+        mail_from, rcpt_tos = "", []
+        try:
+            await self._reply(writer, "220 smtp-sink ESMTP")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("utf-8", "replace").rstrip("\r\n")
+                verb = command[:4].upper()
+
+                if verb == "EHLO":
+                    writer.write(b"250-smtp-sink\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n")
+                    await self._reply(writer, "250 SIZE 10485760")
+                elif verb == "HELO":
+                    await self._reply(writer, "250 smtp-sink")
+                elif verb == "AUTH":
+                    await self._reply(writer, "235 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpt_tos = command[10:].strip().strip("<>"), []
+                    await self._reply(writer, "250 OK")
+                elif verb == "RCPT":
+                    rcpt_tos.append(command[8:].strip().strip("<>"))
+                    await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    chunks = []
+                    while True:
+                        chunk = await reader.readline()
+                        if not chunk or chunk == b".\r\n":
+                            break
+                        chunks.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    self._store(SinkMessage(mail_from, rcpt_tos, b"".join(chunks), time.time()))
+                    mail_from, rcpt_tos = "", []
+                    await self._reply(writer, "250 OK queued")
+                elif verb == "RSET":
+                    mail_from, rcpt_tos = "", []
+                    await self._reply(writer, "250 OK")
+                elif verb == "NOOP":
+                    await self._reply(writer, "250 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.active -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    def _store(self, message: SinkMessage) -> None:
+        with self._received:
+            self.messages.append(message)
+            self._received.notify_all()
+        if self.verbose:
+            print(f"[SMTP-SINK] {message.mail_from} -> {message.rcpt_tos} ({len(message.data)} octets)")
+
+    def wait_for(self, count: int, timeout: float = 10.0) -> bool:
+        """Attend que `count` messages aient été reçus"""
+        with self._received:
+            return self._received.wait_for(lambda: len(self.messages) >= count, timeout)
+
+    def clear(self) -> None:
+        with self._received:
+            self.messages.clear()
+        self.connections = 0
+        self.max_active = self.active
+
+    def drop_connections(self) -> None:
+        """Ferme les connexions ouvertes sans QUIT (délai d'inactivité côté fournisseur)"""
+        done = threading.Event()
+
+        def close_all():
+            for writer in self._writers:
+                writer.close()
+            done.set()
+
+        self._loop.call_soon_threadsafe(close_all)
+        done.wait(5)
+
+    async def serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 : port libre choisi par le système
+        self.port = self._server.sockets[0].getsockname()[1]
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self) -> "SMTPSink":
+        """Démarre le serveur dans un thread (tests, benchmarks)"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        def shutdown():
+            self._server.close()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join(5)
+        self._loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur SMTP local pour les tests d'envoi d'emails")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence simulée par commande SMTP")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.latency_ms / 1000, verbose=True)
+    print(f"[SMTP-SINK] En écoute sur {args.host}:{args.port}")
+    try:
+        asyncio.run(sink.serve())
+    except KeyboardInterrupt:
+        print(f"\n[SMTP-SINK] {len(sink.messages)} message(s) reçu(s)")
+
+
+if __name__ == "__main__":
+    main()
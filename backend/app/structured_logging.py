@@ -0,0 +1,206 @@
+"""
+Journalisation structurée et non bloquante.
+
+Les modules journalisent avec logging.getLogger(__name__) (loggers "app.*").
+Le handler du logger "app" se contente de déposer l'enregistrement dans une file
+(QueueHandler) : l'écriture sur stdout est faite par un thread d'écoute
+(QueueListener), une requête n'attend donc jamais la sortie standard.
+
+Chaque enregistrement est une ligne JSON (LOG_FORMAT=json, par défaut) ou texte
+(LOG_FORMAT=text) avec :
+- request_id : identifiant de corrélation posé par RequestIdMiddleware (en-tête
+  X-Request-ID reçu ou généré, renvoyé dans la réponse). Il suit la requête dans
+  ses tâches d'arrière-plan (emails), et chaque exécution d'une tâche planifiée
+  reçoit le sien (champ job en plus) ;
+- les champs passés en extra= (ex. extra={"ticket_id": 12}).
+
+Échantillonnage : les événements fréquents sans gravité sont journalisés avec
+extra={"sampled": True} et seule une fraction LOG_SAMPLE_RATE est conservée
+(les métriques /metrics en gardent le compte exact). Les avertissements et
+erreurs ne sont jamais échantillonnés.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Awaitable, Dict, Optional
+
+import orjson
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Attributs standard d'un LogRecord : tout le reste vient de extra= et devient un champ JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "request_id", "job", "sampled",
+}
+
+_log_context: ContextVar[Dict[str, str]] = ContextVar("log_context", default={})
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_log_context() -> Dict[str, str]:
+    return _log_context.get()
+
+
+@contextmanager
+def log_context(**fields: str):
+    """Ajoute des champs de corrélation (request_id, job...) aux enregistrements du bloc"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+async def bind_log_context(awaitable: Awaitable, context: Optional[Dict[str, str]] = None) -> Any:
+    """
+    Exécute `awaitable` avec le contexte de corrélation de l'appelant, pour une coroutine
+    confiée à une autre boucle asyncio (run_coroutine_threadsafe ne propage pas le contexte).
+    Le contexte doit être capturé dans le thread appelant : bind_log_context(coro, current_log_context())
+    """
+    with log_context(**(context or {})):
+        return await awaitable
+
+
+class ContextFilter(logging.Filter):
+    """Copie le contexte de corrélation dans l'enregistrement, dans le thread qui journalise"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.request_id = context.get("request_id", "-")
+        record.job = context.get("job")
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Ne garde qu'une fraction des enregistrements marqués sampled (niveau < WARNING)"""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        if getattr(record, "job", None):
+            entry["job"] = record.job
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        # exc_text : exception déjà mise en texte par le QueueHandler
+        exception = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exception:
+            entry["exception"] = exception
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """
+    QueueHandler qui transmet l'enregistrement tel quel (message formaté, exception
+    mise en texte) : le formatage JSON est fait par le thread d'écoute
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_setup_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> QueueListener:
+    """Configure le logger "app" (file + thread d'écoute). Idempotent"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+
+        records: queue.SimpleQueue = queue.SimpleQueue()  # Non bornée : put() ne bloque jamais
+        handler = _PreparedQueueHandler(records)
+        handler.addFilter(ContextFilter())
+        handler.addFilter(SamplingFilter())
+
+        logger = logging.getLogger("app")
+        logger.setLevel(LOG_LEVEL)
+        logger.handlers = [handler]
+        logger.propagate = False
+
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+class RequestIdMiddleware:
+    """Pose le request_id de la requête (X-Request-ID reçu ou généré) et le renvoie dans la réponse"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        received = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                received = value.decode("latin-1")
+                break
+        request_id = received if received and _VALID_REQUEST_ID.match(received) else new_request_id()
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        # Les tâches d'arrière-plan (emails) s'exécutent dans cet appel : elles héritent du contexte
+        with log_context(request_id=request_id):
+            await self.app(scope, receive, send_with_request_id)
@@ -0,0 +1,179 @@
+"""
+Archivage des tickets clôturés.
+
+tickets, comments et ticket_history grossissaient sans fin et chaque liste,
+recherche ou statistique parcourait tout l'historique. Les tickets CLOTURE
+clôturés depuis plus de TICKET_ARCHIVE_AFTER_DAYS jours sont déplacés, avec
+leurs commentaires et leur historique, vers tickets_archive, comments_archive
+et ticket_history_archive. Les tables actives ne gardent que les tickets en
+cours et récemment clôturés.
+
+Les tables d'archive sont partitionnées par année de clôture du ticket
+(PARTITION BY RANGE sur ticket_closed_at, une partition par année créée à la
+demande). Une année entière peut ainsi être détachée puis exportée vers un
+stockage froid (ALTER TABLE ... DETACH PARTITION, pg_dump de la partition)
+sans DELETE massif.
+
+Un ticket archivé reste lisible en lecture seule : détail, commentaires,
+historique, timeline et pièces jointes. La recherche des listes l'inclut
+sur demande (include_archived=true). Les rapports de période et les
+statistiques des techniciens (app.analytics) incluent l'archive : ils ne
+changent pas quand des tickets y sont déplacés.
+
+Le déplacement travaille par lots : une transaction par lot, tickets
+verrouillés avec SKIP LOCKED, instructions DELETE ... RETURNING dans un
+INSERT ... SELECT. Les échéances et signatures du ticket sont supprimées en
+cascade. Les notifications gardent leur ticket_id (colonne sans clé
+étrangère). Un ticket ayant encore un email en attente de récapitulatif est
+archivé à une exécution suivante.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, exists, insert, literal, select, text
+from sqlalchemy.orm import Session, joinedload
+
+from . import models
+from .similarity_index import similarity_index
+
+load_dotenv()
+
+TICKET_ARCHIVE_AFTER_DAYS = int(os.getenv("TICKET_ARCHIVE_AFTER_DAYS", "365"))
+TICKET_ARCHIVE_BATCH_SIZE = int(os.getenv("TICKET_ARCHIVE_BATCH_SIZE", "500"))
+# Nombre maximal de lots par exécution du job (le reste est traité à l'exécution suivante)
+TICKET_ARCHIVE_MAX_BATCHES = int(os.getenv("TICKET_ARCHIVE_MAX_BATCHES", "100"))
+
+ARCHIVE_TABLES = (
+    models.TicketArchive.__table__,
+    models.CommentArchive.__table__,
+    models.TicketHistoryArchive.__table__,
+)
+
+# Partitions dont l'existence est connue de ce processus
+_known_partitions: Set[Tuple[str, int]] = set()
+
+
+def ensure_partitions(db: Session, years: Iterable[int]) -> None:
+    """Crée les partitions annuelles manquantes des tables d'archive"""
+    for year in sorted(set(years)):
+        for table in ARCHIVE_TABLES:
+            if (table.name, year) in _known_partitions:
+                continue
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table.name}_{year} PARTITION OF {table.name} "
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
+            _known_partitions.add((table.name, year))
+
+
+def _move_children(db: Session, source, archive, ticket_ids: list) -> None:
+    """Déplace les lignes de `source` (commentaires, historique) des tickets vers `archive`"""
+    tickets = models.Ticket.__table__
+    columns = [column.name for column in source.columns]
+    moved = (
+        delete(source)
+        .where(source.c.ticket_id.in_(ticket_ids))
+        .returning(*source.columns)
+        .cte("moved")
+    )
+    # La date de clôture (clé de partition) est lue dans tickets, déplacés ensuite
+    db.execute(
+        insert(archive).from_select(
+            columns + ["ticket_closed_at"],
+            select(*(moved.c[name] for name in columns), tickets.c.closed_at)
+            .select_from(moved)
+            .join(tickets, tickets.c.id == moved.c.ticket_id),
+        )
+    )
+
+
+def _move_tickets(db: Session, ticket_ids: list, archived_at: datetime) -> None:
+    tickets = models.Ticket.__table__
+    archive = models.TicketArchive.__table__
+    columns = [column.name for column in tickets.columns]
+    moved = delete(tickets).where(tickets.c.id.in_(ticket_ids)).returning(*tickets.columns).cte("moved")
+    db.execute(
+        insert(archive).from_select(
+            columns + ["ticket_closed_at", "archived_at"],
+            select(
+                *(moved.c[name] for name in columns),
+                moved.c.closed_at,
+                literal(archived_at, archive.c.archived_at.type),
+            ),
+        )
+    )
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = TICKET_ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Archive un lot de tickets clôturés avant `cutoff`, avec commentaires et historique.
+    Renvoie le nombre de tickets archivés.
+    """
+    tickets = models.Ticket.__table__
+    digest_items = models.EmailDigestItem.__table__
+
+    batch = db.execute(
+        select(tickets.c.id, tickets.c.closed_at)
+        .where(
+            tickets.c.status == models.TicketStatus.CLOTURE,
+            tickets.c.closed_at < cutoff,
+            ~exists().where(digest_items.c.ticket_id == tickets.c.id),
+        )
+        .order_by(tickets.c.closed_at)
+        .limit(batch_size)
+        .with_for_update(of=tickets, skip_locked=True)
+    ).all()
+    if not batch:
+        db.commit()
+        return 0
+
+    ticket_ids = [row.id for row in batch]
+    ensure_partitions(db, {row.closed_at.year for row in batch})
+    _move_children(db, models.Comment.__table__, models.CommentArchive.__table__, ticket_ids)
+    _move_children(db, models.TicketHistory.__table__, models.TicketHistoryArchive.__table__, ticket_ids)
+    _move_tickets(db, ticket_ids, datetime.utcnow())
+    db.commit()
+
+    for ticket_id in ticket_ids:
+        similarity_index.remove(ticket_id)
+    return len(ticket_ids)
+
+
+def archive_closed_tickets(db: Session, now: Optional[datetime] = None) -> int:
+    """Archive par lots les tickets clôturés depuis plus de TICKET_ARCHIVE_AFTER_DAYS jours"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=TICKET_ARCHIVE_AFTER_DAYS)
+    total = 0
+    for _ in range(TICKET_ARCHIVE_MAX_BATCHES):
+        count = archive_batch(db, cutoff)
+        total += count
+        if count < TICKET_ARCHIVE_BATCH_SIZE:
+            break
+    return total
+
+
+# ----- Lecture des tickets archivés -----
+
+def get_archived_ticket(db: Session, ticket_id: int) -> Optional[models.TicketArchive]:
+    """Ticket archivé avec son créateur et son technicien"""
+    return (
+        db.query(models.TicketArchive)
+        .options(joinedload(models.TicketArchive.creator), joinedload(models.TicketArchive.technician))
+        .filter(models.TicketArchive.id == ticket_id)
+        .first()
+    )
+
+
+def is_archived(ticket) -> bool:
+    return isinstance(ticket, models.TicketArchive)
+
+
+def comment_model(ticket):
+    """Modèle des commentaires du ticket (table active ou archive)"""
+    return models.CommentArchive if is_archived(ticket) else models.Comment
+
+
+def history_model(ticket):
+    """Modèle de l'historique du ticket (table active ou archive)"""
+    return models.TicketHistoryArchive if is_archived(ticket) else models.TicketHistory
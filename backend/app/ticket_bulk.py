@@ -0,0 +1,259 @@
+"""
+Opérations groupées sur les tickets (POST /tickets/bulk).
+
+Une opération (assignation, clôture, changement de priorité) est appliquée à une
+liste de tickets dans une seule transaction :
+- une lecture des tickets concernés ;
+- un seul UPDATE conditionnel ... WHERE (id, version) IN (...) RETURNING id,
+  version : les tickets modifiés entre-temps par une autre requête sont signalés
+  en 409 sans annuler les autres (verrouillage optimiste, voir app.ticket_workflow) ;
+- l'historique et les notifications sont insérés en INSERT multi-lignes ;
+- un seul email récapitulatif par destinataire (technicien ou créateur) au lieu
+  d'un email par ticket, sauf pour les tickets que le destinataire reçoit en mode
+  récapitulatif (voir app.notification_digest).
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .auto_assignment import LOAD_STATUSES, record_load_deltas
+from .notification_counters import apply_unread_deltas
+from .notification_digest import EmailDelivery
+from .sla_timers import sync_ticket_timers
+from .ticket_workflow import TRANSITIONS
+
+
+class BulkEmail(NamedTuple):
+    """Email récapitulatif à envoyer après le commit"""
+    template: str
+    recipient_email: str
+    recipient_name: str
+    tickets: List[Dict[str, Any]]
+    deliveries: List[EmailDelivery]  # deliveries[i] : notification du destinataire pour tickets[i]
+    notes: Optional[str] = None
+
+
+def _history_reason(operation: schemas.TicketBulkOperation, default: str) -> str:
+    reason = operation.reason or default
+    if operation.action == "assign" and operation.notes:
+        reason += f" | Instructions: {operation.notes}"
+    return reason
+
+
+def apply_bulk_operation(
+    db: Session,
+    operation: schemas.TicketBulkOperation,
+    current_user: models.User,
+):
+    """
+    Applique l'opération (sans commit). Renvoie (résultats par ticket, emails récapitulatifs).
+    Les paramètres de l'opération (technicien, priorité) doivent avoir été validés.
+    """
+    tickets = models.Ticket.__table__
+    ticket_ids = list(dict.fromkeys(operation.ticket_ids))  # Dédoublonnage, ordre conservé
+    transition = TRANSITIONS[operation.action]
+    now = datetime.utcnow()
+
+    rows = {
+        row.id: row
+        for row in db.execute(
+            select(
+                tickets.c.id, tickets.c.number, tickets.c.title, tickets.c.status, tickets.c.priority,
+                tickets.c.version, tickets.c.creator_id, tickets.c.technician_id,
+            ).where(tickets.c.id.in_(ticket_ids))
+        )
+    }
+
+    results: Dict[int, schemas.TicketBulkItemResult] = {}
+    candidates = []
+    for ticket_id in ticket_ids:
+        row = rows.get(ticket_id)
+        if row is None:
+            results[ticket_id] = schemas.TicketBulkItemResult(ticket_id=ticket_id, status_code=404, detail="Ticket not found")
+        elif row.status not in transition.sources:
+            results[ticket_id] = schemas.TicketBulkItemResult(
+                ticket_id=ticket_id, status_code=409, detail=transition.detail, version=row.version
+            )
+        elif operation.action == "reprioritize" and row.priority == operation.priority:
+            results[ticket_id] = schemas.TicketBulkItemResult(
+                ticket_id=ticket_id, status_code=200, detail="Priority unchanged", version=row.version
+            )
+        else:
+            candidates.append(row)
+
+    if operation.action == "assign":
+        values = {
+            "technician_id": operation.technician_id,
+            "secretary_id": current_user.id,
+            "status": transition.target,
+            "assigned_at": now,
+        }
+    elif operation.action == "close":
+        values = {"status": transition.target, "closed_at": now}
+    else:
+        values = {"priority": operation.priority}
+
+    updated: Dict[int, int] = {}
+    if candidates:
+        updated = dict(
+            db.execute(
+                update(tickets)
+                .where(tuple_(tickets.c.id, tickets.c.version).in_([(row.id, row.version) for row in candidates]))
+                .values(**values, version=tickets.c.version + 1)
+                .returning(tickets.c.id, tickets.c.version)
+            ).all()
+        )
+
+    history_rows = []
+    notification_rows = []
+    for row in candidates:
+        if row.id not in updated:
+            results[row.id] = schemas.TicketBulkItemResult(
+                ticket_id=row.id, status_code=409,
+                detail="The resource was modified by another request. Reload it and try again.",
+            )
+            continue
+        results[row.id] = schemas.TicketBulkItemResult(ticket_id=row.id, status_code=200, version=updated[row.id])
+
+        def notify(user_id, notification_type, message):
+            notification_rows.append({
+                "user_id": user_id, "type": notification_type, "ticket_id": row.id,
+                "message": message, "read": False, "created_at": now,
+            })
+
+        if operation.action == "assign":
+            reason = _history_reason(operation, "Assignation groupée")
+            notify(operation.technician_id, models.NotificationType.ASSIGNATION,
+                   f"Un nouveau ticket #{row.number} vous a été assigné: {row.title}")
+            notify(row.creator_id, models.NotificationType.TICKET_ASSIGNE,
+                   f"Votre ticket #{row.number} a été assigné à un technicien: {row.title}")
+        elif operation.action == "close":
+            reason = _history_reason(operation, "Clôture groupée")
+            notify(row.creator_id, models.NotificationType.TICKET_CLOTURE,
+                   f"Votre ticket #{row.number} a été clôturé: {row.title}")
+            if row.technician_id:
+                role = "que vous avez résolu" if row.status == models.TicketStatus.RESOLU else "qui vous était assigné"
+                notify(row.technician_id, models.NotificationType.TICKET_CLOTURE,
+                       f"Le ticket #{row.number} {role} a été clôturé: {row.title}")
+        else:
+            reason = _history_reason(
+                operation,
+                f"Priorité modifiée de {row.priority.value} à {operation.priority.value}",
+            )
+            notify(row.creator_id, models.NotificationType.PRIORITE_MODIFIEE,
+                   f"La priorité de votre ticket #{row.number} est passée à {operation.priority.value}: {row.title}")
+            if row.technician_id:
+                notify(row.technician_id, models.NotificationType.PRIORITE_MODIFIEE,
+                       f"La priorité du ticket #{row.number} est passée à {operation.priority.value}: {row.title}")
+
+        # UPDATE hors ORM : les échéances du ticket sont recalculées explicitement
+        sync_ticket_timers(
+            db, row.id, transition.target or row.status,
+            operation.priority if operation.action == "reprioritize" else row.priority,
+            now=now,
+        )
+
+        history_rows.append({
+            "ticket_id": row.id,
+            "old_status": row.status,
+            "new_status": transition.target or row.status,
+            "user_id": current_user.id,
+            "reason": reason,
+            "changed_at": now,
+        })
+
+    if history_rows:
+        db.execute(insert(models.TicketHistory), history_rows)
+    if notification_rows:
+        db.execute(insert(models.Notification), notification_rows)
+        # INSERT hors ORM : le compteur de non lues est mis à jour explicitement
+        unread = defaultdict(int)
+        for notification in notification_rows:
+            unread[notification["user_id"]] += 1
+        apply_unread_deltas(db, unread)
+
+    # UPDATE hors ORM : la charge des techniciens (assignation automatique) est déclarée explicitement
+    load = defaultdict(int)
+    for row in candidates:
+        if row.id not in updated:
+            continue
+        if operation.action == "assign":
+            load[operation.technician_id] += 1
+        elif operation.action == "close" and row.technician_id and row.status in LOAD_STATUSES:
+            load[row.technician_id] -= 1
+    record_load_deltas(db, load)
+
+    emails = _summary_emails(db, operation, [row for row in candidates if row.id in updated], notification_rows)
+    return [results[ticket_id] for ticket_id in ticket_ids], emails
+
+
+# Template de l'email récapitulatif -> type de la notification correspondante
+SUMMARY_NOTIFICATION_TYPES = {
+    "tickets_bulk_assigned": models.NotificationType.ASSIGNATION,
+    "tickets_bulk_assigned_to_creator": models.NotificationType.TICKET_ASSIGNE,
+    "tickets_bulk_closed": models.NotificationType.TICKET_CLOTURE,
+    "tickets_bulk_reprioritized": models.NotificationType.PRIORITE_MODIFIEE,
+}
+
+
+def _summary_emails(
+    db: Session,
+    operation: schemas.TicketBulkOperation,
+    rows,
+    notification_rows: List[Dict[str, Any]],
+) -> List[BulkEmail]:
+    """Regroupe les tickets modifiés par destinataire : un email par technicien / créateur"""
+    if not rows:
+        return []
+
+    messages: Dict[tuple, str] = {}
+    for notification in notification_rows:
+        key = (notification["user_id"], notification["ticket_id"], notification["type"])
+        messages.setdefault(key, notification["message"])
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    deliveries: Dict[tuple, List[EmailDelivery]] = defaultdict(list)
+    for row in rows:
+        priority = operation.priority if operation.action == "reprioritize" else row.priority
+        ticket = {
+            "id": row.id,
+            "number": row.number,
+            "title": row.title,
+            "priority": priority.value,
+        }
+        if operation.action == "assign":
+            recipients = [
+                ("tickets_bulk_assigned", operation.technician_id),
+                ("tickets_bulk_assigned_to_creator", row.creator_id),
+            ]
+        elif operation.action == "close":
+            recipients = [("tickets_bulk_closed", row.creator_id)]
+        elif row.technician_id:
+            recipients = [("tickets_bulk_reprioritized", row.technician_id)]
+        else:
+            recipients = []
+        for template, user_id in recipients:
+            notification_type = SUMMARY_NOTIFICATION_TYPES[template]
+            groups[(template, user_id)].append(ticket)
+            deliveries[(template, user_id)].append(EmailDelivery(
+                user_id, notification_type, row.id, messages[(user_id, row.id, notification_type)], priority,
+            ))
+
+    user_ids = {user_id for _, user_id in groups}
+    users = {
+        user.id: user
+        for user in db.query(models.User).filter(models.User.id.in_(user_ids)).all()
+    }
+
+    emails = []
+    for (template, user_id), tickets in groups.items():
+        user = users.get(user_id)
+        if not user or not user.email or not user.email.strip():
+            continue
+        notes = operation.notes if template == "tickets_bulk_assigned" else None
+        emails.append(BulkEmail(template, user.email, user.full_name, tickets, deliveries[(template, user_id)], notes))
+    return emails
@@ -0,0 +1,97 @@
+"""
+Machine à états du cycle de vie des tickets.
+
+Chaque action du workflow est décrite une seule fois dans TRANSITIONS : les
+statuts de départ autorisés et le statut d'arrivée (None : le statut ne change
+pas). Les endpoints appellent ensure_transition avant de modifier le ticket.
+
+Les accès concurrents sont traités par verrouillage optimiste : la colonne
+tickets.version (version_id_col du mapper) transforme chaque UPDATE du ticket en
+UPDATE ... WHERE id = ? AND version = ?. Si une autre requête a modifié le ticket
+entre la lecture et l'écriture, le commit lève StaleDataError, converti en 409
+par get_db : la transaction (historique, notifications) est annulée et aucun
+email n'est envoyé.
+"""
+from typing import Dict, FrozenSet, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from . import models
+
+S = models.TicketStatus
+
+ACTIVE_STATUSES = frozenset({S.EN_ATTENTE_ANALYSE, S.ASSIGNE_TECHNICIEN, S.EN_COURS})
+
+
+class Transition(NamedTuple):
+    sources: FrozenSet[models.TicketStatus]
+    target: Optional[models.TicketStatus]
+    detail: str
+
+
+TRANSITIONS: Dict[str, Transition] = {
+    # Secrétaire / Adjoint / DSI
+    "assign": Transition(
+        frozenset({S.EN_ATTENTE_ANALYSE}), S.ASSIGNE_TECHNICIEN,
+        "Ticket is not awaiting assignment. Use /reassign instead.",
+    ),
+    "reassign": Transition(ACTIVE_STATUSES, None, "Only open tickets can be reassigned"),
+    "escalate": Transition(ACTIVE_STATUSES, None, "Only open tickets can be escalated"),
+    "reprioritize": Transition(ACTIVE_STATUSES, None, "Only open tickets can be reprioritised"),
+    "delegate_adjoint": Transition(ACTIVE_STATUSES, S.EN_ATTENTE_ANALYSE, "Only open tickets can be delegated"),
+    "close": Transition(
+        frozenset(set(S) - {S.CLOTURE}), S.CLOTURE, "Ticket is already closed",
+    ),
+    "reject": Transition(
+        frozenset(set(S) - {S.CLOTURE, S.REJETE}), S.REJETE, "Ticket cannot be rejected in its current status",
+    ),
+    "reopen": Transition(frozenset({S.REJETE}), S.ASSIGNE_TECHNICIEN, "Only rejected tickets can be reopened"),
+    # Technicien
+    "accept_assignment": Transition(frozenset({S.ASSIGNE_TECHNICIEN}), None, "Ticket is not in assigned status"),
+    "reject_assignment": Transition(
+        frozenset({S.ASSIGNE_TECHNICIEN}), S.EN_ATTENTE_ANALYSE, "Ticket is not in assigned status",
+    ),
+    "start": Transition(frozenset({S.ASSIGNE_TECHNICIEN}), S.EN_COURS, "Ticket is not in assigned status"),
+    "resolve": Transition(
+        frozenset({S.ASSIGNE_TECHNICIEN, S.EN_COURS}), S.RESOLU, "Only assigned or in-progress tickets can be resolved",
+    ),
+    # Utilisateur créateur
+    "validate": Transition(frozenset({S.RESOLU}), S.CLOTURE, "Ticket must be resolved before validation"),
+    "reject_resolution": Transition(frozenset({S.RESOLU}), S.REJETE, "Ticket must be resolved before validation"),
+    "feedback": Transition(frozenset({S.CLOTURE}), None, "Feedback can only be submitted for closed tickets"),
+    "reopen_by_user": Transition(frozenset({S.CLOTURE}), S.EN_ATTENTE_ANALYSE, "Ticket is not closed"),
+}
+
+# PUT /tickets/{id}/status : action correspondant au statut demandé
+STATUS_ACTIONS: Dict[models.TicketStatus, str] = {
+    S.EN_COURS: "start",
+    S.RESOLU: "resolve",
+    S.CLOTURE: "close",
+    S.REJETE: "reject",
+}
+
+
+def can_transition(ticket: models.Ticket, action: str) -> bool:
+    return ticket.status in TRANSITIONS[action].sources
+
+
+def ensure_transition(ticket: models.Ticket, action: str) -> Optional[models.TicketStatus]:
+    """
+    Vérifie que l'action est autorisée depuis le statut actuel du ticket
+    (409 sinon) et renvoie le statut d'arrivée (None : inchangé).
+    """
+    transition = TRANSITIONS[action]
+    if ticket.status not in transition.sources:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=transition.detail)
+    return transition.target
+
+
+def action_for_status(target: models.TicketStatus) -> str:
+    """Action du workflow pour un changement de statut direct (400 si non pris en charge)"""
+    action = STATUS_ACTIONS.get(target)
+    if action is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Status '{target.value}' cannot be set directly",
+        )
+    return action
@@ -0,0 +1,64 @@
+"""
+Mesure hors ligne du débit d'envoi des backends email (sync / async)
+contre le serveur SMTP local app.smtp_sink.
+
+Usage : python benchmark_email_backends.py [--count 200] [--latency-ms 20] [--domains 5]
+"""
+import argparse
+import json
+import time
+
+from app.email_service import EmailService
+from app.smtp_sink import SMTPSink
+
+
+def run_backend(backend: str, sink: SMTPSink, count: int, domains: int) -> dict:
+    service = EmailService()
+    service.email_enabled = True
+    service.backend = backend
+    service.smtp_server = "127.0.0.1"
+    service.smtp_port = sink.port
+    service.smtp_plaintext = True
+    sink.clear()
+
+    start = time.perf_counter()
+    for i in range(count):
+        service.send_email(
+            [f"user{i}@domaine{i % domains}.local"],
+            f"Benchmark {i}",
+            "Corps du message de test",
+            "<p>Corps du message de test</p>",
+        )
+    submitted = time.perf_counter() - start
+    service.async_backend.flush()
+    elapsed = time.perf_counter() - start
+    service.async_backend.close()
+
+    return {
+        "backend": backend,
+        "messages": len(sink.messages),
+        "seconds": round(elapsed, 3),
+        "caller_seconds": round(submitted, 3),
+        "messages_per_second": round(len(sink.messages) / elapsed, 1) if elapsed else None,
+        "smtp_connections": sink.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends d'envoi d'emails")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latence simulée par commande SMTP")
+    parser.add_argument("--domains", type=int, default=5)
+    parser.add_argument("--backends", default="sync,async")
+    args = parser.parse_args()
+
+    sink = SMTPSink(port=0, latency=args.latency_ms / 1000).start()
+    try:
+        results = [run_backend(b, sink, args.count, args.domains) for b in args.backends.split(",")]
+    finally:
+        sink.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
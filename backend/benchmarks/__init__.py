@@ -0,0 +1,16 @@
+"""
+Suite de benchmarks (base PostgreSQL locale + serveur SMTP local app.smtp_sink).
+
+À lancer depuis backend/, contre une base dédiée (les données sont modifiées) :
+
+    python -m benchmarks.generate_data --tickets 1000000 --history 5000000 --notifications 10000000
+    python -m benchmarks.workloads --base-url http://127.0.0.1:8000 --duration 120
+    python -m benchmarks.microbench
+    python -m benchmarks.startup
+    python -m benchmarks.compare benchmarks/results/avant.json benchmarks/results/apres.json
+
+Chaque commande écrit ses résultats en JSON (benchmarks/results/ par défaut) :
+durées en millisecondes (moyenne, p50, p90, p99, max), débits et métadonnées
+(commit git, version de Python, paramètres). compare signale les mesures qui se
+dégradent au-delà d'un seuil entre deux exécutions (code de sortie 1).
+"""
@@ -0,0 +1,88 @@
+"""
+Compare deux fichiers de résultats (même suite) et signale les régressions.
+
+Chaque durée en millisecondes (clés *_ms) présente dans les deux fichiers est
+comparée ; une mesure qui augmente de plus de --threshold % (et d'au moins
+--min-delta-ms, pour ignorer le bruit des mesures très courtes) est une
+régression. Code de sortie 1 s'il y en a au moins une.
+
+Usage (depuis backend/) :
+    python -m benchmarks.compare benchmarks/results/avant.json benchmarks/results/apres.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+
+def flatten(results: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """(chemin "section/mesure/p90_ms", valeur) de chaque durée en millisecondes"""
+    if not isinstance(results, dict):
+        return
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif str(key).endswith("_ms") and isinstance(value, (int, float)):
+            yield path, float(value)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float, min_delta_ms: float) -> Dict[str, Any]:
+    before = dict(flatten(baseline.get("results", {})))
+    after = dict(flatten(candidate.get("results", {})))
+    rows = []
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        change = (new - old) / old * 100 if old else None
+        regression = change is not None and change > threshold and new - old >= min_delta_ms
+        improvement = change is not None and change < -threshold and old - new >= min_delta_ms
+        rows.append({
+            "metric": path,
+            "before_ms": old,
+            "after_ms": new,
+            "change_percent": round(change, 1) if change is not None else None,
+            "status": "regression" if regression else "improvement" if improvement else "unchanged",
+        })
+    return {
+        "rows": rows,
+        "regressions": [row for row in rows if row["status"] == "regression"],
+        "improvements": [row for row in rows if row["status"] == "improvement"],
+        "only_before": sorted(before.keys() - after.keys()),
+        "only_after": sorted(after.keys() - before.keys()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison de deux résultats de benchmark")
+    parser.add_argument("baseline", help="Résultats de référence (JSON)")
+    parser.add_argument("candidate", help="Résultats à comparer (JSON)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Dégradation tolérée (%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Écart minimal pris en compte (ms)")
+    parser.add_argument("--all", action="store_true", help="Afficher aussi les mesures inchangées")
+    args = parser.parse_args()
+
+    documents = []
+    for path in (args.baseline, args.candidate):
+        with open(path, encoding="utf-8") as f:
+            documents.append(json.load(f))
+    baseline, candidate = documents
+    if baseline.get("suite") != candidate.get("suite"):
+        parser.error(f"Suites différentes : {baseline.get('suite')} / {candidate.get('suite')}")
+
+    report = compare(baseline, candidate, args.threshold, args.min_delta_ms)
+    for row in report["rows"]:
+        if args.all or row["status"] != "unchanged":
+            change = f"{row['change_percent']:+.1f} %" if row["change_percent"] is not None else "n/a"
+            print(f"{row['status']:<12} {row['metric']:<70} {row['before_ms']:>10.3f} -> {row['after_ms']:>10.3f} ms  {change}")
+
+    commits = (baseline.get("metadata", {}).get("git_commit"), candidate.get("metadata", {}).get("git_commit"))
+    print(
+        f"{len(report['rows'])} mesures comparées ({commits[0]} -> {commits[1]}) : "
+        f"{len(report['regressions'])} régressions, {len(report['improvements'])} améliorations "
+        f"(seuil {args.threshold} %)"
+    )
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
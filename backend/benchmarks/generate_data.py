@@ -0,0 +1,474 @@
+"""
+Générateur de données synthétiques pour les benchmarks (PostgreSQL, COPY).
+
+Charge des utilisateurs, des tickets avec leur historique de statuts et des
+notifications aux distributions réalistes :
+- création des tickets étalée sur --days jours, surtout aux heures ouvrées et
+  en semaine ;
+- priorités, types et catégories pondérés ; quelques utilisateurs très actifs
+  (loi de Pareto) ;
+- cycle de vie cohérent avec l'âge du ticket : les anciens tickets sont
+  presque tous clôturés, les récents encore ouverts ; délais d'assignation
+  et de résolution log-normaux (plus courts pour les priorités hautes) ;
+- notifications issues des événements du cycle de vie, lues pour la plupart
+  quand elles sont anciennes.
+
+Les lignes sont générées en Python et chargées par lots avec COPY FROM STDIN
+(un commit par lot), sans passer par l'ORM. Les séquences, les compteurs de
+notifications non lues et les statistiques du planificateur (ANALYZE) sont mis
+à jour à la fin. Les rôles doivent exister (init_db.py).
+
+Usage (depuis backend/) :
+    python -m benchmarks.generate_data --tickets 1000000 --history 5000000 --notifications 10000000
+"""
+import argparse
+import bisect
+import io
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from app import models
+from app.database import SessionLocal, engine
+from app.notification_counters import reconcile_unread_counters
+from app.security import get_password_hash
+
+from .results import write_results
+
+S = models.TicketStatus
+N = models.NotificationType
+
+AGENCIES = [
+    "Agence Dakar Plateau", "Agence Dakar Almadies", "Agence Thiès", "Agence Saint-Louis",
+    "Agence Kaolack", "Agence Ziguinchor", "Agence Touba", "Agence Mbour", "Agence Rufisque",
+    "Agence Tambacounda", "Siège", "Agence IT",
+]
+PRIORITY_WEIGHTS = {
+    models.TicketPriority.FAIBLE: 0.30,
+    models.TicketPriority.MOYENNE: 0.45,
+    models.TicketPriority.HAUTE: 0.20,
+    models.TicketPriority.CRITIQUE: 0.05,
+}
+# Délai médian de résolution (heures) par priorité
+RESOLUTION_MEDIAN_HOURS = {
+    models.TicketPriority.FAIBLE: 48.0,
+    models.TicketPriority.MOYENNE: 24.0,
+    models.TicketPriority.HAUTE: 8.0,
+    models.TicketPriority.CRITIQUE: 3.0,
+}
+TYPE_WEIGHTS = {models.TicketType.MATERIEL: 0.55, models.TicketType.APPLICATIF: 0.45}
+DEFAULT_CATEGORIES = {
+    "materiel": ["Imprimante", "Poste de travail", "Réseau", "Téléphonie", "Écran"],
+    "applicatif": ["Messagerie", "ERP", "Logiciel métier", "Accès et comptes", "Navigateur"],
+}
+PROBLEMS = {
+    "materiel": [
+        "Imprimante {place} hors service", "Bourrage papier sur l'imprimante {place}",
+        "Écran noir au démarrage du poste {place}", "Pas de connexion réseau {place}",
+        "Clavier défectueux {place}", "Téléphone fixe muet {place}", "Poste très lent {place}",
+        "Câble réseau endommagé {place}", "Onduleur en alarme {place}", "Souris sans fil ne répond plus",
+    ],
+    "applicatif": [
+        "Impossible d'ouvrir {app}", "Mot de passe {app} expiré", "Erreur à la connexion à {app}",
+        "Messagerie : pièces jointes bloquées", "{app} se ferme tout seul", "Lenteur de {app}",
+        "Droits insuffisants sur {app}", "Export PDF impossible dans {app}", "Mise à jour de {app} en échec",
+        "Synchronisation du calendrier en erreur",
+    ],
+}
+PLACES = ["au 1er étage", "au 2e étage", "à l'accueil", "au guichet 3", "en salle de réunion", "au service RH",
+          "au service comptable", "à la direction", "au magasin", ""]
+APPS = ["l'ERP", "Outlook", "le logiciel de caisse", "SAGE", "l'intranet", "Teams", "le CRM", "Excel"]
+DETAILS = [
+    "Le problème est apparu ce matin.", "Plusieurs collègues sont concernés.", "Déjà redémarré, sans effet.",
+    "Urgent : bloque le traitement des dossiers clients.", "Le message d'erreur s'affiche à chaque tentative.",
+    "Cela arrive de manière intermittente depuis hier.",
+]
+# Poids des heures de création (heures ouvrées, pic le matin)
+HOUR_WEIGHTS = [0.1, 0.05, 0.05, 0.05, 0.05, 0.1, 0.3, 1.0, 3.0, 4.0, 3.5, 3.0,
+                1.5, 2.5, 3.0, 2.5, 2.0, 1.0, 0.5, 0.3, 0.2, 0.2, 0.1, 0.1]
+WEEKEND_FACTOR = 0.15
+
+
+def _esc(value) -> str:
+    """Valeur au format texte de COPY"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, Enum):
+        return value.name  # Les types ENUM PostgreSQL portent les noms des membres
+    value = str(value)
+    if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+        value = value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return value
+
+
+class CopyBuffer:
+    """Lignes d'une table accumulées en mémoire puis chargées par COPY"""
+
+    def __init__(self, table: str, columns: Sequence[str]):
+        self.sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        self.table = table
+        self.buffer = io.StringIO()
+        self.pending = 0
+        self.total = 0
+
+    def add(self, *values) -> None:
+        self.buffer.write("\t".join(_esc(v) for v in values))
+        self.buffer.write("\n")
+        self.pending += 1
+
+    def flush(self, cursor) -> None:
+        if not self.pending:
+            return
+        self.buffer.seek(0)
+        cursor.copy_expert(self.sql, self.buffer)
+        self.total += self.pending
+        self.buffer = io.StringIO()
+        self.pending = 0
+
+
+class WeightedChoice:
+    """Tirage pondéré en O(log n) (bisect sur les poids cumulés)"""
+
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        self.items = list(items)
+        self.cumulative = list(itertools.accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def __call__(self, rng: random.Random):
+        return self.items[bisect.bisect(self.cumulative, rng.random() * self.total)]
+
+
+def _lognormal_hours(rng: random.Random, median: float, sigma: float = 1.0) -> timedelta:
+    return timedelta(hours=rng.lognormvariate(math.log(median), sigma))
+
+
+def _creation_times(rng: random.Random, count: int, days: int, now: datetime) -> List[datetime]:
+    """Dates de création triées : heures ouvrées, peu de tickets le week-end"""
+    start = now - timedelta(days=days)
+    hours = WeightedChoice(range(24), HOUR_WEIGHTS)
+    times = []
+    while len(times) < count:
+        day = start + timedelta(days=rng.randrange(days))
+        if day.weekday() >= 5 and rng.random() > WEEKEND_FACTOR:
+            continue
+        moment = day.replace(hour=hours(rng), minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+        if moment < now:
+            times.append(moment)
+    times.sort()
+    return times
+
+
+# Statut des tickets de moins de 30 jours, puis de moins de 3 jours
+_RECENT_STATUS = WeightedChoice(
+    [S.EN_ATTENTE_ANALYSE, S.ASSIGNE_TECHNICIEN, S.EN_COURS, S.RESOLU, S.CLOTURE, S.REJETE],
+    [0.03, 0.07, 0.15, 0.2, 0.5, 0.05],
+)
+_OPEN_STATUS = WeightedChoice(
+    [S.EN_ATTENTE_ANALYSE, S.ASSIGNE_TECHNICIEN, S.EN_COURS, S.RESOLU, S.CLOTURE],
+    [0.3, 0.25, 0.25, 0.15, 0.05],
+)
+
+
+def _final_status(rng: random.Random, age: timedelta) -> models.TicketStatus:
+    if age > timedelta(days=30):
+        return S.CLOTURE if rng.random() < 0.88 else (S.REJETE if rng.random() < 0.5 else S.RESOLU)
+    if age > timedelta(days=3):
+        return _RECENT_STATUS(rng)
+    return _OPEN_STATUS(rng)
+
+
+class Generator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    # ----- Utilisateurs -----
+
+    def load_users(self, cursor) -> Dict[str, List[Tuple[int, Optional[str], Optional[str]]]]:
+        """Crée les comptes bench_* ; renvoie {rôle: [(id, agence, spécialisation)]}"""
+        cursor.execute("SELECT name, id FROM roles")
+        roles = dict(cursor.fetchall())
+        missing = {"Utilisateur", "Technicien", "Secrétaire DSI", "Adjoint DSI", "DSI"} - set(roles)
+        if missing:
+            raise SystemExit(f"Rôles manquants : {', '.join(sorted(missing))}. Lancez d'abord init_db.py")
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+        next_id = cursor.fetchone()[0] + 1
+        password_hash = get_password_hash(self.args.password)
+        buffer = CopyBuffer("users", [
+            "id", "full_name", "email", "agency", "actif", "specialization", "max_tickets_capacity",
+            "created_at", "token_version", "username", "password_hash", "role_id",
+        ])
+        users: Dict[str, List[Tuple[int, Optional[str], Optional[str]]]] = {}
+        counts = [
+            ("Utilisateur", "user", self.args.users),
+            ("Technicien", "tech", self.args.technicians),
+            ("Secrétaire DSI", "secretaire", self.args.secretaries),
+            ("Adjoint DSI", "adjoint", 1),
+            ("DSI", "dsi", 1),
+        ]
+        for role, prefix, count in counts:
+            for i in range(count):
+                agency = "Agence IT" if role != "Utilisateur" else self.rng.choice(AGENCIES)
+                specialization = None
+                if role == "Technicien":
+                    specialization = "materiel" if i % 5 < 3 else "applicatif"
+                username = f"bench_{prefix}_{self.args.run_tag}_{i}"
+                buffer.add(
+                    next_id, f"Bench {prefix.capitalize()} {i}", f"{username}@bench.local", agency, True,
+                    specialization, self.args.capacity if role == "Technicien" else None,
+                    self.now - timedelta(days=self.args.days + 1), 0, username, password_hash, roles[role],
+                )
+                users.setdefault(role, []).append((next_id, agency, specialization))
+                next_id += 1
+        buffer.flush(cursor)
+        return users
+
+    def _categories(self, cursor) -> Dict[str, List[str]]:
+        cursor.execute(
+            "SELECT t.code, c.name FROM ticket_categories c JOIN ticket_types t ON t.id = c.ticket_type_id "
+            "WHERE c.is_active"
+        )
+        categories: Dict[str, List[str]] = {}
+        for code, name in cursor.fetchall():
+            categories.setdefault(code, []).append(name)
+        return {code: categories.get(code) or names for code, names in DEFAULT_CATEGORIES.items()}
+
+    # ----- Tickets, historique, notifications -----
+
+    def run(self) -> dict:
+        args = self.args
+        rng = self.rng
+        connection = engine.raw_connection()
+        timings = {}
+        try:
+            cursor = connection.cursor()
+            start = time.perf_counter()
+            users = self.load_users(cursor)
+            connection.commit()
+            timings["users_seconds"] = round(time.perf_counter() - start, 2)
+
+            categories = self._categories(cursor)
+            creators = users["Utilisateur"]
+            pick_creator = WeightedChoice(creators, [rng.paretovariate(1.2) for _ in creators])
+            technicians = {
+                code: [user_id for user_id, _, specialization in users["Technicien"] if specialization == code]
+                for code in ("materiel", "applicatif")
+            }
+            dispatchers = [user_id for user_id, _, _ in users["Secrétaire DSI"] + users["Adjoint DSI"]]
+            managers = dispatchers + [user_id for user_id, _, _ in users["DSI"]]
+            pick_priority = WeightedChoice(list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values()))
+            pick_type = WeightedChoice(list(TYPE_WEIGHTS), list(TYPE_WEIGHTS.values()))
+            pick_score = WeightedChoice([1, 2, 3, 4, 5], [0.05, 0.05, 0.15, 0.35, 0.40])
+
+            cursor.execute("SELECT COALESCE(MAX(id), 0), COALESCE(MAX(number), 0) FROM tickets")
+            ticket_id, number = cursor.fetchone()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM ticket_history")
+            history_id = cursor.fetchone()[0]
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM notifications")
+            notification_id = cursor.fetchone()[0]
+
+            tickets = CopyBuffer("tickets", [
+                "id", "number", "title", "description", "type", "priority", "status", "category",
+                "creator_id", "technician_id", "secretary_id", "user_agency", "created_at", "assigned_at",
+                "resolved_at", "closed_at", "feedback_score", "version",
+            ])
+            history = CopyBuffer("ticket_history", [
+                "id", "ticket_id", "old_status", "new_status", "user_id", "reason", "changed_at",
+            ])
+            notifications = CopyBuffer("notifications", [
+                "id", "user_id", "type", "ticket_id", "message", "read", "created_at", "read_at",
+            ])
+
+            start = time.perf_counter()
+            created_times = _creation_times(rng, args.tickets, args.days, self.now)
+            for index, created_at in enumerate(created_times):
+                ticket_id += 1
+                number += 1
+                creator_id, agency, _ = pick_creator(rng)
+                ticket_type = pick_type(rng)
+                priority = pick_priority(rng)
+                status = _final_status(rng, self.now - created_at)
+                title = rng.choice(PROBLEMS[ticket_type.value]).format(
+                    place=rng.choice(PLACES), app=rng.choice(APPS)
+                ).strip()
+                description = f"{title}. {rng.choice(DETAILS)}"
+
+                # Cycle de vie : (statut, auteur, date), bornés à maintenant
+                events = [(None, S.EN_ATTENTE_ANALYSE, creator_id, created_at)]
+                technician_id = secretary_id = assigned_at = resolved_at = closed_at = None
+                moment = created_at
+                if status != S.EN_ATTENTE_ANALYSE:
+                    secretary_id = rng.choice(dispatchers)
+                    if status == S.REJETE and rng.random() < 0.5:
+                        moment += _lognormal_hours(rng, 2.0)
+                        events.append((S.EN_ATTENTE_ANALYSE, S.REJETE, secretary_id, moment))
+                    else:
+                        technician_id = rng.choice(technicians[ticket_type.value] or dispatchers)
+                        moment += _lognormal_hours(rng, 1.5)
+                        assigned_at = moment
+                        events.append((S.EN_ATTENTE_ANALYSE, S.ASSIGNE_TECHNICIEN, secretary_id, moment))
+                        path = {
+                            S.ASSIGNE_TECHNICIEN: [],
+                            S.EN_COURS: [S.EN_COURS],
+                            S.RESOLU: [S.EN_COURS, S.RESOLU],
+                            S.CLOTURE: [S.EN_COURS, S.RESOLU, S.CLOTURE],
+                            S.REJETE: [S.EN_COURS, S.RESOLU, S.REJETE],
+                        }[status]
+                        previous = S.ASSIGNE_TECHNICIEN
+                        for step in path:
+                            if step == S.EN_COURS:
+                                moment += _lognormal_hours(rng, 0.5)
+                                actor = technician_id
+                            elif step == S.RESOLU:
+                                moment += _lognormal_hours(rng, RESOLUTION_MEDIAN_HOURS[priority])
+                                resolved_at = moment
+                                actor = technician_id
+                            else:
+                                moment += _lognormal_hours(rng, 20.0)
+                                closed_at = moment if step == S.CLOTURE else None
+                                actor = creator_id
+                            events.append((previous, step, actor, moment))
+                            previous = step
+                # Dates futures ramenées juste avant maintenant (tickets récents)
+                events = [(old, new, actor, min(at, self.now)) for old, new, actor, at in events]
+                assigned_at = assigned_at and min(assigned_at, self.now)
+                resolved_at = resolved_at and min(resolved_at, self.now)
+                closed_at = closed_at and min(closed_at, self.now)
+
+                # Historique : cycle de vie, complété par des réassignations pour atteindre --history
+                history_budget = round(args.history * (index + 1) / args.tickets) - history.total - history.pending
+                for old, new, actor, at in events[:max(history_budget, 1)]:
+                    history_id += 1
+                    history.add(history_id, ticket_id, old, new, actor, None, at)
+                extra = history_budget - len(events)
+                if extra > 0 and assigned_at:
+                    for _ in range(extra):
+                        history_id += 1
+                        at = assigned_at + (events[-1][3] - assigned_at) * rng.random()
+                        history.add(history_id, ticket_id, S.ASSIGNE_TECHNICIEN, S.ASSIGNE_TECHNICIEN,
+                                    secretary_id, "Réassignation", at)
+
+                # Notifications : événements du cycle de vie, complétées par des rappels
+                label = f"TKT-{number:03d}"
+                candidates = [(creator_id, N.TICKET_CREE, created_at)]
+                candidates += [(user_id, N.NOUVEAU_TICKET, created_at) for user_id in managers]
+                for old, new, actor, at in events[1:]:
+                    if new == S.ASSIGNE_TECHNICIEN and old != S.ASSIGNE_TECHNICIEN:
+                        candidates += [(technician_id, N.ASSIGNATION, at), (creator_id, N.TICKET_ASSIGNE, at)]
+                    elif new == S.EN_COURS:
+                        candidates.append((creator_id, N.TICKET_EN_COURS, at))
+                    elif new == S.RESOLU:
+                        candidates.append((creator_id, N.DEMANDE_VALIDATION, at))
+                    elif new == S.CLOTURE:
+                        candidates += [(technician_id, N.TICKET_CLOTURE, at), (creator_id, N.TICKET_CLOTURE, at)]
+                    elif new == S.REJETE:
+                        candidates.append((creator_id, N.TICKET_REJETE, at))
+                notification_budget = (
+                    round(args.notifications * (index + 1) / args.tickets) - notifications.total - notifications.pending
+                )
+                while len(candidates) < notification_budget:
+                    at = created_at + (events[-1][3] - created_at) * rng.random()
+                    candidates.append((creator_id, N.RAPPEL, at))
+                for user_id, kind, at in candidates[:max(notification_budget, 0)]:
+                    notification_id += 1
+                    age = self.now - at
+                    read = rng.random() < (0.97 if age > timedelta(days=14) else 0.5)
+                    read_at = min(at + timedelta(hours=rng.expovariate(1 / 6)), self.now) if read else None
+                    notifications.add(notification_id, user_id, kind, ticket_id,
+                                      f"{kind.value.replace('_', ' ').capitalize()} : ticket {label}", read, at, read_at)
+
+                feedback = pick_score(rng) if status == S.CLOTURE and rng.random() < 0.6 else None
+                tickets.add(
+                    ticket_id, number, title, description, ticket_type, priority, status,
+                    rng.choice(categories[ticket_type.value]), creator_id, technician_id, secretary_id, agency,
+                    created_at, assigned_at, resolved_at, closed_at, feedback, 1,
+                )
+
+                if tickets.pending >= args.batch_size:
+                    self._flush(connection, cursor, tickets, history, notifications)
+                    rate = tickets.total / (time.perf_counter() - start)
+                    print(f"   {tickets.total} tickets, {history.total} historiques, "
+                          f"{notifications.total} notifications ({rate:.0f} tickets/s)")
+            self._flush(connection, cursor, tickets, history, notifications)
+            timings["load_seconds"] = round(time.perf_counter() - start, 2)
+
+            start = time.perf_counter()
+            for table in ("users", "tickets", "ticket_history", "notifications"):
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+                )
+            connection.commit()
+            timings["sequences_seconds"] = round(time.perf_counter() - start, 2)
+            loaded = {"tickets": tickets.total, "history": history.total, "notifications": notifications.total}
+        finally:
+            connection.close()
+
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            reconcile_unread_counters(db)
+        finally:
+            db.close()
+        timings["counters_seconds"] = round(time.perf_counter() - start, 2)
+
+        start = time.perf_counter()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for table in ("users", "tickets", "ticket_history", "notifications", "notification_counters"):
+                connection.execute(text(f"ANALYZE {table}"))
+        timings["analyze_seconds"] = round(time.perf_counter() - start, 2)
+        return {**loaded, **timings}
+
+    @staticmethod
+    def _flush(connection, cursor, *buffers: CopyBuffer) -> None:
+        # Tickets d'abord (clés étrangères de l'historique et des notifications)
+        for buffer in buffers:
+            buffer.flush(cursor)
+        connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement de données synthétiques (COPY) pour les benchmarks")
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--history", type=int, default=None, help="Lignes d'historique (défaut : 5 par ticket)")
+    parser.add_argument("--notifications", type=int, default=None, help="Notifications (défaut : 10 par ticket)")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--technicians", type=int, default=80)
+    parser.add_argument("--secretaries", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=10, help="Capacité des techniciens")
+    parser.add_argument("--days", type=int, default=730, help="Période couverte par les tickets")
+    parser.add_argument("--password", default="bench123", help="Mot de passe des comptes bench_*")
+    parser.add_argument("--run-tag", default=None, help="Suffixe des identifiants (défaut : graine)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50000, help="Tickets par lot COPY")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON")
+    args = parser.parse_args()
+    args.history = args.tickets * 5 if args.history is None else args.history
+    args.notifications = args.tickets * 10 if args.notifications is None else args.notifications
+    args.run_tag = args.run_tag or str(args.seed)
+
+    print("Génération des données...")
+    start = time.perf_counter()
+    results = Generator(args).run()
+    results["total_seconds"] = round(time.perf_counter() - start, 2)
+    results["rows_per_second"] = round(
+        (results["tickets"] + results["history"] + results["notifications"]) / results["load_seconds"]
+    ) if results["load_seconds"] else None
+    print(f"OK - {results['tickets']} tickets, {results['history']} historiques, "
+          f"{results['notifications']} notifications en {results['total_seconds']} s")
+    write_results("generate_data", {k: v for k, v in vars(args).items() if k != "password"}, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Micro-benchmarks des traitements hors requête HTTP, contre la base configurée
+(DATABASE_URL, données de generate_data) :
+- tâches planifiées (app.scheduler), exécutées une à une : durée, nombre de
+  requêtes SQL, lignes traitées ;
+- rapports d'analyse (app.analytics) sur toute la période et sur 30 jours ;
+- rendu des templates d'emails (un rendu, puis render_many par lots) ;
+- envoi d'emails (backends sync / async) vers le serveur SMTP local.
+
+Les tâches planifiées modifient les données (emails envoyés, notifications
+archivées...) : à lancer sur une base dédiée.
+
+Usage (depuis backend/) :
+    python -m benchmarks.microbench --repeat 5 --sections scheduler,analytics,templates,email
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from .results import summarize, write_results
+
+SECTIONS = ("scheduler", "analytics", "templates", "email")
+SCHEDULER_JOBS = (
+    "process_sla_timers",
+    "send_email_digests",
+    "reconcile_notification_counters",
+    "archive_old_notifications",
+    "archive_closed_tickets",
+    "purge_idempotency_keys",
+    "purge_used_refresh_tokens",
+    "resync_assignment_engine",
+    "report_recurring_problems",
+)
+
+
+def measure(function: Callable[[], Any], repeat: int, warmup: int = 0) -> List[float]:
+    for _ in range(warmup):
+        function()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_scheduler(args: argparse.Namespace) -> Dict[str, Any]:
+    from app import scheduler
+    from app.metrics import SCHEDULER_JOB_FAILURES
+    from app.query_metrics import query_budget
+
+    results = {}
+    for name in SCHEDULER_JOBS:
+        job = getattr(scheduler, name)
+        failures = SCHEDULER_JOB_FAILURES.labels(name)
+        failed_before = failures.value
+        durations, queries, rows = [], [], 0
+        for _ in range(args.repeat):
+            # Budget illimité : sert seulement à compter les requêtes SQL de la tâche
+            with query_budget(sys.maxsize) as stats:
+                start = time.perf_counter()
+                rows += job() or 0
+                durations.append(time.perf_counter() - start)
+            queries.append(stats.count)
+        results[name] = {
+            **summarize(durations),
+            "sql_queries_max": max(queries),
+            "rows": rows,
+            "failures": int(failures.value - failed_before),
+        }
+    return results
+
+
+def bench_analytics(args: argparse.Namespace) -> Dict[str, Any]:
+    from sqlalchemy import select
+
+    from app import analytics, models
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        technician_id = db.execute(
+            select(models.Ticket.technician_id).where(models.Ticket.technician_id.isnot(None)).limit(1)
+        ).scalar()
+        periods = {
+            "all": analytics.ReportFilters(),
+            "30d": analytics.ReportFilters(start=datetime.utcnow() - timedelta(days=30)),
+        }
+        cases: Dict[str, Callable[[], Any]] = {}
+        for period, filters in periods.items():
+            cases[f"resolution_report_{period}"] = lambda f=filters: analytics.resolution_report(db, f)
+            cases[f"resolution_histogram_{period}"] = lambda f=filters: analytics.resolution_histogram(db, f)
+            for dimension in analytics.BREAKDOWN_DIMENSIONS:
+                cases[f"breakdown_{dimension}_{period}"] = (
+                    lambda d=dimension, f=filters: analytics.breakdown(db, d, f)
+                )
+        if technician_id is not None:
+            cases["technician_summary"] = lambda: analytics.technician_summary(db, technician_id)
+        return {name: summarize(measure(case, args.repeat, warmup=1)) for name, case in cases.items()}
+    finally:
+        db.close()
+
+
+def _variables(nodes: tuple, names: set) -> set:
+    """Variables restant à fournir à un template compilé (hors valeurs globales déjà liées)"""
+    from app.email_templates import _If, _Var
+
+    for node in nodes:
+        if isinstance(node, _Var):
+            names.add(node.name)
+        elif isinstance(node, _If):
+            names.add(node.name)
+            _variables(node.then, names)
+            _variables(node.otherwise, names)
+    return names
+
+
+def bench_templates(args: argparse.Namespace) -> Dict[str, Any]:
+    from app.email_service import email_service
+    from app.email_templates import template_engine
+
+    results = {}
+    globals_ = email_service._template_globals()
+    for name in template_engine.template_names():
+        template = template_engine.get(name, globals=globals_)
+        names = set()
+        for part in template:
+            _variables(part.nodes, names)
+        # Contexte générique : chaque variable reçoit une valeur à échapper en HTML
+        contexts = [
+            {variable: f"{variable} <{i}> & co" for variable in names}
+            for i in range(args.batch)
+        ]
+        single = measure(lambda: email_service.render_email(name, contexts[0]), args.repeat * 20, warmup=5)
+        batch = measure(lambda: email_service.render_many(name, contexts), args.repeat, warmup=1)
+        results[name] = {
+            "render": summarize(single),
+            f"render_many_{args.batch}": summarize(batch),
+        }
+    return results
+
+
+def bench_email(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmark_email_backends import run_backend
+    from app.smtp_sink import SMTPSink
+
+    sink = SMTPSink(port=0, latency=args.smtp_latency_ms / 1000).start()
+    try:
+        results = {}
+        for backend in ("sync", "async"):
+            result = run_backend(backend, sink, args.emails, args.email_domains)
+            # Durée totale en millisecondes : comparable par benchmarks.compare
+            result["total_ms"] = round(result["seconds"] * 1000, 3)
+            results[backend] = result
+        return results
+    finally:
+        sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks (tâches planifiées, rapports, emails)")
+    parser.add_argument("--sections", default=",".join(SECTIONS), help=f"Parmi {', '.join(SECTIONS)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=500, help="Taille des lots de render_many")
+    parser.add_argument("--emails", type=int, default=200, help="Emails envoyés par backend")
+    parser.add_argument("--email-domains", type=int, default=5)
+    parser.add_argument("--smtp-latency-ms", type=float, default=20.0, help="Latence simulée par commande SMTP")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON")
+    args = parser.parse_args()
+
+    benches = {
+        "scheduler": bench_scheduler,
+        "analytics": bench_analytics,
+        "templates": bench_templates,
+        "email": bench_email,
+    }
+    sections = [section.strip() for section in args.sections.split(",") if section.strip()]
+    unknown = [section for section in sections if section not in benches]
+    if unknown:
+        parser.error(f"Sections inconnues : {', '.join(unknown)}")
+
+    results = {}
+    for section in sections:
+        start = time.perf_counter()
+        results[section] = benches[section](args)
+        print(f"OK - {section} en {time.perf_counter() - start:.1f} s", file=sys.stderr)
+    write_results("microbench", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Résultats des benchmarks : statistiques de durées et fichiers JSON comparables entre versions.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def summarize(durations: Iterable[float]) -> Dict[str, Any]:
+    """Statistiques (millisecondes) d'une série de durées en secondes"""
+    values = sorted(durations)
+    if not values:
+        return {"count": 0}
+
+    def percentile(p: float) -> float:
+        # Interpolation linéaire, comme percentile_cont
+        position = (len(values) - 1) * p
+        lower = int(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(0.5) * 1000, 3),
+        "p90_ms": round(percentile(0.9) * 1000, 3),
+        "p99_ms": round(percentile(0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_results(suite: str, parameters: Dict[str, Any], results: Dict[str, Any], output: Optional[str] = None) -> str:
+    """Écrit {"suite", "metadata", "parameters", "results"} en JSON ; renvoie le chemin du fichier"""
+    started = datetime.utcnow()
+    document = {
+        "suite": suite,
+        "metadata": {
+            "date": started.isoformat(timespec="seconds") + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "hostname": platform.node(),
+        },
+        "parameters": parameters,
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False, default=str)
+    print(f"Résultats écrits dans {output}", file=sys.stderr)
+    return output
@@ -0,0 +1,105 @@
+"""
+Temps de démarrage de l'application, mesuré dans des processus Python neufs :
+- import : import de app.main (modules, construction des routes) ;
+- lifespan_startup / lifespan_shutdown : démarrage et arrêt du lifespan
+  (journaux, scheduler si SCHEDULER_ENABLED) ;
+- threads_after_import, apscheduler_imported : état après l'import (1 thread,
+  APScheduler non chargé : aucun effet de bord à l'import) ;
+- les modules les plus coûteux à importer (python -X importtime), pour suivre
+  l'origine d'une régression.
+
+Usage (depuis backend/) :
+    python -m benchmarks.startup --repeat 10
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+from .results import summarize, write_results
+
+# Exécuté dans le processus mesuré : affiche une ligne JSON
+_PROBE = """
+import asyncio, json, sys, threading, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+threads = threading.active_count()
+apscheduler_imported = "apscheduler" in sys.modules
+
+async def lifespan():
+    context = app.main.app.router.lifespan_context(app.main.app)
+    begin = time.perf_counter()
+    await context.__aenter__()
+    started = time.perf_counter()
+    await context.__aexit__(None, None, None)
+    return started - begin, time.perf_counter() - started
+
+startup, shutdown = asyncio.run(lifespan())
+print(json.dumps({
+    "import": imported - start,
+    "startup": startup,
+    "shutdown": shutdown,
+    "threads": threads,
+    "apscheduler_imported": apscheduler_imported,
+}))
+"""
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def probe(environment: Dict[str, str]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE], capture_output=True, text=True, env=environment, check=True,
+    )
+    # Dernière ligne : le JSON de la sonde (les journaux de l'application la précèdent)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(environment: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Modules de premier niveau les plus coûteux (durée cumulée, imports compris)"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, env=environment, check=True,
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and len(match.group(3)) <= 3:  # Imports directs de app.main et app.main lui-même
+            modules.append({"module": match.group(4), "cumulative_ms": int(match.group(2)) / 1000})
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage de l'application")
+    parser.add_argument("--repeat", type=int, default=10, help="Processus mesurés")
+    parser.add_argument("--no-scheduler", action="store_true", help="Lifespan avec SCHEDULER_ENABLED=false")
+    parser.add_argument("--top-imports", type=int, default=15)
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON")
+    args = parser.parse_args()
+
+    environment = dict(os.environ)
+    if args.no_scheduler:
+        environment["SCHEDULER_ENABLED"] = "false"
+
+    probe(environment)  # Premier processus : compilation des .pyc, cache disque
+    runs = [probe(environment) for _ in range(args.repeat)]
+    results = {
+        "import": summarize(run["import"] for run in runs),
+        "lifespan_startup": summarize(run["startup"] for run in runs),
+        "lifespan_shutdown": summarize(run["shutdown"] for run in runs),
+        "threads_after_import": max(run["threads"] for run in runs),
+        "apscheduler_imported": any(run["apscheduler_imported"] for run in runs),
+        "slowest_imports": slowest_imports(environment, args.top_imports),
+    }
+    print(f"OK - import {results['import']['p50_ms']} ms, démarrage {results['lifespan_startup']['p50_ms']} ms "
+          f"(médianes), {results['threads_after_import']} thread(s) après l'import")
+    write_results("startup", vars(args), results, args.output)
+
+
+if __name__ == "__main__":
+    main()
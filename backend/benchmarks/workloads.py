@@ -0,0 +1,324 @@
+"""
+Charge HTTP reproduisant les quatre tableaux de bord du frontend.
+
+Chaque session virtuelle se connecte avec un compte bench_* (generate_data),
+charge son tableau de bord puis le rafraîchit toutes les --poll-seconds
+(30 s dans le frontend) avec les mêmes appels :
+- utilisateur : /notifications/, /notifications/unread/count ; crée des
+  tickets, valide et note ceux qui sont résolus ;
+- technicien : /notifications/, /notifications/unread/count, /tickets/assigned ;
+  prend en charge puis résout ses tickets assignés ;
+- secrétaire : /tickets/, /notifications/, /notifications/unread/count ;
+  assigne les tickets en attente d'analyse ;
+- DSI : idem secrétaire, plus /users/technicians et les statistiques de
+  chaque technicien au chargement.
+
+Les latences sont relevées par appel (nom de la route) et écrites en JSON.
+Le serveur doit tourner contre la base chargée, avec le serveur SMTP local :
+    python -m app.smtp_sink --port 1025
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=1025 SMTP_PLAINTEXT=true uvicorn app.main:app
+
+Usage (depuis backend/) :
+    python -m benchmarks.workloads --base-url http://127.0.0.1:8000 --duration 120 --poll-seconds 5
+"""
+import argparse
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from .generate_data import APPS, PLACES, PROBLEMS
+from .results import summarize, write_results
+
+
+class Recorder:
+    """Durées et erreurs par appel, partagées entre les sessions"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.actions: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, status: int, duration: float) -> None:
+        with self._lock:
+            self.durations[name].append(duration)
+            if status >= 400 or status == 0:
+                self.errors[name][status] += 1
+
+    def action(self, name: str) -> None:
+        with self._lock:
+            self.actions[name] += 1
+
+
+class Session:
+    """Client HTTP d'un utilisateur virtuel (connexion persistante)"""
+
+    def __init__(self, base_url: str, recorder: Recorder, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self.recorder = recorder
+        self.token: Optional[str] = None
+        self._connection = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        self._connection = cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method: str, path: str, name: Optional[str] = None, body: Any = None,
+                form: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if form is not None:
+            payload = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+
+        start = time.perf_counter()
+        status, data = 0, None
+        for attempt in range(2):
+            try:
+                if self._connection is None:
+                    self._connect()
+                self._connection.request(method, path, body=payload, headers=headers)
+                response = self._connection.getresponse()
+                raw = response.read()
+                status = response.status
+                if response.getheader("Content-Encoding") == "gzip":
+                    raw = gzip.decompress(raw)
+                if raw and response.getheader("Content-Type", "").startswith("application/json"):
+                    data = json.loads(raw)
+                break
+            except (http.client.HTTPException, OSError):
+                # Connexion fermée par le serveur (keep-alive expiré) : une nouvelle tentative
+                self._connection = None
+                if attempt:
+                    status = 0
+        self.recorder.record(name or f"{method} {path}", status, time.perf_counter() - start)
+        return status, data
+
+    def login(self, username: str, password: str) -> bool:
+        status, data = self.request("POST", "/auth/token", "POST /auth/token",
+                                    form={"username": username, "password": password})
+        if status == 200 and data:
+            self.token = data["access_token"]
+            return True
+        return False
+
+
+class Dashboard(threading.Thread):
+    role = ""
+
+    def __init__(self, args: argparse.Namespace, recorder: Recorder, username: str, seed: int):
+        super().__init__(daemon=True)
+        self.args = args
+        self.recorder = recorder
+        self.username = username
+        self.rng = random.Random(seed)
+        self.session = Session(args.base_url, recorder, args.timeout)
+        self.deadline = 0.0
+
+    def run(self) -> None:
+        if not self.session.login(self.username, self.args.password):
+            self.recorder.action(f"{self.role}_login_failed")
+            return
+        # Démarrages étalés sur une période de rafraîchissement
+        time.sleep(self.rng.random() * min(self.args.poll_seconds, 5))
+        self.load()
+        while True:
+            pause = self.args.poll_seconds * self.rng.uniform(0.9, 1.1)
+            if time.monotonic() + pause > self.deadline:
+                return
+            time.sleep(pause)
+            self.poll()
+
+    def get(self, path: str, name: Optional[str] = None) -> Tuple[int, Any]:
+        return self.session.request("GET", path, name or f"GET {path.split('?')[0]}")
+
+    def put(self, path: str, name: str, body: Any) -> Tuple[int, Any]:
+        return self.session.request("PUT", path, name, body=body)
+
+    def notifications(self) -> None:
+        self.get("/notifications/")
+        self.get("/notifications/unread/count")
+
+    def load(self) -> None:
+        self.get("/auth/me")
+        self.poll()
+
+    def poll(self) -> None:
+        raise NotImplementedError
+
+
+class UserDashboard(Dashboard):
+    role = "user"
+
+    def load(self) -> None:
+        self.get("/auth/me")
+        self.get("/ticket-config/types")
+        self.get("/ticket-config/categories")
+        self.get("/tickets/me")
+        self.poll()
+
+    def poll(self) -> None:
+        self.notifications()
+        if self.rng.random() < self.args.create_rate:
+            ticket_type = self.rng.choice(["materiel", "applicatif"])
+            title = self.rng.choice(PROBLEMS[ticket_type]).format(
+                place=self.rng.choice(PLACES), app=self.rng.choice(APPS)
+            ).strip()
+            status, _ = self.session.request("POST", "/tickets/", "POST /tickets/", body={
+                "title": title,
+                "description": f"{title}. Ticket créé par le benchmark.",
+                "type": ticket_type,
+                "priority": self.rng.choice(["faible", "moyenne", "moyenne", "haute"]),
+            })
+            if status == 200:
+                self.recorder.action("tickets_created")
+        status, tickets = self.get("/tickets/me")
+        for ticket in (tickets or [])[:50]:
+            if ticket.get("status") == "resolu":
+                status, _ = self.put(f"/tickets/{ticket['id']}/validate", "PUT /tickets/{ticket_id}/validate",
+                                     {"validated": True})
+                if status == 200:
+                    self.recorder.action("tickets_validated")
+                    self.put(f"/tickets/{ticket['id']}/feedback", "PUT /tickets/{ticket_id}/feedback",
+                             {"score": self.rng.choice([3, 4, 4, 5, 5])})
+
+
+class TechnicianDashboard(Dashboard):
+    role = "technician"
+
+    def poll(self) -> None:
+        self.notifications()
+        status, tickets = self.get(f"/tickets/assigned{self.args.list_query}", "GET /tickets/assigned")
+        for ticket in (tickets or [])[:20]:
+            if ticket.get("status") == "assigne_technicien":
+                next_status, action = "en_cours", "tickets_started"
+            elif ticket.get("status") == "en_cours" and self.rng.random() < 0.5:
+                next_status, action = "resolu", "tickets_resolved"
+            else:
+                continue
+            body = {"status": next_status}
+            if next_status == "resolu":
+                body["resolution_summary"] = "Résolu par le benchmark"
+            status, _ = self.put(f"/tickets/{ticket['id']}/status", "PUT /tickets/{ticket_id}/status", body)
+            if status == 200:
+                self.recorder.action(action)
+
+
+class SecretaryDashboard(Dashboard):
+    role = "secretary"
+
+    def poll(self) -> None:
+        status, tickets = self.get(f"/tickets/{self.args.list_query}", "GET /tickets/")
+        self.notifications()
+        pending = [t for t in (tickets or []) if t.get("status") == "en_attente_analyse"][:20]
+        if not pending:
+            return
+        status, technicians = self.get("/users/technicians")
+        by_specialization = defaultdict(list)
+        for technician in technicians or []:
+            by_specialization[technician.get("specialization")].append(technician["id"])
+        for ticket in pending:
+            candidates = by_specialization.get(ticket.get("type")) or [t["id"] for t in technicians or []]
+            if not candidates:
+                return
+            status, _ = self.put(f"/tickets/{ticket['id']}/assign", "PUT /tickets/{ticket_id}/assign",
+                                 {"technician_id": self.rng.choice(candidates)})
+            if status == 200:
+                self.recorder.action("tickets_assigned")
+
+
+class DSIDashboard(SecretaryDashboard):
+    role = "dsi"
+
+    def load(self) -> None:
+        self.get("/auth/me")
+        self.get("/users/")
+        status, technicians = self.get("/users/technicians")
+        for technician in (technicians or [])[:self.args.dsi_stats_limit]:
+            self.get(f"/users/technicians/{technician['id']}/stats", "GET /users/technicians/{technician_id}/stats")
+        self.poll()
+
+    def poll(self) -> None:
+        self.get(f"/tickets/{self.args.list_query}", "GET /tickets/")
+        self.notifications()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    recorder = Recorder()
+    sessions: List[Dashboard] = []
+    plan = [
+        (UserDashboard, "user", args.user_sessions),
+        (TechnicianDashboard, "tech", args.technician_sessions),
+        (SecretaryDashboard, "secretaire", args.secretary_sessions),
+        (DSIDashboard, "dsi", args.dsi_sessions),
+    ]
+    seed = args.seed
+    for cls, prefix, count in plan:
+        for i in range(count):
+            seed += 1
+            sessions.append(cls(args, recorder, f"bench_{prefix}_{args.run_tag}_{i}", seed))
+
+    start = time.monotonic()
+    for session in sessions:
+        session.deadline = start + args.duration
+        session.start()
+    for session in sessions:
+        session.join(args.duration + args.timeout + 10)
+    elapsed = time.monotonic() - start
+
+    requests = sum(len(durations) for durations in recorder.durations.values())
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 2) if elapsed else None,
+        "errors": sum(sum(codes.values()) for codes in recorder.errors.values()),
+        "endpoints": {
+            name: {**summarize(durations), "errors": dict(recorder.errors.get(name, {}))}
+            for name, durations in sorted(recorder.durations.items())
+        },
+        "actions": dict(recorder.actions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge HTTP des tableaux de bord (comptes bench_*)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=60, help="Durée de la charge (secondes)")
+    parser.add_argument("--poll-seconds", type=float, default=30, help="Intervalle de rafraîchissement")
+    parser.add_argument("--user-sessions", type=int, default=50)
+    parser.add_argument("--technician-sessions", type=int, default=10)
+    parser.add_argument("--secretary-sessions", type=int, default=2)
+    parser.add_argument("--dsi-sessions", type=int, default=1)
+    parser.add_argument("--create-rate", type=float, default=0.1, help="Probabilité de créer un ticket par rafraîchissement")
+    parser.add_argument("--dsi-stats-limit", type=int, default=20, help="Statistiques de techniciens chargées par le DSI")
+    parser.add_argument("--list-query", default="", help="Paramètres des listes de tickets, ex. ?view=compact")
+    parser.add_argument("--password", default="bench123")
+    parser.add_argument("--run-tag", default="42", help="Suffixe des comptes bench_* (graine de generate_data)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"OK - {results['requests']} requêtes en {results['elapsed_seconds']} s "
+          f"({results['requests_per_second']} req/s, {results['errors']} erreurs)")
+    write_results("workloads", {k: v for k, v in vars(args).items() if k != "password"}, results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Fixtures des tests pytest (TestClient, sans serveur ni PostgreSQL).
+
+Les scripts test_*.py à la racine de backend/ testent un serveur lancé
+(python test_endpoints.py) ; les tests de ce dossier s'exécutent avec
+`python -m pytest` depuis backend/. La base est une SQLite en mémoire
+partagée par les threads (JSONB stocké en JSON) : les fonctionnalités
+propres à PostgreSQL (partitions, ON CONFLICT des tables d'archive) ne sont
+pas couvertes ici.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(element, compiler, **kw):
+    return "JSON"
+
+
+from app import database  # noqa: E402
+
+test_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+test_engine.raw_connection().driver_connection.create_function("greatest", 2, max)
+database.engine = test_engine
+database.SessionLocal.configure(bind=test_engine)
+
+from app import models  # noqa: E402
+from app.security import create_token_pair  # noqa: E402
+
+ROLES = ("Utilisateur", "Secrétaire DSI", "Adjoint DSI", "Technicien", "DSI", "Admin")
+USERS = (
+    ("user", "Utilisateur"),
+    ("secretary", "Secrétaire DSI"),
+    ("tech", "Technicien"),
+    ("tech2", "Technicien"),
+    ("dsi", "DSI"),
+    ("admin", "Admin"),
+)
+
+
+@pytest.fixture
+def db():
+    database.Base.metadata.create_all(test_engine)
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        database.Base.metadata.drop_all(test_engine)
+
+
+@pytest.fixture
+def users(db):
+    """Un utilisateur par rôle : {username: (utilisateur, en-têtes d'authentification)}"""
+    roles = {name: models.Role(name=name) for name in ROLES}
+    db.add_all(roles.values())
+    db.flush()
+    created = {}
+    for username, role in USERS:
+        is_technician = role == "Technicien"
+        created[username] = models.User(
+            full_name=username.title(),
+            email=f"{username}@example.com",
+            username=username,
+            password_hash="$2b$04$" + "a" * 53,
+            role_id=roles[role].id,
+            actif=True,
+            specialization="materiel" if is_technician else None,
+            max_tickets_capacity=5 if is_technician else None,
+        )
+    db.add_all(created.values())
+    db.commit()
+    return {
+        username: (user, {"Authorization": f"Bearer {create_token_pair(user).access_token}"})
+        for username, user in created.items()
+    }
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
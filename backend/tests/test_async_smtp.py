@@ -0,0 +1,106 @@
+"""Backend d'envoi asynchrone (EMAIL_BACKEND=async) contre le serveur SMTP local"""
+import asyncio
+import time
+
+import pytest
+
+from app.async_smtp import AsyncSMTPBackend, SMTPSettings, TokenBucket
+from app.smtp_sink import SMTPSink
+
+MESSAGE = b"Subject: Test\r\n\r\nBonjour\r\n"
+
+
+@pytest.fixture
+def sink():
+    sink = SMTPSink(port=0).start()
+    yield sink
+    sink.stop()
+
+
+def _backend(sink, **options):
+    settings = SMTPSettings("127.0.0.1", sink.port, "", "", False, False, True)
+    return AsyncSMTPBackend(lambda: settings, timeout=5.0, **options)
+
+
+def _send_all(backend, count):
+    futures = [
+        backend.submit("helpdesk@example.com", [f"user{i}@example.com"], MESSAGE)
+        for i in range(count)
+    ]
+    return [future.result(10) for future in futures]
+
+
+def test_lines_starting_with_a_dot_are_stuffed(sink):
+    backend = _backend(sink)
+    data = b"Subject: Points\r\n\r\n.commence par un point\r\n..deux points\r\n.\r\nfin\r\n"
+    try:
+        assert backend.submit("helpdesk@example.com", ["user@example.com"], data).result(10)
+    finally:
+        backend.close()
+
+    assert sink.messages[0].data == data
+
+
+def test_connection_reused_across_sends(sink):
+    backend = _backend(sink)
+    try:
+        for _ in range(3):
+            assert _send_all(backend, 1) == [True]
+    finally:
+        backend.close()
+
+    assert len(sink.messages) == 3
+    assert sink.connections == 1
+
+
+def test_connection_closed_by_server_is_retried_on_a_new_one(sink):
+    backend = _backend(sink)
+    try:
+        assert _send_all(backend, 1) == [True]
+        sink.drop_connections()
+        assert _send_all(backend, 1) == [True]
+    finally:
+        backend.close()
+
+    assert len(sink.messages) == 2
+    assert sink.connections == 2
+
+
+def test_concurrency_limit(sink):
+    sink.latency = 0.01
+    backend = _backend(sink, concurrency=2, max_connections_per_domain=10)
+    try:
+        assert _send_all(backend, 8) == [True] * 8
+    finally:
+        backend.close()
+
+    assert len(sink.messages) == 8
+    assert sink.max_active <= 2
+
+
+def test_token_bucket_spaces_sends(sink):
+    backend = _backend(sink, rate_per_second=20, burst=1)
+    start = time.perf_counter()
+    try:
+        assert _send_all(backend, 4) == [True] * 4
+    finally:
+        backend.close()
+
+    # 1 jeton disponible puis 1 toutes les 50 ms
+    assert time.perf_counter() - start >= 0.14
+
+
+def test_token_bucket_allows_burst():
+    bucket = TokenBucket(rate=10, capacity=3)
+
+    async def timings():
+        start = time.perf_counter()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.perf_counter() - start
+        await bucket.acquire()
+        return burst, time.perf_counter() - start - burst
+
+    burst, next_token = asyncio.run(timings())
+    assert burst < 0.05
+    assert next_token >= 0.08
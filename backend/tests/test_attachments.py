@@ -0,0 +1,211 @@
+"""Stockage des pièces jointes : limite de taille à la réception et suppression différée des fichiers"""
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app import attachment_storage, models
+from app.attachment_storage import (
+    ATTACHMENT_GC_GRACE_MINUTES,
+    AttachmentUploadLimitMiddleware,
+    LocalAttachmentStore,
+    S3AttachmentStore,
+    collect_deleted_attachments,
+    request_deletion,
+)
+
+
+def _upload_app(max_size):
+    app = FastAPI()
+    received = []
+
+    @app.post("/tickets/{ticket_id}/attachments")
+    def upload(ticket_id: int, file: UploadFile = File(...)):
+        received.append(file.filename)
+        return {"ok": True}
+
+    app.add_middleware(AttachmentUploadLimitMiddleware, max_size=max_size)
+    return TestClient(app), received
+
+
+def test_upload_rejected_from_content_length():
+    client, received = _upload_app(max_size=1024)
+    oversized = b"x" * (1024 + attachment_storage.ATTACHMENT_MULTIPART_OVERHEAD + 1)
+
+    response = client.post("/tickets/1/attachments", files={"file": ("big.bin", oversized)})
+
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_streamed_upload_without_content_length_rejected():
+    client, received = _upload_app(max_size=1024)
+
+    def body():
+        for _ in range(100):
+            yield b"x" * 8192
+
+    response = client.post(
+        "/tickets/1/attachments", content=body(),
+        headers={"Content-Type": "multipart/form-data; boundary=limit"},
+    )
+
+    assert response.status_code == 413
+    assert received == []
+
+
+def test_small_upload_accepted():
+    client, received = _upload_app(max_size=1024)
+
+    response = client.post("/tickets/1/attachments", files={"file": ("small.txt", b"hello")})
+
+    assert response.status_code == 200
+    assert received == ["small.txt"]
+
+
+def _stale(store, sha256, minutes):
+    path = store.path_for(sha256)
+    old = (datetime.now() - timedelta(minutes=minutes)).timestamp()
+    os.utime(path, (old, old))
+
+
+def test_unreferenced_file_deleted_after_grace_period(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(attachment_storage, "is_referenced", lambda db, sha256: False)
+    store = LocalAttachmentStore(root=str(tmp_path))
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+    _stale(store, sha256, ATTACHMENT_GC_GRACE_MINUTES + 5)
+    request_deletion(db, sha256, now=datetime.utcnow() - timedelta(minutes=ATTACHMENT_GC_GRACE_MINUTES + 1))
+    db.commit()
+
+    assert collect_deleted_attachments(db, store) == 1
+    assert not store.exists(sha256)
+    assert db.query(models.AttachmentDeletion).count() == 0
+
+
+def test_reuploaded_file_survives_pending_deletion(db, tmp_path, monkeypatch):
+    # Upload dédupliqué du même contenu pendant le délai : pièce jointe pas encore enregistrée
+    monkeypatch.setattr(attachment_storage, "is_referenced", lambda db, sha256: False)
+    store = LocalAttachmentStore(root=str(tmp_path))
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+    _stale(store, sha256, ATTACHMENT_GC_GRACE_MINUTES + 5)
+    request_deletion(db, sha256, now=datetime.utcnow() - timedelta(minutes=ATTACHMENT_GC_GRACE_MINUTES + 1))
+    db.commit()
+    store.save(io.BytesIO(b"contenu"))
+
+    assert collect_deleted_attachments(db, store) == 0
+    assert store.exists(sha256)
+    assert db.query(models.AttachmentDeletion).count() == 1
+
+
+def test_deletion_waits_for_grace_period(db, tmp_path):
+    store = LocalAttachmentStore(root=str(tmp_path))
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+    request_deletion(db, sha256)
+    db.commit()
+
+    assert collect_deleted_attachments(db, store) == 0
+    assert store.exists(sha256)
+
+
+class FakeS3Client:
+    """Équivalent local du client boto3 : objets en mémoire, LastModified donné par `now`"""
+
+    def __init__(self):
+        self.objects = {}
+        self.now = datetime.now(timezone.utc)
+        self.before_delete = None  # Appelé avant une suppression (course avec un upload)
+
+    def _put(self, key, body):
+        self.objects[key] = (body, self.now)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise KeyError(Key)  # botocore lèverait ClientError (404)
+        body, modified = self.objects[Key]
+        return {"ContentLength": len(body), "LastModified": modified}
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, "rb") as source:
+            self._put(Key, source.read())
+
+    def put_object(self, Bucket, Key, Body):
+        self._put(Key, Body)
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self._put(Key, self.objects[CopySource["Key"]][0])
+
+    def delete_object(self, Bucket, Key):
+        if self.before_delete is not None:
+            before_delete, self.before_delete = self.before_delete, None
+            before_delete()
+        self.objects.pop(Key, None)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        query = {k: v for k, v in Params.items() if k not in ("Bucket", "Key")}
+        return f"https://s3.local/{Params['Bucket']}/{Params['Key']}?{urlencode({**query, 'X-Expires': ExpiresIn})}"
+
+
+def _s3_store():
+    client = FakeS3Client()
+    return client, S3AttachmentStore(client, bucket="tickets")
+
+
+def _collect_after_grace(db, store, client, sha256):
+    """Suppression demandée puis ramasse-miettes exécuté après le délai de grâce"""
+    request_deletion(db, sha256)
+    db.commit()
+    later = datetime.utcnow() + timedelta(minutes=ATTACHMENT_GC_GRACE_MINUTES + 5)
+    client.now = later.replace(tzinfo=timezone.utc)
+    return collect_deleted_attachments(db, store, now=later)
+
+
+def test_s3_save_deduplicates():
+    client, store = _s3_store()
+    first, size = store.save(io.BytesIO(b"contenu"))
+    second, _ = store.save(io.BytesIO(b"contenu"))
+
+    assert first == second and size == 7
+    assert client.objects[first][0] == b"contenu"
+    assert set(client.objects) == {first, first + S3AttachmentStore.LEASE_SUFFIX}
+
+
+def test_s3_unreferenced_file_deleted_after_grace_period(db, monkeypatch):
+    monkeypatch.setattr(attachment_storage, "is_referenced", lambda db, sha256: False)
+    client, store = _s3_store()
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+    store.save(io.BytesIO(b"contenu"))
+
+    assert _collect_after_grace(db, store, client, sha256) == 1
+    assert client.objects == {}
+
+
+def test_s3_reupload_during_deletion_keeps_the_file(db, monkeypatch):
+    monkeypatch.setattr(attachment_storage, "is_referenced", lambda db, sha256: False)
+    client, store = _s3_store()
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+    # Upload dédupliqué entre la lecture de LastModified et la suppression de l'objet
+    client.before_delete = lambda: store.save(io.BytesIO(b"contenu"))
+
+    assert _collect_after_grace(db, store, client, sha256) == 0
+    assert client.objects[sha256][0] == b"contenu"
+    assert sha256 + S3AttachmentStore.TOMBSTONE_SUFFIX not in client.objects
+
+
+def test_s3_download_redirects_to_presigned_url():
+    client, store = _s3_store()
+    sha256, _ = store.save(io.BytesIO(b"contenu"))
+
+    response = store.download_response(sha256, 'rapport "été".pdf', "application/pdf")
+
+    assert response.status_code == 307
+    url = urlparse(response.headers["location"])
+    assert url.path == f"/tickets/{sha256}"
+    params = parse_qs(url.query)
+    assert params["ResponseContentType"] == ["application/pdf"]
+    assert params["ResponseContentDisposition"] == [
+        "attachment; filename=\"rapport \\\"?t?\\\".pdf\"; "
+        "filename*=UTF-8''rapport%20%22%C3%A9t%C3%A9%22.pdf"
+    ]
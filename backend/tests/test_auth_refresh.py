@@ -0,0 +1,28 @@
+"""Rotation des jetons de rafraîchissement (POST /auth/refresh)"""
+from datetime import datetime, timedelta
+
+from app import models
+from app.security import create_token_pair, purge_used_refresh_tokens
+
+
+def test_refresh_token_is_single_use(client, users):
+    user, _ = users["user"]
+    refresh_token = create_token_pair(user).refresh_token
+
+    first = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    reused = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    rotated = client.post("/auth/refresh", json={"refresh_token": first.json()["refresh_token"]})
+
+    assert first.status_code == 200
+    assert reused.status_code == 401
+    assert reused.json()["detail"] == "Refresh token has already been used"
+    assert rotated.status_code == 200
+
+
+def test_expired_used_tokens_are_purged(client, db, users):
+    user, _ = users["user"]
+    client.post("/auth/refresh", json={"refresh_token": create_token_pair(user).refresh_token})
+    assert db.query(models.UsedRefreshToken).count() == 1
+
+    assert purge_used_refresh_tokens(db, now=datetime.utcnow() + timedelta(days=30)) == 1
+    assert db.query(models.UsedRefreshToken).count() == 0
@@ -0,0 +1,39 @@
+"""Assignation automatique : réservation provisoire du technicien choisi par pick()"""
+from app import database, models
+from app.auto_assignment import assignment_engine
+from app.routers import tickets
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def _load(technician_id):
+    return assignment_engine._technicians[technician_id].load
+
+
+def test_concurrent_picks_choose_different_technicians(db, users):
+    technicians = {users["tech"][0].id, users["tech2"][0].id}
+    assignment_engine.load(db)
+    other = database.SessionLocal()
+    try:
+        first = assignment_engine.pick(db, models.TicketType.MATERIEL)
+        second = assignment_engine.pick(other, models.TicketType.MATERIEL)
+
+        assert {first.technician_id, second.technician_id} == technicians
+    finally:
+        other.close()
+        db.rollback()
+
+    # Transactions annulées : réservations libérées
+    assert {_load(technician_id) for technician_id in technicians} == {0}
+
+
+def test_committed_assignment_replaces_the_reservation(client, db, users, monkeypatch):
+    monkeypatch.setattr(tickets, "AUTO_ASSIGNMENT_MODE", "auto")
+    _, headers = users["user"]
+    assignment_engine.load(db)
+
+    ticket = client.post("/tickets/", json=TICKET, headers=headers).json()
+
+    assert ticket["technician_id"] is not None
+    assert _load(ticket["technician_id"]) == 1
+    assert assignment_engine._reserved == {}
@@ -0,0 +1,88 @@
+"""Compression des réponses (app.responses.CompressionMiddleware)"""
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.responses import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.fixture
+def compressed_client(tmp_path):
+    attachment = tmp_path / "scan.pdf"
+    attachment.write_bytes(b"%PDF" + b"0123456789" * 20_000)
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/json")
+    def json_payload():
+        return ORJSONResponse({"items": ["ticket"] * 500})
+
+    @app.get("/small")
+    def small_payload():
+        return ORJSONResponse({"items": []})
+
+    @app.get("/stream")
+    def stream_payload():
+        return StreamingResponse((b"line %d\n" % i for i in range(500)), media_type="text/plain")
+
+    @app.get("/file")
+    def file_payload():
+        return FileResponse(attachment, media_type="application/pdf")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_json_is_compressed(compressed_client, encoding):
+    response = compressed_client.get("/json", headers={"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_file_download_is_not_compressed(compressed_client, encoding):
+    response = compressed_client.get("/file", headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert len(response.content) == 200_004
+
+
+def test_range_request_keeps_byte_positions(compressed_client):
+    response = compressed_client.get("/file", headers={"Accept-Encoding": "gzip, br", "Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 0-99/200004"
+    assert "content-encoding" not in response.headers
+    assert response.content == (b"%PDF" + b"0123456789" * 10)[:100]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0, gzip", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_accept_encoding_q_values(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_refused_encoding_is_not_applied(compressed_client):
+    response = compressed_client.get("/json", headers={"Accept-Encoding": "br;q=0, gzip;q=0"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"items": ["ticket"] * 500}
+
+
+def test_small_response_is_not_compressed(compressed_client):
+    response = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_streamed_response_is_compressed(compressed_client):
+    response = compressed_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.text == "".join(f"line {i}\n" for i in range(500))
@@ -0,0 +1,29 @@
+"""En-tête Idempotency-Key des mutations de tickets (app.idempotency)"""
+from app import models
+
+TICKET = {"title": "Imprimante HS", "description": "Ne s'allume plus", "type": "materiel", "priority": "moyenne"}
+
+
+def test_retry_replays_stored_response(client, db, users):
+    _, headers = users["user"]
+    headers = {**headers, "Idempotency-Key": "create-1"}
+
+    first = client.post("/tickets/", json=TICKET, headers=headers)
+    retry = client.post("/tickets/", json=TICKET, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert db.query(models.Ticket).count() == 1
+
+
+def test_same_key_with_another_body_is_rejected(client, users):
+    _, headers = users["user"]
+    headers = {**headers, "Idempotency-Key": "create-2"}
+
+    assert client.post("/tickets/", json=TICKET, headers=headers).status_code == 200
+    response = client.post("/tickets/", json={**TICKET, "title": "Autre"}, headers=headers)
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Idempotency-Key already used with a different request"
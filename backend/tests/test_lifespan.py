@@ -0,0 +1,21 @@
+"""Démarrage et arrêt de l'application (lifespan) à travers toute la pile de middlewares"""
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.sla_timers import timer_wakeup
+
+
+def _scheduler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "APScheduler"]
+
+
+def test_lifespan_starts_and_stops_scheduler():
+    with TestClient(app) as client:
+        # Le scheduler (SCHEDULER_ENABLED par défaut) est démarré par le lifespan
+        assert timer_wakeup._scheduler is not None
+        assert _scheduler_threads()
+        assert client.get("/metrics").status_code == 200
+    assert timer_wakeup._scheduler is None
+    assert not _scheduler_threads()
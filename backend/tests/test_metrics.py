@@ -0,0 +1,49 @@
+"""Export Prometheus pendant la création concurrente de séries (app.metrics)"""
+import threading
+
+from app.metrics import Counter, Gauge, Histogram
+
+SERIES = 2000
+
+
+def _sample_lines(text):
+    """Lignes d'échantillon de l'export, chacune vérifiée : nom{labels} valeur"""
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        float(value)
+        assert name.count("{") == name.count("}") <= 1
+        samples.append(name)
+    return samples
+
+
+def test_render_while_new_label_children_are_created():
+    counter = Counter("test_requests", "Requêtes", ("route",))
+    gauge = Gauge("test_in_flight", "En cours", ("route",))
+    histogram = Histogram("test_latency_seconds", "Latence", ("route",))
+    metrics = (counter, gauge, histogram)
+
+    def create_children():
+        for index in range(SERIES):
+            counter.labels(f"/r{index}").inc()
+            gauge.labels(f"/r{index}").set(1)
+            histogram.labels(f"/r{index}").observe(0.01)
+
+    writer = threading.Thread(target=create_children)
+    writer.start()
+    try:
+        while writer.is_alive():
+            for metric in metrics:
+                _sample_lines(metric.render())
+    finally:
+        writer.join()
+
+    counter_samples = _sample_lines(counter.render())
+    gauge_samples = _sample_lines(gauge.render())
+    histogram_samples = _sample_lines(histogram.render())
+    assert len(counter_samples) == SERIES
+    assert len(gauge_samples) == SERIES
+    assert sum(name.startswith("test_latency_seconds_count") for name in histogram_samples) == SERIES
+    assert len(histogram_samples) == SERIES * (len(histogram.buckets) + 3)
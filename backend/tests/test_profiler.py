@@ -0,0 +1,55 @@
+"""Bornes des sessions du profileur échantillonneur (app.profiler)"""
+import threading
+import time
+
+from app import profiler as profiler_module
+from app.main import app
+from app.profiler import PROFILER_MAX_REQUESTS, PROFILER_MAX_SECONDS, ProfileSession, SamplingProfiler
+
+
+def test_request_only_session_has_a_deadline():
+    sampling_profiler = SamplingProfiler()
+    session = sampling_profiler.start(app.routes, "/tickets/", method="GET", max_requests=5_000)
+    try:
+        assert session.max_requests == PROFILER_MAX_REQUESTS
+        assert session.deadline <= time.monotonic() + PROFILER_MAX_SECONDS
+    finally:
+        sampling_profiler.stop()
+
+
+def test_sampler_thread_stops_at_deadline(monkeypatch):
+    monkeypatch.setattr(profiler_module, "PROFILER_MAX_SECONDS", 0.05)
+    sampling_profiler = SamplingProfiler()
+    session = sampling_profiler.start(app.routes, "/tickets/", method="GET", max_requests=10, interval_ms=5)
+    sampling_profiler._thread.join(timeout=2)
+
+    assert not sampling_profiler._thread.is_alive()
+    assert sampling_profiler.active is None
+    assert session.ended_at is not None
+
+
+class _Frame:
+    def __init__(self, code, back=None):
+        self.f_code = code
+        self.f_back = back
+
+
+def test_folded_while_sampler_adds_stacks():
+    endpoint = compile("endpoint = 0", "endpoint.py", "exec")
+    session = ProfileSession("/tickets/", "GET", {endpoint}, None, None, 0.01)
+    leaves = [compile(f"leaf = {index}", f"leaf_{index}.py", "exec") for index in range(2000)]
+
+    def sample_new_stacks():
+        for leaf in leaves:
+            session.sample({1: _Frame(leaf, _Frame(endpoint))}, own_thread=0)
+
+    sampler = threading.Thread(target=sample_new_stacks)
+    sampler.start()
+    try:
+        while sampler.is_alive():
+            session.folded()
+    finally:
+        sampler.join()
+
+    assert len(session.folded().splitlines()) == len(leaves)
+    assert session.samples == len(leaves)
@@ -0,0 +1,61 @@
+"""
+Budgets de requêtes SQL des endpoints autrefois en N+1 (app.query_metrics.query_budget).
+Le nombre de requêtes ne doit pas dépendre du nombre d'utilisateurs ou de tickets.
+"""
+import pytest
+
+from app import models
+from app.query_metrics import query_budget
+
+EXTRA_TECHNICIANS = 15
+
+
+@pytest.fixture
+def populated(db, users):
+    """Techniciens supplémentaires, chacun avec des tickets, pour rendre un N+1 visible"""
+    technician_role = db.query(models.Role).filter(models.Role.name == "Technicien").one()
+    creator, _ = users["user"]
+    number = 0
+    for index in range(EXTRA_TECHNICIANS):
+        technician = models.User(
+            full_name=f"Technicien {index}", email=f"technician{index}@example.com",
+            username=f"technician{index}", password_hash="$2b$04$" + "a" * 53,
+            role_id=technician_role.id, actif=True, specialization="applicatif",
+        )
+        db.add(technician)
+        db.flush()
+        for status in (models.TicketStatus.EN_COURS, models.TicketStatus.RESOLU, models.TicketStatus.CLOTURE):
+            number += 1
+            db.add(models.Ticket(
+                number=number, title="Panne", description="x",
+                type=models.TicketType.APPLICATIF, priority=models.TicketPriority.MOYENNE,
+                status=status, creator_id=creator.id, technician_id=technician.id,
+            ))
+    db.commit()
+    return users
+
+
+# (url, budget) : connexion (SELECT 1), utilisateur connecté, son rôle et une éventuelle
+# resynchronisation de la liste de révocation compris
+ENDPOINT_BUDGETS = [
+    ("/users/", 5),
+    ("/users/technicians", 7),
+]
+
+
+@pytest.mark.parametrize("url, budget", ENDPOINT_BUDGETS)
+def test_list_endpoints_stay_within_budget(client, populated, url, budget):
+    _, headers = populated["dsi"]
+    with query_budget(budget, n_plus_one_threshold=EXTRA_TECHNICIANS):
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) >= EXTRA_TECHNICIANS
+
+
+def test_technician_stats_stay_within_budget(client, db, populated):
+    _, headers = populated["dsi"]
+    # Technicien avec trois tickets : un historique lu ticket par ticket dépasserait le seuil
+    technician = db.query(models.User).filter(models.User.username == "technician0").one()
+    with query_budget(6, n_plus_one_threshold=3):
+        response = client.get(f"/users/technicians/{technician.id}/stats", headers=headers)
+    assert response.status_code == 200
@@ -0,0 +1,29 @@
+"""Tâches planifiées : session, journalisation et comptage des échecs communs (_scheduled_job)"""
+from app import scheduler
+from app.metrics import SCHEDULER_JOB_FAILURES
+
+
+def test_failed_job_is_logged_and_counted(db, monkeypatch, caplog):
+    def fail(session):
+        raise RuntimeError("base indisponible")
+
+    monkeypatch.setattr(scheduler, "purge_expired_keys", fail)
+    failures = SCHEDULER_JOB_FAILURES.labels("purge_idempotency_keys")
+    before = failures.value
+
+    assert scheduler.purge_idempotency_keys() is None
+    assert failures.value == before + 1
+    assert "Erreur lors de la purge des clés d'idempotence" in caplog.text
+
+
+def test_job_receives_a_session_and_returns_its_count(db, monkeypatch):
+    sessions = []
+
+    def purge(session):
+        sessions.append(session)
+        return 3
+
+    monkeypatch.setattr(scheduler, "purge_expired_keys", purge)
+
+    assert scheduler.purge_idempotency_keys() == 3
+    assert len(sessions) == 1
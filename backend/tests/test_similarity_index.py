@@ -0,0 +1,35 @@
+"""Synchronisation de l'index de similarité entre processus (app.similarity_index)"""
+from app import models
+from app import similarity_index as similarity_module
+from app.similarity_index import SimilarityIndex
+
+PRINTER = {"title": "Imprimante bloquée", "description": "L'imprimante du 2e étage affiche bourrage papier",
+           "type": "materiel", "priority": "moyenne"}
+NETWORK = {"title": "Wifi coupé", "description": "Plus de connexion réseau dans la salle de réunion",
+           "type": "materiel", "priority": "moyenne"}
+
+
+def _create(client, headers, ticket):
+    return client.post("/tickets/", json=ticket, headers=headers).json()["id"]
+
+
+def test_other_worker_edits_and_deletes_are_picked_up(client, db, users, monkeypatch):
+    _, headers = users["user"]
+    printer = _create(client, headers, PRINTER)
+    network = _create(client, headers, NETWORK)
+    worker, other_worker = SimilarityIndex(), SimilarityIndex()
+    worker.load(db)
+    other_worker.load(db)
+    assert worker.similar(db, printer) == []
+
+    # L'autre processus réécrit la signature d'un ticket existant (identifiant plus petit)
+    ticket = db.get(models.Ticket, network)
+    ticket.title, ticket.description = PRINTER["title"], PRINTER["description"]
+    other_worker.index_ticket(db, ticket)
+    assert [similar_id for similar_id, _ in worker.similar(db, printer)] == [network]
+
+    # Puis le supprime : retiré à la prochaine réconciliation
+    db.query(models.TicketSignature).filter(models.TicketSignature.ticket_id == network).delete()
+    db.commit()
+    monkeypatch.setattr(similarity_module, "SIMILARITY_RECONCILE_SECONDS", 0)
+    assert worker.similar(db, printer) == []
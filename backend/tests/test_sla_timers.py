@@ -0,0 +1,34 @@
+"""Emails des échéances de tickets (app.sla_timers.process_due_timers)"""
+from datetime import datetime, timedelta
+
+from app import models
+from app.email_service import email_service
+from app.sla_timers import AUTO_CLOSE_DAYS, process_due_timers
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def test_auto_close_email_respects_digest_preference(client, db, users, monkeypatch):
+    creator, headers = users["user"]
+    ticket_id = client.post("/tickets/", json=TICKET, headers=headers).json()["id"]
+    resolved_at = datetime.utcnow()
+    ticket = db.get(models.Ticket, ticket_id)
+    ticket.status = models.TicketStatus.RESOLU
+    ticket.resolved_at = resolved_at
+    db.add(models.NotificationPreference(
+        user_id=creator.id, notification_type=models.NotificationType.CLOTURE_AUTOMATIQUE,
+        email_mode=models.EmailDeliveryMode.DIGEST, digest_window_minutes=60,
+    ))
+    db.commit()
+    sent = []
+    monkeypatch.setattr(email_service, "send_ticket_auto_closed_notification", lambda **kwargs: sent.append(kwargs))
+    monkeypatch.setattr(email_service, "send_validation_reminder", lambda **kwargs: sent.append(kwargs))
+
+    process_due_timers(db, now=resolved_at + timedelta(days=AUTO_CLOSE_DAYS, minutes=1))
+
+    db.expire_all()
+    assert db.get(models.Ticket, ticket_id).status == models.TicketStatus.CLOTURE
+    # Préférence du type CLOTURE_AUTOMATIQUE : mis en attente ; rappels (défaut immédiat) envoyés
+    assert all("reminder_number" in kwargs for kwargs in sent)
+    queued = db.query(models.EmailDigestItem).filter(models.EmailDigestItem.user_id == creator.id).all()
+    assert [item.notification_type for item in queued] == [models.NotificationType.CLOTURE_AUTOMATIQUE]
@@ -0,0 +1,89 @@
+"""Emails et notifications des opérations groupées (POST /tickets/bulk)"""
+from app import models
+from app.email_service import email_service
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def _capture_summaries(monkeypatch):
+    sent = []
+
+    def send_tickets_bulk_summary(template, recipient_email, recipient_name, tickets, notes=None):
+        sent.append((template, recipient_email, tickets))
+        return True
+
+    monkeypatch.setattr(email_service, "send_tickets_bulk_summary", send_tickets_bulk_summary)
+    return sent
+
+
+def _create_tickets(client, headers, count, **overrides):
+    return [client.post("/tickets/", json={**TICKET, **overrides}, headers=headers).json()["id"] for _ in range(count)]
+
+
+def test_bulk_assign_respects_digest_preferences_and_ticket_priority(client, db, users, monkeypatch):
+    _, user_headers = users["user"]
+    technician, _ = users["tech"]
+    _, secretary_headers = users["secretary"]
+    db.add(models.NotificationPreference(
+        user_id=technician.id, notification_type=None,
+        email_mode=models.EmailDeliveryMode.DIGEST, digest_window_minutes=60,
+    ))
+    db.commit()
+    ticket_ids = _create_tickets(client, user_headers, 2)
+    sent = _capture_summaries(monkeypatch)
+
+    response = client.post("/tickets/bulk", headers=secretary_headers, json={
+        "action": "assign", "ticket_ids": ticket_ids, "technician_id": technician.id, "priority": "critique",
+    })
+
+    assert response.json()["succeeded"] == 2
+    # Technicien en mode récapitulatif : pas d'email immédiat, tickets mis en attente
+    assert [template for template, _, _ in sent] == ["tickets_bulk_assigned_to_creator"]
+    assert {ticket["priority"] for ticket in sent[0][2]} == {"moyenne"}
+    queued = db.query(models.EmailDigestItem).filter(models.EmailDigestItem.user_id == technician.id).all()
+    assert sorted(item.ticket_id for item in queued) == sorted(ticket_ids)
+    assert {item.notification_type for item in queued} == {models.NotificationType.ASSIGNATION}
+
+
+def test_bulk_assign_sends_critical_tickets_immediately(client, db, users, monkeypatch):
+    _, user_headers = users["user"]
+    technician, _ = users["tech"]
+    _, secretary_headers = users["secretary"]
+    db.add(models.NotificationPreference(
+        user_id=technician.id, notification_type=None,
+        email_mode=models.EmailDeliveryMode.DIGEST, digest_window_minutes=60,
+    ))
+    db.commit()
+    critical = _create_tickets(client, user_headers, 1, priority="critique")
+    normal = _create_tickets(client, user_headers, 1)
+    sent = _capture_summaries(monkeypatch)
+
+    client.post("/tickets/bulk", headers=secretary_headers, json={
+        "action": "assign", "ticket_ids": critical + normal, "technician_id": technician.id,
+    })
+
+    technician_emails = [tickets for template, _, tickets in sent if template == "tickets_bulk_assigned"]
+    assert [[ticket["id"] for ticket in tickets] for tickets in technician_emails] == [critical]
+
+
+def test_bulk_close_message_follows_previous_status(client, db, users, monkeypatch):
+    _, user_headers = users["user"]
+    technician, _ = users["tech"]
+    _, secretary_headers = users["secretary"]
+    _capture_summaries(monkeypatch)
+    ticket_ids = _create_tickets(client, user_headers, 1)
+    client.post("/tickets/bulk", headers=secretary_headers, json={
+        "action": "assign", "ticket_ids": ticket_ids, "technician_id": technician.id,
+    })
+
+    client.post("/tickets/bulk", headers=secretary_headers, json={"action": "close", "ticket_ids": ticket_ids})
+
+    message = (
+        db.query(models.Notification.message)
+        .filter(
+            models.Notification.user_id == technician.id,
+            models.Notification.type == models.NotificationType.TICKET_CLOTURE,
+        )
+        .scalar()
+    )
+    assert "qui vous était assigné" in message
@@ -0,0 +1,29 @@
+"""Suppression d'un ticket par son créateur (DELETE /tickets/{id})"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import models
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def test_delete_ticket_with_pending_digest_items(client, db, users):
+    creator, headers = users["user"]
+    ticket_id = client.post("/tickets/", json=TICKET, headers=headers).json()["id"]
+    db.add(models.EmailDigestItem(
+        user_id=creator.id, notification_type=models.NotificationType.TICKET_CREE,
+        ticket_id=ticket_id, message="Ticket créé", due_at=datetime.utcnow() + timedelta(hours=1),
+    ))
+    db.commit()
+
+    # SQLite n'applique les clés étrangères qu'à la demande (PostgreSQL toujours)
+    db.execute(text("PRAGMA foreign_keys=ON"))
+    try:
+        response = client.delete(f"/tickets/{ticket_id}", headers=headers)
+    finally:
+        db.execute(text("PRAGMA foreign_keys=OFF"))
+
+    assert response.status_code == 204
+    db.expire_all()
+    assert db.query(models.EmailDigestItem).filter(models.EmailDigestItem.ticket_id == ticket_id).count() == 0
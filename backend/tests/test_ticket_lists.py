@@ -0,0 +1,25 @@
+"""Listes de tickets : vue complète et vue compacte (view=compact / fields=)"""
+from app import schemas
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def test_list_endpoints_document_both_views(client):
+    paths = client.get("/openapi.json").json()["paths"]
+
+    for path in ("/tickets/", "/tickets/me", "/tickets/assigned"):
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        variants = {str(option) for option in schema["anyOf"]}
+        assert any("TicketRead" in variant for variant in variants), path
+        assert any("TicketCompactList" in variant for variant in variants), path
+
+
+def test_compact_view_matches_its_schema(client, users):
+    creator, headers = users["user"]
+    client.post("/tickets/", json=TICKET, headers=headers)
+
+    response = client.get("/tickets/me", params={"fields": "title,creator_id"}, headers=headers)
+
+    payload = schemas.TicketCompactList.model_validate(response.json())
+    assert [ticket.title for ticket in payload.tickets] == [TICKET["title"]]
+    assert payload.users[creator.id].full_name == creator.full_name
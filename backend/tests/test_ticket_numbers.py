@@ -0,0 +1,29 @@
+"""Numérotation des tickets (POST /tickets/)"""
+from datetime import datetime, timedelta
+
+from app import models
+
+TICKET = {"title": "Écran noir", "description": "Plus d'affichage", "type": "materiel", "priority": "moyenne"}
+
+
+def _archive(db, creator, number):
+    closed_at = datetime.utcnow() - timedelta(days=400)
+    db.add(models.TicketArchive(
+        id=number, number=number, title="Ancien", description="x",
+        type=models.TicketType.MATERIEL, priority=models.TicketPriority.MOYENNE,
+        status=models.TicketStatus.CLOTURE, creator_id=creator.id,
+        created_at=closed_at - timedelta(days=2), closed_at=closed_at,
+        ticket_closed_at=closed_at, archived_at=datetime.utcnow(), version=1,
+    ))
+    db.commit()
+
+
+def test_numbers_continue_after_archived_tickets(client, db, users):
+    creator, headers = users["user"]
+    _archive(db, creator, 41)
+
+    first = client.post("/tickets/", json=TICKET, headers=headers)
+    second = client.post("/tickets/", json=TICKET, headers=headers)
+
+    assert first.json()["number"] == 42
+    assert second.json()["number"] == 43
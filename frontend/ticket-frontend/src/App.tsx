@@ -42,6 +42,8 @@ function App() {
         }
       } else {
         localStorage.removeItem("token");
+        localStorage.removeItem("refreshToken");
+        localStorage.removeItem("tokenExpiresIn");
         localStorage.removeItem("userRole");
         setUserRole(null);
       }
@@ -50,6 +52,46 @@ function App() {
     }
   }, [token]);
 
+  // Renouveler le jeton d'accès (courte durée) avant son expiration grâce au jeton de rafraîchissement
+  // Le jeton de rafraîchissement n'est utilisable qu'une fois : il est relu au moment de l'appel
+  // (un autre onglet a pu l'échanger entre-temps)
+  useEffect(() => {
+    if (!token) return;
+    if (!localStorage.getItem("refreshToken")) return;
+    const expiresIn = Number(localStorage.getItem("tokenExpiresIn")) || 900;
+    // Rafraîchir une minute avant l'expiration (au minimum toutes les 30 secondes)
+    const delay = Math.max(expiresIn - 60, 30) * 1000;
+    const timeoutId = setTimeout(() => {
+      const refreshToken = localStorage.getItem("refreshToken");
+      if (!refreshToken) return;
+      fetch("http://localhost:8000/auth/refresh", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+      })
+        .then((res) => {
+          if (!res.ok) throw new Error("Session expirée");
+          return res.json();
+        })
+        .then((data) => {
+          localStorage.setItem("refreshToken", data.refresh_token);
+          localStorage.setItem("tokenExpiresIn", String(data.expires_in));
+          setToken(data.access_token);
+        })
+        .catch((err) => {
+          // Jeton déjà échangé par un autre onglet : reprendre le couple qu'il a enregistré
+          const rotatedToken = localStorage.getItem("token");
+          if (localStorage.getItem("refreshToken") !== refreshToken && rotatedToken) {
+            setToken(rotatedToken);
+            return;
+          }
+          console.error("Erreur renouvellement du jeton:", err);
+          setToken(null);
+        });
+    }, delay);
+    return () => clearTimeout(timeoutId);
+  }, [token]);
+
   // Fonction pour déterminer le dashboard selon le rôle
   function getDashboard() {
     if (!token) return <Navigate to="/" replace />;
@@ -0,0 +1,42 @@
+// Mutations de tickets (création, workflow, commentaires) avec un en-tête Idempotency-Key.
+// La même clé est réutilisée pour chaque nouvelle tentative : si la première requête
+// a abouti côté serveur mais que la réponse s'est perdue (coupure réseau, passerelle),
+// le backend renvoie la réponse mémorisée au lieu de recréer le ticket ou de rejouer
+// la transition (historique, notifications, emails).
+
+const MAX_ATTEMPTS = 3;
+const RETRY_DELAY_MS = 500;
+const RETRYABLE_STATUSES = [502, 503, 504];
+
+function newIdempotencyKey(): string {
+  if (typeof crypto !== "undefined" && typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+export async function idempotentFetch(url: string, init: RequestInit = {}): Promise<Response> {
+  const headers = new Headers(init.headers);
+  headers.set("Idempotency-Key", newIdempotencyKey());
+
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await fetch(url, { ...init, headers });
+      // 409 avec Retry-After : la première tentative est encore en cours de traitement
+      const stillProcessing = res.status === 409 && res.headers.has("Retry-After");
+      if (attempt < MAX_ATTEMPTS && (RETRYABLE_STATUSES.includes(res.status) || stillProcessing)) {
+        await sleep(RETRY_DELAY_MS * attempt);
+        continue;
+      }
+      return res;
+    } catch (err) {
+      // Erreur réseau : la requête a pu être traitée, on la renvoie avec la même clé
+      if (attempt >= MAX_ATTEMPTS) throw err;
+      await sleep(RETRY_DELAY_MS * attempt);
+    }
+  }
+}
@@ -3,6 +3,7 @@ import { useSearchParams, useLocation, useNavigate } from "react-router-dom";
 import { Users, Clock3, TrendingUp, Award, UserCheck, Star, LayoutDashboard, ChevronLeft, ChevronRight, Bell, BarChart3, Search, Ticket, Wrench, CheckCircle2, AlertTriangle, Clock, Briefcase, UserPlus, CornerUpRight, Box } from "lucide-react";
 import React from "react";
 import helpdeskLogo from "../assets/helpdesk-logo.png";
+import { idempotentFetch } from "../idempotentFetch";
 import jsPDF from "jspdf";
 import autoTable from "jspdf-autotable";
 import * as XLSX from "xlsx";
@@ -1248,14 +1249,14 @@ function DSIDashboard({ token }: DSIDashboardProps) {
     try {
       const unreadIds = notifications.filter((n) => !n.read).map((n) => n.id);
       if (token && token.trim() !== "" && unreadIds.length > 0) {
-        await Promise.all(
-          unreadIds.map((id) =>
-            fetch(`http://localhost:8000/notifications/${id}/read`, {
-              method: "PUT",
-              headers: { Authorization: `Bearer ${token}` },
-            })
-          )
-        );
+        await fetch("http://localhost:8000/notifications/batch", {
+          method: "POST",
+          headers: {
+            Authorization: `Bearer ${token}`,
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({ action: "read", ids: unreadIds }),
+        });
       }
     } catch {}
     setNotifications([]);
@@ -2107,7 +2108,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/assign`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/assign`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2201,7 +2202,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/reassign`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/reassign`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2267,7 +2268,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
     }
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/delegate-adjoint`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/delegate-adjoint`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2315,7 +2316,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/escalate`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/escalate`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2351,7 +2352,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/status`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/status`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2447,7 +2448,7 @@ function DSIDashboard({ token }: DSIDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/reopen`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/reopen`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
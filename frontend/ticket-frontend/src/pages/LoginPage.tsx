@@ -71,6 +71,12 @@ function LoginPage({ onLogin }: LoginPageProps) {
 
       const data = await res.json();
       localStorage.setItem("token", data.access_token);
+      if (data.refresh_token) {
+        localStorage.setItem("refreshToken", data.refresh_token);
+      }
+      if (data.expires_in) {
+        localStorage.setItem("tokenExpiresIn", String(data.expires_in));
+      }
       
       // Récupérer les infos de l'utilisateur pour connaître son rôle
       try {
@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import { useSearchParams, useLocation, useNavigate } from "react-router-dom";
 import { Clock3, Users, CheckCircle2, ChevronRight, ChevronLeft, ChevronDown, LayoutDashboard, Bell, Search, Clock, Monitor, Wrench, Forward, AlertTriangle, BarChart3, TrendingUp, Box, UserPlus } from "lucide-react";
 import helpdeskLogo from "../assets/helpdesk-logo.png";
+import { idempotentFetch } from "../idempotentFetch";
 import jsPDF from "jspdf";
 import autoTable from "jspdf-autotable";
 import * as XLSX from "xlsx";
@@ -2436,7 +2437,7 @@ Les données détaillées seront disponibles dans une prochaine version.</pre>
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/assign`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/assign`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2672,7 +2673,7 @@ Les données détaillées seront disponibles dans une prochaine version.</pre>
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/reassign`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/reassign`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2717,7 +2718,7 @@ Les données détaillées seront disponibles dans une prochaine version.</pre>
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/escalate`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/escalate`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2753,7 +2754,7 @@ Les données détaillées seront disponibles dans une prochaine version.</pre>
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/status`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/status`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -2849,7 +2850,7 @@ Les données détaillées seront disponibles dans une prochaine version.</pre>
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/reopen`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/reopen`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
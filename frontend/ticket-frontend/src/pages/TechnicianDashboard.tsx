@@ -2,6 +2,7 @@ import { useEffect, useState, useRef } from "react";
 import { useSearchParams, useLocation, useNavigate } from "react-router-dom";
 import { ClipboardList, Clock3, CheckCircle2, LayoutDashboard, ChevronLeft, ChevronRight, Bell, Search, Box, Clock, Monitor, Wrench } from "lucide-react";
 import helpdeskLogo from "../assets/helpdesk-logo.png";
+import { idempotentFetch } from "../idempotentFetch";
 
 interface Notification {
   id: string;
@@ -544,7 +545,7 @@ function TechnicianDashboard({ token }: TechnicianDashboardProps) {
   async function handleTakeCharge(ticketId: string) {
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/status`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/status`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -586,7 +587,7 @@ function TechnicianDashboard({ token }: TechnicianDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/comments`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/comments`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -623,7 +624,7 @@ function TechnicianDashboard({ token }: TechnicianDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/comments`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/comments`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -665,7 +666,7 @@ function TechnicianDashboard({ token }: TechnicianDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/status`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/status`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
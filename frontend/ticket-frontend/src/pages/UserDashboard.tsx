@@ -3,6 +3,7 @@ import type { FormEvent } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
 import { Clock, CheckCircle, LayoutDashboard, PlusCircle, Ticket, ChevronLeft, ChevronRight, Bell, Wrench, Monitor, Search, Send, Info, CheckCircle2, AlertTriangle, XCircle, Check, Pencil, Trash2 } from "lucide-react";
 import helpdeskLogo from "../assets/helpdesk-logo.png";
+import { idempotentFetch } from "../idempotentFetch";
 
 interface UserDashboardProps {
   token: string;
@@ -384,7 +385,7 @@ function UserDashboard({ token: tokenProp }: UserDashboardProps) {
     e.preventDefault();
     if (!actualToken || !editTicketId) return;
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${editTicketId}`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${editTicketId}`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -697,7 +698,7 @@ function UserDashboard({ token: tokenProp }: UserDashboardProps) {
       console.log("Envoi de la requête de création de ticket...", requestBody);
       console.log("Token utilisé:", actualToken.substring(0, 20) + "...");
       
-      const res = await fetch("http://localhost:8000/tickets/", {
+      const res = await idempotentFetch("http://localhost:8000/tickets/", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -765,7 +766,7 @@ function UserDashboard({ token: tokenProp }: UserDashboardProps) {
         requestBody.rejection_reason = rejectionReason.trim();
       }
 
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/validate`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/validate`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",
@@ -802,7 +803,7 @@ function UserDashboard({ token: tokenProp }: UserDashboardProps) {
 
     setLoading(true);
     try {
-      const res = await fetch(`http://localhost:8000/tickets/${ticketId}/feedback`, {
+      const res = await idempotentFetch(`http://localhost:8000/tickets/${ticketId}/feedback`, {
         method: "PUT",
         headers: {
           "Content-Type": "application/json",